@@ -0,0 +1,122 @@
+"""Latency of "any available staff" bookings in a clinic with 500 qualified staff.
+
+Run from app/ against a disposable database:
+    MONGO_URI=mongodb://localhost:27017 python -m benchmarks.bench_assignment [--staff 500] [--bookings 1000]
+
+Seeds one clinic whose --staff members all provide the service and are available all
+day, then books --bookings slots through AssignmentService.auto_assign, --concurrency at
+a time, on slots chosen so that many requests contend for the same time. Reports the
+latency of ranking the candidates alone and of a whole booking (ranking, slot claim and
+insert), and checks that no staff member ended up double booked.
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+
+def percentiles(samples) -> str:
+    cuts = statistics.quantiles(samples, n=100)
+    return f"{statistics.median(samples):>9.2f}{cuts[94]:>9.2f}{cuts[98]:>9.2f}"
+
+
+async def run(args):
+    from fastapi import HTTPException
+    from database.database import connect_to_mongo, close_mongo_connection, get_database
+    from database.sharding import ensure_indexes as ensure_sharding_indexes
+    from schemas.Appointment import AppointmentAutoCreate
+    from services.Assignment import AssignmentService
+    from services.Booking import ensure_indexes as ensure_booking_indexes
+
+    connect_to_mongo()
+    database = get_database()
+    await database.client.drop_database(database.name)
+    rng = random.Random(args.seed)
+    clinic_id, service_id, customer_id = str(uuid4()), str(uuid4()), str(uuid4())
+    day = (datetime.utcnow() + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+
+    try:
+        await ensure_sharding_indexes()
+        await ensure_booking_indexes()
+        await database.services.insert_one({
+            "_id": service_id, "clinic_id": clinic_id, "name": "Checkup", "duration_minutes": 30, "price": 50
+        })
+        await database.users.insert_one({"_id": customer_id, "email": "bench@example.com"})
+        staff_ids = [str(uuid4()) for _ in range(args.staff)]
+        await database.staff.insert_many([
+            {"_id": staff_id, "clinic_id": clinic_id, "service_ids": [service_id]} for staff_id in staff_ids
+        ])
+        await database.availability.insert_many([
+            {
+                "_id": str(uuid4()), "clinic_id": clinic_id, "staff_id": staff_id,
+                "start_time": day + timedelta(hours=8), "end_time": day + timedelta(hours=18)
+            }
+            for staff_id in staff_ids
+        ])
+
+        service = AssignmentService()
+        # Few distinct half hours, so concurrent requests race for the same staff
+        slots = [day + timedelta(hours=8, minutes=30 * rng.randrange(args.slots)) for _ in range(args.bookings)]
+
+        rank_ms = []
+        for start in slots[:200]:
+            started = time.perf_counter()
+            await service.rank_candidates(clinic_id, service_id, start, start + timedelta(minutes=30))
+            rank_ms.append((time.perf_counter() - started) * 1000)
+
+        book_ms, outcomes = [], {"booked": 0, "full": 0}
+        gate = asyncio.Semaphore(args.concurrency)
+
+        async def book(start: datetime):
+            async with gate:
+                started = time.perf_counter()
+                try:
+                    await service.auto_assign(AppointmentAutoCreate(
+                        customer_id=customer_id, clinic_id=clinic_id, service_id=service_id, start_time=start
+                    ))
+                    outcomes["booked"] += 1
+                except HTTPException:
+                    outcomes["full"] += 1
+                book_ms.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(book(start) for start in slots))
+        elapsed = time.perf_counter() - started
+
+        overlaps = await database.appointments.aggregate([
+            {"$group": {"_id": {"staff_id": "$staff_id", "start_time": "$start_time"}, "count": {"$sum": 1}}},
+            {"$match": {"count": {"$gt": 1}}},
+            {"$count": "double_booked"}
+        ]).to_list(length=1)
+
+        print(f"{args.staff} staff, {args.bookings} bookings over {args.slots} half hours, {args.concurrency} concurrent")
+        print(f"{'step':<18}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+        print(f"{'rank candidates':<18}{percentiles(rank_ms)}")
+        print(f"{'auto_assign':<18}{percentiles(book_ms)}")
+        print(f"{outcomes['booked']} booked, {outcomes['full']} refused, {args.bookings / elapsed:.0f} bookings/s")
+        print(f"double booked staff slots: {overlaps[0]['double_booked'] if overlaps else 0}")
+    finally:
+        await database.client.drop_database(database.name)
+        close_mongo_connection()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--staff", type=int, default=500)
+    parser.add_argument("--bookings", type=int, default=1000)
+    parser.add_argument("--slots", type=int, default=4, help="Distinct half hours the bookings spread over")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--database", default="bench_assignment")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    # Read by config at import: point the app at the throwaway database before loading it
+    os.environ["DATABASE_NAME"] = args.database
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
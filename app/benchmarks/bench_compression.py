@@ -0,0 +1,76 @@
+"""Bytes on the wire and CPU per encoding for typical list pages.
+
+Run from app/: python -m benchmarks.bench_compression [--rounds 200]
+
+Pages are encoded the way the fast path sends them. For each page size and
+encoding the table shows the compressed size, the CPU to compress the whole
+body, and the CPU of a precompressed cache hit. The last rows compress an NDJSON
+export the way it streams: one flush per 100-row chunk.
+"""
+import argparse
+import time
+
+import orjson
+
+from benchmarks.bench_fast_response import appointment_document, review_document
+from schemas.Appointment import AppointmentOut
+from schemas.Review import ReviewOut
+from utils.compression import ENCODERS, CompressedBodyCache
+from utils.fast_response import project_documents
+
+
+def timed_us(run, rounds: int) -> float:
+    run()
+    started = time.perf_counter()
+    for _ in range(rounds):
+        run()
+    return (time.perf_counter() - started) / rounds * 1e6
+
+
+def compress_whole(encoding: str, body: bytes) -> bytes:
+    encoder = ENCODERS[encoding]()
+    return encoder.compress(body) + encoder.finish()
+
+
+def compress_stream(encoding: str, chunks) -> int:
+    encoder = ENCODERS[encoding]()
+    size = sum(len(encoder.compress(chunk)) for chunk in chunks)
+    return size + len(encoder.finish())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=200, help="compressions per measurement")
+    args = parser.parse_args()
+
+    pages = []
+    for schema, make in ((AppointmentOut, appointment_document), (ReviewOut, review_document)):
+        for items in (10, 50, 100, 500):
+            documents = project_documents(schema, [make(i) for i in range(items)])
+            pages.append((f"{schema.__name__} x{items}", orjson.dumps(documents, default=str)))
+
+    print(f"{'page':<22}{'raw':>9}  {'encoding':<9}{'wire':>9}{'ratio':>8}{'compress':>12}{'cache hit':>12}")
+    for name, body in pages:
+        for encoding in ENCODERS:
+            compressed = compress_whole(encoding, body)
+            cpu = timed_us(lambda: compress_whole(encoding, body), args.rounds)
+            cache = CompressedBodyCache()
+            key = ('W/"etag"', "/reviews/target/x?", encoding)
+            cache.put(key, compressed)
+            hit = timed_us(lambda: cache.get(key), args.rounds * 10)
+            print(
+                f"{name:<22}{len(body):>9}  {encoding:<9}{len(compressed):>9}"
+                f"{len(body) / len(compressed):>7.1f}x{cpu:>9.0f} us{hit:>9.2f} us"
+            )
+
+    rows = project_documents(AppointmentOut, [appointment_document(i) for i in range(5000)])
+    chunks = [b"".join(orjson.dumps(row, default=str) + b"\n" for row in rows[i:i + 100]) for i in range(0, len(rows), 100)]
+    raw = sum(len(chunk) for chunk in chunks)
+    for encoding in ENCODERS:
+        size = compress_stream(encoding, chunks)
+        cpu = timed_us(lambda: compress_stream(encoding, chunks), max(1, args.rounds // 20))
+        print(f"{'NDJSON 5000 rows':<22}{raw:>9}  {encoding:<9}{size:>9}{raw / size:>7.1f}x{cpu:>9.0f} us{'-':>12}")
+
+
+if __name__ == "__main__":
+    main()
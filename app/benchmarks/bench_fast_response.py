@@ -0,0 +1,98 @@
+"""Micro-benchmark of the list endpoint fast path against the response_model path.
+
+Run from app/: python -m benchmarks.bench_fast_response [--items 100] [--rounds 200]
+
+Both paths start from the documents Motor hands back for one page. The model path
+builds a schema object per document, as the routes do, then lets FastAPI validate
+and serialize the list through response_model and JSONResponse; the fast path is
+fast_list_response().
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import List
+from uuid import uuid4
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+import utils.fast_response as fast_response
+from schemas.Appointment import AppointmentOut
+from schemas.Review import ReviewOut
+from schemas.Service import ServiceOut
+
+
+def appointment_document(i: int) -> dict:
+    start = datetime(2025, 1, 1, 9) + timedelta(minutes=30 * i)
+    return {
+        "_id": str(uuid4()), "customer_id": str(uuid4()), "clinic_id": str(uuid4()),
+        "service_id": str(uuid4()), "staff_id": str(uuid4()),
+        "start_time": start, "end_time": start + timedelta(minutes=30), "status": "booked",
+    }
+
+
+def service_document(i: int) -> dict:
+    return {
+        "_id": str(uuid4()), "clinic_id": str(uuid4()), "name": f"Service {i}",
+        "duration_minutes": 30 + 15 * (i % 4), "price": 49.5 + i,
+    }
+
+
+def review_document(i: int) -> dict:
+    return {
+        "_id": str(uuid4()), "user_id": str(uuid4()), "target_id": str(uuid4()), "target_type": "clinic",
+        "rating": 1 + i % 5, "comment": "Friendly staff, on time, would book again.",
+        "created_at": datetime(2025, 1, 1) + timedelta(hours=i), "helpful_count": i % 7,
+    }
+
+
+def to_model(schema, document: dict):
+    document = dict(document)
+    document["id"] = str(document.pop("_id"))
+    return schema(**document)
+
+
+async def model_path(schema, field, documents: List[dict]) -> bytes:
+    content = [to_model(schema, document) for document in documents]
+    serialized = await serialize_response(field=field, response_content=content)
+    return JSONResponse(serialized).body
+
+
+def fast_path(schema, documents: List[dict]) -> bytes:
+    return fast_response.fast_list_response(schema, documents).body
+
+
+def per_page_us(run, rounds: int) -> float:
+    run()  # warm caches (field maps, pydantic validators)
+    started = time.perf_counter()
+    for _ in range(rounds):
+        run()
+    return (time.perf_counter() - started) / rounds * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=100, help="documents per page")
+    parser.add_argument("--rounds", type=int, default=200, help="pages encoded per measurement")
+    args = parser.parse_args()
+
+    loop = asyncio.new_event_loop()
+    print(f"{'schema':<16}{'model path':>14}{'fast path':>14}{'fast+debug':>14}{'speed-up':>10}")
+    for schema, make in ((AppointmentOut, appointment_document), (ServiceOut, service_document), (ReviewOut, review_document)):
+        documents = [make(i) for i in range(args.items)]
+        field = create_model_field(name="response", type_=List[schema], mode="serialization")
+
+        model = per_page_us(lambda: loop.run_until_complete(model_path(schema, field, documents)), args.rounds)
+        fast = per_page_us(lambda: fast_path(schema, documents), args.rounds)
+        fast_response.DEBUG = True
+        debug = per_page_us(lambda: fast_path(schema, documents), args.rounds)
+        fast_response.DEBUG = False
+
+        print(f"{schema.__name__:<16}{model:>11.0f} us{fast:>11.0f} us{debug:>11.0f} us{model / fast:>9.1f}x")
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
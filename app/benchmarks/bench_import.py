@@ -0,0 +1,105 @@
+"""Throughput of the bulk import pipeline on a generated onboarding file.
+
+Run from app/ against a disposable database:
+    MONGO_URI=mongodb://localhost:27017 python -m benchmarks.bench_import [--clinics 200] [--batch-size 5000]
+
+Generates JSON lines for --clinics clinics, each with --services services, --staff staff
+members offering all of them and --windows availability windows per staff member, and
+imports them twice through ImportService.run: the first pass inserts everything, the
+second finds every natural key already there and updates. Reports rows per second,
+the entities written and the peak memory of the process, which should not grow with
+the size of the file.
+"""
+import argparse
+import asyncio
+import os
+import resource
+import time
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+import orjson
+
+
+def onboarding_lines(args, day: datetime):
+    for c in range(args.clinics):
+        clinic = f"clinic-{c}"
+        yield orjson.dumps({
+            "type": "clinic", "ref": clinic, "name": f"Clinic {c}", "address": f"{c} Main Street",
+            "owner_email": f"owner{c}@example.com"
+        }).decode()
+        services = [f"{clinic}-service-{s}" for s in range(args.services)]
+        for s, service in enumerate(services):
+            yield orjson.dumps({
+                "type": "service", "ref": service, "clinic": clinic, "name": f"Service {s}",
+                "duration_minutes": 30, "price": 40 + s
+            }).decode()
+        for t in range(args.staff):
+            staff = f"{clinic}-staff-{t}"
+            yield orjson.dumps({
+                "type": "staff", "ref": staff, "clinic": clinic,
+                "user_email": f"staff{c}.{t}@example.com", "services": services
+            }).decode()
+            for w in range(args.windows):
+                start_time = day + timedelta(days=w, hours=9)
+                yield orjson.dumps({
+                    "type": "availability", "staff": staff,
+                    "start_time": start_time.isoformat(), "end_time": (start_time + timedelta(hours=8)).isoformat()
+                }).decode()
+
+
+async def run(args):
+    from database.database import connect_to_mongo, close_mongo_connection, get_database
+    from services.Import import ImportService
+
+    connect_to_mongo()
+    database = get_database()
+    await database.client.drop_database(database.name)
+    day = (datetime.utcnow() + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+
+    try:
+        users = [{"_id": str(uuid4()), "email": f"owner{c}@example.com", "role": "clinic_manager"} for c in range(args.clinics)]
+        users += [
+            {"_id": str(uuid4()), "email": f"staff{c}.{t}@example.com", "role": "staff"}
+            for c in range(args.clinics) for t in range(args.staff)
+        ]
+        await database.users.insert_many(users)
+        await database.users.create_index("email")
+
+        print(f"{args.clinics} clinics x ({args.services} services, {args.staff} staff x {args.windows} windows), "
+              f"batches of {args.batch_size}")
+        print(f"{'pass':<8}{'rows':>10}{'failed':>8}{'seconds':>9}{'rows/s':>10}{'inserted':>10}{'updated':>9}")
+        for label in ("insert", "rerun"):
+            started = time.perf_counter()
+            report = await ImportService().run(onboarding_lines(args, day), "jsonl")
+            elapsed = time.perf_counter() - started
+            inserted = sum(counts.inserted for counts in report.entities.values())
+            updated = sum(counts.updated for counts in report.entities.values())
+            print(f"{label:<8}{report.rows:>10}{report.failed:>8}{elapsed:>9.2f}{report.rows / elapsed:>10.0f}{inserted:>10}{updated:>9}")
+            for error in report.errors[:3]:
+                print(f"  line {error.line}: {error.error}")
+
+        # ru_maxrss is in kilobytes on Linux
+        print(f"peak memory: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB")
+    finally:
+        await database.client.drop_database(database.name)
+        close_mongo_connection()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clinics", type=int, default=200)
+    parser.add_argument("--services", type=int, default=10)
+    parser.add_argument("--staff", type=int, default=20)
+    parser.add_argument("--windows", type=int, default=20, help="Availability windows per staff member")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--database", default="bench_import")
+    args = parser.parse_args()
+    # Read by config at import: point the app at the throwaway database before loading it
+    os.environ["DATABASE_NAME"] = args.database
+    os.environ["IMPORT_BATCH_SIZE"] = str(args.batch_size)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""Latency and packing quality of the batch schedule optimizer on a busy clinic-day.
+
+Run from app/ against a disposable database:
+    MONGO_URI=mongodb://localhost:27017 python -m benchmarks.bench_scheduler [--requests 1000] [--staff 100]
+
+Seeds one clinic whose --staff members each offer a random half of --services services
+(15 to 90 minutes long) and are available 08:00-18:00 with a lunch break, with --booked
+existing appointments already in the day. Then runs SchedulerService.optimize --runs times
+on --requests pending requests: some pinned to a staff member, most with one or two
+preferred windows. Reports the latency of the whole call and of its greedy and local
+search phases, how many requests each phase placed and the resulting utilization.
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+
+def percentiles(samples) -> str:
+    if len(samples) < 2:
+        return f"{samples[0]:>9.2f}{samples[0]:>9.2f}{samples[0]:>9.2f}"
+    cuts = statistics.quantiles(samples, n=100)
+    return f"{statistics.median(samples):>9.2f}{cuts[94]:>9.2f}{cuts[98]:>9.2f}"
+
+
+def timed(method, samples: list, placed: list):
+    """Wrap a SchedulePacker phase to record its duration and how many requests are placed after it"""
+    def wrapper(self, *args, **kwargs):
+        started = time.perf_counter()
+        result = method(self, *args, **kwargs)
+        samples.append((time.perf_counter() - started) * 1000)
+        placed.append(int((self.staff >= 0).sum()))
+        return result
+    return wrapper
+
+
+async def run(args):
+    from database.database import connect_to_mongo, close_mongo_connection, get_database
+    from database.sharding import ensure_indexes as ensure_sharding_indexes
+    from models.Appointment import AppStatus
+    from schemas.Schedule import ScheduleOptimizeIn, ScheduleRequestIn, ScheduleWindow
+    from services.Scheduler import SchedulePacker, SchedulerService
+
+    connect_to_mongo()
+    database = get_database()
+    await database.client.drop_database(database.name)
+    rng = random.Random(args.seed)
+    clinic_id = str(uuid4())
+    day = (datetime.utcnow() + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+
+    try:
+        await ensure_sharding_indexes()
+        services = {str(uuid4()): rng.choice([15, 30, 30, 45, 60, 90]) for _ in range(args.services)}
+        await database.services.insert_many([
+            {"_id": service_id, "clinic_id": clinic_id, "name": f"Service {i}", "duration_minutes": minutes, "price": 50}
+            for i, (service_id, minutes) in enumerate(services.items())
+        ])
+        staff = {
+            str(uuid4()): rng.sample(list(services), max(1, args.services // 2))
+            for _ in range(args.staff)
+        }
+        await database.staff.insert_many([
+            {"_id": staff_id, "clinic_id": clinic_id, "service_ids": service_ids}
+            for staff_id, service_ids in staff.items()
+        ])
+        await database.availability.insert_many([
+            {
+                "_id": str(uuid4()), "clinic_id": clinic_id, "staff_id": staff_id,
+                "start_time": day + timedelta(hours=start), "end_time": day + timedelta(hours=end)
+            }
+            for staff_id in staff for start, end in ((8, 12), (13, 18))
+        ])
+        booked = []
+        for _ in range(args.booked):
+            staff_id = rng.choice(list(staff))
+            start_time = day + timedelta(hours=8, minutes=15 * rng.randrange(36))
+            booked.append({
+                "_id": str(uuid4()), "clinic_id": clinic_id, "staff_id": staff_id, "customer_id": str(uuid4()),
+                "service_id": staff[staff_id][0], "status": AppStatus.booked.value,
+                "start_time": start_time, "end_time": start_time + timedelta(minutes=services[staff[staff_id][0]])
+            })
+        if booked:
+            await database.appointments.insert_many(booked)
+
+        requests = []
+        for i in range(args.requests):
+            staff_id = rng.choice(list(staff))
+            service_id = rng.choice(staff[staff_id])
+            windows = []
+            for _ in range(rng.choice([0, 1, 1, 2])):
+                window_start = day + timedelta(hours=rng.randrange(8, 16))
+                windows.append(ScheduleWindow(start_time=window_start, end_time=window_start + timedelta(hours=rng.randrange(2, 5))))
+            requests.append(ScheduleRequestIn(
+                request_id=f"request-{i}", service_id=service_id, customer_id=uuid4(),
+                # A tenth ask for a particular staff member
+                staff_id=staff_id if rng.random() < 0.1 else None, windows=windows
+            ))
+        data = ScheduleOptimizeIn(date=day.date(), requests=requests)
+
+        greedy_ms, greedy_placed, search_ms, search_placed = [], [], [], []
+        SchedulePacker.greedy = timed(SchedulePacker.greedy, greedy_ms, greedy_placed)
+        SchedulePacker.local_search = timed(SchedulePacker.local_search, search_ms, search_placed)
+
+        service = SchedulerService()
+        # The first call also pays for importing numpy
+        await service.optimize(clinic_id, data)
+        greedy_ms.clear(), greedy_placed.clear(), search_ms.clear(), search_placed.clear()
+
+        optimize_ms = []
+        for _ in range(args.runs):
+            started = time.perf_counter()
+            result = await service.optimize(clinic_id, data)
+            optimize_ms.append((time.perf_counter() - started) * 1000)
+
+        print(f"{args.requests} requests, {args.staff} staff x {args.services} services, "
+              f"{args.booked} already booked, {args.runs} runs")
+        print(f"{'step':<16}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'placed':>8}")
+        print(f"{'greedy':<16}{percentiles(greedy_ms)}{greedy_placed[-1]:>8}")
+        print(f"{'local search':<16}{percentiles(search_ms)}{search_placed[-1]:>8}")
+        print(f"{'optimize':<16}{percentiles(optimize_ms)}{len(result.assignments):>8}")
+        print(f"{len(result.unassigned)} unassigned, utilization {result.utilization:.2%}, "
+              f"{result.idle_minutes:.0f} of {result.available_minutes:.0f} minutes idle")
+    finally:
+        await database.client.drop_database(database.name)
+        close_mongo_connection()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--staff", type=int, default=100)
+    parser.add_argument("--services", type=int, default=12)
+    parser.add_argument("--booked", type=int, default=200, help="Appointments already in the day")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--database", default="bench_scheduler")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    # Read by config at import: point the app at the throwaway database before loading it
+    os.environ["DATABASE_NAME"] = args.database
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
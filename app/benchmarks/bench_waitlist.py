@@ -0,0 +1,115 @@
+"""Latency of matching a freed slot against a large waitlist.
+
+Run from app/ against a disposable database:
+    MONGO_URI=mongodb://localhost:27017 python -m benchmarks.bench_waitlist [--entries 5000] [--matches 500]
+
+Seeds one clinic with --entries waiting entries spread over --services services and a
+month of windows, then times the candidate query alone and a full match_slot (query,
+atomic claim and the offer expiry job) on random freed slots. The explain line shows
+how many index keys and documents one match reads: it should stay near the number of
+candidates returned, whatever the size of the waitlist.
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+
+def percentiles(samples) -> str:
+    cuts = statistics.quantiles(samples, n=100)
+    return f"{statistics.median(samples):>9.2f}{cuts[94]:>9.2f}{cuts[98]:>9.2f}"
+
+
+async def run(args):
+    from database.database import connect_to_mongo, close_mongo_connection, get_database
+    from models.Waitlist import WaitlistStatus
+    from services.Job import get_job_service
+    from services.Waitlist import WaitlistService, candidate_query
+    from config import WAITLIST_MATCH_CANDIDATES
+
+    connect_to_mongo()
+    database = get_database()
+    await database.client.drop_database(database.name)
+    rng = random.Random(args.seed)
+    clinic_id = str(uuid4())
+    services = [str(uuid4()) for _ in range(args.services)]
+    staff = [str(uuid4()) for _ in range(args.staff)]
+    first_day = datetime.utcnow().replace(microsecond=0) + timedelta(days=1)
+
+    try:
+        service = WaitlistService()
+        await service.ensure_indexes()
+        await get_job_service().ensure_indexes()
+        entries = []
+        for i in range(args.entries):
+            window_start = first_day + timedelta(hours=rng.randrange(30 * 24))
+            entries.append({
+                "_id": str(uuid4()), "customer_id": str(uuid4()), "clinic_id": clinic_id,
+                "service_id": rng.choice(services), "staff_id": rng.choice(staff + [None]),
+                "window_start": window_start, "window_end": window_start + timedelta(hours=rng.choice([2, 8, 48])),
+                "auto_book": False, "status": WaitlistStatus.waiting.value, "created_at": first_day - timedelta(seconds=i)
+            })
+        await service.collection.insert_many(entries)
+
+        def freed_slot() -> dict:
+            start_time = first_day + timedelta(minutes=30 * rng.randrange(30 * 48))
+            return {
+                "clinic_id": clinic_id, "service_id": rng.choice(services), "staff_id": rng.choice(staff),
+                "start_time": start_time, "end_time": start_time + timedelta(minutes=30)
+            }
+
+        slots = [freed_slot() for _ in range(args.matches)]
+        for probe in slots[:20]:
+            await service.find_candidates(probe)
+
+        query_ms = []
+        for probe in slots:
+            started = time.perf_counter()
+            await service.find_candidates(probe)
+            query_ms.append((time.perf_counter() - started) * 1000)
+
+        match_ms, offered = [], 0
+        for probe in slots:
+            started = time.perf_counter()
+            offered += await service.match_slot(probe) is not None
+            match_ms.append((time.perf_counter() - started) * 1000)
+
+        plan = await service.collection.find(candidate_query(slots[0])).sort("created_at", 1).limit(
+            WAITLIST_MATCH_CANDIDATES
+        ).explain()
+        stats = plan.get("executionStats", {})
+
+        print(f"{args.entries} waiting entries, {args.services} services, {args.staff} staff")
+        print(f"{'step':<18}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+        print(f"{'candidate query':<18}{percentiles(query_ms)}")
+        print(f"{'match_slot':<18}{percentiles(match_ms)}")
+        print(f"offered {offered} of {len(slots)} slots")
+        print(
+            f"explain: {stats.get('nReturned')} returned, {stats.get('totalKeysExamined')} keys "
+            f"and {stats.get('totalDocsExamined')} documents examined"
+        )
+    finally:
+        await database.client.drop_database(database.name)
+        close_mongo_connection()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=5000)
+    parser.add_argument("--services", type=int, default=10)
+    parser.add_argument("--staff", type=int, default=20)
+    parser.add_argument("--matches", type=int, default=500)
+    parser.add_argument("--database", default="bench_waitlist")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    # Read by config at import: point the app at the throwaway database before loading it
+    os.environ["DATABASE_NAME"] = args.database
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
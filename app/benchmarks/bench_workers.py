@@ -0,0 +1,142 @@
+"""Booking throughput of `cli serve` as the number of worker processes grows.
+
+Run from app/ against a disposable database:
+    MONGO_URI=mongodb://localhost:27017 python -m benchmarks.bench_workers [--workers 1 2 4] [--clients 16]
+
+For each worker count the server is started on a fresh port, the benchmark waits for
+/health/ready, then client processes book non-overlapping slots through
+POST /appointments/auto as fast as they can. Each client signs in as its own user so
+the rate limiter, which stays in the path, keys every client separately. The seeded
+database (--database, dropped at the end) never touches DATABASE_NAME.
+"""
+import argparse
+import http.client
+import multiprocessing
+import os
+import signal
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+os.environ.setdefault("SECRET_KEY", "bench-secret")
+os.environ.setdefault("ALGORITHM", "HS256")
+
+from pymongo import MongoClient  # noqa: E402
+
+from utils.auth import create_access_token  # noqa: E402
+
+
+SLOT_MINUTES = 15
+FIRST_SLOT = datetime(2030, 1, 1)
+
+
+def seed(database) -> dict:
+    clinic_id, service_id, customer_id = str(uuid4()), str(uuid4()), str(uuid4())
+    database.clinics.insert_one({"_id": clinic_id, "name": "Bench clinic"})
+    database.services.insert_one({
+        "_id": service_id, "clinic_id": clinic_id, "name": "Checkup", "duration_minutes": SLOT_MINUTES, "price": 50
+    })
+    database.users.insert_one({"_id": customer_id, "email": "bench@example.com", "name": "Bench"})
+    staff_id = str(uuid4())
+    database.staff.insert_one({"_id": staff_id, "clinic_id": clinic_id, "name": "Bench staff", "service_ids": [service_id]})
+    # One availability window covering every slot the run can book
+    database.availability.insert_one({
+        "_id": str(uuid4()), "clinic_id": clinic_id, "staff_id": staff_id,
+        "start_time": FIRST_SLOT, "end_time": FIRST_SLOT + timedelta(days=3650)
+    })
+    return {"clinic_id": clinic_id, "service_id": service_id, "customer_id": customer_id}
+
+
+def book(job) -> tuple:
+    """One client: book its slots back to back on a keep-alive connection"""
+    port, ids, token, slots = job
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
+    booked = failed = 0
+    for slot in slots:
+        start = FIRST_SLOT + timedelta(minutes=SLOT_MINUTES * slot)
+        body = (
+            f'{{"customer_id": "{ids["customer_id"]}", "clinic_id": "{ids["clinic_id"]}", '
+            f'"service_id": "{ids["service_id"]}", "start_time": "{start.isoformat()}"}}'
+        )
+        connection.request("POST", "/appointments/auto", body, headers)
+        response = connection.getresponse()
+        response.read()
+        if response.status == 201:
+            booked += 1
+        else:
+            failed += 1
+    connection.close()
+    return booked, failed
+
+
+def wait_ready(port: int, timeout: float = 60.0):
+    give_up_at = time.monotonic() + timeout
+    while time.monotonic() < give_up_at:
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+            connection.request("GET", "/health/ready")
+            if connection.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"server on port {port} not ready after {timeout}s")
+
+
+def measure(workers: int, port: int, ids: dict, args, database_name: str) -> tuple:
+    env = dict(os.environ, DATABASE_NAME=database_name, RATE_LIMIT_RATE="1000000", RATE_LIMIT_BURST="1000000")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "cli", "serve", "--workers", str(workers), "--port", str(port), "--drain-delay", "0"],
+        env=env, stdout=subprocess.DEVNULL
+    )
+    try:
+        wait_ready(port)
+        per_client = args.requests // args.clients
+        jobs = [
+            (port, ids, create_access_token({"user_id": f"bench-client-{client}"}, timedelta(hours=1)),
+             range(client * per_client, (client + 1) * per_client))
+            for client in range(args.clients)
+        ]
+        with multiprocessing.Pool(args.clients) as pool:
+            started = time.perf_counter()
+            results = pool.map(book, jobs)
+            elapsed = time.perf_counter() - started
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=60)
+    booked = sum(result[0] for result in results)
+    failed = sum(result[1] for result in results)
+    return booked / elapsed, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=4000, help="Bookings per worker count")
+    parser.add_argument("--port", type=int, default=8700)
+    parser.add_argument("--database", default="bench_workers")
+    args = parser.parse_args()
+
+    client = MongoClient(os.environ["MONGO_URI"])
+    client.drop_database(args.database)
+    database = client[args.database]
+    ids = seed(database)
+
+    print(f"{'workers':>8}{'bookings/s':>14}{'speed-up':>10}{'failed':>8}")
+    baseline = None
+    try:
+        for i, workers in enumerate(args.workers):
+            database.appointments.delete_many({})
+            rate, failed = measure(workers, args.port + i, ids, args, args.database)
+            baseline = baseline or rate
+            print(f"{workers:>8}{rate:>14.0f}{rate / baseline:>9.2f}x{failed:>8}")
+    finally:
+        client.drop_database(args.database)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""Command line entrypoint.
+
+    python -m cli serve --workers 4
+    python -m cli openapi
+    python -m cli export appointments --format parquet --start-date 2025-01-01
+    python -m cli import onboarding.jsonl --errors import-errors.jsonl
+"""
+import argparse
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+
+from config import (
+    SERVER_HOST, SERVER_PORT, WEB_CONCURRENCY, GRACEFUL_TIMEOUT_SECONDS, DRAIN_DELAY_SECONDS, OPENAPI_SCHEMA_PATH,
+    WORKER_STABLE_SECONDS, WORKER_RESTART_BACKOFF_SECONDS, WORKER_RESTART_BACKOFF_MAX_SECONDS, WORKER_MAX_CRASHES
+)
+
+
+def serve(args):
+    import uvicorn
+
+    # Preload the app once in the parent so every forked worker shares the imported modules.
+    # No Mongo client exists yet: each worker opens its own in the startup hook, after fork.
+    from main import app
+    from routers.Health import mark_draining
+
+    class DrainingServer(uvicorn.Server):
+        def handle_exit(self, sig, frame):
+            # Fail readiness first so the load balancer stops routing here, then drain
+            mark_draining()
+            threading.Timer(args.drain_delay, super(DrainingServer, self).handle_exit, (sig, frame)).start()
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.host, args.port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    def run_worker():
+        config = uvicorn.Config(
+            app,
+            timeout_graceful_shutdown=args.graceful_timeout,
+            access_log=False,
+        )
+        DrainingServer(config).run(sockets=[sock])
+
+    if args.workers <= 1:
+        run_worker()
+        return 0
+
+    workers = {}
+    stopping = False
+    exit_code = 0
+    crashes = 0
+    # Monotonic times at which a replacement for a dead worker is due
+    restarts = []
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            try:
+                run_worker()
+            finally:
+                os._exit(0)
+        workers[pid] = time.monotonic()
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for _ in range(args.workers):
+        spawn()
+    print(f"✅ Serving on {args.host}:{args.port} with {args.workers} workers")
+
+    deadline = None
+    while workers or (restarts and not stopping):
+        now = time.monotonic()
+        if stopping and deadline is None:
+            deadline = now + args.drain_delay + args.graceful_timeout + 5
+        if deadline and now > deadline:
+            for pid in list(workers):
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+        while restarts and restarts[0] <= now and not stopping:
+            restarts.pop(0)
+            spawn()
+
+        pid = 0
+        if workers:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+        if pid == 0:
+            time.sleep(0.2)
+            continue
+
+        started = workers.pop(pid, None)
+        if stopping:
+            continue
+        # A worker that dies soon after starting is crash-looping: back off before the next one
+        if started is not None and time.monotonic() - started < WORKER_STABLE_SECONDS:
+            crashes += 1
+        else:
+            crashes = 0
+        if crashes > WORKER_MAX_CRASHES * args.workers:
+            print(f"❌ Workers crashed {crashes} times in a row, shutting down")
+            stop(None, None)
+            exit_code = 1
+            continue
+        delay = min(WORKER_RESTART_BACKOFF_SECONDS * 2 ** (crashes - 1), WORKER_RESTART_BACKOFF_MAX_SECONDS) if crashes else 0
+        print(f"❌ Worker {pid} exited with status {status}, restarting in {delay:.1f}s")
+        restarts.append(time.monotonic() + delay)
+        restarts.sort()
+
+    sock.close()
+    return exit_code
+
+
+def openapi(args):
+    import orjson
+    from main import build_openapi_schema
+
+    with open(args.output, "wb") as schema_file:
+        schema_file.write(orjson.dumps(build_openapi_schema()))
+    print(f"✅ OpenAPI schema written to {args.output}")
+
+
+def export(args):
+    import asyncio
+    from database.database import connect_to_mongo, close_mongo_connection
+    from services.Export import get_export_service
+
+    filters = {"start_date": args.start_date, "end_date": args.end_date, "clinic_id": args.clinic_id}
+    export_id = args.export_id or f"{args.dataset}:{args.format}:{args.start_date}:{args.end_date}:{args.clinic_id}"
+
+    async def run():
+        connect_to_mongo()
+        try:
+            return await get_export_service().export_to_directory(export_id, args.dataset, filters, args.format, args.output_dir)
+        finally:
+            close_mongo_connection()
+
+    checkpoint = asyncio.run(run())
+    print(f"✅ Exported {checkpoint['rows']} {args.dataset} rows in {checkpoint['parts']} files to {args.output_dir}")
+
+
+def import_entities(args):
+    import asyncio
+    import orjson
+    from database.database import connect_to_mongo, close_mongo_connection
+    from services.Import import get_import_service
+
+    import_format = args.format or ("csv" if args.path.endswith(".csv") else "jsonl")
+
+    async def run(on_error):
+        connect_to_mongo()
+        try:
+            with open(args.path, encoding="utf-8", newline="") as lines:
+                return await get_import_service().run(lines, import_format, on_error)
+        finally:
+            close_mongo_connection()
+
+    # The full per-row error report goes to a file; the summary only keeps the first errors
+    if args.errors:
+        with open(args.errors, "wb") as errors_file:
+            report = asyncio.run(run(lambda error: errors_file.write(orjson.dumps(error.model_dump()) + b"\n")))
+    else:
+        report = asyncio.run(run(None))
+
+    written = sum(counts.inserted + counts.updated for counts in report.entities.values())
+    print(f"✅ Imported {written} of {report.rows} rows in {report.seconds}s")
+    for kind, counts in report.entities.items():
+        print(f"   {kind}: {counts.inserted} inserted, {counts.updated} updated")
+    if report.failed:
+        print(f"❌ {report.failed} rows failed" + (f", see {args.errors}" if args.errors else ""))
+        return 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="cli", description="Clinic Appointment API commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = commands.add_parser("serve", help="Run the API with N preloaded worker processes")
+    serve_parser.add_argument("--host", default=SERVER_HOST)
+    serve_parser.add_argument("--port", type=int, default=SERVER_PORT)
+    serve_parser.add_argument("--workers", type=int, default=WEB_CONCURRENCY)
+    serve_parser.add_argument("--graceful-timeout", type=int, default=GRACEFUL_TIMEOUT_SECONDS)
+    serve_parser.add_argument("--drain-delay", type=float, default=DRAIN_DELAY_SECONDS)
+    serve_parser.set_defaults(handler=serve)
+
+    openapi_parser = commands.add_parser("openapi", help="Generate the OpenAPI schema at build time")
+    openapi_parser.add_argument("--output", default=OPENAPI_SCHEMA_PATH)
+    openapi_parser.set_defaults(handler=openapi)
+
+    export_parser = commands.add_parser("export", help="Export a collection to Parquet or csv.gz part files, resumable")
+    export_parser.add_argument("dataset", choices=["appointments", "reviews"])
+    export_parser.add_argument("--format", choices=["csv.gz", "parquet"], default="parquet")
+    export_parser.add_argument("--output-dir", default="exports")
+    export_parser.add_argument("--start-date", help="YYYY-MM-DD, inclusive")
+    export_parser.add_argument("--end-date", help="YYYY-MM-DD, inclusive")
+    export_parser.add_argument("--clinic-id")
+    export_parser.add_argument("--export-id", help="Checkpoint name; rerunning with the same one resumes")
+    export_parser.set_defaults(handler=export)
+
+    import_parser = commands.add_parser("import", help="Bulk import clinics, services, staff and availability; safe to rerun")
+    import_parser.add_argument("path", help="JSON lines or CSV file")
+    import_parser.add_argument("--format", choices=["jsonl", "csv"], help="Guessed from the file name when omitted")
+    import_parser.add_argument("--errors", help="Write every failed row to this JSON lines file")
+    import_parser.set_defaults(handler=import_entities)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
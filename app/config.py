@@ -8,3 +8,165 @@ DATABASE_NAME = os.getenv("DATABASE_NAME")
 SECRET_KEY = os.getenv("SECRET_KEY")
 SECRET_REFRESH_KEY = os.getenv("SECRET_REFRESH_KEY")
 ALGORITHM = os.getenv("ALGORITHM")
+
+DEBUG = os.getenv("DEBUG", "false").lower() == "true"
+# Serve list endpoints straight from the DB documents as orjson bytes
+FAST_RESPONSES = os.getenv("FAST_RESPONSES", "false").lower() == "true"
+
+# Appointment archival
+ARCHIVE_HORIZON_DAYS = int(os.getenv("ARCHIVE_HORIZON_DAYS", "365"))
+ARCHIVE_INTERVAL_SECONDS = int(os.getenv("ARCHIVE_INTERVAL_SECONDS", "86400"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "1000"))
+ARCHIVE_COMPRESSOR = os.getenv("ARCHIVE_COMPRESSOR", "zstd")
+
+# Background jobs
+JOB_CONCURRENCY = int(os.getenv("JOB_CONCURRENCY", "4"))
+JOB_POLL_INTERVAL_SECONDS = float(os.getenv("JOB_POLL_INTERVAL_SECONDS", "1"))
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "300"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+JOB_BACKOFF_SECONDS = float(os.getenv("JOB_BACKOFF_SECONDS", "2"))
+JOB_BACKOFF_MAX_SECONDS = float(os.getenv("JOB_BACKOFF_MAX_SECONDS", "600"))
+
+# Change streams
+CHANGE_STREAMS_ENABLED = os.getenv("CHANGE_STREAMS_ENABLED", "true").lower() == "true"
+CHANGE_STREAM_LISTENER_NAME = os.getenv("CHANGE_STREAM_LISTENER_NAME", "api")
+CHANGE_STREAM_POLL_INTERVAL_SECONDS = float(os.getenv("CHANGE_STREAM_POLL_INTERVAL_SECONDS", "5"))
+CHANGE_STREAM_POLL_RESYNC_SECONDS = int(os.getenv("CHANGE_STREAM_POLL_RESYNC_SECONDS", "3600"))  # polling misses deletes
+
+# Rate limiting
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")  # memory | redis
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+RATE_LIMIT_RATE = float(os.getenv("RATE_LIMIT_RATE", "10"))  # tokens refilled per second
+RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST", "20"))  # bucket capacity
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))  # in-memory buckets per process
+RATE_LIMIT_TOKEN_CACHE_SIZE = int(os.getenv("RATE_LIMIT_TOKEN_CACHE_SIZE", "10000"))  # verified bearer tokens
+# Token cost of expensive routes, matched by path prefix
+RATE_LIMIT_ROUTE_COSTS = {
+    "/api/auth/login": 5.0,
+    "/services/search": 2.0,
+    "/clinics/search": 2.0,
+}
+
+# Adaptive concurrency limiting
+CONCURRENCY_LIMIT_ENABLED = os.getenv("CONCURRENCY_LIMIT_ENABLED", "true").lower() == "true"
+CONCURRENCY_INITIAL_LIMIT = int(os.getenv("CONCURRENCY_INITIAL_LIMIT", "50"))
+CONCURRENCY_MIN_LIMIT = int(os.getenv("CONCURRENCY_MIN_LIMIT", "5"))
+CONCURRENCY_MAX_LIMIT = int(os.getenv("CONCURRENCY_MAX_LIMIT", "500"))
+CONCURRENCY_TARGET_LATENCY_MS = float(os.getenv("CONCURRENCY_TARGET_LATENCY_MS", "250"))
+CONCURRENCY_BACKOFF_RATIO = float(os.getenv("CONCURRENCY_BACKOFF_RATIO", "0.9"))
+# How long a request of each priority may wait for a slot before it is shed
+CONCURRENCY_QUEUE_DEADLINES_MS = {
+    0: float(os.getenv("CONCURRENCY_QUEUE_DEADLINE_CRITICAL_MS", "2000")),
+    1: float(os.getenv("CONCURRENCY_QUEUE_DEADLINE_NORMAL_MS", "500")),
+    2: float(os.getenv("CONCURRENCY_QUEUE_DEADLINE_LOW_MS", "100")),
+}
+
+# Request deadlines, propagated into Mongo operations
+DEADLINE_HEADER = os.getenv("DEADLINE_HEADER", "x-request-timeout")  # milliseconds
+DEADLINE_DEFAULT_MS = float(os.getenv("DEADLINE_DEFAULT_MS", "10000"))
+DEADLINE_MAX_MS = float(os.getenv("DEADLINE_MAX_MS", "30000"))
+# Route defaults, matched by path prefix
+DEADLINE_ROUTE_DEFAULTS_MS = {
+    "/clinics/search": 2000.0,
+    "/services/search": 2000.0,
+    "/appointments/calendar": 5000.0,
+}
+# Long-running exports and imports bounded by the client connection instead of a deadline
+DEADLINE_EXEMPT_PREFIXES = ("/exports", "/imports")
+
+# HTTP caching: Cache-Control sent with ETag/Last-Modified, per route
+CACHE_CONTROL_POLICIES = {
+    "clinic": os.getenv("CACHE_CONTROL_CLINIC", "public, max-age=60"),
+    "service": os.getenv("CACHE_CONTROL_SERVICE", "public, max-age=60"),
+    "services_by_clinic": os.getenv("CACHE_CONTROL_SERVICES_BY_CLINIC", "public, max-age=30"),
+    "reviews_by_target": os.getenv("CACHE_CONTROL_REVIEWS_BY_TARGET", "public, max-age=15"),
+}
+
+# Response compression
+COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "true").lower() == "true"
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))  # bytes
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+COMPRESSION_ZSTD_LEVEL = int(os.getenv("COMPRESSION_ZSTD_LEVEL", "3"))
+COMPRESSION_CACHE_MAX_BYTES = int(os.getenv("COMPRESSION_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+# Production server
+SERVER_HOST = os.getenv("SERVER_HOST", "0.0.0.0")
+SERVER_PORT = int(os.getenv("SERVER_PORT", "8000"))
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1)))
+GRACEFUL_TIMEOUT_SECONDS = int(os.getenv("GRACEFUL_TIMEOUT_SECONDS", "30"))
+# How long a draining worker keeps serving while readiness reports it down
+DRAIN_DELAY_SECONDS = float(os.getenv("DRAIN_DELAY_SECONDS", "5"))
+# Workers exiting sooner than this after starting count as crashes; restarts back off exponentially
+WORKER_STABLE_SECONDS = float(os.getenv("WORKER_STABLE_SECONDS", "10"))
+WORKER_RESTART_BACKOFF_SECONDS = float(os.getenv("WORKER_RESTART_BACKOFF_SECONDS", "0.5"))
+WORKER_RESTART_BACKOFF_MAX_SECONDS = float(os.getenv("WORKER_RESTART_BACKOFF_MAX_SECONDS", "30"))
+# Consecutive crashes per worker after which the supervisor gives up, so the orchestrator sees it fail
+WORKER_MAX_CRASHES = int(os.getenv("WORKER_MAX_CRASHES", "10"))
+
+# OpenAPI schema generated at build time by `python -m cli openapi`
+OPENAPI_SCHEMA_PATH = os.getenv("OPENAPI_SCHEMA_PATH", os.path.join(os.path.dirname(__file__), "openapi.json"))
+
+# Read replica routing
+READ_REPLICAS_ENABLED = os.getenv("READ_REPLICAS_ENABLED", "true").lower() == "true"
+READ_MAX_STALENESS_SECONDS = int(os.getenv("READ_MAX_STALENESS_SECONDS", "90"))  # MongoDB minimum is 90
+READ_YOUR_WRITES_SECONDS = int(os.getenv("READ_YOUR_WRITES_SECONDS", "30"))
+
+# Upcoming appointments kept in each customer's index document
+CUSTOMER_UPCOMING_INDEX_SIZE = int(os.getenv("CUSTOMER_UPCOMING_INDEX_SIZE", "50"))
+
+# Waitlist: how long a customer has to accept an offered slot before it moves on
+WAITLIST_OFFER_SECONDS = int(os.getenv("WAITLIST_OFFER_SECONDS", "900"))
+WAITLIST_MATCH_CANDIDATES = int(os.getenv("WAITLIST_MATCH_CANDIDATES", "20"))
+
+# Staff auto-assignment: candidates tried before giving up on a contended slot
+ASSIGNMENT_MAX_ATTEMPTS = int(os.getenv("ASSIGNMENT_MAX_ATTEMPTS", "3"))
+
+# Booking: every booking path claims the staff member's slots of this many minutes
+BOOKING_SLOT_MINUTES = int(os.getenv("BOOKING_SLOT_MINUTES", "5"))
+# A claim without a live appointment this old is left over from a crashed booking
+BOOKING_ORPHAN_CLAIM_SECONDS = int(os.getenv("BOOKING_ORPHAN_CLAIM_SECONDS", "60"))
+
+# Batch schedule optimizer
+SCHEDULER_SLOT_MINUTES = int(os.getenv("SCHEDULER_SLOT_MINUTES", "5"))
+SCHEDULER_MAX_REQUESTS = int(os.getenv("SCHEDULER_MAX_REQUESTS", "5000"))
+SCHEDULER_LOCAL_SEARCH_ROUNDS = int(os.getenv("SCHEDULER_LOCAL_SEARCH_ROUNDS", "2"))
+
+# Analytics: rebuilds of one date range requested within this window run once
+ANALYTICS_REBUILD_DEDUP_SECONDS = int(os.getenv("ANALYTICS_REBUILD_DEDUP_SECONDS", "3600"))
+# Days before and after today rebuilt when change events may have been missed
+ANALYTICS_RESYNC_DAYS = int(os.getenv("ANALYTICS_RESYNC_DAYS", "90"))
+
+# Columnar exports
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "5000"))  # documents per cursor round trip
+EXPORT_ROW_GROUP_SIZE = int(os.getenv("EXPORT_ROW_GROUP_SIZE", "50000"))
+EXPORT_ROWS_PER_FILE = int(os.getenv("EXPORT_ROWS_PER_FILE", "1000000"))  # per part file in CLI exports
+
+# Bulk onboarding imports
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "5000"))  # rows validated and written together
+IMPORT_MAX_REPORTED_ERRORS = int(os.getenv("IMPORT_MAX_REPORTED_ERRORS", "1000"))  # in the HTTP report
+
+# Idempotent retries of writes sent with an Idempotency-Key header
+IDEMPOTENCY_HEADER = os.getenv("IDEMPOTENCY_HEADER", "Idempotency-Key")
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))  # how long responses are replayed
+IDEMPOTENCY_LOCK_SECONDS = int(os.getenv("IDEMPOTENCY_LOCK_SECONDS", "60"))  # above DEADLINE_MAX_MS
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "10"))  # for a concurrent duplicate
+IDEMPOTENCY_MAX_RESPONSE_BYTES = int(os.getenv("IDEMPOTENCY_MAX_RESPONSE_BYTES", "1048576"))
+
+# Review feeds: newest reviews kept per target for a one-read first page
+REVIEW_FEED_SIZE = int(os.getenv("REVIEW_FEED_SIZE", "20"))
+REVIEW_FEED_MAX_PAGE = int(os.getenv("REVIEW_FEED_MAX_PAGE", "100"))
+
+# Targets one POST /reviews/stats/batch call may ask for
+REVIEW_STATS_BATCH_MAX_TARGETS = int(os.getenv("REVIEW_STATS_BATCH_MAX_TARGETS", "500"))
+
+# Ranking scores: time-decayed Bayesian average of review ratings
+RANKING_HALF_LIFE_DAYS = float(os.getenv("RANKING_HALF_LIFE_DAYS", "180"))  # a review's weight halves every N days
+RANKING_PRIOR_RATING = float(os.getenv("RANKING_PRIOR_RATING", "3.5"))
+RANKING_PRIOR_WEIGHT = float(os.getenv("RANKING_PRIOR_WEIGHT", "5"))  # the prior counts as N fresh reviews
+RANKING_REDECAY_INTERVAL_SECONDS = int(os.getenv("RANKING_REDECAY_INTERVAL_SECONDS", "3600"))
+RANKING_BATCH_SIZE = int(os.getenv("RANKING_BATCH_SIZE", "5000"))
+
+# Sharding on clinic_id; shardCollection needs a mongos and cluster admin rights
+SHARDING_ENABLED = os.getenv("SHARDING_ENABLED", "false").lower() == "true"
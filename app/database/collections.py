@@ -1,22 +1,75 @@
-from database.database import get_database
+from database.database import get_database, get_read_database
 
-def get_user_collection():
-    return get_database()["users"]
+APPOINTMENT_ARCHIVE_PREFIX = "appointments_archive_"
 
-def get_staff_collection():
-    return get_database()["staff"]
+def get_user_collection(read_only: bool = False):
+    return (get_read_database() if read_only else get_database())["users"]
 
-def get_service_collection():
-    return get_database()["services"]
+def get_staff_collection(read_only: bool = False):
+    return (get_read_database() if read_only else get_database())["staff"]
 
-def get_review_collection():
-    return get_database()["reviews"]
+def get_service_collection(read_only: bool = False):
+    return (get_read_database() if read_only else get_database())["services"]
 
-def get_clinic_collection():
-    return get_database()["clinics"]
+def get_review_collection(read_only: bool = False):
+    return (get_read_database() if read_only else get_database())["reviews"]
 
-def get_availability_collection():
-    return get_database()["availability"]
+def get_clinic_collection(read_only: bool = False):
+    return (get_read_database() if read_only else get_database())["clinics"]
 
-def get_appointment_collection():
-    return get_database()["appointments"]
+def get_availability_collection(read_only: bool = False):
+    return (get_read_database() if read_only else get_database())["availability"]
+
+def get_appointment_collection(read_only: bool = False):
+    return (get_read_database() if read_only else get_database())["appointments"]
+
+def get_appointment_archive_collection(month: str, read_only: bool = False):
+    # month is formatted as YYYY_MM
+    return (get_read_database() if read_only else get_database())[f"{APPOINTMENT_ARCHIVE_PREFIX}{month}"]
+
+def get_customer_clinics_collection(read_only: bool = False):
+    # customer_id -> clinic_ids the customer has appointments in
+    return (get_read_database() if read_only else get_database())["customer_clinics"]
+
+def get_user_review_clinics_collection(read_only: bool = False):
+    # user_id -> clinic_ids the user has reviewed something in
+    return (get_read_database() if read_only else get_database())["user_review_clinics"]
+
+def get_customer_appointment_index_collection(read_only: bool = False):
+    # customer_id -> soonest upcoming appointments
+    return (get_read_database() if read_only else get_database())["customer_appointment_index"]
+
+def get_review_feed_collection(read_only: bool = False):
+    return (get_read_database() if read_only else get_database())["review_feeds"]
+
+def get_review_helpful_vote_collection():
+    return get_database()["review_helpful_votes"]
+
+def get_ranking_score_collection(read_only: bool = False):
+    return (get_read_database() if read_only else get_database())["ranking_scores"]
+
+def get_staff_slot_collection():
+    # One document per staff member and booked slot, keyed so a slot can only be claimed once
+    return get_database()["staff_slots"]
+
+def get_waitlist_collection():
+    return get_database()["waitlist"]
+
+def get_daily_rollup_collection(read_only: bool = False):
+    return (get_read_database() if read_only else get_database())["daily_rollups"]
+
+def get_rollup_contribution_collection():
+    # What each appointment or availability document currently adds to the rollups
+    return get_database()["rollup_contributions"]
+
+def get_export_checkpoint_collection():
+    return get_database()["export_checkpoints"]
+
+def get_idempotency_key_collection():
+    return get_database()["idempotency_keys"]
+
+def get_job_collection():
+    return get_database()["jobs"]
+
+def get_change_stream_token_collection():
+    return get_database()["change_stream_tokens"]
@@ -1,19 +1,30 @@
 
 
+from contextvars import ContextVar
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo.read_preferences import SecondaryPreferred
 from fastapi import FastAPI
-from config import MONGO_URI, DATABASE_NAME
+from config import MONGO_URI, DATABASE_NAME, READ_REPLICAS_ENABLED, READ_MAX_STALENESS_SECONDS
 
 
 client: AsyncIOMotorClient = None
 db: AsyncIOMotorDatabase = None
+read_db: AsyncIOMotorDatabase = None
+
+# Set for requests from a client that wrote recently, so it reads its own writes
+read_primary: ContextVar[bool] = ContextVar("read_primary", default=False)
 
 
 def connect_to_mongo():
-    global client, db
+    global client, db, read_db
+    from database.sharding import routing_listener
     try:
-        client = AsyncIOMotorClient(MONGO_URI)
+        # The listener classifies every query for the scatter-gather report
+        client = AsyncIOMotorClient(MONGO_URI, event_listeners=[routing_listener])
         db = client[DATABASE_NAME]
+        read_db = db.with_options(
+            read_preference=SecondaryPreferred(max_staleness=READ_MAX_STALENESS_SECONDS)
+        ) if READ_REPLICAS_ENABLED else db
         print("✅ Connected to MongoDB")
     except Exception as e:
         print(f"❌ MongoDB connection error: {e}")
@@ -33,6 +44,13 @@ def get_database() -> AsyncIOMotorDatabase:
     return db
 
 
+def get_read_database() -> AsyncIOMotorDatabase:
+    """Database handle for read-only queries: secondaries unless the caller must read its writes"""
+    if read_db is None or read_primary.get():
+        return get_database()
+    return read_db
+
+
 def init_mongo(app):
     @app.on_event("startup")
     async def startup_db_client():
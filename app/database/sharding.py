@@ -0,0 +1,234 @@
+import threading
+from collections import defaultdict
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+from pymongo import monitoring
+from pymongo.errors import OperationFailure
+from database.database import get_database
+from config import DATABASE_NAME
+
+
+# Shard keys of the tenant-partitioned collections. Appointments and availability are
+# range-sharded so one clinic's calendar window lives in few chunks; reviews hash the
+# clinic to spread tenants evenly. Clinics, services, staff and users stay unsharded:
+# they are small and their point reads by _id hit a single shard.
+SHARD_KEYS: Dict[str, List[Tuple[str, object]]] = {
+    "appointments": [("clinic_id", 1), ("start_time", 1)],
+    "availability": [("clinic_id", 1), ("start_time", 1)],
+    "reviews": [("clinic_id", "hashed")],
+    # Lookup collections for queries that do not know the clinic yet, keyed by the looked-up id
+    "customer_clinics": [("_id", "hashed")],
+    "user_review_clinics": [("_id", "hashed")],
+    "customer_appointment_index": [("_id", "hashed")],
+    "review_feeds": [("_id", "hashed")],
+    "daily_rollups": [("clinic_id", 1), ("day", 1)],
+    # Slot claim ids start with the clinic, so _id stays unique on the one shard a clinic hashes to
+    "staff_slots": [("clinic_id", "hashed")],
+    "rollup_contributions": [("_id", "hashed")],
+}
+
+# Every index leads with clinic_id so it doubles as the shard key prefix
+INDEXES: Dict[str, List[List[Tuple[str, int]]]] = {
+    "appointments": [
+        [("clinic_id", 1), ("start_time", 1)],
+        [("clinic_id", 1), ("staff_id", 1), ("start_time", 1)],
+        [("clinic_id", 1), ("customer_id", 1), ("start_time", 1)],
+    ],
+    "availability": [
+        [("clinic_id", 1), ("start_time", 1)],
+        [("clinic_id", 1), ("staff_id", 1), ("start_time", 1)],
+    ],
+    "reviews": [
+        # One per review feed ordering, ending with _id for keyset paging
+        [("clinic_id", 1), ("target_type", 1), ("target_id", 1), ("created_at", -1), ("_id", -1)],
+        [("clinic_id", 1), ("target_type", 1), ("target_id", 1), ("helpful_count", -1), ("created_at", -1), ("_id", -1)],
+        [("clinic_id", 1), ("target_type", 1), ("target_id", 1), ("rating", -1), ("created_at", -1), ("_id", -1)],
+        [("clinic_id", 1), ("target_type", 1), ("target_id", 1), ("rating", 1), ("created_at", -1), ("_id", -1)],
+        [("clinic_id", 1), ("user_id", 1), ("created_at", -1)],
+    ],
+    "services": [
+        [("clinic_id", 1), ("name", 1)],
+    ],
+    "staff": [
+        [("clinic_id", 1), ("service_ids", 1)],
+    ],
+}
+
+# Broadcast queries an endpoint may issue per request; endpoints not listed may issue none.
+# These look up by an id that is not the shard key, or list across clinics.
+BROADCAST_BUDGETS: Dict[str, int] = {
+    "GET /appointments/": 1,
+    "GET /appointments/{appointment_id}": 1,
+    "GET /reviews/{review_id}": 1,
+    "GET /analytics/report": 1,
+}
+# Commands whose filter decides how mongos routes them, and where the filter sits
+FILTERED_COMMANDS = {
+    "find": lambda command: [command.get("filter", {})],
+    "count": lambda command: [command.get("query", {})],
+    "distinct": lambda command: [command.get("query", {})],
+    "findAndModify": lambda command: [command.get("query", {})],
+    "update": lambda command: [update["q"] for update in command.get("updates", [])],
+    "delete": lambda command: [delete["q"] for delete in command.get("deletes", [])],
+    "aggregate": lambda command: [
+        command["pipeline"][0]["$match"] if command.get("pipeline") and "$match" in command["pipeline"][0] else {}
+    ],
+}
+BACKGROUND = "background"
+
+# The request being served, so the command listener can attribute the queries it sees
+current_request: ContextVar[Optional[dict]] = ContextVar("current_request", default=None)
+
+
+def _key_condition(query: dict, field: str) -> Optional[str]:
+    """"eq" or "in" when the filter pins the shard key field to one or several values"""
+    if field in query:
+        value = query[field]
+        if not isinstance(value, dict) or "$eq" in value:
+            return "eq"
+        if "$in" in value:
+            return "eq" if len(value["$in"]) == 1 else "in"
+    for clause in query.get("$and", []):
+        condition = _key_condition(clause, field)
+        if condition:
+            return condition
+    branches = query.get("$or")
+    if branches and all(_key_condition(branch, field) for branch in branches):
+        return "in"
+    return None
+
+
+def classify_query(collection: str, query: dict) -> str:
+    """How mongos routes a filter: unsharded, targeted (one shard), multi (a subset) or broadcast"""
+    shard_key = SHARD_KEYS.get(collection)
+    if shard_key is None:
+        return "unsharded"
+    routing = _key_condition(query, shard_key[0][0])
+    if routing == "eq":
+        return "targeted"
+    if routing == "in":
+        return "multi"
+    return "broadcast"
+
+
+class ShardRoutingListener(monitoring.CommandListener):
+    """Classifies every filtered command the client sends, per endpoint.
+
+    The report is built from the queries the code actually issues, so it cannot drift
+    from the query builders. Counts are per worker process and since it started.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests: Dict[str, int] = defaultdict(int)
+        self.queries: Dict[str, Dict[str, Dict[str, int]]] = defaultdict(lambda: defaultdict(lambda: defaultdict(int)))
+
+    def started(self, event):
+        filters = FILTERED_COMMANDS.get(event.command_name)
+        if filters is None:
+            return
+        collection = event.command[event.command_name]
+        endpoint = _endpoint(current_request.get())
+        routings = [classify_query(collection, query) for query in filters(event.command)]
+        with self.lock:
+            for routing in routings:
+                self.queries[endpoint][collection][routing] += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+    def count_request(self, scope: dict):
+        with self.lock:
+            self.requests[_endpoint(scope)] += 1
+
+    def report(self) -> dict:
+        with self.lock:
+            queries = {endpoint: {collection: dict(routings) for collection, routings in collections.items()}
+                       for endpoint, collections in self.queries.items()}
+            requests = dict(self.requests)
+
+        endpoints = {}
+        for endpoint, collections in queries.items():
+            broadcasts = sum(routings.get("broadcast", 0) for routings in collections.values())
+            served = requests.get(endpoint, 0)
+            entry = {"requests": served, "queries": collections, "broadcasts": broadcasts}
+            if endpoint != BACKGROUND:
+                budget = BROADCAST_BUDGETS.get(endpoint, 0)
+                entry["budget"] = budget
+                entry["within_budget"] = broadcasts <= budget * max(served, 1)
+            endpoints[endpoint] = entry
+        return endpoints
+
+
+def _endpoint(scope: Optional[dict]) -> str:
+    # The router records the matched route in the scope; unmatched paths are not worth a row
+    route = scope.get("route") if scope else None
+    return f"{scope['method']} {route.path}" if route else BACKGROUND
+
+
+routing_listener = ShardRoutingListener()
+
+
+class ShardRoutingMiddleware:
+    """ASGI middleware exposing the request to the routing listener"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = current_request.set(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_request.reset(token)
+            if "route" in scope:
+                routing_listener.count_request(scope)
+
+
+def get_routing_report() -> dict:
+    """Scatter-gather report per endpoint, from the queries observed, against its broadcast budget"""
+    endpoints = routing_listener.report()
+    return {
+        "shard_keys": {collection: dict(key) for collection, key in SHARD_KEYS.items()},
+        "endpoints": endpoints,
+        "over_budget": [endpoint for endpoint, entry in endpoints.items() if entry.get("within_budget") is False],
+    }
+
+
+async def ensure_indexes():
+    database = get_database()
+    for collection, indexes in INDEXES.items():
+        for keys in indexes:
+            await database[collection].create_index(keys)
+
+
+async def shard_collections() -> List[str]:
+    """Enable sharding on the tenant collections; needs a mongos and cluster admin rights"""
+    # Read the client at call time: it is created in the startup hook
+    from database.database import client
+    admin = client.admin
+    sharded = []
+    try:
+        await admin.command("enableSharding", DATABASE_NAME)
+    except OperationFailure as e:
+        print(f"❌ Could not enable sharding on {DATABASE_NAME}: {e}")
+        return sharded
+
+    for collection, key in SHARD_KEYS.items():
+        # The shard key needs a supporting index before the collection can be sharded
+        await get_database()[collection].create_index(key)
+        try:
+            await admin.command("shardCollection", f"{DATABASE_NAME}.{collection}", key=dict(key))
+            sharded.append(collection)
+        except OperationFailure as e:
+            # Already sharded with this key is reported as an error by older servers
+            print(f"❌ Could not shard {collection}: {e}")
+
+    return sharded
+
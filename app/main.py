@@ -1,11 +1,35 @@
+import hashlib
+import os
+from functools import lru_cache
+import orjson
 from fastapi import FastAPI, HTTPException
+from fastapi.dependencies.utils import get_flat_dependant
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.openapi.utils import get_openapi
+from fastapi.routing import APIRoute
+from pydantic import TypeAdapter
 from database.database import init_mongo
+from database.sharding import ShardRoutingMiddleware
+from services.Archive import init_appointment_archiver
+from services.Job import init_job_worker
+from services.ChangeStream import init_change_stream_listener
+from services.Sharding import init_sharding
+from services.Booking import init_booking
+from services.Waitlist import init_waitlist
+from services.Analytics import init_analytics
+from services.ReviewFeed import init_review_feeds
+from services.Ranking import init_ranking
 from routers.User import user_router
 from routers.auth import auth_router
-from routers import Availability , Appointment , Service , Staff , Review , Clinic
+from routers import Availability , Appointment , Service , Staff , Review , Clinic , Job , Metrics , Health , Waitlist , Schedule , Analytics , Export , Import , Ranking
 from routers.Appointment import Appointment_router
+from utils.ratelimit import RateLimitMiddleware
+from utils.concurrency import ConcurrencyLimitMiddleware
+from utils.deadline import DeadlineMiddleware, init_deadline_handlers
+from utils.compression import CompressionMiddleware
+from utils.readpref import ReadYourWritesMiddleware
+from utils.idempotency import IdempotencyMiddleware, init_idempotency
+from config import RATE_LIMIT_ENABLED, CONCURRENCY_LIMIT_ENABLED, COMPRESSION_ENABLED, OPENAPI_SCHEMA_PATH
 # from app.database import database , DatabaseManager  # Import the global instance here
 
 app = FastAPI(
@@ -15,6 +39,17 @@ app = FastAPI(
 )
 
 init_mongo(app)
+init_job_worker(app)
+init_appointment_archiver(app)
+init_change_stream_listener(app)
+init_sharding(app)
+init_booking(app)
+init_waitlist(app)
+init_analytics(app)
+init_review_feeds(app)
+init_ranking(app)
+init_deadline_handlers(app)
+init_idempotency(app)
 
 
 # @app.on_event("startup")
@@ -25,6 +60,31 @@ init_mongo(app)
 #     # if success == False:
 #     #     raise HTTPException(status_code=500, detail="❌ Failed to initialize the database")
 
+# Shed load when Mongo slows down; innermost so throttled requests never take a slot
+if CONCURRENCY_LIMIT_ENABLED:
+    app.add_middleware(ConcurrencyLimitMiddleware)
+
+# Attribute every Mongo query to its endpoint for the scatter-gather report
+app.add_middleware(ShardRoutingMiddleware)
+
+# Route this client's reads to the primary right after it writes
+app.add_middleware(ReadYourWritesMiddleware)
+
+# Replay the stored response of a retried write instead of running it twice; outside
+# ReadYourWrites so a replayed write still pins the client's reads to the primary
+app.add_middleware(IdempotencyMiddleware)
+
+# Every request gets a deadline that bounds its Mongo work, including time spent queued
+app.add_middleware(DeadlineMiddleware)
+
+# Throttle clients before any work is done; added before CORS so CORS wraps the 429s
+if RATE_LIMIT_ENABLED:
+    app.add_middleware(RateLimitMiddleware)
+
+# Compress large payloads; cacheable ones are compressed once and served from memory
+if COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -42,6 +102,16 @@ app.include_router(Clinic.router)
 app.include_router(Review.router)
 app.include_router(Service.router)
 app.include_router(Staff.router)
+app.include_router(Appointment_router, tags=["Appointment"], prefix="/appointments")
+app.include_router(Job.router)
+app.include_router(Metrics.router)
+app.include_router(Health.router)
+app.include_router(Waitlist.router)
+app.include_router(Schedule.router)
+app.include_router(Analytics.router)
+app.include_router(Export.router)
+app.include_router(Import.router)
+app.include_router(Ranking.router)
 
 
 
@@ -63,16 +133,77 @@ async def root():
 
 
 # Custom OpenAPI schema
-def custom_openapi():
-    if app.openapi_schema:
-        return app.openapi_schema
-    openapi_schema = get_openapi(
+@lru_cache(maxsize=None)
+def _type_schema(annotation) -> dict:
+    return TypeAdapter(annotation).json_schema()
+
+def _schema_of(annotation):
+    """JSON schema of a parameter, body or response type, so changing a model field changes the fingerprint"""
+    try:
+        return _type_schema(annotation)
+    except Exception:
+        # Types pydantic cannot describe, such as uploads, are fingerprinted by name
+        return repr(annotation)
+
+def _route_description(route) -> list:
+    endpoint = getattr(route, "endpoint", None)
+    description = [
+        route.path,
+        sorted(getattr(route, "methods", None) or []),
+        f"{endpoint.__module__}.{endpoint.__qualname__}" if endpoint else None,
+    ]
+    if not isinstance(route, APIRoute) or not route.include_in_schema:
+        return description
+    # Everything get_openapi documents for the route, without building the document itself
+    dependant = get_flat_dependant(route.dependant)
+    params = [
+        [
+            location, field.alias, field.field_info.is_required(), repr(field.field_info.default),
+            field.field_info.description, _schema_of(field.field_info.annotation)
+        ]
+        for location, fields in (
+            ("path", dependant.path_params), ("query", dependant.query_params),
+            ("header", dependant.header_params), ("cookie", dependant.cookie_params)
+        )
+        for field in fields
+    ]
+    return description + [
+        route.status_code, [str(tag) for tag in route.tags or []], route.summary, route.description,
+        route.deprecated, params,
+        _schema_of(route.body_field.field_info.annotation) if route.body_field else None,
+        _schema_of(route.response_model) if route.response_model else None,
+    ]
+
+def routes_fingerprint() -> str:
+    """Hash of the app version and of every route's method, path, handler, parameters and models"""
+    digest = hashlib.sha256(app.version.encode())
+    for route in app.routes:
+        digest.update(orjson.dumps(_route_description(route), option=orjson.OPT_SORT_KEYS, default=repr))
+    return digest.hexdigest()
+
+def build_openapi_schema() -> dict:
+    schema = get_openapi(
         title="Clinic Appoitment",
-        version="1.0.0",
+        version=app.version,
         description="API for a modern Clinic Appoitment",
         routes=app.routes,
     )
-    app.openapi_schema = openapi_schema
+    schema["info"]["x-routes-fingerprint"] = routes_fingerprint()
+    return schema
+
+def custom_openapi():
+    if app.openapi_schema:
+        return app.openapi_schema
+    # Prefer the schema generated at build time over walking every route on the first /docs hit,
+    # unless the routes changed since it was generated
+    schema = None
+    if os.path.exists(OPENAPI_SCHEMA_PATH):
+        with open(OPENAPI_SCHEMA_PATH, "rb") as schema_file:
+            schema = orjson.loads(schema_file.read())
+        if schema.get("info", {}).get("x-routes-fingerprint") != routes_fingerprint():
+            print(f"❌ {OPENAPI_SCHEMA_PATH} is stale, regenerate it with python -m cli openapi")
+            schema = None
+    app.openapi_schema = schema or build_openapi_schema()
     return app.openapi_schema
 
-app.openapi = custom_openapi
\ No newline at end of file
+app.openapi = custom_openapi
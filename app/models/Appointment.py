@@ -18,4 +18,4 @@ class Appointment(BaseModel):
     staff_id: UUID
     start_time: datetime
     end_time: datetime
-    status: AppStatus.canceled
+    status: AppStatus = AppStatus.booked
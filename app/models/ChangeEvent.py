@@ -0,0 +1,18 @@
+from pydantic import BaseModel
+from typing import Any, Optional
+from datetime import datetime
+from enum import Enum
+
+
+class OperationType(str, Enum):
+    insert = "insert"
+    update = "update"
+    replace = "replace"
+    delete = "delete"
+
+class ChangeEvent(BaseModel):
+    collection: str
+    operation: OperationType
+    document_id: Any
+    document: Optional[dict] = None
+    cluster_time: Optional[datetime] = None
@@ -0,0 +1,25 @@
+from pydantic import BaseModel , Field
+from typing import Optional
+from uuid import UUID , uuid4
+from datetime import datetime
+from enum import Enum
+
+
+class JobStatus(str, Enum):
+    queued = "queued"
+    running = "running"
+    done = "done"
+    failed = "failed"
+
+class Job(BaseModel):
+    id: UUID = Field(default_factory=uuid4)
+    type: str
+    payload: dict = {}
+    status: JobStatus = JobStatus.queued
+    attempts: int = 0
+    max_attempts: int
+    idempotency_key: Optional[str] = None
+    run_at: datetime
+    created_at: datetime
+    locked_until: Optional[datetime] = None
+    last_error: Optional[str] = None
@@ -0,0 +1,25 @@
+from pydantic import BaseModel , Field
+from typing import Optional
+from uuid import UUID , uuid4
+from datetime import datetime
+from enum import Enum
+
+
+class WaitlistStatus(str, Enum):
+    waiting = "waiting"
+    offered = "offered"
+    booked = "booked"
+    expired = "expired"
+    withdrawn = "withdrawn"
+
+class WaitlistEntry(BaseModel):
+    id: UUID = Field(default_factory=uuid4)
+    customer_id: UUID
+    clinic_id: UUID
+    service_id: UUID
+    staff_id: Optional[UUID] = None  # None means any staff member
+    window_start: datetime
+    window_end: datetime
+    auto_book: bool = False
+    status: WaitlistStatus = WaitlistStatus.waiting
+    created_at: datetime
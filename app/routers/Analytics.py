@@ -0,0 +1,48 @@
+from uuid import UUID
+from datetime import date, datetime
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Query
+from services.Analytics import AnalyticsService, get_analytics_service
+from services.Job import get_job_service
+from utils.auth import get_admin_user
+from config import ANALYTICS_REBUILD_DEDUP_SECONDS
+
+router = APIRouter(prefix="/analytics", tags=["Analytics"])
+
+
+@router.get("/report", response_model=List[dict])
+async def get_analytics_report(
+    start_date: date = Query(..., description="First day of the range (inclusive)"),
+    end_date: date = Query(..., description="Last day of the range (inclusive)"),
+    group_by: List[str] = Query(["clinic_id"], description="Any of day, clinic_id, staff_id, service_id"),
+    clinic_id: Optional[UUID] = None,
+    staff_id: Optional[UUID] = None,
+    service_id: Optional[UUID] = None,
+    service: AnalyticsService = Depends(get_analytics_service)
+):
+    """Utilization, revenue and cancellation rate summed from the daily rollups"""
+    return await service.get_report(
+        start_date, end_date, group_by,
+        str(clinic_id) if clinic_id else None,
+        str(staff_id) if staff_id else None,
+        str(service_id) if service_id else None
+    )
+
+
+@router.post("/rebuild", response_model=dict, status_code=202)
+async def rebuild_rollups(
+    start_date: date = Query(...),
+    end_date: date = Query(...),
+    # Rebuilds read every source document in the range: admins only
+    current_user: str = Depends(get_admin_user)
+):
+    """Queue a recomputation of the rollups for a date range from the source collections"""
+    # Repeated requests for the same range within the window queue one rebuild
+    window = int(datetime.utcnow().timestamp() // ANALYTICS_REBUILD_DEDUP_SECONDS)
+    job = await get_job_service().enqueue(
+        "analytics.rebuild_rollups",
+        payload={"start_date": start_date.isoformat(), "end_date": end_date.isoformat()},
+        idempotency_key=f"analytics.rebuild_rollups:{start_date.isoformat()}:{end_date.isoformat()}:{window}"
+    )
+    return {"job_id": job["_id"], "status": job["status"]}
@@ -0,0 +1,33 @@
+from uuid import UUID
+from datetime import date
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+from services.Export import ExportService, FORMATS, get_export_service, parse_after
+from utils.auth import get_admin_user
+
+router = APIRouter(prefix="/exports", tags=["Export"])
+
+
+@router.get("/{dataset}")
+async def export_dataset(
+    dataset: str,
+    format: str = Query("csv.gz", description="csv.gz or parquet"),
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    clinic_id: Optional[UUID] = None,
+    after: Optional[str] = Query(None, description="Last exported id, to resume an interrupted download"),
+    # Exports hold every clinic's data: admins only
+    current_user: str = Depends(get_admin_user),
+    service: ExportService = Depends(get_export_service)
+):
+    """Stream a filtered collection as gzipped CSV or Parquet, one row group at a time"""
+    service.validate(dataset, format)
+    filters = {"start_date": start_date, "end_date": end_date, "clinic_id": clinic_id}
+    media_type, extension = FORMATS[format]
+    return StreamingResponse(
+        service.stream(dataset, filters, format, parse_after(after)),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{dataset}.{extension}"'}
+    )
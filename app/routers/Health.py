@@ -0,0 +1,32 @@
+import asyncio
+
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from database.database import get_database
+
+router = APIRouter(prefix="/health", tags=["Health"])
+
+# Set when the worker received SIGTERM and is finishing its in-flight requests
+draining = False
+
+
+def mark_draining():
+    global draining
+    draining = True
+
+
+@router.get("/live")
+async def liveness():
+    return {"status": "alive"}
+
+
+@router.get("/ready")
+async def readiness():
+    if draining:
+        return JSONResponse(status_code=503, content={"status": "draining"})
+    try:
+        await asyncio.wait_for(get_database().command("ping"), timeout=2)
+    except Exception as e:
+        return JSONResponse(status_code=503, content={"status": "unavailable", "detail": str(e)})
+    return {"status": "ready"}
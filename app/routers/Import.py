@@ -0,0 +1,24 @@
+import io
+from typing import Optional
+
+from fastapi import APIRouter, Depends, File, Query, UploadFile
+from schemas.Import import ImportReport
+from services.Import import ImportService, get_import_service
+from utils.auth import get_admin_user
+
+router = APIRouter(prefix="/imports", tags=["Import"])
+
+
+@router.post("", response_model=ImportReport)
+async def import_entities(
+    file: UploadFile = File(..., description="JSON lines or CSV rows of clinics, services, staff and availability"),
+    format: Optional[str] = Query(None, description="jsonl or csv, guessed from the file name when omitted"),
+    # Imports create clinics for any owner: admins only
+    current_user: str = Depends(get_admin_user),
+    service: ImportService = Depends(get_import_service)
+):
+    """Onboard clinics in bulk; re-uploading the same file updates instead of duplicating"""
+    import_format = format or ("csv" if (file.filename or "").endswith(".csv") else "jsonl")
+    service.validate_format(import_format)
+    lines = io.TextIOWrapper(file.file, encoding="utf-8", newline="")
+    return await service.run(lines, import_format)
@@ -0,0 +1,17 @@
+from fastapi import APIRouter
+
+from schemas.Job import JobMetricsOut
+from services.Job import get_job_service, get_job_worker
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+
+@router.get("/metrics", response_model=JobMetricsOut)
+async def get_job_metrics():
+    metrics = await get_job_service().get_metrics()
+    worker = get_job_worker()
+    return JobMetricsOut(
+        **metrics,
+        workers_busy=worker.busy if worker else 0,
+        concurrency=worker.concurrency if worker else 0
+    )
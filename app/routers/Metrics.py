@@ -0,0 +1,16 @@
+from fastapi import APIRouter
+
+from database.sharding import get_routing_report
+from utils.concurrency import concurrency_limiter
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+
+@router.get("/concurrency", response_model=dict)
+async def get_concurrency_metrics():
+    return concurrency_limiter.snapshot()
+
+
+@router.get("/sharding", response_model=dict)
+async def get_sharding_report():
+    return get_routing_report()
@@ -0,0 +1,26 @@
+from typing import List, Optional
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, Query
+from models.Review import ReviewTarget
+from schemas.Ranking import RankingOut
+from services.Ranking import RankingService, get_ranking_service
+
+router = APIRouter(prefix="/rankings", tags=["Ranking"])
+
+
+@router.get("/{target_type}", response_model=List[RankingOut])
+async def get_top_ranked(
+    target_type: ReviewTarget,
+    clinic_id: Optional[UUID] = None,
+    service_name: Optional[str] = Query(None, description="Services of this name across clinics: the top clinics for it"),
+    limit: int = 20,
+    service: RankingService = Depends(get_ranking_service)
+):
+    """Best ranked clinics, staff or services, read in score order from an index"""
+    return await service.get_top(target_type, limit, str(clinic_id) if clinic_id else None, service_name)
+
+
+@router.get("/{target_type}/{target_id}", response_model=RankingOut)
+async def get_ranking(target_type: ReviewTarget, target_id: UUID, service: RankingService = Depends(get_ranking_service)):
+    return await service.get_ranking(str(target_id), target_type)
@@ -1,52 +1,97 @@
 from uuid import UUID
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Query, Depends
-from schemas.Review import ReviewCreate, ReviewUpdate, ReviewOut
+from fastapi import APIRouter, Query, Depends, Request, Response
+from schemas.Review import ReviewCreate, ReviewUpdate, ReviewOut, ReviewFeedOut, ReviewStatsBatchIn
 from models.Review import ReviewTarget
-from services.Review import get_review_service
+from services.Review import ReviewService, get_review_service
+from services.ReviewFeed import ReviewFeedService, get_review_feed_service
+from utils.fast_response import fast_list_response
+from utils.httpcache import is_not_modified, apply_cache_headers, not_modified_response
+from config import FAST_RESPONSES, REVIEW_FEED_SIZE
 
 router = APIRouter(prefix="/reviews", tags=["Review"])
 
 
 @router.post("/", response_model=ReviewOut, status_code=201)
-async def create_review(review_data: ReviewCreate):
-    return await get_review_service.create_review(review_data)
+async def create_review(review_data: ReviewCreate, service: ReviewService = Depends(get_review_service)):
+    return await service.create_review(review_data)
 
 
 @router.get("/{review_id}", response_model=ReviewOut)
-async def get_review_by_id(review_id: UUID):
-    return await get_review_service.get_review_by_id(review_id)
+async def get_review_by_id(review_id: UUID, service: ReviewService = Depends(get_review_service)):
+    return await service.get_review_by_id(review_id)
 
 
 @router.get("/target/{target_id}", response_model=List[ReviewOut])
 async def get_reviews_by_target(
     target_id: UUID,
+    request: Request,
+    response: Response,
     target_type: ReviewTarget = Query(...),
     skip: int = 0,
-    limit: int = 100
+    limit: int = 100,
+    service: ReviewService = Depends(get_review_service)
 ):
-    return await get_review_service.get_reviews_by_target(target_id, target_type, skip, limit)
+    validators = await service.get_reviews_by_target_validators(target_id, target_type, skip, limit)
+    if is_not_modified(request, validators):
+        return not_modified_response("reviews_by_target", validators)
+    apply_cache_headers(response, "reviews_by_target", validators)
+    
+    if FAST_RESPONSES:
+        reviews = await service.get_reviews_by_target_documents(target_id, target_type, skip, limit)
+        return apply_cache_headers(fast_list_response(ReviewOut, reviews), "reviews_by_target", validators)
+    return await service.get_reviews_by_target(target_id, target_type, skip, limit)
+
+
+@router.get("/target/{target_id}/feed", response_model=ReviewFeedOut)
+async def get_review_feed(
+    target_id: UUID,
+    target_type: ReviewTarget = Query(...),
+    sort: str = Query("newest", description="newest, helpful, highest or lowest"),
+    limit: int = REVIEW_FEED_SIZE,
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    service: ReviewFeedService = Depends(get_review_feed_service)
+):
+    """Page through a target's reviews; the first newest page is a single document read"""
+    return await service.get_page(target_id, target_type, sort, limit, cursor)
 
 
 @router.get("/user/{user_id}", response_model=List[ReviewOut])
-async def get_reviews_by_user(user_id: UUID, skip: int = 0, limit: int = 100):
-    return await get_review_service.get_reviews_by_user(user_id, skip, limit)
+async def get_reviews_by_user(user_id: UUID, skip: int = 0, limit: int = 100, service: ReviewService = Depends(get_review_service)):
+    return await service.get_reviews_by_user(user_id, skip, limit)
 
 
 @router.put("/{review_id}", response_model=ReviewOut)
-async def update_review(review_id: UUID, update_data: ReviewUpdate, user_id: UUID = Query(...)):
-    return await get_review_service.update_review(review_id, update_data, user_id)
+async def update_review(review_id: UUID, update_data: ReviewUpdate, user_id: UUID = Query(...), service: ReviewService = Depends(get_review_service)):
+    return await service.update_review(review_id, update_data, user_id)
 
 
 @router.delete("/{review_id}", response_model=bool)
-async def delete_review(review_id: UUID, user_id: UUID = Query(...)):
-    return await get_review_service.delete_review(review_id, user_id)
+async def delete_review(review_id: UUID, user_id: UUID = Query(...), service: ReviewService = Depends(get_review_service)):
+    return await service.delete_review(review_id, user_id)
+
+
+@router.post("/{review_id}/helpful", response_model=ReviewOut)
+async def mark_review_helpful(review_id: UUID, user_id: UUID = Query(...), service: ReviewService = Depends(get_review_service)):
+    return await service.set_helpful_vote(review_id, user_id, True)
+
+
+@router.delete("/{review_id}/helpful", response_model=ReviewOut)
+async def unmark_review_helpful(review_id: UUID, user_id: UUID = Query(...), service: ReviewService = Depends(get_review_service)):
+    return await service.set_helpful_vote(review_id, user_id, False)
+
+
+@router.post("/stats/batch", response_model=dict)
+async def get_review_statistics_batch(data: ReviewStatsBatchIn, service: ReviewService = Depends(get_review_service)):
+    """Statistics of many targets at once, e.g. every clinic and service on a listing page"""
+    return await service.get_review_statistics_batch(data.targets)
 
 
 @router.get("/stats/{target_id}", response_model=dict)
 async def get_review_statistics(
     target_id: UUID,
-    target_type: ReviewTarget = Query(...)
+    target_type: ReviewTarget = Query(...),
+    service: ReviewService = Depends(get_review_service)
 ):
-    return await get_review_service.get_review_statistics(target_id, target_type)
+    return await service.get_review_statistics(target_id, target_type)
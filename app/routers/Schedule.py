@@ -0,0 +1,17 @@
+from uuid import UUID
+
+from fastapi import APIRouter, Depends
+from schemas.Schedule import ScheduleOptimizeIn, ScheduleOptimizeOut
+from services.Scheduler import SchedulerService, get_scheduler_service
+
+router = APIRouter(prefix="/schedules", tags=["Schedule"])
+
+
+@router.post("/{clinic_id}/optimize", response_model=ScheduleOptimizeOut)
+async def optimize_schedule(
+    clinic_id: UUID,
+    schedule_data: ScheduleOptimizeIn,
+    service: SchedulerService = Depends(get_scheduler_service)
+):
+    """Pack a day's pending requests into staff availability; nothing is booked"""
+    return await service.optimize(str(clinic_id), schedule_data)
@@ -1,10 +1,13 @@
 from uuid import UUID
 from typing import List, Optional
 
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, Query, Request, Response, Depends
 
 from schemas.Service import ServiceCreate, ServiceUpdate, ServiceOut
-from services.Service import get_service_service
+from services.Service import ServiceService, get_service_service
+from utils.fast_response import fast_list_response
+from utils.httpcache import is_not_modified, apply_cache_headers, not_modified_response
+from config import FAST_RESPONSES
 
 router = APIRouter(prefix="/services", tags=["Service"])
 
@@ -13,24 +16,38 @@ router = APIRouter(prefix="/services", tags=["Service"])
 async def create_service(
     service_data: ServiceCreate,
     clinic_id: UUID = Query(...),
-    user_id: UUID = Query(...)
+    user_id: UUID = Query(...),
+    service: ServiceService = Depends(get_service_service)
 ):
-    return await get_service_service.create_service(service_data, clinic_id, user_id)
+    return await service.create_service(service_data, clinic_id, user_id)
 
 
 @router.get("/{service_id}", response_model=ServiceOut)
-async def get_service_by_id(service_id: UUID):
-    return await get_service_service.get_service_by_id(service_id)
+async def get_service_by_id(service_id: UUID, request: Request, response: Response, service: ServiceService = Depends(get_service_service)):
+    validators = await service.get_service_validators(service_id)
+    if validators:
+        if is_not_modified(request, validators):
+            return not_modified_response("service", validators)
+        apply_cache_headers(response, "service", validators)
+    return await service.get_service_by_id(service_id)
 
 
 @router.get("/clinic/{clinic_id}", response_model=List[ServiceOut])
-async def get_services_by_clinic(clinic_id: UUID, skip: int = 0, limit: int = 100):
-    return await get_service_service.get_services_by_clinic(clinic_id, skip, limit)
+async def get_services_by_clinic(clinic_id: UUID, request: Request, response: Response, skip: int = 0, limit: int = 100, service: ServiceService = Depends(get_service_service)):
+    validators = await service.get_services_by_clinic_validators(clinic_id, skip, limit)
+    if validators:
+        if is_not_modified(request, validators):
+            return not_modified_response("services_by_clinic", validators)
+        apply_cache_headers(response, "services_by_clinic", validators)
+    return await service.get_services_by_clinic(clinic_id, skip, limit)
 
 
 @router.get("/", response_model=List[ServiceOut])
-async def get_all_services(skip: int = 0, limit: int = 100):
-    return await get_service_service.get_all_services(skip, limit)
+async def get_all_services(skip: int = 0, limit: int = 100, service: ServiceService = Depends(get_service_service)):
+    if FAST_RESPONSES:
+        services = await service.get_all_services_documents(skip, limit)
+        return fast_list_response(ServiceOut, services)
+    return await service.get_all_services(skip, limit)
 
 
 @router.get("/search", response_model=List[ServiceOut])
@@ -38,9 +55,10 @@ async def search_services(
     search_term: str,
     clinic_id: Optional[UUID] = None,
     skip: int = 0,
-    limit: int = 100
+    limit: int = 100,
+    service: ServiceService = Depends(get_service_service)
 ):
-    return await get_service_service.search_services(search_term, clinic_id, skip, limit)
+    return await service.search_services(search_term, clinic_id, skip, limit)
 
 
 @router.get("/price-range", response_model=List[ServiceOut])
@@ -49,25 +67,27 @@ async def get_services_by_price_range(
     max_price: float,
     clinic_id: Optional[UUID] = None,
     skip: int = 0,
-    limit: int = 100
+    limit: int = 100,
+    service: ServiceService = Depends(get_service_service)
 ):
-    return await get_service_service.get_services_by_price_range(min_price, max_price, clinic_id, skip, limit)
+    return await service.get_services_by_price_range(min_price, max_price, clinic_id, skip, limit)
 
 
 @router.put("/{service_id}", response_model=ServiceOut)
 async def update_service(
     service_id: UUID,
     update_data: ServiceUpdate,
-    user_id: UUID = Query(...)
+    user_id: UUID = Query(...),
+    service: ServiceService = Depends(get_service_service)
 ):
-    return await get_service_service.update_service(service_id, update_data, user_id)
+    return await service.update_service(service_id, update_data, user_id)
 
 
 @router.delete("/{service_id}", response_model=bool)
-async def delete_service(service_id: UUID, user_id: UUID = Query(...)):
-    return await get_service_service.delete_service(service_id, user_id)
+async def delete_service(service_id: UUID, user_id: UUID = Query(...), service: ServiceService = Depends(get_service_service)):
+    return await service.delete_service(service_id, user_id)
 
 
 @router.get("/stats/{service_id}", response_model=dict)
-async def get_service_stats(service_id: UUID):
-    return await get_service_service.get_service_stats(service_id)
+async def get_service_stats(service_id: UUID, service: ServiceService = Depends(get_service_service)):
+    return await service.get_service_stats(service_id)
@@ -0,0 +1,33 @@
+from uuid import UUID
+from typing import List
+
+from fastapi import APIRouter, Depends
+from schemas.Waitlist import WaitlistCreate, WaitlistOut
+from services.Waitlist import WaitlistService, get_waitlist_service
+
+router = APIRouter(prefix="/waitlist", tags=["Waitlist"])
+
+
+@router.post("/", response_model=WaitlistOut, status_code=201)
+async def join_waitlist(entry_data: WaitlistCreate, service: WaitlistService = Depends(get_waitlist_service)):
+    return await service.join(entry_data)
+
+
+@router.get("/customer/{customer_id}", response_model=List[WaitlistOut])
+async def get_customer_waitlist(customer_id: UUID, service: WaitlistService = Depends(get_waitlist_service)):
+    return await service.get_entries_by_customer(customer_id)
+
+
+@router.get("/{entry_id}", response_model=WaitlistOut)
+async def get_waitlist_entry(entry_id: UUID, service: WaitlistService = Depends(get_waitlist_service)):
+    return await service.get_entry(entry_id)
+
+
+@router.post("/{entry_id}/accept", response_model=WaitlistOut)
+async def accept_waitlist_offer(entry_id: UUID, service: WaitlistService = Depends(get_waitlist_service)):
+    return await service.accept(entry_id)
+
+
+@router.delete("/{entry_id}", response_model=WaitlistOut)
+async def withdraw_from_waitlist(entry_id: UUID, service: WaitlistService = Depends(get_waitlist_service)):
+    return await service.withdraw(entry_id)
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, EmailStr
 from uuid import UUID
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 from enum import Enum
 from schemas.User import UserOut
@@ -22,10 +22,17 @@ class AppointmentCreate(BaseModel):
     start_time: datetime
     end_time: datetime
 
+class AppointmentAutoCreate(BaseModel):
+    customer_id: UUID
+    clinic_id: UUID
+    service_id: UUID
+    start_time: datetime
+    end_time: Optional[datetime] = None  # defaults to the service duration
+
 class AppointmentUpdate(BaseModel):
-    status: Optional[AppStatus]
-    start_time: Optional[datetime]
-    end_time: Optional[datetime]
+    status: Optional[AppStatus] = None
+    start_time: Optional[datetime] = None
+    end_time: Optional[datetime] = None
     
 class AppointmentDetailedOut(BaseModel):
     id: UUID
@@ -49,3 +56,20 @@ class AppointmentOut(BaseModel):
 
     class Config:
         orm_mode = True
+
+
+class CalendarStaffBucketOut(BaseModel):
+    staff_id: str
+    appointment_count: int
+    booked_minutes: float
+    available_minutes: float
+    utilization: Optional[float]
+    appointments: List[AppointmentOut]
+
+class CalendarDayOut(BaseModel):
+    date: str
+    appointment_count: int
+    booked_minutes: float
+    available_minutes: float
+    utilization: Optional[float]
+    staff: List[CalendarStaffBucketOut]
@@ -0,0 +1,71 @@
+from pydantic import BaseModel, EmailStr, Field, field_validator, model_validator
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# Rows reference each other with `ref`s from the same file, or with the id of an existing document
+
+
+class ClinicImportRow(BaseModel):
+    ref: str
+    name: str
+    address: str
+    phone: Optional[str] = ""
+    description: Optional[str] = ""
+    owner_email: EmailStr
+
+
+class ServiceImportRow(BaseModel):
+    ref: Optional[str] = None
+    clinic: str
+    name: str
+    description: Optional[str] = ""
+    duration_minutes: int = Field(gt=0)
+    price: float = Field(ge=0)
+
+
+class StaffImportRow(BaseModel):
+    ref: Optional[str] = None
+    clinic: str
+    user_email: EmailStr
+    services: List[str] = []
+
+    @field_validator("services", mode="before")
+    @classmethod
+    def split_services(cls, value):
+        # CSV cells list services separated by ";"
+        if isinstance(value, str):
+            return [item.strip() for item in value.split(";") if item.strip()]
+        return value
+
+
+class AvailabilityImportRow(BaseModel):
+    staff: str
+    start_time: datetime
+    end_time: datetime
+
+    @model_validator(mode="after")
+    def check_window(self):
+        if self.end_time <= self.start_time:
+            raise ValueError("end_time must be after start_time")
+        return self
+
+
+class ImportRowError(BaseModel):
+    line: int
+    type: Optional[str]
+    ref: Optional[str]
+    error: str
+
+
+class ImportCounts(BaseModel):
+    inserted: int = 0
+    updated: int = 0
+
+
+class ImportReport(BaseModel):
+    rows: int
+    failed: int
+    entities: Dict[str, ImportCounts]
+    errors: List[ImportRowError]
+    errors_truncated: bool
+    seconds: float
@@ -0,0 +1,11 @@
+from pydantic import BaseModel
+from typing import Dict, Optional
+
+
+class JobMetricsOut(BaseModel):
+    depth: Dict[str, int]
+    ready: int
+    lag_seconds: float
+    oldest_ready_type: Optional[str]
+    workers_busy: int
+    concurrency: int
@@ -0,0 +1,15 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Optional
+from models.Review import ReviewTarget
+
+
+class RankingOut(BaseModel):
+    target_id: str
+    target_type: ReviewTarget
+    clinic_id: Optional[str]
+    service_name: Optional[str] = None  # service targets only
+    score: float  # time-decayed Bayesian average, on the 1-5 rating scale
+    average_rating: Optional[float]
+    reviews: int
+    scored_at: datetime
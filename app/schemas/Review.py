@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field, conint
 from uuid import UUID
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 from enum import Enum
 
@@ -32,6 +32,21 @@ class ReviewOut(BaseModel):
     rating: int
     comment: Optional[str]
     created_at: datetime
+    helpful_count: Optional[int] = 0
 
     class Config:
         orm_mode = True
+
+
+class ReviewStatsTarget(BaseModel):
+    target_id: UUID
+    target_type: ReviewTarget
+
+
+class ReviewStatsBatchIn(BaseModel):
+    targets: List[ReviewStatsTarget]
+
+
+class ReviewFeedOut(BaseModel):
+    reviews: List[ReviewOut]
+    next_cursor: Optional[str]  # pass back as `cursor` for the next page; None on the last one
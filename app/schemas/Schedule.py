@@ -0,0 +1,37 @@
+from pydantic import BaseModel
+from uuid import UUID
+from typing import List, Optional
+from datetime import date, datetime
+
+
+class ScheduleWindow(BaseModel):
+    start_time: datetime
+    end_time: datetime
+
+class ScheduleRequestIn(BaseModel):
+    request_id: str
+    service_id: UUID
+    customer_id: Optional[UUID] = None
+    staff_id: Optional[UUID] = None
+    windows: List[ScheduleWindow] = []  # empty means any time that day
+
+class ScheduleOptimizeIn(BaseModel):
+    date: date
+    requests: List[ScheduleRequestIn]
+
+class ScheduledAssignmentOut(BaseModel):
+    request_id: str
+    service_id: UUID
+    customer_id: Optional[UUID]
+    staff_id: UUID
+    start_time: datetime
+    end_time: datetime
+
+class ScheduleOptimizeOut(BaseModel):
+    date: date
+    assignments: List[ScheduledAssignmentOut]
+    unassigned: List[str]
+    available_minutes: float
+    scheduled_minutes: float
+    idle_minutes: float
+    utilization: Optional[float]
@@ -0,0 +1,45 @@
+from pydantic import BaseModel
+from uuid import UUID
+from typing import Optional
+from datetime import datetime
+from enum import Enum
+
+
+class WaitlistStatus(str, Enum):
+    waiting = "waiting"
+    offered = "offered"
+    booked = "booked"
+    expired = "expired"
+    withdrawn = "withdrawn"
+
+class WaitlistCreate(BaseModel):
+    customer_id: UUID
+    clinic_id: UUID
+    service_id: UUID
+    staff_id: Optional[UUID] = None
+    window_start: datetime
+    window_end: datetime
+    auto_book: bool = False
+
+class WaitlistOfferOut(BaseModel):
+    staff_id: UUID
+    start_time: datetime
+    end_time: datetime
+    expires_at: datetime
+
+class WaitlistOut(BaseModel):
+    id: UUID
+    customer_id: UUID
+    clinic_id: UUID
+    service_id: UUID
+    staff_id: Optional[UUID]
+    window_start: datetime
+    window_end: datetime
+    auto_book: bool
+    status: WaitlistStatus
+    created_at: datetime
+    offer: Optional[WaitlistOfferOut] = None
+    appointment_id: Optional[UUID] = None
+
+    class Config:
+        orm_mode = True
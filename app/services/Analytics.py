@@ -0,0 +1,339 @@
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Optional, Tuple
+from fastapi import HTTPException
+from pymongo import ReturnDocument, UpdateOne
+from database.collections import (
+    get_appointment_collection, get_appointment_archive_collection, get_availability_collection,
+    get_service_collection, get_daily_rollup_collection, get_rollup_contribution_collection
+)
+from models.Appointment import AppStatus
+from models.ChangeEvent import ChangeEvent, OperationType
+from services.Archive import get_archive_service
+from services.ChangeStream import on_resync, subscribe
+from services.Job import job_handler, get_job_service
+from config import ANALYTICS_RESYNC_DAYS, CHANGE_STREAM_POLL_RESYNC_SECONDS
+
+
+METRICS = (
+    "appointments", "booked", "completed", "canceled",
+    "booked_minutes", "available_minutes", "revenue", "expected_revenue"
+)
+DIMENSIONS = ("day", "clinic_id", "staff_id", "service_id")
+MAX_REPORT_DAYS = 366
+BACKFILL_BATCH_SIZE = 1000
+
+
+def _cell(day: str, clinic_id: str, staff_id: str, service_id: Optional[str]) -> dict:
+    # Finest grain: one rollup document per day, clinic, staff member and service
+    return {
+        "_id": f"{day}|{clinic_id}|{staff_id}|{service_id or ''}",
+        "day": day,
+        "clinic_id": clinic_id,
+        "staff_id": staff_id,
+        "service_id": service_id
+    }
+
+
+def appointment_contribution(appointment: dict, price: float) -> Tuple[dict, Dict[str, float]]:
+    """Rollup cell of an appointment and what it adds to each metric in its current status"""
+    cell = _cell(
+        appointment["start_time"].strftime("%Y-%m-%d"),
+        str(appointment["clinic_id"]), str(appointment["staff_id"]), str(appointment["service_id"])
+    )
+    minutes = (appointment["end_time"] - appointment["start_time"]).total_seconds() / 60
+    status = appointment["status"]
+
+    metrics = {"appointments": 1}
+    if status == AppStatus.canceled.value:
+        metrics["canceled"] = 1
+    else:
+        metrics["booked_minutes"] = minutes
+        metrics["expected_revenue"] = price
+        if status == AppStatus.completed.value:
+            metrics["completed"] = 1
+            metrics["revenue"] = price
+        else:
+            metrics["booked"] = 1
+    return cell, metrics
+
+
+def availability_contribution(availability: dict) -> Tuple[dict, Dict[str, float]]:
+    cell = _cell(
+        availability["start_time"].strftime("%Y-%m-%d"),
+        str(availability["clinic_id"]), str(availability["staff_id"]), None
+    )
+    minutes = (availability["end_time"] - availability["start_time"]).total_seconds() / 60
+    return cell, {"available_minutes": minutes}
+
+
+def _unless_moved_since(started: datetime, field: str, value) -> dict:
+    """Update expression writing a rebuilt value, unless an event stamped the document after `started`"""
+    return {"$cond": [{"$gte": ["$updated_at", started]}, f"${field}", {"$literal": value}]}
+
+
+class AnalyticsService:
+    """Daily rollups kept up to date from the change stream, summed with numpy at query time.
+
+    Each source document's current contribution is stored next to the rollups. An event
+    swaps in the new contribution and applies the difference to the rollup cells, so a
+    redelivered event, or the same event seen by several workers, adds nothing twice.
+    Both are stamped with updated_at, which a rebuild checks before overwriting them.
+    """
+
+    def __init__(self):
+        self.rollup_collection = get_daily_rollup_collection()
+        self.read_rollup_collection = get_daily_rollup_collection(read_only=True)
+        self.contribution_collection = get_rollup_contribution_collection()
+        self.service_collection = get_service_collection()
+
+    async def ensure_indexes(self):
+        await self.rollup_collection.create_index([("clinic_id", 1), ("day", 1)])
+        await self.rollup_collection.create_index([("day", 1)])
+
+    async def apply_change(self, source: str, document_id, contribution: Optional[Tuple[dict, Dict[str, float]]]):
+        """Replace a document's contribution and move the rollups by the difference"""
+        contribution_id = f"{source}:{document_id}"
+        now = datetime.utcnow()
+        if contribution is None:
+            previous = await self.contribution_collection.find_one_and_delete({"_id": contribution_id})
+        else:
+            cell, metrics = contribution
+            previous = await self.contribution_collection.find_one_and_update(
+                {"_id": contribution_id},
+                {"$set": {"cell": cell, "metrics": metrics, "updated_at": now}},
+                upsert=True,
+                return_document=ReturnDocument.BEFORE
+            )
+
+        deltas: Dict[str, Tuple[dict, Dict[str, float]]] = {}
+        if previous:
+            deltas[previous["cell"]["_id"]] = (previous["cell"], {name: -value for name, value in previous["metrics"].items()})
+        if contribution is not None:
+            cell, metrics = contribution
+            _, merged = deltas.setdefault(cell["_id"], (cell, {}))
+            for name, value in metrics.items():
+                merged[name] = merged.get(name, 0) + value
+
+        operations = []
+        for cell_id, (cell, metrics) in deltas.items():
+            increments = {name: value for name, value in metrics.items() if value}
+            if increments:
+                operations.append(UpdateOne(
+                    {"_id": cell_id},
+                    {"$inc": increments, "$set": {"updated_at": now}, "$setOnInsert": {key: cell[key] for key in DIMENSIONS}},
+                    upsert=True
+                ))
+        if operations:
+            await self.rollup_collection.bulk_write(operations, ordered=False)
+
+    async def on_appointment_change(self, event: ChangeEvent):
+        if event.operation == OperationType.delete or event.document is None:
+            if await self._was_archived(event.document_id):
+                return
+            await self.apply_change("appointments", event.document_id, None)
+            return
+        service = await self.service_collection.find_one({"_id": str(event.document["service_id"])}, {"price": 1})
+        price = float(service["price"]) if service else 0.0
+        await self.apply_change("appointments", event.document_id, appointment_contribution(event.document, price))
+
+    async def _was_archived(self, appointment_id) -> bool:
+        """Whether an appointment left the hot collection for its monthly archive"""
+        previous = await self.contribution_collection.find_one({"_id": f"appointments:{appointment_id}"}, {"cell.day": 1})
+        if not previous:
+            return False
+        # The archiver copies before it deletes, and files by start month like the rollup day
+        month = previous["cell"]["day"][:7].replace("-", "_")
+        return await get_appointment_archive_collection(month).find_one({"_id": appointment_id}, {"_id": 1}) is not None
+
+    async def on_availability_change(self, event: ChangeEvent):
+        if event.operation == OperationType.delete or event.document is None:
+            await self.apply_change("availability", event.document_id, None)
+            return
+        if not event.document.get("clinic_id"):
+            return
+        await self.apply_change("availability", event.document_id, availability_contribution(event.document))
+
+    async def rebuild(self, start_date: date, end_date: date) -> dict:
+        """Recompute rollups and contributions for a date range from the source collections.
+
+        Archived appointments still count towards the days they happened on. Cells are
+        overwritten in place, so reports never see the range empty while it is rebuilt.
+        A cell or contribution an event moved after the rebuild started keeps its value:
+        it counts that event, which the rebuild may have read the source before.
+        """
+        started = datetime.utcnow()
+        window_start = datetime.combine(start_date, time.min)
+        window_end = datetime.combine(end_date + timedelta(days=1), time.min)
+        day_range = {"$gte": start_date.isoformat(), "$lte": end_date.isoformat()}
+
+        prices = {
+            str(service["_id"]): float(service["price"])
+            async for service in self.service_collection.find({}, {"price": 1})
+        }
+
+        cells: Dict[str, dict] = {}
+        contributions = []
+        counts = {"appointments": 0, "availability": 0}
+
+        async def collect(source: str, document_id, contribution):
+            cell, metrics = contribution
+            entry = cells.setdefault(cell["_id"], {**cell, **{name: 0 for name in METRICS}})
+            for name, value in metrics.items():
+                entry[name] += value
+            contributions.append(UpdateOne({"_id": f"{source}:{document_id}"}, [{"$set": {
+                "cell": _unless_moved_since(started, "cell", cell),
+                "metrics": _unless_moved_since(started, "metrics", metrics)
+            }}], upsert=True))
+            counts[source] += 1
+            if len(contributions) >= BACKFILL_BATCH_SIZE:
+                await self.contribution_collection.bulk_write(contributions, ordered=False)
+                contributions.clear()
+
+        in_window = {"start_time": {"$gte": window_start, "$lt": window_end}}
+        archived = await get_archive_service().find_archived(in_window, window_start, window_end)
+        # Mid-archival an appointment can be in both places; it counts once
+        seen = set()
+        for appointment in archived:
+            seen.add(appointment["_id"])
+            await collect("appointments", appointment["_id"], appointment_contribution(appointment, prices.get(str(appointment["service_id"]), 0.0)))
+        async for appointment in get_appointment_collection().find(in_window):
+            if appointment["_id"] not in seen:
+                await collect("appointments", appointment["_id"], appointment_contribution(appointment, prices.get(str(appointment["service_id"]), 0.0)))
+
+        async for availability in get_availability_collection().find({
+            "start_time": {"$gte": window_start, "$lt": window_end}, "clinic_id": {"$exists": True}
+        }):
+            await collect("availability", availability["_id"], availability_contribution(availability))
+
+        if contributions:
+            await self.contribution_collection.bulk_write(contributions, ordered=False)
+
+        # Cells in the range that nothing contributes to any more are zeroed, not dropped
+        emptied = [
+            cell["_id"]
+            async for cell in self.rollup_collection.find({"day": day_range}, {"_id": 1})
+            if cell["_id"] not in cells
+        ]
+        operations = [
+            UpdateOne({"_id": cell_id}, [{"$set": {
+                **{key: {"$literal": cell[key]} for key in DIMENSIONS},
+                **{name: _unless_moved_since(started, name, cell[name]) for name in METRICS}
+            }}], upsert=True)
+            for cell_id, cell in cells.items()
+        ] + [
+            UpdateOne({"_id": cell_id}, [{"$set": {name: _unless_moved_since(started, name, 0) for name in METRICS}}])
+            for cell_id in emptied
+        ]
+        for i in range(0, len(operations), BACKFILL_BATCH_SIZE):
+            await self.rollup_collection.bulk_write(operations[i:i + BACKFILL_BATCH_SIZE], ordered=False)
+
+        return {**counts, "cells": len(cells)}
+
+    async def get_report(
+        self,
+        start_date: date,
+        end_date: date,
+        group_by: List[str],
+        clinic_id: Optional[str] = None,
+        staff_id: Optional[str] = None,
+        service_id: Optional[str] = None
+    ) -> List[dict]:
+        """Sum rollup cells over a date range, grouped by any combination of dimensions"""
+        if end_date < start_date:
+            raise HTTPException(status_code=400, detail="end_date must not be before start_date")
+        if (end_date - start_date).days + 1 > MAX_REPORT_DAYS:
+            raise HTTPException(status_code=400, detail=f"Report window cannot exceed {MAX_REPORT_DAYS} days")
+        unknown = set(group_by) - set(DIMENSIONS)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Cannot group by {', '.join(sorted(unknown))}")
+
+        query = {"day": {"$gte": start_date.isoformat(), "$lte": end_date.isoformat()}}
+        if clinic_id:
+            query["clinic_id"] = clinic_id
+        if staff_id:
+            query["staff_id"] = staff_id
+        if service_id:
+            # Availability cells carry no service: keep them so utilization stays meaningful
+            query["service_id"] = {"$in": [service_id, None]}
+
+        projection = {name: 1 for name in (*group_by, *METRICS)}
+        cells = await self.read_rollup_collection.find(query, projection).to_list(length=None)
+        if not cells:
+            return []
+
+        # numpy is imported on first use, not at startup: only reports need it
+        import numpy as np
+        values = np.array([[cell.get(name, 0) for name in METRICS] for cell in cells], dtype=np.float64)
+        group_index: Dict[tuple, int] = {}
+        inverse = np.array([
+            group_index.setdefault(tuple(cell.get(dimension) for dimension in group_by), len(group_index))
+            for cell in cells
+        ])
+        totals = np.zeros((len(group_index), len(METRICS)))
+        np.add.at(totals, inverse, values)
+
+        metric = {name: i for i, name in enumerate(METRICS)}
+        available = totals[:, metric["available_minutes"]]
+        booked = totals[:, metric["booked_minutes"]]
+        appointments = totals[:, metric["appointments"]]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            utilization = np.where(available > 0, booked / available, np.nan)
+            cancellation_rate = np.where(appointments > 0, totals[:, metric["canceled"]] / appointments, np.nan)
+
+        report = []
+        for group, i in sorted(group_index.items(), key=lambda item: tuple(str(value) for value in item[0])):
+            row = dict(zip(group_by, group))
+            row.update({name: float(totals[i, metric[name]]) for name in METRICS})
+            row["booked_hours"] = round(float(booked[i]) / 60, 2)
+            row["available_hours"] = round(float(available[i]) / 60, 2)
+            row["utilization"] = None if np.isnan(utilization[i]) else round(float(utilization[i]), 4)
+            row["cancellation_rate"] = None if np.isnan(cancellation_rate[i]) else round(float(cancellation_rate[i]), 4)
+            report.append(row)
+        return report
+
+
+def get_analytics_service() -> AnalyticsService:
+    return AnalyticsService()
+
+
+@subscribe("appointments")
+async def update_appointment_rollups(event: ChangeEvent):
+    await get_analytics_service().on_appointment_change(event)
+
+
+@subscribe("availability")
+async def update_availability_rollups(event: ChangeEvent):
+    await get_analytics_service().on_availability_change(event)
+
+
+@on_resync
+async def rebuild_recent_rollups():
+    """Events were missed, such as deletes while polling: queue a rebuild of the days around today"""
+    today = datetime.utcnow().date()
+    # One rebuild per resync period, however many workers are listening
+    window = int(datetime.utcnow().timestamp() // CHANGE_STREAM_POLL_RESYNC_SECONDS)
+    await get_job_service().enqueue(
+        "analytics.rebuild_rollups",
+        payload={
+            "start_date": (today - timedelta(days=ANALYTICS_RESYNC_DAYS)).isoformat(),
+            "end_date": (today + timedelta(days=ANALYTICS_RESYNC_DAYS)).isoformat()
+        },
+        idempotency_key=f"analytics.resync:{window}"
+    )
+
+
+@job_handler("analytics.rebuild_rollups")
+async def rebuild_rollups_job(payload: dict):
+    counts = await get_analytics_service().rebuild(
+        date.fromisoformat(payload["start_date"]), date.fromisoformat(payload["end_date"])
+    )
+    print(f"✅ Rebuilt daily rollups {payload['start_date']}..{payload['end_date']}: {counts}")
+
+
+def init_analytics(app):
+    @app.on_event("startup")
+    async def prepare_analytics():
+        try:
+            await get_analytics_service().ensure_indexes()
+        except Exception as e:
+            print(f"❌ Failed to create analytics indexes: {e}")
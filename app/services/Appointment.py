@@ -1,17 +1,32 @@
 from uuid import UUID
-from datetime import datetime
+from datetime import datetime, date, time, timedelta, timezone
 from typing import List, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 from fastapi import HTTPException
 from motor.motor_asyncio import AsyncIOMotorDatabase
-from database.collections import get_appointment_collection, get_user_collection, get_clinic_collection, get_service_collection, get_staff_collection
+from database.collections import get_appointment_collection, get_user_collection, get_clinic_collection, get_service_collection, get_staff_collection, get_availability_collection
 from models.Appointment import Appointment, AppStatus
-from schemas.Appointment import AppointmentCreate, AppointmentUpdate, AppointmentOut, AppointmentDetailedOut
+from schemas.Appointment import AppointmentCreate, AppointmentUpdate, AppointmentOut, AppointmentDetailedOut, CalendarDayOut, CalendarStaffBucketOut
 from schemas.User import UserOut
+from services.Archive import get_archive_service
+from services.Booking import book, reclaim_slots, release_slots
+from services.Sharding import get_customer_clinic_ids, get_staff_clinic_id
+from services.CustomerIndex import get_customer_index_service
+from services.Waitlist import on_appointment_canceled
 from schemas.Clinic import ClinicOut
 from schemas.Service import ServiceOut
 from schemas.Staff import StaffOut
 
 
+MAX_CALENDAR_DAYS = 62
+
+
+def _utilization(booked_minutes: float, available_minutes: float) -> Optional[float]:
+    if not available_minutes:
+        return None
+    return round(booked_minutes / available_minutes, 4)
+
+
 class AppointmentService:
     def __init__(self):
         self.collection = get_appointment_collection()
@@ -19,6 +34,9 @@ class AppointmentService:
         self.clinic_collection = get_clinic_collection()
         self.service_collection = get_service_collection()
         self.staff_collection = get_staff_collection()
+        self.read_collection = get_appointment_collection(read_only=True)
+        self.read_staff_collection = get_staff_collection(read_only=True)
+        self.read_availability_collection = get_availability_collection(read_only=True)
 
     async def create_appointment(self, appointment_data: AppointmentCreate) -> AppointmentOut:
         """Create a new appointment"""
@@ -38,14 +56,17 @@ class AppointmentService:
             status=AppStatus.booked
         )
         
-        appointment_dict = appointment.model_dump()
+        appointment_dict = appointment.model_dump(exclude={"id"})
         appointment_dict["_id"] = str(appointment.id)
+        for field in ("customer_id", "clinic_id", "service_id", "staff_id"):
+            appointment_dict[field] = str(appointment_dict[field])
+        appointment_dict["status"] = AppStatus.booked.value
+        appointment_dict["updated_at"] = datetime.utcnow()
         
-        result = await self.collection.insert_one(appointment_dict)
-        if result.inserted_id:
-            return AppointmentOut(**appointment_dict)
-        
-        raise HTTPException(status_code=500, detail="Failed to create appointment")
+        # The check above gives a quick answer; the slot claim is what stops a racing booking
+        if not await book(appointment_dict):
+            raise HTTPException(status_code=400, detail="Staff is not available at this time")
+        return AppointmentOut(id=appointment.id, **appointment_dict)
 
     async def get_appointment_by_id(self, appointment_id: UUID) -> AppointmentOut:
         """Get appointment by ID"""
@@ -88,39 +109,154 @@ class AppointmentService:
             status=appointment["status"]
         )
 
-    async def get_appointments_by_customer(self, customer_id: UUID) -> List[AppointmentOut]:
+    async def get_appointments_by_customer(self, customer_id: UUID, start_date: Optional[datetime] = None, end_date: Optional[datetime] = None) -> List[AppointmentOut]:
         """Get all appointments for a customer"""
-        cursor = self.collection.find({"customer_id": str(customer_id)})
-        appointments = await cursor.to_list(length=None)
-        
-        result = []
-        for appointment in appointments:
-            appointment["id"] = appointment["_id"]
-            result.append(AppointmentOut(**appointment))
-        
-        return result
+        query = {"customer_id": str(customer_id)}
+        # Route to the customer's clinics only; customers not in the lookup yet fall back to a broadcast
+        clinic_ids = await get_customer_clinic_ids(str(customer_id))
+        if clinic_ids is not None:
+            query["clinic_id"] = {"$in": clinic_ids}
+        return await self._find_appointments(query, start_date, end_date)
 
-    async def get_appointments_by_staff(self, staff_id: UUID) -> List[AppointmentOut]:
+    async def get_appointments_by_staff(self, staff_id: UUID, start_date: Optional[datetime] = None, end_date: Optional[datetime] = None) -> List[AppointmentOut]:
         """Get all appointments for a staff member"""
-        cursor = self.collection.find({"staff_id": str(staff_id)})
-        appointments = await cursor.to_list(length=None)
-        
-        result = []
-        for appointment in appointments:
-            appointment["id"] = appointment["_id"]
-            result.append(AppointmentOut(**appointment))
-        
-        return result
+        query = {"staff_id": str(staff_id)}
+        clinic_id = await get_staff_clinic_id(str(staff_id))
+        if clinic_id:
+            query["clinic_id"] = clinic_id
+        return await self._find_appointments(query, start_date, end_date)
 
-    async def get_appointments_by_clinic(self, clinic_id: UUID) -> List[AppointmentOut]:
+    async def get_appointments_by_clinic(self, clinic_id: UUID, start_date: Optional[datetime] = None, end_date: Optional[datetime] = None) -> List[AppointmentOut]:
         """Get all appointments for a clinic"""
-        cursor = self.collection.find({"clinic_id": str(clinic_id)})
-        appointments = await cursor.to_list(length=None)
+        return await self._find_appointments({"clinic_id": str(clinic_id)}, start_date, end_date)
+
+    async def get_calendar(
+        self,
+        start_date: date,
+        end_date: date,
+        tz: str = "UTC",
+        clinic_id: Optional[UUID] = None,
+        staff_id: Optional[UUID] = None
+    ) -> List[CalendarDayOut]:
+        """Get appointments bucketed per day and per staff member for a calendar window"""
+        if (clinic_id is None) == (staff_id is None):
+            raise HTTPException(status_code=400, detail="Provide exactly one of clinic_id or staff_id")
+        
+        if end_date < start_date:
+            raise HTTPException(status_code=400, detail="end_date must not be before start_date")
+        
+        if (end_date - start_date).days + 1 > MAX_CALENDAR_DAYS:
+            raise HTTPException(status_code=400, detail=f"Calendar window cannot exceed {MAX_CALENDAR_DAYS} days")
+        
+        try:
+            zone = ZoneInfo(tz)
+        except (ZoneInfoNotFoundError, ValueError):
+            raise HTTPException(status_code=400, detail="Unknown timezone")
+        
+        # Window boundaries are local midnights converted to UTC, as stored in Mongo
+        window_start = datetime.combine(start_date, time.min, tzinfo=zone).astimezone(timezone.utc)
+        window_end = datetime.combine(end_date + timedelta(days=1), time.min, tzinfo=zone).astimezone(timezone.utc)
+        
+        if clinic_id:
+            staff_ids = [str(sid) for sid in await self.read_staff_collection.distinct("_id", {"clinic_id": str(clinic_id)})]
+            appointment_match = {"clinic_id": str(clinic_id)}
+        else:
+            staff_clinic_id = await get_staff_clinic_id(str(staff_id))
+            if staff_clinic_id is None:
+                raise HTTPException(status_code=404, detail="Staff not found")
+            staff_ids = [str(staff_id)]
+            appointment_match = {"clinic_id": staff_clinic_id, "staff_id": str(staff_id)}
+        
+        appointment_match["start_time"] = {"$gte": window_start, "$lt": window_end}
+        appointment_match["status"] = {"$ne": AppStatus.canceled}
+        
+        day_key = {"$dateToString": {"format": "%Y-%m-%d", "date": "$start_time", "timezone": tz}}
+        duration_minutes = {"$divide": [{"$subtract": ["$end_time", "$start_time"]}, 60000]}
+        
+        appointment_pipeline = [
+            {"$match": appointment_match},
+            {"$sort": {"start_time": 1}},
+            {
+                "$group": {
+                    "_id": {"day": day_key, "staff_id": "$staff_id"},
+                    "appointment_count": {"$sum": 1},
+                    "booked_minutes": {"$sum": duration_minutes},
+                    "appointments": {
+                        "$push": {
+                            "id": "$_id",
+                            "customer_id": "$customer_id",
+                            "clinic_id": "$clinic_id",
+                            "service_id": "$service_id",
+                            "staff_id": "$staff_id",
+                            "start_time": "$start_time",
+                            "end_time": "$end_time",
+                            "status": "$status"
+                        }
+                    }
+                }
+            }
+        ]
+        
+        availability_pipeline = [
+            {
+                "$match": {
+                    "clinic_id": appointment_match["clinic_id"],
+                    "staff_id": {"$in": staff_ids},
+                    "start_time": {"$gte": window_start, "$lt": window_end}
+                }
+            },
+            {
+                "$group": {
+                    "_id": {"day": day_key, "staff_id": "$staff_id"},
+                    "available_minutes": {"$sum": duration_minutes}
+                }
+            }
+        ]
+        
+        booked = await self.read_collection.aggregate(appointment_pipeline).to_list(length=None)
+        available = await self.read_availability_collection.aggregate(availability_pipeline).to_list(length=None)
+        
+        buckets = {}
+        for bucket in booked:
+            buckets[(bucket["_id"]["day"], bucket["_id"]["staff_id"])] = {
+                "appointment_count": bucket["appointment_count"],
+                "booked_minutes": bucket["booked_minutes"],
+                "available_minutes": 0,
+                "appointments": bucket["appointments"]
+            }
+        for bucket in available:
+            key = (bucket["_id"]["day"], bucket["_id"]["staff_id"])
+            entry = buckets.setdefault(key, {
+                "appointment_count": 0,
+                "booked_minutes": 0,
+                "available_minutes": 0,
+                "appointments": []
+            })
+            entry["available_minutes"] = bucket["available_minutes"]
+        
+        days = {}
+        for (day, bucket_staff_id), entry in sorted(buckets.items()):
+            days.setdefault(day, []).append(CalendarStaffBucketOut(
+                staff_id=bucket_staff_id,
+                appointment_count=entry["appointment_count"],
+                booked_minutes=entry["booked_minutes"],
+                available_minutes=entry["available_minutes"],
+                utilization=_utilization(entry["booked_minutes"], entry["available_minutes"]),
+                appointments=[AppointmentOut(**appointment) for appointment in entry["appointments"]]
+            ))
         
         result = []
-        for appointment in appointments:
-            appointment["id"] = appointment["_id"]
-            result.append(AppointmentOut(**appointment))
+        for day, staff_buckets in days.items():
+            booked_minutes = sum(bucket.booked_minutes for bucket in staff_buckets)
+            available_minutes = sum(bucket.available_minutes for bucket in staff_buckets)
+            result.append(CalendarDayOut(
+                date=day,
+                appointment_count=sum(bucket.appointment_count for bucket in staff_buckets),
+                booked_minutes=booked_minutes,
+                available_minutes=available_minutes,
+                utilization=_utilization(booked_minutes, available_minutes),
+                staff=staff_buckets
+            ))
         
         return result
 
@@ -132,7 +268,7 @@ class AppointmentService:
         
         update_dict = {}
         if update_data.status is not None:
-            update_dict["status"] = update_data.status
+            update_dict["status"] = AppStatus(update_data.status).value
         if update_data.start_time is not None:
             update_dict["start_time"] = update_data.start_time
         if update_data.end_time is not None:
@@ -151,26 +287,54 @@ class AppointmentService:
                     end_time=update_dict.get("end_time", appointment["end_time"])
                 )
                 await self._check_scheduling_conflicts(temp_appointment, exclude_appointment_id=appointment_id)
+            await reclaim_slots(appointment, update_dict)
             
+            update_dict["updated_at"] = datetime.utcnow()
             result = await self.collection.update_one(
                 {"_id": str(appointment_id)},
                 {"$set": update_dict}
             )
+            if not result.matched_count:
+                raise HTTPException(status_code=404, detail="Appointment not found")
             
-            if result.modified_count:
-                updated_appointment = await self.collection.find_one({"_id": str(appointment_id)})
-                updated_appointment["id"] = updated_appointment["_id"]
-                return AppointmentOut(**updated_appointment)
+            appointment_before, appointment = appointment, await self.collection.find_one({"_id": str(appointment_id)})
+            await get_customer_index_service().sync(appointment)
+            if appointment_before["status"] != AppStatus.canceled and appointment["status"] == AppStatus.canceled:
+                await release_slots(str(appointment["clinic_id"]), str(appointment_id))
+                await on_appointment_canceled({**appointment_before, "updated_at": appointment["updated_at"]})
         
-        raise HTTPException(status_code=500, detail="Failed to update appointment")
+        appointment["id"] = appointment["_id"]
+        return AppointmentOut(**appointment)
 
     async def delete_appointment(self, appointment_id: UUID) -> bool:
         """Delete an appointment"""
-        result = await self.collection.delete_one({"_id": str(appointment_id)})
-        if result.deleted_count:
+        appointment = await self.collection.find_one_and_delete({"_id": str(appointment_id)}, projection={"customer_id": 1, "clinic_id": 1})
+        if appointment:
+            await release_slots(str(appointment["clinic_id"]), str(appointment_id))
+            await get_customer_index_service().remove(str(appointment["customer_id"]), str(appointment_id))
             return True
         raise HTTPException(status_code=404, detail="Appointment not found")
 
+    async def _find_appointments(self, query: dict, start_date: Optional[datetime], end_date: Optional[datetime]) -> List[AppointmentOut]:
+        """Find appointments in the hot collection, reaching into the archive only for old date ranges"""
+        if start_date or end_date:
+            query["start_time"] = {}
+            if start_date:
+                query["start_time"]["$gte"] = start_date
+            if end_date:
+                query["start_time"]["$lte"] = end_date
+        
+        cursor = self.collection.find(query)
+        appointments = await cursor.to_list(length=None)
+        appointments.extend(await get_archive_service().find_archived(query, start_date, end_date))
+        
+        result = []
+        for appointment in appointments:
+            appointment["id"] = appointment["_id"]
+            result.append(AppointmentOut(**appointment))
+        
+        return result
+
     async def _validate_appointment_references(self, appointment_data: AppointmentCreate):
         """Validate that all referenced entities exist"""
         # Check customer exists
@@ -204,6 +368,7 @@ class AppointmentService:
     async def _check_scheduling_conflicts(self, appointment_data: AppointmentCreate, exclude_appointment_id: Optional[UUID] = None):
         """Check for scheduling conflicts with existing appointments"""
         query = {
+            "clinic_id": str(appointment_data.clinic_id),
             "staff_id": str(appointment_data.staff_id),
             "status": {"$ne": AppStatus.canceled},
             "$or": [
@@ -232,4 +397,7 @@ class AppointmentService:
 
 
 # Create a global instance
-appointment_service = AppointmentService()
\ No newline at end of file
+# appointment_service = AppointmentService()
+
+def get_appointment_service() -> AppointmentService:
+    return AppointmentService()
\ No newline at end of file
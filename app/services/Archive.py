@@ -0,0 +1,183 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+from pymongo.errors import BulkWriteError, CollectionInvalid
+from database.database import get_database
+from database.collections import (
+    APPOINTMENT_ARCHIVE_PREFIX, get_appointment_collection, get_appointment_archive_collection
+)
+from models.Appointment import AppStatus
+from services.Job import job_handler, get_job_service
+from config import ARCHIVE_HORIZON_DAYS, ARCHIVE_INTERVAL_SECONDS, ARCHIVE_BATCH_SIZE, ARCHIVE_COMPRESSOR
+
+
+ARCHIVABLE_STATUSES = [AppStatus.completed.value, AppStatus.canceled.value]
+DUPLICATE_KEY_ERROR = 11000
+
+
+def get_archive_cutoff() -> datetime:
+    """Appointments ending before this moment are eligible for the archive"""
+    return datetime.utcnow() - timedelta(days=ARCHIVE_HORIZON_DAYS)
+
+
+def _naive_utc(value: datetime) -> datetime:
+    # Mongo stores naive UTC datetimes
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _month_key(moment: datetime) -> str:
+    return f"{moment.year:04d}_{moment.month:02d}"
+
+
+def _months_between(start: datetime, end: datetime) -> List[str]:
+    months = []
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        months.append(f"{year:04d}_{month:02d}")
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+class AppointmentArchiveService:
+    def __init__(self):
+        self.database = get_database()
+        self.collection = get_appointment_collection()
+
+    async def archive_appointments(self) -> dict:
+        """Move completed/canceled appointments older than the horizon into monthly archives"""
+        cutoff = get_archive_cutoff()
+        query = {
+            "status": {"$in": ARCHIVABLE_STATUSES},
+            "end_time": {"$lt": cutoff}
+        }
+
+        archived = 0
+        months = set()
+        while True:
+            cursor = self.collection.find(query).sort("end_time", 1).limit(ARCHIVE_BATCH_SIZE)
+            appointments = await cursor.to_list(length=ARCHIVE_BATCH_SIZE)
+            if not appointments:
+                break
+
+            by_month: Dict[str, List[dict]] = {}
+            for appointment in appointments:
+                by_month.setdefault(_month_key(appointment["start_time"]), []).append(appointment)
+
+            for month, month_appointments in by_month.items():
+                if month not in months:
+                    await self._ensure_archive_collection(month)
+                await self._copy_to_archive(month, month_appointments)
+                months.add(month)
+
+            # Only delete from the hot collection once every copy has landed, and only what is
+            # still archivable: an appointment changed since it was copied stays live
+            ids = [a["_id"] for a in appointments]
+            result = await self.collection.delete_many({"_id": {"$in": ids}, **query})
+            if result.deleted_count < len(ids):
+                # Drop their copies so they are not found live and archived at once
+                kept = {a["_id"] async for a in self.collection.find({"_id": {"$in": ids}}, {"_id": 1})}
+                for month, month_appointments in by_month.items():
+                    stale = [a["_id"] for a in month_appointments if a["_id"] in kept]
+                    if stale:
+                        await get_appointment_archive_collection(month).delete_many({"_id": {"$in": stale}})
+            archived += result.deleted_count
+
+        return {
+            "archived": archived,
+            "months": sorted(months),
+            "cutoff": cutoff
+        }
+
+    async def find_archived(self, query: dict, start_date: Optional[datetime], end_date: Optional[datetime]) -> List[dict]:
+        """Find archived appointments, only when the date filter reaches past the horizon"""
+        if start_date is None:
+            return []
+
+        result = []
+        for archive in await self.archive_collections(start_date, end_date):
+            result.extend(await archive.find(query).to_list(length=None))
+
+        return result
+
+    async def archive_collections(self, start_date: Optional[datetime], end_date: Optional[datetime]) -> list:
+        """Read handles on the existing monthly archives a date range reaches, oldest first; no start means all"""
+        cutoff = get_archive_cutoff()
+        start_date = _naive_utc(start_date) if start_date else None
+        if start_date is not None and start_date >= cutoff:
+            return []
+
+        last = min(_naive_utc(end_date), cutoff) if end_date else cutoff
+        existing = set(await self._list_archive_months())
+        if start_date is None:
+            months = [month for month in sorted(existing) if month <= _month_key(last)]
+        else:
+            months = [month for month in _months_between(start_date, last) if month in existing]
+        return [get_appointment_archive_collection(month, read_only=True) for month in months]
+
+    async def _copy_to_archive(self, month: str, appointments: List[dict]):
+        """Insert into the archive, tolerating documents copied by an interrupted earlier run"""
+        try:
+            await get_appointment_archive_collection(month).insert_many(appointments, ordered=False)
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            if any(error.get("code") != DUPLICATE_KEY_ERROR for error in errors):
+                raise
+
+    async def _ensure_archive_collection(self, month: str):
+        """Create a monthly archive collection on compressed storage with its lookup indexes"""
+        try:
+            await self.database.create_collection(
+                f"{APPOINTMENT_ARCHIVE_PREFIX}{month}",
+                storageEngine={"wiredTiger": {"configString": f"block_compressor={ARCHIVE_COMPRESSOR}"}}
+            )
+        except CollectionInvalid:
+            # Already there; a run interrupted right after creating it may not have indexed it yet
+            pass
+
+        archive = get_appointment_archive_collection(month)
+        await archive.create_index([("customer_id", 1), ("start_time", 1)])
+        await archive.create_index([("staff_id", 1), ("start_time", 1)])
+        await archive.create_index([("clinic_id", 1), ("start_time", 1)])
+
+    async def _list_archive_months(self) -> List[str]:
+        names = await self.database.list_collection_names(
+            filter={"name": {"$regex": f"^{APPOINTMENT_ARCHIVE_PREFIX}"}}
+        )
+        return [name[len(APPOINTMENT_ARCHIVE_PREFIX):] for name in names]
+
+
+def get_archive_service() -> AppointmentArchiveService:
+    return AppointmentArchiveService()
+
+
+@job_handler("appointments.archive")
+async def archive_appointments_job(payload: dict):
+    result = await get_archive_service().archive_appointments()
+    if result["archived"]:
+        print(f"📦 Archived {result['archived']} appointments into {result['months']}")
+
+
+def init_appointment_archiver(app):
+    archiver_task: Optional[asyncio.Task] = None
+
+    async def schedule_archival():
+        while True:
+            # One archival job per interval, however many API workers are running
+            window = int(datetime.utcnow().timestamp() // ARCHIVE_INTERVAL_SECONDS)
+            try:
+                await get_job_service().enqueue("appointments.archive", idempotency_key=f"appointments.archive:{window}")
+            except Exception as e:
+                print(f"❌ Failed to schedule appointment archival: {e}")
+            await asyncio.sleep(ARCHIVE_INTERVAL_SECONDS)
+
+    @app.on_event("startup")
+    async def start_archiver():
+        nonlocal archiver_task
+        archiver_task = asyncio.create_task(schedule_archival())
+
+    @app.on_event("shutdown")
+    async def stop_archiver():
+        if archiver_task:
+            archiver_task.cancel()
@@ -0,0 +1,146 @@
+import asyncio
+from datetime import datetime, timedelta, time
+from typing import Dict, List
+from uuid import uuid4
+from fastapi import HTTPException
+from database.collections import (
+    get_appointment_collection, get_availability_collection, get_staff_collection,
+    get_service_collection, get_user_collection
+)
+from models.Appointment import AppStatus
+from schemas.Appointment import AppointmentAutoCreate, AppointmentOut
+from services.Booking import book
+from config import ASSIGNMENT_MAX_ATTEMPTS
+
+
+def _overlaps(start_field: str, end_field: str, start: datetime, end: datetime) -> dict:
+    return {"$and": [{"$lt": [start_field, end]}, {"$gt": [end_field, start]}]}
+
+
+def _covers(start_field: str, end_field: str, start: datetime, end: datetime) -> dict:
+    return {"$and": [{"$lte": [start_field, start]}, {"$gte": [end_field, end]}]}
+
+
+class AssignmentService:
+    """Books "any available staff" appointments on the least loaded qualified staff member.
+
+    Availability and bookings of every candidate for the day are read in two batched
+    aggregations whatever the number of staff, instead of one conflict check per staff.
+    """
+
+    def __init__(self):
+        self.collection = get_appointment_collection()
+        self.availability_collection = get_availability_collection()
+        self.staff_collection = get_staff_collection()
+        self.service_collection = get_service_collection()
+        self.user_collection = get_user_collection()
+
+    async def auto_assign(self, data: AppointmentAutoCreate) -> AppointmentOut:
+        service = await self.service_collection.find_one({"_id": str(data.service_id), "clinic_id": str(data.clinic_id)})
+        if not service:
+            raise HTTPException(status_code=404, detail="Service not found in this clinic")
+        customer = await self.user_collection.find_one({"_id": str(data.customer_id)}, {"_id": 1})
+        if not customer:
+            raise HTTPException(status_code=404, detail="Customer not found")
+
+        start = data.start_time
+        end = data.end_time or start + timedelta(minutes=service["duration_minutes"])
+        if end <= start:
+            raise HTTPException(status_code=400, detail="end_time must be after start_time")
+
+        ranked = await self.rank_candidates(str(data.clinic_id), str(data.service_id), start, end)
+        for staff_id in ranked[:ASSIGNMENT_MAX_ATTEMPTS]:
+            appointment = await self._book(data, staff_id, start, end)
+            if appointment:
+                return appointment
+
+        raise HTTPException(status_code=409, detail="No qualified staff member is available at this time")
+
+    async def rank_candidates(self, clinic_id: str, service_id: str, start: datetime, end: datetime) -> List[str]:
+        """Qualified staff free for the slot, least utilized over the day first"""
+        staff_ids = [
+            str(staff["_id"])
+            for staff in await self.staff_collection.find(
+                {"clinic_id": clinic_id, "service_ids": service_id}, {"_id": 1}
+            ).to_list(length=None)
+        ]
+        if not staff_ids:
+            return []
+
+        day_start = datetime.combine(start.date(), time.min, tzinfo=start.tzinfo)
+        day_end = day_start + timedelta(days=1)
+        duration_minutes = {"$divide": [{"$subtract": ["$end_time", "$start_time"]}, 60000]}
+
+        availability_pipeline = [
+            {"$match": {
+                "clinic_id": clinic_id,
+                "staff_id": {"$in": staff_ids},
+                "start_time": {"$lt": day_end},
+                "end_time": {"$gt": day_start}
+            }},
+            {"$group": {
+                "_id": "$staff_id",
+                "available_minutes": {"$sum": duration_minutes},
+                "covers_slot": {"$max": _covers("$start_time", "$end_time", start, end)}
+            }}
+        ]
+        booking_pipeline = [
+            {"$match": {
+                "clinic_id": clinic_id,
+                "staff_id": {"$in": staff_ids},
+                "status": {"$ne": AppStatus.canceled.value},
+                "start_time": {"$lt": day_end},
+                "end_time": {"$gt": day_start}
+            }},
+            {"$group": {
+                "_id": "$staff_id",
+                "booked_minutes": {"$sum": duration_minutes},
+                "conflicts": {"$max": _overlaps("$start_time", "$end_time", start, end)}
+            }}
+        ]
+
+        availability, bookings = await asyncio.gather(
+            self.availability_collection.aggregate(availability_pipeline).to_list(length=None),
+            self.collection.aggregate(booking_pipeline).to_list(length=None)
+        )
+
+        booked: Dict[str, dict] = {row["_id"]: row for row in bookings}
+        ranked = []
+        for row in availability:
+            if not row["covers_slot"]:
+                continue
+            load = booked.get(row["_id"], {"booked_minutes": 0, "conflicts": False})
+            if load["conflicts"]:
+                continue
+            utilization = load["booked_minutes"] / row["available_minutes"] if row["available_minutes"] else 1.0
+            ranked.append((utilization, load["booked_minutes"], row["_id"]))
+
+        ranked.sort()
+        return [staff_id for _, _, staff_id in ranked]
+
+    async def _book(self, data: AppointmentAutoCreate, staff_id: str, start: datetime, end: datetime):
+        """Claim the staff member's slots, then insert; None if another booking got there first.
+
+        The slot claim is the lock every booking path takes, so a racing auto-assign, a
+        booking with a named staff member or a reschedule cannot land on the same slot,
+        and the loser moves on to the next candidate.
+        """
+        appointment_dict = {
+            "_id": str(uuid4()),
+            "customer_id": str(data.customer_id),
+            "clinic_id": str(data.clinic_id),
+            "service_id": str(data.service_id),
+            "staff_id": staff_id,
+            "start_time": start,
+            "end_time": end,
+            "status": AppStatus.booked.value,
+            "updated_at": datetime.utcnow()
+        }
+        if not await book(appointment_dict):
+            return None
+        appointment_dict["id"] = appointment_dict["_id"]
+        return AppointmentOut(**appointment_dict)
+
+
+def get_assignment_service() -> AssignmentService:
+    return AssignmentService()
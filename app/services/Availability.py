@@ -32,9 +32,12 @@ class AvailabilityService:
         
         availability_dict = availability.model_dump()
         availability_dict["_id"] = str(availability.id)
+        # Denormalized so availability can be sharded with the clinic's appointments
+        availability_dict["clinic_id"] = str(staff["clinic_id"])
         # Convert time objects to strings for MongoDB storage
         availability_dict["start_time"] = availability_data.start_time
         availability_dict["end_time"] = availability_data.end_time
+        availability_dict["updated_at"] = datetime.utcnow()
         
         result = await self.collection.insert_one(availability_dict)
         if result.inserted_id:
@@ -118,6 +121,7 @@ class AvailabilityService:
             )
             await self._check_availability_conflicts(temp_availability, exclude_availability_id=availability_id)
             
+            update_dict["updated_at"] = datetime.utcnow()
             result = await self.collection.update_one(
                 {"_id": str(availability_id)},
                 {"$set": update_dict}
@@ -0,0 +1,190 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+from bson import ObjectId
+from fastapi import HTTPException
+from pymongo.errors import BulkWriteError
+from database.collections import get_appointment_collection, get_staff_slot_collection
+from models.Appointment import AppStatus
+from services.Job import job_handler, get_job_service
+from services.Sharding import add_customer_clinic
+from services.CustomerIndex import get_customer_index_service
+from config import BOOKING_SLOT_MINUTES, BOOKING_ORPHAN_CLAIM_SECONDS
+
+
+# Claims on past slots only guard bookings nobody can make any more
+SLOT_RETENTION_SECONDS = 24 * 60 * 60
+SLOT_EPOCH = datetime(2000, 1, 1)
+BACKFILL_BATCH_SIZE = 1000
+
+
+def _naive_utc(moment: datetime) -> datetime:
+    return moment.astimezone(timezone.utc).replace(tzinfo=None) if moment.tzinfo else moment
+
+
+def slot_starts(start_time: datetime, end_time: datetime) -> List[datetime]:
+    """Starts of the BOOKING_SLOT_MINUTES slots a booking touches, the partial ones included"""
+    step = timedelta(minutes=BOOKING_SLOT_MINUTES)
+    start_time, end_time = _naive_utc(start_time), _naive_utc(end_time)
+    slot = start_time - (start_time - SLOT_EPOCH) % step
+    starts = []
+    while slot < end_time:
+        starts.append(slot)
+        slot += step
+    return starts
+
+
+def _slot_id(clinic_id: str, staff_id: str, slot: datetime) -> str:
+    return f"{clinic_id}:{staff_id}:{slot:%Y%m%dT%H%M}"
+
+
+async def claim_slots(appointment_id: str, clinic_id: str, staff_id: str, start_time: datetime, end_time: datetime) -> bool:
+    """Claim the staff member's slots for a booking, all or none; False if any is taken.
+
+    This is the lock every booking path takes before writing its appointment: the slot
+    documents are keyed by clinic, staff and slot start, so of two racing bookings that
+    overlap, the second insert fails on the duplicate key whichever path either came
+    from. Claiming again for an appointment that moved keeps the slots it still covers
+    and gives back the others. Bookings are on a BOOKING_SLOT_MINUTES grid; times off
+    the grid conflict with anything sharing one of their partial slots.
+    """
+    collection = get_staff_slot_collection()
+    wanted: Dict[str, datetime] = {
+        _slot_id(clinic_id, staff_id, slot): slot for slot in slot_starts(start_time, end_time)
+    }
+    owned = {
+        claim["_id"]
+        async for claim in collection.find({"clinic_id": clinic_id, "appointment_id": appointment_id}, {"_id": 1})
+    }
+
+    now = datetime.utcnow()
+    step = timedelta(minutes=BOOKING_SLOT_MINUTES)
+    claims = [
+        {
+            "_id": slot_id, "clinic_id": clinic_id, "staff_id": staff_id, "appointment_id": appointment_id,
+            "slot": slot, "expires_at": slot + step, "claimed_at": now
+        }
+        for slot_id, slot in wanted.items() if slot_id not in owned
+    ]
+    for attempt in range(2):
+        try:
+            if claims:
+                await collection.insert_many(claims, ordered=False)
+            break
+        except BulkWriteError as e:
+            # Give back what this call took before deciding anything
+            await collection.delete_many({"_id": {"$in": [claim["_id"] for claim in claims]}, "appointment_id": appointment_id})
+            if any(error["code"] != 11000 for error in e.details["writeErrors"]):
+                raise
+            if attempt or not await _release_orphans([claims[error["index"]]["_id"] for error in e.details["writeErrors"]]):
+                return False
+
+    stale = owned - wanted.keys()
+    if stale:
+        await collection.delete_many({"_id": {"$in": list(stale)}, "appointment_id": appointment_id})
+    return True
+
+
+async def _release_orphans(slot_ids: List[str]) -> bool:
+    """Drop claims left by bookings that crashed before writing their appointment; True if any went"""
+    collection = get_staff_slot_collection()
+    holders = {}
+    async for claim in collection.find({"_id": {"$in": slot_ids}}, {"appointment_id": 1, "claimed_at": 1}):
+        holders.setdefault(claim["appointment_id"], claim["claimed_at"])
+
+    cutoff = datetime.utcnow() - timedelta(seconds=BOOKING_ORPHAN_CLAIM_SECONDS)
+    suspects = [appointment_id for appointment_id, claimed_at in holders.items() if claimed_at < cutoff]
+    if not suspects:
+        return False
+    # Appointments booked through the legacy route have ObjectId ids
+    ids = suspects + [ObjectId(appointment_id) for appointment_id in suspects if ObjectId.is_valid(appointment_id)]
+    live = {
+        str(appointment["_id"])
+        async for appointment in get_appointment_collection().find(
+            {"_id": {"$in": ids}, "status": {"$ne": AppStatus.canceled.value}}, {"_id": 1}
+        )
+    }
+    orphans = [appointment_id for appointment_id in suspects if appointment_id not in live]
+    if not orphans:
+        return False
+    await collection.delete_many({"appointment_id": {"$in": orphans}, "claimed_at": {"$lt": cutoff}})
+    return True
+
+
+async def claim_or_conflict(appointment_id: str, clinic_id: str, staff_id: str, start_time: datetime, end_time: datetime):
+    if not await claim_slots(appointment_id, clinic_id, staff_id, start_time, end_time):
+        raise HTTPException(status_code=400, detail="Staff is not available at this time")
+
+
+async def book(appointment: dict) -> bool:
+    """Claim the slots of a new booked appointment, insert it and record it for its customer.
+
+    The one write path for new bookings, whichever route they come from; False when
+    another booking holds one of the slots.
+    """
+    clinic_id, appointment_id = appointment["clinic_id"], appointment["_id"]
+    if not await claim_slots(appointment_id, clinic_id, appointment["staff_id"], appointment["start_time"], appointment["end_time"]):
+        return False
+    try:
+        await get_appointment_collection().insert_one(appointment)
+    except Exception:
+        await release_slots(clinic_id, appointment_id)
+        raise
+    await add_customer_clinic(appointment["customer_id"], clinic_id)
+    await get_customer_index_service().add(appointment)
+    return True
+
+
+async def release_slots(clinic_id: str, appointment_id: str):
+    await get_staff_slot_collection().delete_many({"clinic_id": clinic_id, "appointment_id": appointment_id})
+
+
+async def reclaim_slots(appointment: dict, changes: dict):
+    """Claim the slots an update moves an appointment to, before the update is written.
+
+    Canceling frees the slots once the update is written, with release_slots.
+    """
+    if changes.get("status", appointment["status"]) == AppStatus.canceled.value:
+        return
+    start_time = changes.get("start_time", appointment["start_time"])
+    end_time = changes.get("end_time", appointment["end_time"])
+    if appointment["status"] == AppStatus.canceled.value or (start_time, end_time) != (appointment["start_time"], appointment["end_time"]):
+        await claim_or_conflict(str(appointment["_id"]), str(appointment["clinic_id"]), str(appointment["staff_id"]), start_time, end_time)
+
+
+async def ensure_indexes():
+    collection = get_staff_slot_collection()
+    await collection.create_index([("clinic_id", 1), ("appointment_id", 1)])
+    await collection.create_index("expires_at", expireAfterSeconds=SLOT_RETENTION_SECONDS)
+
+
+async def backfill_slots() -> Dict[str, int]:
+    """Claim the slots of upcoming appointments booked before claims existed"""
+    counts = {"claimed": 0, "conflicts": 0}
+    cursor = get_appointment_collection().find(
+        {"status": AppStatus.booked.value, "end_time": {"$gt": datetime.utcnow()}},
+        {"clinic_id": 1, "staff_id": 1, "start_time": 1, "end_time": 1}
+    ).batch_size(BACKFILL_BATCH_SIZE)
+    async for appointment in cursor:
+        claimed = await claim_slots(
+            str(appointment["_id"]), str(appointment["clinic_id"]), str(appointment["staff_id"]),
+            appointment["start_time"], appointment["end_time"]
+        )
+        counts["claimed" if claimed else "conflicts"] += 1
+    return counts
+
+
+@job_handler("booking.backfill_slots")
+async def backfill_slots_job(payload: dict):
+    counts = await backfill_slots()
+    # Conflicts are double bookings made before claims existed; they stay as they are
+    print(f"✅ Backfilled staff slot claims: {counts}")
+
+
+def init_booking(app):
+    @app.on_event("startup")
+    async def prepare_booking():
+        try:
+            await ensure_indexes()
+            await get_job_service().enqueue("booking.backfill_slots", idempotency_key="booking.backfill_slots:v1")
+        except Exception as e:
+            print(f"❌ Failed to prepare staff slot claims: {e}")
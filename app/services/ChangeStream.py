@@ -0,0 +1,201 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional
+from pymongo.errors import OperationFailure, PyMongoError
+from database.database import get_database
+from database.collections import get_change_stream_token_collection
+from models.ChangeEvent import ChangeEvent, OperationType
+from config import (
+    CHANGE_STREAMS_ENABLED, CHANGE_STREAM_LISTENER_NAME, CHANGE_STREAM_POLL_INTERVAL_SECONDS, CHANGE_STREAM_POLL_RESYNC_SECONDS
+)
+
+
+WATCHED_COLLECTIONS = ["clinics", "services", "staff", "availability", "appointments", "reviews"]
+
+# Server errors meaning change streams are unsupported on this deployment (standalone mongod)
+CHANGE_STREAMS_UNSUPPORTED = {40573, 40324}
+CHANGE_STREAM_HISTORY_LOST = 286
+TOKEN_FLUSH_INTERVAL_SECONDS = 1.0
+# How long a polled write may take to commit after stamping updated_at
+POLL_SETTLE_SECONDS = 2.0
+
+Subscriber = Callable[[ChangeEvent], Awaitable[None]]
+Resyncer = Callable[[], Awaitable[None]]
+
+_subscribers: Dict[str, List[Subscriber]] = {name: [] for name in WATCHED_COLLECTIONS}
+_resyncers: List[Resyncer] = []
+
+
+def subscribe(*collections: str):
+    """Register a coroutine to receive change events for the given collections (all when omitted)"""
+    def register(subscriber: Subscriber) -> Subscriber:
+        for name in collections or WATCHED_COLLECTIONS:
+            _subscribers[name].append(subscriber)
+        return subscriber
+    return register
+
+
+def on_resync(resyncer: Resyncer) -> Resyncer:
+    """Register a coroutine that recomputes a subscriber's state when events may have been missed"""
+    _resyncers.append(resyncer)
+    return resyncer
+
+
+async def resync():
+    for resyncer in _resyncers:
+        try:
+            await resyncer()
+        except Exception as e:
+            print(f"❌ Change resync {resyncer.__name__} failed: {e}")
+
+
+async def dispatch(event: ChangeEvent):
+    """Deliver an event to every subscriber; one failing subscriber does not block the others"""
+    for subscriber in _subscribers.get(event.collection, []):
+        try:
+            await subscriber(event)
+        except Exception as e:
+            print(f"❌ Change subscriber {subscriber.__name__} failed on {event.collection}: {e}")
+
+
+class ChangeStreamListener:
+    def __init__(self, name: str = CHANGE_STREAM_LISTENER_NAME):
+        self.name = name
+        self.database = get_database()
+        self.token_collection = get_change_stream_token_collection()
+
+    async def run(self):
+        """Follow the change stream, falling back to polling when it is unavailable"""
+        try:
+            await self._watch()
+        except OperationFailure as e:
+            if e.code not in CHANGE_STREAMS_UNSUPPORTED:
+                raise
+            print("⚠️ Change streams unavailable, falling back to polling")
+            await self._poll()
+
+    async def _watch(self):
+        state = await self.token_collection.find_one({"_id": self.name}) or {}
+        pipeline = [{"$match": {"ns.coll": {"$in": WATCHED_COLLECTIONS}}}]
+
+        while True:
+            try:
+                async with self.database.watch(
+                    pipeline,
+                    full_document="updateLookup",
+                    resume_after=state.get("resume_token")
+                ) as stream:
+                    last_flush = datetime.utcnow()
+                    async for change in stream:
+                        state["resume_token"] = stream.resume_token
+                        # Drops and renames carry no document to hand to subscribers
+                        if change["operationType"] not in OperationType.__members__:
+                            continue
+                        await dispatch(self._to_event(change))
+
+                        # Persisting the token on every event would double the write load
+                        if (datetime.utcnow() - last_flush).total_seconds() >= TOKEN_FLUSH_INTERVAL_SECONDS:
+                            await self._save_state({"resume_token": state["resume_token"]})
+                            last_flush = datetime.utcnow()
+            except OperationFailure as e:
+                if e.code != CHANGE_STREAM_HISTORY_LOST:
+                    raise
+                # The oplog rolled past our token: start over from now, subscribers must resync
+                print("⚠️ Change stream resume token expired, restarting from the current position")
+                state.pop("resume_token", None)
+                await self.token_collection.update_one({"_id": self.name}, {"$unset": {"resume_token": ""}})
+                await resync()
+            except PyMongoError as e:
+                # Transient network errors: resume from the last token we saw
+                print(f"⚠️ Change stream interrupted, resuming: {e}")
+                if state.get("resume_token"):
+                    await self._save_state({"resume_token": state["resume_token"]})
+                await asyncio.sleep(CHANGE_STREAM_POLL_INTERVAL_SECONDS)
+
+    async def _poll(self):
+        """Emit update events for documents whose (updated_at, _id) moved past the stored watermark.
+
+        Every write to a watched collection stamps updated_at. Documents sharing the
+        watermark's timestamp are told apart by _id, and only timestamps older than
+        POLL_SETTLE_SECONDS are read, so a write stamped just before a slower one
+        commits is not skipped.
+
+        A deleted document leaves nothing to read, so no delete event is ever emitted.
+        Subscribers are resynced instead: once when polling starts, as the stream may have
+        been down, then every CHANGE_STREAM_POLL_RESYNC_SECONDS.
+        """
+        state = await self.token_collection.find_one({"_id": self.name}) or {}
+        watermarks = state.get("watermarks", {})
+        started = datetime.utcnow()
+        resynced_at = None
+
+        while True:
+            if resynced_at is None or (datetime.utcnow() - resynced_at).total_seconds() >= CHANGE_STREAM_POLL_RESYNC_SECONDS:
+                await resync()
+                resynced_at = datetime.utcnow()
+            settled = datetime.utcnow() - timedelta(seconds=POLL_SETTLE_SECONDS)
+            for name in WATCHED_COLLECTIONS:
+                watermark = watermarks.get(name)
+                if not isinstance(watermark, dict):
+                    # Nothing stored yet, or a timestamp from before the _id tiebreak
+                    watermark = {"updated_at": watermark or started, "_id": None}
+                query = {"updated_at": {"$gte": watermark["updated_at"], "$lte": settled}}
+                if watermark["_id"] is not None:
+                    query["$or"] = [
+                        {"updated_at": {"$gt": watermark["updated_at"]}},
+                        {"_id": {"$gt": watermark["_id"]}}
+                    ]
+                cursor = self.database[name].find(query).sort([("updated_at", 1), ("_id", 1)])
+                async for document in cursor:
+                    await dispatch(ChangeEvent(
+                        collection=name,
+                        operation=OperationType.update,
+                        document_id=document["_id"],
+                        document=document,
+                        cluster_time=document["updated_at"]
+                    ))
+                    watermark = {"updated_at": document["updated_at"], "_id": document["_id"]}
+                watermarks[name] = watermark
+
+            await self._save_state({"watermarks": watermarks})
+            await asyncio.sleep(CHANGE_STREAM_POLL_INTERVAL_SECONDS)
+
+    async def _save_state(self, state: dict):
+        await self.token_collection.update_one(
+            {"_id": self.name},
+            {"$set": {**state, "updated_at": datetime.utcnow()}},
+            upsert=True
+        )
+
+    def _to_event(self, change: dict) -> ChangeEvent:
+        cluster_time = change.get("clusterTime")
+        return ChangeEvent(
+            collection=change["ns"]["coll"],
+            operation=change["operationType"],
+            document_id=change["documentKey"]["_id"],
+            document=change.get("fullDocument"),
+            cluster_time=cluster_time.as_datetime() if cluster_time else None
+        )
+
+
+def init_change_stream_listener(app):
+    listener_task: Optional[asyncio.Task] = None
+
+    async def run_listener():
+        try:
+            await ChangeStreamListener().run()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"❌ Change stream listener stopped: {e}")
+
+    @app.on_event("startup")
+    async def start_listener():
+        nonlocal listener_task
+        if CHANGE_STREAMS_ENABLED:
+            listener_task = asyncio.create_task(run_listener())
+
+    @app.on_event("shutdown")
+    async def stop_listener():
+        if listener_task:
+            listener_task.cancel()
@@ -1,14 +1,17 @@
 from uuid import UUID
+from datetime import datetime
 from typing import List, Optional
 from fastapi import HTTPException
 from database.collections import get_clinic_collection, get_user_collection
 from models.Clinic import Clinic
 from schemas.Clinic import ClinicCreate, ClinicUpdate, ClinicOut
+from utils.httpcache import VALIDATOR_PROJECTION, Validators, build_validators
 
 
 class ClinicService:
     def __init__(self):
         self.collection = get_clinic_collection()
+        self.read_collection = get_clinic_collection(read_only=True)
         self.user_collection = get_user_collection()
 
     async def create_clinic(self, clinic_data: ClinicCreate, owner_id: UUID) -> ClinicOut:
@@ -37,6 +40,8 @@ class ClinicService:
         
         clinic_dict = clinic.model_dump()
         clinic_dict["_id"] = str(clinic.id)
+        clinic_dict["version"] = 1
+        clinic_dict["updated_at"] = datetime.utcnow()
         
         result = await self.collection.insert_one(clinic_dict)
         if result.inserted_id:
@@ -62,6 +67,13 @@ class ClinicService:
             phone=clinic.get("phone")
         )
 
+    async def get_clinic_validators(self, clinic_id: UUID) -> Optional[Validators]:
+        """Get the ETag/Last-Modified of a clinic without loading the full document"""
+        clinic = await self.collection.find_one({"_id": str(clinic_id)}, VALIDATOR_PROJECTION)
+        if not clinic:
+            return None
+        return build_validators([clinic])
+
     async def get_all_clinics(self, skip: int = 0, limit: int = 100) -> List[ClinicOut]:
         """Get all clinics with pagination"""
         cursor = self.collection.find({}).skip(skip).limit(limit)
@@ -103,7 +115,7 @@ class ClinicService:
             ]
         }
         
-        cursor = self.collection.find(query).skip(skip).limit(limit)
+        cursor = self.read_collection.find(query).skip(skip).limit(limit)
         clinics = await cursor.to_list(length=None)
         
         result = []
@@ -150,9 +162,10 @@ class ClinicService:
             update_dict["phone"] = update_data.phone
         
         if update_dict:
+            update_dict["updated_at"] = datetime.utcnow()
             result = await self.collection.update_one(
                 {"_id": str(clinic_id)},
-                {"$set": update_dict}
+                {"$set": update_dict, "$inc": {"version": 1}}
             )
             
             if result.modified_count:
@@ -196,9 +209,9 @@ class ClinicService:
         # Import here to avoid circular imports
         from database.collections import get_staff_collection, get_service_collection, get_appointment_collection
         
-        staff_collection = get_staff_collection()
-        service_collection = get_service_collection()
-        appointment_collection = get_appointment_collection()
+        staff_collection = get_staff_collection(read_only=True)
+        service_collection = get_service_collection(read_only=True)
+        appointment_collection = get_appointment_collection(read_only=True)
         
         # Count staff members
         staff_count = await staff_collection.count_documents({"clinic_id": str(clinic_id)})
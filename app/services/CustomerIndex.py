@@ -0,0 +1,120 @@
+from datetime import datetime
+from typing import List
+from pymongo import ReturnDocument
+from database.collections import get_appointment_collection, get_customer_appointment_index_collection
+from models.Appointment import AppStatus
+from schemas.Appointment import AppointmentOut
+from services.Sharding import get_customer_clinic_ids
+from config import CUSTOMER_UPCOMING_INDEX_SIZE
+
+
+ENTRY_FIELDS = ("customer_id", "clinic_id", "service_id", "staff_id", "start_time", "end_time", "status")
+
+
+def _to_entry(appointment: dict) -> dict:
+    entry = {"id": str(appointment["_id"])}
+    for field in ENTRY_FIELDS:
+        entry[field] = appointment[field]
+    return entry
+
+
+def _is_upcoming(appointment: dict) -> bool:
+    return appointment["status"] == AppStatus.booked.value and appointment["start_time"] > datetime.utcnow()
+
+
+class CustomerAppointmentIndexService:
+    """One document per customer holding their soonest upcoming appointments.
+
+    Entries are kept sorted by start_time and trimmed to CUSTOMER_UPCOMING_INDEX_SIZE
+    with $slice, so "my upcoming appointments" is a single document read whatever the
+    size of the appointments collection or how it is partitioned.
+    """
+
+    def __init__(self, size: int = CUSTOMER_UPCOMING_INDEX_SIZE):
+        self.size = size
+        self.collection = get_customer_appointment_index_collection()
+        self.read_collection = get_customer_appointment_index_collection(read_only=True)
+
+    async def get_upcoming(self, customer_id: str) -> List[AppointmentOut]:
+        entry = await self.read_collection.find_one({"_id": customer_id})
+        if entry is None:
+            # Customers who booked before the index existed get theirs built on first read
+            upcoming = await self.rebuild(customer_id)
+        else:
+            upcoming = entry["upcoming"]
+
+        now = datetime.utcnow()
+        current = [appointment for appointment in upcoming if appointment["start_time"] > now]
+        # A full list that lost entries to the clock may be hiding later appointments it sliced off
+        if len(upcoming) >= self.size and len(current) < len(upcoming):
+            current = [appointment for appointment in await self.rebuild(customer_id) if appointment["start_time"] > now]
+        return [AppointmentOut(**appointment) for appointment in current]
+
+    async def add(self, appointment: dict):
+        """Insert a booked appointment at its place in the customer's upcoming list"""
+        if not _is_upcoming(appointment):
+            return
+        customer_id = str(appointment["customer_id"])
+        # Past entries go first, so they never hold a slot the new appointment needs. This is
+        # its own update because one update cannot both $pull from and $push to a field.
+        previous = await self.collection.find_one_and_update(
+            {"_id": customer_id, "upcoming.start_time": {"$lte": datetime.utcnow()}},
+            {"$pull": {"upcoming": {"start_time": {"$lte": datetime.utcnow()}}}},
+            projection={"upcoming.id": 1},
+            return_document=ReturnDocument.BEFORE
+        )
+        if previous and len(previous.get("upcoming", [])) >= self.size:
+            # The freed slots belong to appointments the full list sliced off, the new one included
+            await self.rebuild(customer_id)
+            return
+        await self.collection.update_one(
+            {"_id": customer_id},
+            {
+                "$push": {"upcoming": {"$each": [_to_entry(appointment)], "$sort": {"start_time": 1}, "$slice": self.size}},
+                "$set": {"updated_at": datetime.utcnow()}
+            },
+            upsert=True
+        )
+
+    async def remove(self, customer_id: str, appointment_id: str) -> bool:
+        """Drop an appointment, along with entries that are already in the past; True if it rebuilt the index"""
+        previous = await self.collection.find_one_and_update(
+            {"_id": customer_id},
+            {
+                "$pull": {"upcoming": {"$or": [{"id": appointment_id}, {"start_time": {"$lte": datetime.utcnow()}}]}},
+                "$set": {"updated_at": datetime.utcnow()}
+            },
+            projection={"upcoming.id": 1},
+            return_document=ReturnDocument.BEFORE
+        )
+        # A full list may have sliced off later appointments that now fit again
+        if previous and len(previous.get("upcoming", [])) >= self.size:
+            await self.rebuild(customer_id)
+            return True
+        return False
+
+    async def sync(self, appointment: dict):
+        """Reflect a changed appointment: rescheduled ones move, canceled or completed ones leave"""
+        if not await self.remove(str(appointment["customer_id"]), str(appointment["_id"])):
+            await self.add(appointment)
+
+    async def rebuild(self, customer_id: str) -> List[dict]:
+        """Recompute the index from the appointments collection"""
+        query = {"customer_id": customer_id, "status": AppStatus.booked.value, "start_time": {"$gt": datetime.utcnow()}}
+        clinic_ids = await get_customer_clinic_ids(customer_id)
+        if clinic_ids is not None:
+            query["clinic_id"] = {"$in": clinic_ids}
+
+        cursor = get_appointment_collection().find(query, {field: 1 for field in ENTRY_FIELDS}).sort("start_time", 1).limit(self.size)
+        upcoming = [_to_entry(appointment) for appointment in await cursor.to_list(length=self.size)]
+
+        await self.collection.update_one(
+            {"_id": customer_id},
+            {"$set": {"upcoming": upcoming, "updated_at": datetime.utcnow()}},
+            upsert=True
+        )
+        return upcoming
+
+
+def get_customer_index_service() -> CustomerAppointmentIndexService:
+    return CustomerAppointmentIndexService()
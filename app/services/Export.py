@@ -0,0 +1,304 @@
+import csv
+import heapq
+import importlib.util
+import io
+import os
+import zlib
+from datetime import date, datetime, time, timedelta
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from bson import ObjectId
+from fastapi import HTTPException
+from database.collections import (
+    get_appointment_collection, get_review_collection, get_export_checkpoint_collection
+)
+from services.Archive import get_archive_service
+from config import EXPORT_BATCH_SIZE, EXPORT_ROW_GROUP_SIZE, EXPORT_ROWS_PER_FILE
+
+# pyarrow is optional, and imported by the first Parquet export rather than at startup
+PARQUET_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+
+
+# Column name -> (source field, type) per dataset; "_id" is exported as "id"
+DATASETS: Dict[str, Dict[str, Tuple[str, str]]] = {
+    "appointments": {
+        "id": ("_id", "string"),
+        "customer_id": ("customer_id", "string"),
+        "clinic_id": ("clinic_id", "string"),
+        "service_id": ("service_id", "string"),
+        "staff_id": ("staff_id", "string"),
+        "start_time": ("start_time", "timestamp"),
+        "end_time": ("end_time", "timestamp"),
+        "status": ("status", "string"),
+    },
+    "reviews": {
+        "id": ("_id", "string"),
+        "user_id": ("user_id", "string"),
+        "clinic_id": ("clinic_id", "string"),
+        "target_id": ("target_id", "string"),
+        "target_type": ("target_type", "string"),
+        "rating": ("rating", "int"),
+        "comment": ("comment", "string"),
+        "created_at": ("created_at", "timestamp"),
+    },
+}
+
+# Field the date range filter applies to
+DATE_FIELDS = {"appointments": "start_time", "reviews": "created_at"}
+
+FORMATS = {
+    "csv.gz": ("application/gzip", "csv.gz"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+
+def _to_row(dataset: str, document: dict) -> dict:
+    row = {}
+    for column, (field, kind) in DATASETS[dataset].items():
+        value = document.get(field)
+        if value is not None and kind == "string":
+            value = str(value)
+        row[column] = value
+    return row
+
+
+def _after_filter(last_id) -> dict:
+    """Documents sorting after last_id; string ids sort before ObjectIds in BSON order"""
+    if isinstance(last_id, ObjectId):
+        return {"_id": {"$gt": last_id}}
+    return {"$or": [{"_id": {"$gt": last_id}}, {"_id": {"$type": "objectId"}}]}
+
+
+def _id_order(document_id) -> tuple:
+    # BSON order between the id types in use: strings, then ObjectIds
+    return (isinstance(document_id, ObjectId), document_id)
+
+
+async def _merge_by_id(cursors: list) -> AsyncIterator[dict]:
+    """Interleave cursors sorted by _id into one _id-ordered stream, each id once"""
+    iterators = [cursor.__aiter__() for cursor in cursors]
+    heads = []
+
+    async def advance(i: int):
+        try:
+            document = await iterators[i].__anext__()
+        except StopAsyncIteration:
+            return
+        heapq.heappush(heads, (_id_order(document["_id"]), i, document))
+
+    for i in range(len(iterators)):
+        await advance(i)
+    last = None
+    while heads:
+        order, i, document = heapq.heappop(heads)
+        # Mid-archival an appointment is briefly in both the hot collection and its archive
+        if order != last:
+            yield document
+            last = order
+        await advance(i)
+
+
+def parse_after(after: Optional[str]):
+    if after is None:
+        return None
+    return ObjectId(after) if ObjectId.is_valid(after) else after
+
+
+class CsvGzipEncoder:
+    def __init__(self, dataset: str):
+        self.columns = list(DATASETS[dataset])
+        self.compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        self.header_written = False
+
+    def write(self, rows: List[dict]) -> bytes:
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=self.columns)
+        if not self.header_written:
+            writer.writeheader()
+            self.header_written = True
+        for row in rows:
+            writer.writerow({
+                column: value.isoformat() if isinstance(value, datetime) else value
+                for column, value in row.items()
+            })
+        return self.compressor.compress(buffer.getvalue().encode())
+
+    def finish(self) -> bytes:
+        return self.compressor.flush(zlib.Z_FINISH)
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file handing back whatever was written since the last drain"""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+class ParquetEncoder:
+    """Writes one Parquet row group per batch, so memory stays bounded by the row group size"""
+
+    TYPES = {"string": "string", "int": "int64", "timestamp": "timestamp[ms]"}
+
+    def __init__(self, dataset: str):
+        import pyarrow
+        import pyarrow.parquet
+        self.pyarrow = pyarrow
+        self.schema = pyarrow.schema([
+            (column, pyarrow.type_for_alias(self.TYPES[kind]))
+            for column, (_, kind) in DATASETS[dataset].items()
+        ])
+        self.sink = _ChunkSink()
+        self.writer = pyarrow.parquet.ParquetWriter(self.sink, self.schema, compression="zstd")
+
+    def write(self, rows: List[dict]) -> bytes:
+        self.writer.write_table(self.pyarrow.Table.from_pylist(rows, schema=self.schema))
+        return self.sink.drain()
+
+    def finish(self) -> bytes:
+        self.writer.close()
+        return self.sink.drain()
+
+
+ENCODERS = {"csv.gz": CsvGzipEncoder, "parquet": ParquetEncoder}
+
+
+class ExportService:
+    """Streams a filtered collection in _id order, in row groups, from the read replicas"""
+
+    def __init__(self):
+        self.checkpoint_collection = get_export_checkpoint_collection()
+
+    def validate(self, dataset: str, export_format: str):
+        if dataset not in DATASETS:
+            raise HTTPException(status_code=400, detail=f"Unknown dataset, expected one of {', '.join(DATASETS)}")
+        if export_format not in FORMATS:
+            raise HTTPException(status_code=400, detail=f"Unknown format, expected one of {', '.join(FORMATS)}")
+        if export_format == "parquet" and not PARQUET_AVAILABLE:
+            raise HTTPException(status_code=400, detail="Parquet exports need pyarrow installed")
+
+    def build_query(self, dataset: str, filters: dict) -> dict:
+        query = {}
+        if filters.get("clinic_id"):
+            query["clinic_id"] = str(filters["clinic_id"])
+        date_range = {}
+        if filters.get("start_date"):
+            date_range["$gte"] = datetime.combine(date.fromisoformat(str(filters["start_date"])), time.min)
+        if filters.get("end_date"):
+            date_range["$lt"] = datetime.combine(date.fromisoformat(str(filters["end_date"])) + timedelta(days=1), time.min)
+        if date_range:
+            query[DATE_FIELDS[dataset]] = date_range
+        return query
+
+    async def iter_row_groups(self, dataset: str, filters: dict, after=None) -> AsyncIterator[Tuple[List[dict], object]]:
+        """Yield (rows, last _id) batches of EXPORT_ROW_GROUP_SIZE rows.
+
+        Appointments past the archive horizon are read from their monthly archives, merged
+        into the same _id order so that `after` resumes across collections.
+        """
+        collections = [{
+            "appointments": get_appointment_collection,
+            "reviews": get_review_collection,
+        }[dataset](read_only=True)]
+
+        query = self.build_query(dataset, filters)
+        if dataset == "appointments":
+            date_range = query.get(DATE_FIELDS[dataset], {})
+            collections += await get_archive_service().archive_collections(date_range.get("$gte"), date_range.get("$lt"))
+        if after is not None:
+            query = {"$and": [query, _after_filter(after)]}
+        projection = {field: 1 for field, _ in DATASETS[dataset].values()}
+
+        cursors = [
+            collection.find(query, projection).sort("_id", 1).batch_size(EXPORT_BATCH_SIZE)
+            for collection in collections
+        ]
+        rows = []
+        last_id = after
+        async for document in _merge_by_id(cursors):
+            rows.append(_to_row(dataset, document))
+            last_id = document["_id"]
+            if len(rows) >= EXPORT_ROW_GROUP_SIZE:
+                yield rows, last_id
+                rows = []
+        if rows:
+            yield rows, last_id
+
+    async def stream(self, dataset: str, filters: dict, export_format: str, after=None) -> AsyncIterator[bytes]:
+        """Encoded export as a byte stream; pass the last exported id as `after` to resume"""
+        encoder = ENCODERS[export_format](dataset)
+        async for rows, _ in self.iter_row_groups(dataset, filters, after):
+            chunk = encoder.write(rows)
+            if chunk:
+                yield chunk
+        yield encoder.finish()
+
+    async def export_to_directory(self, export_id: str, dataset: str, filters: dict, export_format: str, output_dir: str) -> dict:
+        """Write numbered part files, checkpointing after each one so a rerun resumes where it stopped"""
+        self.validate(dataset, export_format)
+        checkpoint = await self.checkpoint_collection.find_one({"_id": export_id})
+        if checkpoint and (checkpoint["dataset"], checkpoint["format"], checkpoint["filters"]) != (dataset, export_format, filters):
+            raise ValueError(f"Export {export_id} was started with different parameters")
+        if checkpoint and checkpoint.get("done"):
+            return checkpoint
+
+        checkpoint = checkpoint or {
+            "_id": export_id, "dataset": dataset, "format": export_format, "filters": filters,
+            "last_id": None, "parts": 0, "rows": 0, "done": False
+        }
+        os.makedirs(output_dir, exist_ok=True)
+        extension = FORMATS[export_format][1]
+
+        part_file = encoder = None
+        part_rows = 0
+        last_id = checkpoint["last_id"]
+        async for rows, group_last_id in self.iter_row_groups(dataset, filters, checkpoint["last_id"]):
+            if part_file is None:
+                # A part left half written by an interrupted run is simply rewritten
+                part_path = os.path.join(output_dir, f"{dataset}-{checkpoint['parts']:05d}.{extension}")
+                part_file = open(part_path, "wb")
+                encoder = ENCODERS[export_format](dataset)
+            part_file.write(encoder.write(rows))
+            part_rows += len(rows)
+            last_id = group_last_id
+
+            if part_rows >= EXPORT_ROWS_PER_FILE:
+                await self._close_part(checkpoint, part_file, encoder, part_rows, last_id)
+                part_file = None
+                part_rows = 0
+
+        if part_file is not None:
+            await self._close_part(checkpoint, part_file, encoder, part_rows, last_id)
+
+        checkpoint["done"] = True
+        checkpoint["finished_at"] = datetime.utcnow()
+        await self.checkpoint_collection.replace_one({"_id": export_id}, checkpoint, upsert=True)
+        return checkpoint
+
+    async def _close_part(self, checkpoint: dict, part_file, encoder, part_rows: int, last_id):
+        part_file.write(encoder.finish())
+        part_file.close()
+        checkpoint["parts"] += 1
+        checkpoint["rows"] += part_rows
+        checkpoint["last_id"] = last_id
+        checkpoint["updated_at"] = datetime.utcnow()
+        await self.checkpoint_collection.replace_one({"_id": checkpoint["_id"]}, checkpoint, upsert=True)
+
+
+def get_export_service() -> ExportService:
+    return ExportService()
@@ -0,0 +1,421 @@
+import csv
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from uuid import UUID, uuid5
+import orjson
+from bson import ObjectId
+from fastapi import HTTPException
+from pydantic import ValidationError
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from database.collections import (
+    get_clinic_collection, get_service_collection, get_staff_collection,
+    get_availability_collection, get_user_collection
+)
+from schemas.Import import (
+    ClinicImportRow, ServiceImportRow, StaffImportRow, AvailabilityImportRow,
+    ImportCounts, ImportReport, ImportRowError
+)
+from config import IMPORT_BATCH_SIZE, IMPORT_MAX_REPORTED_ERRORS
+
+
+# Parents before children: within a batch, rows are written one entity type at a time in this order
+ROW_MODELS = {
+    "clinic": ClinicImportRow,
+    "service": ServiceImportRow,
+    "staff": StaffImportRow,
+    "availability": AvailabilityImportRow,
+}
+REFERENCED = ("clinic", "service", "staff")
+FORMATS = ("jsonl", "csv")
+
+# Ids of imported documents derive from their natural key, so a re-run updates instead of duplicating
+IMPORT_NAMESPACE = UUID("6f1c2a8e-3d4b-5e7f-9a0b-1c2d3e4f5a6b")
+
+
+def _entity_id(kind: str, *key: str) -> str:
+    return str(uuid5(IMPORT_NAMESPACE, "|".join((kind, *key))))
+
+
+def _id_variants(ids: Iterable[str]) -> List:
+    # Staff ids are ObjectIds, everything else is a UUID string
+    variants = []
+    for value in ids:
+        variants.append(value)
+        if ObjectId.is_valid(value):
+            variants.append(ObjectId(value))
+    return variants
+
+
+def _naive_utc(value: datetime) -> datetime:
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _describe(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in detail['loc']) or 'row'}: {detail['msg']}"
+        for detail in error.errors()
+    )
+
+
+def parse_rows(lines: Iterable[str], import_format: str) -> Iterator[Tuple[int, Optional[dict], Optional[str]]]:
+    """Yield (line number, row, parse error) from JSON lines or a CSV file with a header"""
+    if import_format == "jsonl":
+        for line_number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                row = orjson.loads(line)
+            except orjson.JSONDecodeError as e:
+                yield line_number, None, f"Invalid JSON: {e}"
+                continue
+            if not isinstance(row, dict):
+                yield line_number, None, "Each line must be a JSON object"
+                continue
+            yield line_number, row, None
+        return
+
+    reader = csv.DictReader(lines)
+    for row in reader:
+        # Empty cells mean "not given", so model defaults apply
+        yield reader.line_num, {column: value for column, value in row.items() if column and value not in ("", None)}, None
+
+
+class ImportRun:
+    """State of one import: refs seen so far, counts, and the row error report"""
+
+    def __init__(self, on_error: Optional[Callable[[ImportRowError], None]] = None):
+        self.rows = 0
+        self.failed = 0
+        self.counts = {kind: ImportCounts() for kind in ROW_MODELS}
+        self.errors: List[ImportRowError] = []
+        # ref -> {"_id", "clinic_id"} for rows written by this run, and the same for existing ids used
+        self.refs: Dict[str, Dict[str, dict]] = {kind: {} for kind in REFERENCED}
+        self.existing: Dict[str, Dict[str, dict]] = {kind: {} for kind in REFERENCED}
+        self.on_error = on_error
+
+    def fail(self, line: int, kind: Optional[str], ref: Optional[str], message: str):
+        self.failed += 1
+        error = ImportRowError(
+            line=line,
+            type=None if kind is None else str(kind),
+            ref=None if ref is None else str(ref),
+            error=message
+        )
+        if len(self.errors) < IMPORT_MAX_REPORTED_ERRORS:
+            self.errors.append(error)
+        if self.on_error:
+            self.on_error(error)
+
+    def report(self, seconds: float) -> ImportReport:
+        return ImportReport(
+            rows=self.rows,
+            failed=self.failed,
+            entities=self.counts,
+            errors=self.errors,
+            errors_truncated=self.failed > len(self.errors),
+            seconds=round(seconds, 3)
+        )
+
+
+class ImportService:
+    """Bulk onboarding of clinics, services, staff and availability.
+
+    Rows are validated a batch at a time; every lookup a batch needs (owners, staff users,
+    referenced documents, existing entities, overlapping availability) is one `$in` query,
+    and each entity type is written with a single unordered bulk_write of upserts.
+    """
+
+    def __init__(self):
+        self.clinic_collection = get_clinic_collection()
+        self.service_collection = get_service_collection()
+        self.staff_collection = get_staff_collection()
+        self.availability_collection = get_availability_collection()
+        self.user_collection = get_user_collection()
+        self.collections = {
+            "clinic": self.clinic_collection,
+            "service": self.service_collection,
+            "staff": self.staff_collection,
+            "availability": self.availability_collection,
+        }
+
+    def validate_format(self, import_format: str):
+        if import_format not in FORMATS:
+            raise HTTPException(status_code=400, detail=f"Unknown format, expected one of {', '.join(FORMATS)}")
+
+    async def run(
+        self,
+        lines: Iterable[str],
+        import_format: str,
+        on_error: Optional[Callable[[ImportRowError], None]] = None
+    ) -> ImportReport:
+        """Import a stream of rows; rows may only reference refs defined earlier in the file or in the same batch"""
+        self.validate_format(import_format)
+        started = time.perf_counter()
+        run = ImportRun(on_error)
+
+        batch = []
+        for line, row, error in parse_rows(lines, import_format):
+            run.rows += 1
+            if error:
+                run.fail(line, None, None, error)
+                continue
+            batch.append((line, row))
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                await self._import_batch(run, batch)
+                batch = []
+        if batch:
+            await self._import_batch(run, batch)
+
+        return run.report(time.perf_counter() - started)
+
+    async def _import_batch(self, run: ImportRun, batch: List[Tuple[int, dict]]):
+        by_kind = {kind: [] for kind in ROW_MODELS}
+        for line, row in batch:
+            kind = row.pop("type", None)
+            if kind not in ROW_MODELS:
+                run.fail(line, kind, row.get("ref"), f"Unknown type, expected one of {', '.join(ROW_MODELS)}")
+                continue
+            try:
+                by_kind[kind].append((line, ROW_MODELS[kind](**row)))
+            except ValidationError as e:
+                run.fail(line, kind, row.get("ref"), _describe(e))
+
+        for kind, rows in by_kind.items():
+            if rows:
+                await getattr(self, f"_import_{kind}")(run, rows)
+
+    async def _resolve(self, run: ImportRun, kind: str, keys: Iterable[str]) -> Dict[str, dict]:
+        """Map refs from this import, or ids of existing documents, to {"_id", "clinic_id"}"""
+        found = {}
+        missing = set()
+        for key in keys:
+            entity = run.refs[kind].get(key) or run.existing[kind].get(key)
+            if entity:
+                found[key] = entity
+            else:
+                missing.add(key)
+
+        if missing:
+            async for document in self.collections[kind].find({"_id": {"$in": _id_variants(missing)}}, {"clinic_id": 1}):
+                entity = {"_id": document["_id"], "clinic_id": str(document.get("clinic_id", document["_id"]))}
+                run.existing[kind][str(document["_id"])] = entity
+                found[str(document["_id"])] = entity
+        return found
+
+    async def _users_by_email(self, emails: Iterable[str]) -> Dict[str, dict]:
+        return {
+            user["email"]: user
+            async for user in self.user_collection.find({"email": {"$in": list(set(emails))}}, {"email": 1, "role": 1})
+        }
+
+    async def _import_clinic(self, run: ImportRun, rows: List[Tuple[int, ClinicImportRow]]):
+        owners = await self._users_by_email(row.owner_email for _, row in rows)
+        existing = {
+            clinic["name"]: clinic["_id"]
+            async for clinic in self.clinic_collection.find({"name": {"$in": [row.name for _, row in rows]}}, {"name": 1})
+        }
+
+        planned = []
+        for line, row in rows:
+            owner = owners.get(row.owner_email)
+            if owner is None:
+                run.fail(line, "clinic", row.ref, "Owner not found")
+                continue
+            if owner.get("role") not in ["clinic_manager", "admin"]:
+                run.fail(line, "clinic", row.ref, "Owner must be a clinic manager or an admin")
+                continue
+            clinic_id = existing.get(row.name) or _entity_id("clinic", row.name)
+            planned.append((line, row.ref, clinic_id, {
+                "name": row.name,
+                "address": row.address,
+                "phone": row.phone or "",
+                "description": row.description or "",
+                "owner_id": str(owner["_id"])
+            }))
+        await self._write(run, "clinic", planned)
+
+    async def _import_service(self, run: ImportRun, rows: List[Tuple[int, ServiceImportRow]]):
+        clinics = await self._resolve(run, "clinic", {row.clinic for _, row in rows})
+        existing = {
+            (service["clinic_id"], service["name"]): service["_id"]
+            async for service in self.service_collection.find({
+                "clinic_id": {"$in": list({entity["clinic_id"] for entity in clinics.values()})},
+                "name": {"$in": list({row.name for _, row in rows})}
+            }, {"clinic_id": 1, "name": 1})
+        }
+
+        planned = []
+        for line, row in rows:
+            clinic = clinics.get(row.clinic)
+            if clinic is None:
+                run.fail(line, "service", row.ref, f"Unknown clinic {row.clinic}")
+                continue
+            clinic_id = clinic["clinic_id"]
+            service_id = existing.get((clinic_id, row.name)) or _entity_id("service", clinic_id, row.name)
+            planned.append((line, row.ref, service_id, {
+                "clinic_id": clinic_id,
+                "name": row.name,
+                "description": row.description or "",
+                "duration_minutes": row.duration_minutes,
+                "price": row.price
+            }))
+        await self._write(run, "service", planned)
+
+    async def _import_staff(self, run: ImportRun, rows: List[Tuple[int, StaffImportRow]]):
+        clinics = await self._resolve(run, "clinic", {row.clinic for _, row in rows})
+        services = await self._resolve(run, "service", {service for _, row in rows for service in row.services})
+        users = await self._users_by_email(row.user_email for _, row in rows)
+        existing = {
+            (staff["clinic_id"], staff["user_id"]): staff["_id"]
+            async for staff in self.staff_collection.find({
+                "clinic_id": {"$in": list({entity["clinic_id"] for entity in clinics.values()})},
+                "user_id": {"$in": [str(user["_id"]) for user in users.values()]}
+            }, {"clinic_id": 1, "user_id": 1})
+        }
+
+        planned = []
+        for line, row in rows:
+            clinic = clinics.get(row.clinic)
+            if clinic is None:
+                run.fail(line, "staff", row.ref, f"Unknown clinic {row.clinic}")
+                continue
+            user = users.get(row.user_email)
+            if user is None:
+                run.fail(line, "staff", row.ref, "User not found")
+                continue
+            unknown = [service for service in row.services if service not in services]
+            if unknown:
+                run.fail(line, "staff", row.ref, f"Unknown services {', '.join(unknown)}")
+                continue
+            foreign = [service for service in row.services if services[service]["clinic_id"] != clinic["clinic_id"]]
+            if foreign:
+                run.fail(line, "staff", row.ref, f"Services {', '.join(foreign)} belong to another clinic")
+                continue
+
+            clinic_id = clinic["clinic_id"]
+            user_id = str(user["_id"])
+            staff_id = existing.get((clinic_id, user_id)) or _entity_id("staff", clinic_id, user_id)
+            planned.append((line, row.ref, staff_id, {
+                "id": str(staff_id),
+                "user_id": user_id,
+                "clinic_id": clinic_id,
+                "service_ids": [str(services[service]["_id"]) for service in row.services]
+            }))
+        await self._write(run, "staff", planned)
+
+    async def _import_availability(self, run: ImportRun, rows: List[Tuple[int, AvailabilityImportRow]]):
+        staff = await self._resolve(run, "staff", {row.staff for _, row in rows})
+
+        windows = []
+        for line, row in rows:
+            member = staff.get(row.staff)
+            if member is None:
+                run.fail(line, "availability", None, f"Unknown staff member {row.staff}")
+                continue
+            windows.append((line, str(member["_id"]), member["clinic_id"], _naive_utc(row.start_time), _naive_utc(row.end_time)))
+        if not windows:
+            return
+
+        # Every stored window of these staff members that could overlap one being imported
+        stored: Dict[str, List[Tuple[datetime, datetime, object]]] = {}
+        async for window in self.availability_collection.find({
+            "staff_id": {"$in": list({staff_id for _, staff_id, _, _, _ in windows})},
+            "start_time": {"$lt": max(end for _, _, _, _, end in windows)},
+            "end_time": {"$gt": min(start for _, _, _, start, _ in windows)}
+        }, {"staff_id": 1, "start_time": 1, "end_time": 1}):
+            stored.setdefault(str(window["staff_id"]), []).append((window["start_time"], window["end_time"], window["_id"]))
+
+        planned = []
+        by_staff: Dict[str, List[tuple]] = {}
+        for line, staff_id, clinic_id, start, end in windows:
+            # The same window imported again keeps its document
+            availability_id = next(
+                (stored_id for stored_start, stored_end, stored_id in stored.get(staff_id, [])
+                 if (stored_start, stored_end) == (start, end)),
+                _entity_id("availability", staff_id, start.isoformat(), end.isoformat())
+            )
+            entry = (line, None, availability_id, {
+                "staff_id": staff_id,
+                "clinic_id": clinic_id,
+                "weekday": start.weekday(),
+                "start_time": start,
+                "end_time": end
+            })
+            by_staff.setdefault(staff_id, []).append(entry)
+
+        for staff_id, entries in by_staff.items():
+            replaced = {availability_id for _, _, availability_id, _ in entries}
+            intervals = sorted(
+                [(entry[3]["start_time"], entry[3]["end_time"], entry) for entry in entries]
+                + [(start, end, None) for start, end, stored_id in stored.get(staff_id, []) if stored_id not in replaced],
+                key=lambda interval: (interval[0], interval[1])
+            )
+            # Sorted by start, an interval overlaps an earlier one iff it starts before their
+            # latest end, and a later one iff the next interval starts before it ends
+            latest_end = None
+            for i, (start, end, entry) in enumerate(intervals):
+                overlaps = (latest_end is not None and start < latest_end) or (
+                    i + 1 < len(intervals) and intervals[i + 1][0] < end
+                )
+                latest_end = end if latest_end is None else max(latest_end, end)
+                if entry is None:
+                    continue
+                if overlaps:
+                    run.fail(entry[0], "availability", None, "Overlaps another availability window of this staff member")
+                else:
+                    planned.append(entry)
+        await self._write(run, "availability", planned)
+
+    async def _write(self, run: ImportRun, kind: str, planned: List[Tuple[int, Optional[str], object, dict]]):
+        """Upsert a batch's planned rows with one unordered bulk write; written rows register their ref"""
+        accepted = []
+        batch_refs = set()
+        lines_by_id = {}
+        for line, ref, entity_id, fields in planned:
+            if ref is not None and (ref in batch_refs or (kind in REFERENCED and ref in run.refs[kind])):
+                run.fail(line, kind, ref, f"Duplicate {kind} ref {ref}")
+                continue
+            if entity_id in lines_by_id:
+                run.fail(line, kind, ref, f"Same {kind} as line {lines_by_id[entity_id]}")
+                continue
+            if ref is not None:
+                batch_refs.add(ref)
+            lines_by_id[entity_id] = line
+            accepted.append((line, ref, entity_id, fields))
+
+        if not accepted:
+            return
+        now = datetime.utcnow()
+        operations = [
+            UpdateOne(
+                {"_id": entity_id},
+                {"$set": {**fields, "updated_at": now}, "$inc": {"version": 1}},
+                upsert=True
+            )
+            for _, _, entity_id, fields in accepted
+        ]
+        try:
+            result = (await self.collections[kind].bulk_write(operations, ordered=False)).bulk_api_result
+        except BulkWriteError as e:
+            result = e.details
+
+        failed = {error["index"]: error["errmsg"] for error in result.get("writeErrors", [])}
+        upserted = {item["index"] for item in result.get("upserted", [])}
+        counts = run.counts[kind]
+        for index, (line, ref, entity_id, fields) in enumerate(accepted):
+            if index in failed:
+                run.fail(line, kind, ref, failed[index])
+                continue
+            if index in upserted:
+                counts.inserted += 1
+            else:
+                counts.updated += 1
+            if ref is not None and kind in REFERENCED:
+                run.refs[kind][ref] = {"_id": entity_id, "clinic_id": fields.get("clinic_id", str(entity_id))}
+
+def get_import_service() -> ImportService:
+    return ImportService()
@@ -0,0 +1,288 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Optional
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from database.collections import get_job_collection
+from models.Job import Job, JobStatus
+from config import (
+    JOB_CONCURRENCY, JOB_POLL_INTERVAL_SECONDS, JOB_LEASE_SECONDS,
+    JOB_MAX_ATTEMPTS, JOB_BACKOFF_SECONDS, JOB_BACKOFF_MAX_SECONDS
+)
+
+
+JobHandler = Callable[[dict], Awaitable[None]]
+
+_handlers: Dict[str, JobHandler] = {}
+
+
+def job_handler(job_type: str):
+    """Register a coroutine as the handler for a job type"""
+    def register(handler: JobHandler) -> JobHandler:
+        _handlers[job_type] = handler
+        return handler
+    return register
+
+
+def get_backoff(attempts: int) -> timedelta:
+    """Exponential backoff after the given number of failed attempts"""
+    return timedelta(seconds=min(JOB_BACKOFF_SECONDS * 2 ** (attempts - 1), JOB_BACKOFF_MAX_SECONDS))
+
+
+def _lease_filter(job: dict) -> dict:
+    # Each claim bumps attempts, so it identifies the attempt holding the lease; a worker whose
+    # lease ran out and was re-claimed elsewhere can no longer touch the job
+    return {"_id": job["_id"], "status": JobStatus.running.value, "attempts": job["attempts"]}
+
+
+class JobService:
+    def __init__(self):
+        self.collection = get_job_collection()
+
+    async def ensure_indexes(self):
+        await self.collection.create_index([("status", 1), ("run_at", 1)])
+        await self.collection.create_index(
+            "idempotency_key",
+            unique=True,
+            partialFilterExpression={"idempotency_key": {"$type": "string"}}
+        )
+
+    async def enqueue(
+        self,
+        job_type: str,
+        payload: Optional[dict] = None,
+        idempotency_key: Optional[str] = None,
+        delay_seconds: float = 0,
+        max_attempts: int = JOB_MAX_ATTEMPTS
+    ) -> dict:
+        """Queue a job; a job with the same idempotency key is only queued once"""
+        now = datetime.utcnow()
+        job = Job(
+            type=job_type,
+            payload=payload or {},
+            max_attempts=max_attempts,
+            idempotency_key=idempotency_key,
+            run_at=now + timedelta(seconds=delay_seconds),
+            created_at=now
+        )
+
+        job_dict = job.model_dump(exclude={"id"})
+        job_dict["_id"] = str(job.id)
+        if idempotency_key is None:
+            del job_dict["idempotency_key"]
+
+        try:
+            await self.collection.insert_one(job_dict)
+        except DuplicateKeyError:
+            return await self.collection.find_one({"idempotency_key": idempotency_key})
+
+        return job_dict
+
+    async def claim(self) -> Optional[dict]:
+        """Atomically lease the next ready job, including jobs whose lease expired"""
+        now = datetime.utcnow()
+        return await self.collection.find_one_and_update(
+            {
+                "$or": [
+                    {"status": JobStatus.queued.value, "run_at": {"$lte": now}},
+                    {"status": JobStatus.running.value, "locked_until": {"$lt": now}}
+                ]
+            },
+            {
+                "$set": {
+                    "status": JobStatus.running.value,
+                    "started_at": now,
+                    "locked_until": now + timedelta(seconds=JOB_LEASE_SECONDS)
+                },
+                "$inc": {"attempts": 1}
+            },
+            sort=[("run_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def renew_lease(self, job: dict) -> bool:
+        """Push back the lease of a job still held by this attempt; False once it was lost"""
+        result = await self.collection.update_one(
+            _lease_filter(job),
+            {"$set": {"locked_until": datetime.utcnow() + timedelta(seconds=JOB_LEASE_SECONDS)}}
+        )
+        return result.matched_count == 1
+
+    async def complete(self, job: dict) -> bool:
+        result = await self.collection.update_one(
+            _lease_filter(job),
+            {"$set": {"status": JobStatus.done.value, "finished_at": datetime.utcnow(), "locked_until": None}}
+        )
+        return result.matched_count == 1
+
+    async def fail(self, job: dict, error: str) -> bool:
+        """Reschedule a failed job with backoff, or give up after max_attempts"""
+        now = datetime.utcnow()
+        update = {"last_error": error, "locked_until": None}
+        if job["attempts"] < job["max_attempts"]:
+            update["status"] = JobStatus.queued.value
+            update["run_at"] = now + get_backoff(job["attempts"])
+        else:
+            update["status"] = JobStatus.failed.value
+            update["finished_at"] = now
+
+        result = await self.collection.update_one(_lease_filter(job), {"$set": update})
+        return result.matched_count == 1
+
+    async def get_metrics(self) -> dict:
+        """Queue depth per status and the lag of the oldest ready job"""
+        now = datetime.utcnow()
+        depth = {status.value: 0 for status in JobStatus}
+        async for row in self.collection.aggregate([{"$group": {"_id": "$status", "count": {"$sum": 1}}}]):
+            depth[row["_id"]] = row["count"]
+
+        ready_query = {"status": JobStatus.queued.value, "run_at": {"$lte": now}}
+        ready = await self.collection.count_documents(ready_query)
+        oldest = await self.collection.find_one(ready_query, sort=[("run_at", 1)])
+
+        return {
+            "depth": depth,
+            "ready": ready,
+            "lag_seconds": (now - oldest["run_at"]).total_seconds() if oldest else 0.0,
+            "oldest_ready_type": oldest["type"] if oldest else None
+        }
+
+
+def get_job_service() -> JobService:
+    return JobService()
+
+
+class JobWorker:
+    """Runs queued jobs in-process with a bounded number of concurrent handlers"""
+
+    def __init__(
+        self,
+        concurrency: int = JOB_CONCURRENCY,
+        poll_interval: float = JOB_POLL_INTERVAL_SECONDS,
+        heartbeat_interval: float = JOB_LEASE_SECONDS / 3
+    ):
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.busy = 0
+        self._tasks = set()
+        self._stopping = asyncio.Event()
+
+    async def run(self):
+        """Poll for jobs until stop() is called; Mongo errors back off instead of ending the loop"""
+        service = get_job_service()
+        indexed = False
+        errors = 0
+        while not self._stopping.is_set():
+            await self.semaphore.acquire()
+            try:
+                if not indexed:
+                    await service.ensure_indexes()
+                    indexed = True
+                job = await service.claim()
+            except Exception as e:
+                self.semaphore.release()
+                errors += 1
+                delay = min(self.poll_interval * 2 ** errors, JOB_BACKOFF_MAX_SECONDS)
+                print(f"❌ Job worker could not reach the queue ({e}), retrying in {delay:.1f}s")
+                await self._sleep(delay)
+                continue
+            errors = 0
+
+            if job is None:
+                self.semaphore.release()
+                await self._sleep(self.poll_interval)
+                continue
+
+            task = asyncio.create_task(self._execute(service, job))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def run_until_idle(self) -> int:
+        """Run every ready job to completion and return how many ran; used to drive workers in tests"""
+        service = get_job_service()
+        ran = 0
+        while True:
+            jobs = []
+            for _ in range(self.concurrency):
+                job = await service.claim()
+                if job is None:
+                    break
+                jobs.append(job)
+            if not jobs:
+                return ran
+            await asyncio.gather(*(self._execute(service, job, acquired=False) for job in jobs))
+            ran += len(jobs)
+
+    async def stop(self):
+        """Stop claiming new jobs and wait for the running ones to finish"""
+        self._stopping.set()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _sleep(self, seconds: float):
+        try:
+            await asyncio.wait_for(self._stopping.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _heartbeat(self, service: JobService, job: dict):
+        """Keep renewing the lease while the handler runs, so long jobs are not claimed twice"""
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                if not await service.renew_lease(job):
+                    print(f"❌ Job {job['_id']} ({job['type']}) lost its lease to another worker")
+                    return
+            except Exception as e:
+                print(f"❌ Failed to renew the lease of job {job['_id']}: {e}")
+
+    async def _execute(self, service: JobService, job: dict, acquired: bool = True):
+        self.busy += 1
+        heartbeat = asyncio.create_task(self._heartbeat(service, job))
+        try:
+            handler = _handlers.get(job["type"])
+            if handler is None:
+                await service.fail(job, f"No handler registered for job type {job['type']}")
+                return
+            try:
+                await handler(job["payload"])
+            except Exception as e:
+                print(f"❌ Job {job['_id']} ({job['type']}) failed: {e}")
+                await service.fail(job, str(e))
+                return
+            await service.complete(job)
+        except Exception as e:
+            # The queue itself is unreachable: the lease runs out and another attempt picks it up
+            print(f"❌ Failed to record the outcome of job {job['_id']} ({job['type']}): {e}")
+        finally:
+            heartbeat.cancel()
+            self.busy -= 1
+            if acquired:
+                self.semaphore.release()
+
+
+job_worker: Optional[JobWorker] = None
+
+
+def get_job_worker() -> Optional[JobWorker]:
+    return job_worker
+
+
+def init_job_worker(app):
+    worker_task: Optional[asyncio.Task] = None
+
+    @app.on_event("startup")
+    async def start_job_worker():
+        global job_worker
+        nonlocal worker_task
+        job_worker = JobWorker()
+        worker_task = asyncio.create_task(job_worker.run())
+
+    @app.on_event("shutdown")
+    async def stop_job_worker():
+        if job_worker:
+            await job_worker.stop()
+        if worker_task:
+            worker_task.cancel()
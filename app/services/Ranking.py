@@ -0,0 +1,280 @@
+import asyncio
+import math
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, List, Optional
+from fastapi import HTTPException
+from pymongo import UpdateOne
+from database.collections import get_ranking_score_collection, get_review_collection, get_service_collection
+from models.Review import ReviewTarget
+from schemas.Ranking import RankingOut
+from services.Job import job_handler, get_job_service
+from config import (
+    RANKING_HALF_LIFE_DAYS, RANKING_PRIOR_RATING, RANKING_PRIOR_WEIGHT,
+    RANKING_REDECAY_INTERVAL_SECONDS, RANKING_BATCH_SIZE
+)
+
+# numpy is imported on first use, not at startup: only the periodic rescoring needs it.
+if TYPE_CHECKING:
+    import numpy as np
+
+
+# Review weights are exp(rate * (created_at - epoch)): they never change once written, so a
+# review only ever adds to its target's sums, and decaying them to time T is one multiplication
+DECAY_EPOCH = datetime(2024, 1, 1)
+DECAY_RATE_PER_SECOND = math.log(2) / (RANKING_HALF_LIFE_DAYS * 86400)
+MAX_TOP = 100
+SUMS = ("weighted_sum", "weight", "reviews", "rating_sum")
+
+
+def review_weight(created_at: datetime) -> float:
+    return math.exp(DECAY_RATE_PER_SECOND * (created_at - DECAY_EPOCH).total_seconds())
+
+
+def decay_factor(moment: datetime) -> float:
+    return math.exp(-DECAY_RATE_PER_SECOND * (moment - DECAY_EPOCH).total_seconds())
+
+
+def bayesian_scores(weighted_sums: "np.ndarray", weights: "np.ndarray", decay: float) -> "np.ndarray":
+    """Decayed mean rating shrunk towards the prior; few or old reviews stay close to it"""
+    prior = RANKING_PRIOR_WEIGHT * RANKING_PRIOR_RATING
+    return (prior + weighted_sums * decay) / (RANKING_PRIOR_WEIGHT + weights * decay)
+
+
+def _score_expression(decay: float) -> dict:
+    # bayesian_scores() as an update pipeline stage, so incremental writes rescore atomically
+    return {"$divide": [
+        {"$add": [RANKING_PRIOR_WEIGHT * RANKING_PRIOR_RATING, {"$multiply": ["$weighted_sum", decay]}]},
+        {"$add": [RANKING_PRIOR_WEIGHT, {"$multiply": ["$weight", decay]}]}
+    ]}
+
+
+def _ranking_id(target_id: str, target_type) -> str:
+    return f"{ReviewTarget(target_type).value}:{target_id}"
+
+
+def _to_out(ranking: dict) -> RankingOut:
+    return RankingOut(
+        target_id=ranking["target_id"],
+        target_type=ranking["target_type"],
+        clinic_id=ranking.get("clinic_id"),
+        service_name=ranking.get("service_name"),
+        score=round(ranking["score"], 4),
+        average_rating=round(ranking["rating_sum"] / ranking["reviews"], 2) if ranking["reviews"] else None,
+        reviews=ranking["reviews"],
+        scored_at=ranking["scored_at"]
+    )
+
+
+class RankingService:
+    """Per-target ranking scores: a Bayesian average with exponential time decay.
+
+    Each target keeps the sums of its review ratings and weights relative to a fixed epoch,
+    moved on every review write and rescored in the same atomic update. Since decay
+    changes every score continuously, a periodic job rescores all targets in numpy batches.
+    Rankings are then read straight off the (target_type, ..., score) indexes.
+    """
+
+    def __init__(self):
+        self.collection = get_ranking_score_collection()
+        self.read_collection = get_ranking_score_collection(read_only=True)
+        self.review_collection = get_review_collection()
+        self.service_collection = get_service_collection()
+
+    async def ensure_indexes(self):
+        await self.collection.create_index([("target_type", 1), ("score", -1)])
+        await self.collection.create_index([("target_type", 1), ("clinic_id", 1), ("score", -1)])
+        # "Top clinics for service X": services of that name across clinics, best first
+        await self.collection.create_index([("target_type", 1), ("service_name", 1), ("score", -1)])
+
+    async def get_top(
+        self,
+        target_type: ReviewTarget,
+        limit: int = 20,
+        clinic_id: Optional[str] = None,
+        service_name: Optional[str] = None
+    ) -> List[RankingOut]:
+        if not 1 <= limit <= MAX_TOP:
+            raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_TOP}")
+        if service_name is not None and target_type != ReviewTarget.service:
+            raise HTTPException(status_code=400, detail="service_name only applies to service rankings")
+
+        query = {"target_type": target_type.value, "reviews": {"$gt": 0}}
+        if clinic_id:
+            query["clinic_id"] = clinic_id
+        if service_name is not None:
+            query["service_name"] = service_name
+        cursor = self.read_collection.find(query).sort("score", -1).limit(limit)
+        return [_to_out(ranking) for ranking in await cursor.to_list(length=limit)]
+
+    async def get_ranking(self, target_id: str, target_type: ReviewTarget) -> RankingOut:
+        ranking = await self.read_collection.find_one({"_id": _ranking_id(target_id, target_type)})
+        if not ranking:
+            raise HTTPException(status_code=404, detail="No ranking for this target yet")
+        return _to_out(ranking)
+
+    async def on_review_created(self, review: dict):
+        weight = review_weight(review["created_at"])
+        await self._apply(review, review["rating"] * weight, weight, 1, review["rating"])
+
+    async def on_review_rerated(self, review: dict, previous_rating: int):
+        change = review["rating"] - previous_rating
+        if change:
+            await self._apply(review, change * review_weight(review["created_at"]), 0, 0, change)
+
+    async def on_review_deleted(self, review: dict):
+        weight = review_weight(review["created_at"])
+        await self._apply(review, -review["rating"] * weight, -weight, -1, -review["rating"])
+
+    async def _apply(self, review: dict, weighted_sum: float, weight: float, reviews: int, rating_sum: int):
+        """Move a target's sums and rescore it at the current time, in one atomic update"""
+        target_id, target_type = str(review["target_id"]), ReviewTarget(review["target_type"])
+        fields = {"target_id": target_id, "target_type": target_type.value, "clinic_id": review.get("clinic_id")}
+        if target_type == ReviewTarget.service:
+            service = await self.service_collection.find_one({"_id": target_id}, {"name": 1})
+            fields["service_name"] = service["name"] if service else None
+
+        now = datetime.utcnow()
+        await self.collection.update_one({"_id": _ranking_id(target_id, target_type)}, [
+            {"$set": {
+                **{name: {"$literal": value} for name, value in fields.items()},
+                "weighted_sum": {"$add": [{"$ifNull": ["$weighted_sum", 0]}, weighted_sum]},
+                "weight": {"$add": [{"$ifNull": ["$weight", 0]}, weight]},
+                "reviews": {"$add": [{"$ifNull": ["$reviews", 0]}, reviews]},
+                "rating_sum": {"$add": [{"$ifNull": ["$rating_sum", 0]}, rating_sum]},
+                "updated_at": now,
+            }},
+            {"$set": {"score": _score_expression(decay_factor(now)), "scored_at": now}},
+        ], upsert=True)
+
+    async def redecay(self) -> int:
+        """Rescore every target at the current time, a batch of scores per numpy call"""
+        now = datetime.utcnow()
+        decay = decay_factor(now)
+        rescored = 0
+        batch = []
+        async for ranking in self.collection.find({}, {"weighted_sum": 1, "weight": 1}).batch_size(RANKING_BATCH_SIZE):
+            batch.append(ranking)
+            if len(batch) >= RANKING_BATCH_SIZE:
+                rescored += await self._rescore(batch, decay, now)
+                batch = []
+        if batch:
+            rescored += await self._rescore(batch, decay, now)
+        return rescored
+
+    async def _rescore(self, rankings: List[dict], decay: float, now: datetime) -> int:
+        import numpy as np
+        weighted_sums = np.array([ranking["weighted_sum"] for ranking in rankings], dtype=np.float64)
+        weights = np.array([ranking["weight"] for ranking in rankings], dtype=np.float64)
+        scores = bayesian_scores(weighted_sums, weights, decay)
+        # Matching on the sums read skips targets a review write rescored in the meantime
+        operations = [
+            UpdateOne(
+                {"_id": ranking["_id"], "weighted_sum": ranking["weighted_sum"], "weight": ranking["weight"]},
+                {"$set": {"score": float(score), "scored_at": now}}
+            )
+            for ranking, score in zip(rankings, scores)
+        ]
+        await self.collection.bulk_write(operations, ordered=False)
+        return len(operations)
+
+    async def rebuild(self) -> int:
+        """Recompute every target's sums from the reviews collection, then drop targets without reviews"""
+        started = datetime.utcnow()
+        decay = decay_factor(started)
+        weight = {"$exp": {"$multiply": [DECAY_RATE_PER_SECOND / 1000, {"$subtract": ["$created_at", DECAY_EPOCH]}]}}
+        pipeline = [
+            {"$group": {
+                "_id": {"target_id": "$target_id", "target_type": "$target_type"},
+                "clinic_id": {"$first": "$clinic_id"},
+                "reviews": {"$sum": 1},
+                "rating_sum": {"$sum": "$rating"},
+                "weight": {"$sum": weight},
+                "weighted_sum": {"$sum": {"$multiply": ["$rating", weight]}},
+            }}
+        ]
+
+        rebuilt = 0
+        batch = []
+        async for row in self.review_collection.aggregate(pipeline, allowDiskUse=True):
+            batch.append(row)
+            if len(batch) >= RANKING_BATCH_SIZE:
+                rebuilt += await self._replace(batch, decay, started)
+                batch = []
+        if batch:
+            rebuilt += await self._replace(batch, decay, started)
+
+        await self.collection.delete_many({"scored_at": {"$lt": started}})
+        return rebuilt
+
+    async def _replace(self, rows: List[dict], decay: float, started: datetime) -> int:
+        """Write rebuilt sums, except over targets a review write has moved since the rebuild started"""
+        service_ids = [row["_id"]["target_id"] for row in rows if row["_id"]["target_type"] == ReviewTarget.service.value]
+        names: Dict[str, str] = {
+            service["_id"]: service["name"]
+            async for service in self.service_collection.find({"_id": {"$in": service_ids}}, {"name": 1})
+        } if service_ids else {}
+
+        operations = []
+        for row in rows:
+            target_id, target_type = row["_id"]["target_id"], row["_id"]["target_type"]
+            fields = {"target_id": target_id, "target_type": target_type, "clinic_id": row["clinic_id"]}
+            if target_type == ReviewTarget.service.value:
+                fields["service_name"] = names.get(target_id)
+            # A target a review write moved after `started` keeps its sums: they count that
+            # write, which the aggregate may have read before it landed
+            sums = {
+                name: {"$cond": [{"$gte": ["$updated_at", started]}, f"${name}", {"$literal": row[name]}]}
+                for name in SUMS
+            }
+            operations.append(UpdateOne({"_id": _ranking_id(target_id, target_type)}, [
+                {"$set": {**{name: {"$literal": value} for name, value in fields.items()}, **sums}},
+                {"$set": {"score": _score_expression(decay), "scored_at": started}},
+            ], upsert=True))
+        await self.collection.bulk_write(operations, ordered=False)
+        return len(operations)
+
+
+def get_ranking_service() -> RankingService:
+    return RankingService()
+
+
+@job_handler("ranking.redecay")
+async def redecay_rankings_job(payload: dict):
+    rescored = await get_ranking_service().redecay()
+    print(f"✅ Rescored {rescored} ranking targets")
+
+
+@job_handler("ranking.rebuild")
+async def rebuild_rankings_job(payload: dict):
+    rebuilt = await get_ranking_service().rebuild()
+    print(f"✅ Rebuilt rankings of {rebuilt} targets from reviews")
+
+
+def init_ranking(app):
+    ranking_task: Optional[asyncio.Task] = None
+
+    async def schedule_redecay():
+        while True:
+            # One rescoring job per interval, however many API workers are running
+            window = int(datetime.utcnow().timestamp() // RANKING_REDECAY_INTERVAL_SECONDS)
+            try:
+                await get_job_service().enqueue("ranking.redecay", idempotency_key=f"ranking.redecay:{window}")
+            except Exception as e:
+                print(f"❌ Failed to schedule ranking rescoring: {e}")
+            await asyncio.sleep(RANKING_REDECAY_INTERVAL_SECONDS)
+
+    @app.on_event("startup")
+    async def start_ranking():
+        nonlocal ranking_task
+        try:
+            await get_ranking_service().ensure_indexes()
+            # Scores for reviews written before rankings existed, computed once per deployment
+            await get_job_service().enqueue("ranking.rebuild", idempotency_key="ranking.rebuild:v1")
+        except Exception as e:
+            print(f"❌ Failed to prepare rankings: {e}")
+        ranking_task = asyncio.create_task(schedule_redecay())
+
+    @app.on_event("shutdown")
+    async def stop_ranking():
+        if ranking_task:
+            ranking_task.cancel()
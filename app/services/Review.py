@@ -1,22 +1,35 @@
+import asyncio
 from uuid import UUID
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
 from fastapi import HTTPException
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 from database.collections import (
     get_review_collection, get_user_collection, get_clinic_collection,
-    get_staff_collection, get_service_collection
+    get_staff_collection, get_service_collection, get_review_helpful_vote_collection
 )
 from models.Review import Review, ReviewTarget
-from schemas.Review import ReviewCreate, ReviewUpdate, ReviewOut
+from schemas.Review import ReviewCreate, ReviewUpdate, ReviewOut, ReviewStatsTarget
+from utils.fast_response import get_projection
+from services.Sharding import (
+    add_user_review_clinic, clinic_filter, get_user_review_clinic_ids, get_target_clinic_id, get_target_clinic_ids
+)
+from services.ReviewFeed import get_review_feed_service
+from services.Ranking import get_ranking_service
+from utils.httpcache import VALIDATOR_PROJECTION, Validators, build_list_validators
+from config import REVIEW_STATS_BATCH_MAX_TARGETS
 
 
 class ReviewService:
     def __init__(self):
         self.collection = get_review_collection()
+        self.read_collection = get_review_collection(read_only=True)
         self.user_collection = get_user_collection()
         self.clinic_collection = get_clinic_collection()
         self.staff_collection = get_staff_collection()
         self.service_collection = get_service_collection()
+        self.helpful_vote_collection = get_review_helpful_vote_collection()
 
     async def create_review(self, review_data: ReviewCreate) -> ReviewOut:
         """Create a new review"""
@@ -52,9 +65,17 @@ class ReviewService:
         review_dict["_id"] = str(review.id)
         review_dict["user_id"] = str(review_data.user_id)
         review_dict["created_at"] = datetime.utcnow()
+        review_dict["updated_at"] = review_dict["created_at"]
+        review_dict["version"] = 1
+        review_dict["helpful_count"] = 0
+        # Denormalized shard key: reviews are partitioned by the clinic owning the target
+        review_dict["clinic_id"] = await get_target_clinic_id(str(review_data.target_id), review_data.target_type)
         
         result = await self.collection.insert_one(review_dict)
         if result.inserted_id:
+            await add_user_review_clinic(review_dict["user_id"], review_dict["clinic_id"])
+            await get_review_feed_service().add(review_dict)
+            await get_ranking_service().on_review_created(review_dict)
             return ReviewOut(
                 id=review.id,
                 user_id=review_data.user_id,
@@ -80,17 +101,15 @@ class ReviewService:
             target_type=review["target_type"],
             rating=review["rating"],
             comment=review.get("comment"),
-            created_at=review["created_at"]
+            created_at=review["created_at"],
+            helpful_count=review.get("helpful_count", 0)
         )
 
     async def get_reviews_by_target(self, target_id: UUID, target_type: ReviewTarget, skip: int = 0, limit: int = 100) -> List[ReviewOut]:
         """Get all reviews for a specific target"""
-        query = {
-            "target_id": str(target_id),
-            "target_type": target_type
-        }
+        query = await self._target_query(target_id, target_type)
         
-        cursor = self.collection.find(query).sort("created_at", -1).skip(skip).limit(limit)
+        cursor = self.read_collection.find(query).sort("created_at", -1).skip(skip).limit(limit)
         reviews = await cursor.to_list(length=None)
         
         result = []
@@ -102,14 +121,35 @@ class ReviewService:
                 target_type=review["target_type"],
                 rating=review["rating"],
                 comment=review.get("comment"),
-                created_at=review["created_at"]
+                created_at=review["created_at"],
+                helpful_count=review.get("helpful_count", 0)
             ))
         
         return result
 
+    async def get_reviews_by_target_documents(self, target_id: UUID, target_type: ReviewTarget, skip: int = 0, limit: int = 100) -> List[dict]:
+        """Get raw review documents for a target, projected to the ReviewOut fields"""
+        query = await self._target_query(target_id, target_type)
+        
+        cursor = self.read_collection.find(query, get_projection(ReviewOut)).sort("created_at", -1).skip(skip).limit(limit)
+        return await cursor.to_list(length=limit)
+
+    async def get_reviews_by_target_validators(self, target_id: UUID, target_type: ReviewTarget, skip: int = 0, limit: int = 100) -> Validators:
+        """Get the ETag/Last-Modified of a page of target reviews from a projection-only query"""
+        query = await self._target_query(target_id, target_type)
+        
+        # Same handle as the page itself, so the ETag describes the body actually served
+        cursor = self.read_collection.find(query, VALIDATOR_PROJECTION).sort("created_at", -1).skip(skip).limit(limit)
+        return build_list_validators(await cursor.to_list(length=limit))
+
     async def get_reviews_by_user(self, user_id: UUID, skip: int = 0, limit: int = 100) -> List[ReviewOut]:
         """Get all reviews by a specific user"""
-        cursor = self.collection.find({"user_id": str(user_id)}).sort("created_at", -1).skip(skip).limit(limit)
+        query = {"user_id": str(user_id)}
+        # Route to the clinics the user reviewed in; users not in the lookup yet fall back to a broadcast
+        clinic_ids = await get_user_review_clinic_ids(str(user_id))
+        if clinic_ids is not None:
+            query["clinic_id"] = {"$in": clinic_ids}
+        cursor = self.read_collection.find(query).sort("created_at", -1).skip(skip).limit(limit)
         reviews = await cursor.to_list(length=None)
         
         result = []
@@ -121,7 +161,8 @@ class ReviewService:
                 target_type=review["target_type"],
                 rating=review["rating"],
                 comment=review.get("comment"),
-                created_at=review["created_at"]
+                created_at=review["created_at"],
+                helpful_count=review.get("helpful_count", 0)
             ))
         
         return result
@@ -149,11 +190,13 @@ class ReviewService:
             update_dict["updated_at"] = datetime.utcnow()
             result = await self.collection.update_one(
                 {"_id": str(review_id)},
-                {"$set": update_dict}
+                {"$set": update_dict, "$inc": {"version": 1}}
             )
             
             if result.modified_count:
                 updated_review = await self.collection.find_one({"_id": str(review_id)})
+                await get_review_feed_service().update(updated_review)
+                await get_ranking_service().on_review_rerated(updated_review, review["rating"])
                 return ReviewOut(
                     id=UUID(updated_review["_id"]),
                     user_id=UUID(updated_review["user_id"]),
@@ -161,7 +204,8 @@ class ReviewService:
                     target_type=updated_review["target_type"],
                     rating=updated_review["rating"],
                     comment=updated_review.get("comment"),
-                    created_at=updated_review["created_at"]
+                    created_at=updated_review["created_at"],
+                    helpful_count=updated_review.get("helpful_count", 0)
                 )
         
         raise HTTPException(status_code=500, detail="Failed to update review")
@@ -182,18 +226,64 @@ class ReviewService:
         
         result = await self.collection.delete_one({"_id": str(review_id)})
         if result.deleted_count:
+            await get_review_feed_service().remove(review)
+            await get_ranking_service().on_review_deleted(review)
+            await self.helpful_vote_collection.delete_many({"review_id": str(review_id)})
             return True
         
         raise HTTPException(status_code=500, detail="Failed to delete review")
 
+    async def set_helpful_vote(self, review_id: UUID, user_id: UUID, helpful: bool) -> ReviewOut:
+        """Add or withdraw a user's "helpful" vote; voting twice or withdrawing twice changes nothing"""
+        review = await self.collection.find_one({"_id": str(review_id)}, {"user_id": 1})
+        if not review:
+            raise HTTPException(status_code=404, detail="Review not found")
+        if str(review["user_id"]) == str(user_id):
+            raise HTTPException(status_code=400, detail="You cannot vote on your own review")
+        if not await self.user_collection.find_one({"_id": str(user_id)}, {"_id": 1}):
+            raise HTTPException(status_code=404, detail="User not found")
+
+        # One vote document per user and review makes the counter change at most once
+        vote_id = f"{review_id}:{user_id}"
+        if helpful:
+            try:
+                await self.helpful_vote_collection.insert_one({
+                    "_id": vote_id, "review_id": str(review_id), "user_id": str(user_id), "created_at": datetime.utcnow()
+                })
+                changed = 1
+            except DuplicateKeyError:
+                changed = 0
+        else:
+            changed = -(await self.helpful_vote_collection.delete_one({"_id": vote_id})).deleted_count
+
+        if changed:
+            review = await self.collection.find_one_and_update(
+                {"_id": str(review_id)},
+                {"$inc": {"helpful_count": changed, "version": 1}, "$set": {"updated_at": datetime.utcnow()}},
+                return_document=ReturnDocument.AFTER
+            )
+            if not review:
+                raise HTTPException(status_code=404, detail="Review not found")
+            await get_review_feed_service().update(review)
+        else:
+            review = await self.collection.find_one({"_id": str(review_id)})
+
+        return ReviewOut(
+            id=UUID(review["_id"]),
+            user_id=UUID(review["user_id"]),
+            target_id=UUID(review["target_id"]),
+            target_type=review["target_type"],
+            rating=review["rating"],
+            comment=review.get("comment"),
+            created_at=review["created_at"],
+            helpful_count=review.get("helpful_count", 0)
+        )
+
     async def get_review_statistics(self, target_id: UUID, target_type: ReviewTarget) -> dict:
         """Get review statistics for a target"""
         pipeline = [
             {
-                "$match": {
-                    "target_id": str(target_id),
-                    "target_type": target_type
-                }
+                "$match": await self._target_query(target_id, target_type)
             },
             {
                 "$group": {
@@ -207,7 +297,7 @@ class ReviewService:
             }
         ]
         
-        result = await self.collection.aggregate(pipeline).to_list(length=1)
+        result = await self.read_collection.aggregate(pipeline).to_list(length=1)
         
         if not result:
             return {
@@ -233,6 +323,72 @@ class ReviewService:
             "rating_distribution": rating_dist
         }
 
+    async def get_review_statistics_batch(self, targets: List[ReviewStatsTarget]) -> Dict[str, dict]:
+        """Statistics of many targets from one aggregation, keyed by target_type:target_id"""
+        ids_by_type: Dict[ReviewTarget, List[str]] = {}
+        for target in targets:
+            ids = ids_by_type.setdefault(ReviewTarget(target.target_type), [])
+            if str(target.target_id) not in ids:
+                ids.append(str(target.target_id))
+        if sum(len(ids) for ids in ids_by_type.values()) > REVIEW_STATS_BATCH_MAX_TARGETS:
+            raise HTTPException(status_code=400, detail=f"At most {REVIEW_STATS_BATCH_MAX_TARGETS} targets per batch")
+
+        # Staff and service clinics are resolved concurrently, one $in query per type
+        resolved = await asyncio.gather(*(get_target_clinic_ids(target_type, ids) for target_type, ids in ids_by_type.items()))
+        clauses = []
+        for (target_type, ids), clinic_ids in zip(ids_by_type.items(), resolved):
+            clause = {"target_type": target_type, "target_id": {"$in": ids}}
+            # Carry the clinic_id shard key when every target resolves, as _target_query does for one
+            if len(clinic_ids) == len(ids):
+                clause.update(await clinic_filter(list(set(clinic_ids.values()))))
+            clauses.append(clause)
+
+        stats = {
+            f"{target_type.value}:{target_id}": {
+                "target_id": target_id,
+                "target_type": target_type,
+                "total_reviews": 0,
+                "average_rating": 0,
+                "rating_distribution": {1: 0, 2: 0, 3: 0, 4: 0, 5: 0}
+            }
+            for target_type, ids in ids_by_type.items() for target_id in ids
+        }
+        if not clauses:
+            return stats
+
+        # One row per target and rating value: the distribution comes out of the same $group
+        pipeline = [
+            {"$match": {"$or": clauses}},
+            {"$group": {
+                "_id": {"target_type": "$target_type", "target_id": "$target_id", "rating": "$rating"},
+                "count": {"$sum": 1}
+            }}
+        ]
+        rating_sums: Dict[str, int] = {}
+        async for row in self.read_collection.aggregate(pipeline):
+            key = f"{row['_id']['target_type']}:{row['_id']['target_id']}"
+            entry = stats.get(key)
+            if entry is None or row["_id"]["rating"] not in entry["rating_distribution"]:
+                continue
+            entry["rating_distribution"][row["_id"]["rating"]] += row["count"]
+            entry["total_reviews"] += row["count"]
+            rating_sums[key] = rating_sums.get(key, 0) + row["_id"]["rating"] * row["count"]
+
+        for key, rating_sum in rating_sums.items():
+            stats[key]["average_rating"] = round(rating_sum / stats[key]["total_reviews"], 2)
+        return stats
+
+    async def _target_query(self, target_id: UUID, target_type: ReviewTarget) -> dict:
+        """Filter for a target's reviews, carrying the clinic_id shard key when it can be resolved"""
+        query = {
+            "target_id": str(target_id),
+            "target_type": target_type
+        }
+        clinic_id = await get_target_clinic_id(str(target_id), target_type)
+        if clinic_id:
+            query.update(await clinic_filter([clinic_id]))
+        return query
+
     async def _validate_review_target(self, target_id: UUID, target_type: ReviewTarget):
         """Validate that the review target exists"""
         if target_type == ReviewTarget.clinic:
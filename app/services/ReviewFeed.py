@@ -0,0 +1,198 @@
+import base64
+import binascii
+from datetime import datetime
+from typing import List, Optional
+from uuid import UUID
+import orjson
+from fastapi import HTTPException
+from pymongo import ReturnDocument
+from database.collections import get_review_collection, get_review_feed_collection, get_review_helpful_vote_collection
+from models.Review import ReviewTarget
+from schemas.Review import ReviewOut, ReviewFeedOut
+from services.Job import job_handler, get_job_service
+from services.Sharding import clinic_filter, get_target_clinic_id
+from utils.fast_response import get_projection
+from config import REVIEW_FEED_SIZE, REVIEW_FEED_MAX_PAGE
+
+
+# Orderings of a target's reviews; each is served by its own index (see database/sharding.py)
+# and ends with _id so the order is total and a cursor resumes exactly after its review
+SORTS = {
+    "newest": [("created_at", -1), ("_id", -1)],
+    "helpful": [("helpful_count", -1), ("created_at", -1), ("_id", -1)],
+    "highest": [("rating", -1), ("created_at", -1), ("_id", -1)],
+    "lowest": [("rating", 1), ("created_at", -1), ("_id", -1)],
+}
+ENTRY_FIELDS = ("user_id", "target_id", "target_type", "rating", "comment", "created_at")
+
+
+def _feed_id(target_id: str, target_type) -> str:
+    return f"{ReviewTarget(target_type).value}:{target_id}"
+
+
+def _to_entry(review: dict) -> dict:
+    entry = {"id": str(review["_id"])}
+    for field in ENTRY_FIELDS:
+        entry[field] = review.get(field)
+    entry["target_type"] = ReviewTarget(entry["target_type"]).value
+    entry["helpful_count"] = review.get("helpful_count", 0)
+    return entry
+
+
+def encode_cursor(sort: str, entry: dict) -> str:
+    values = []
+    for field, _ in SORTS[sort]:
+        value = entry["id" if field == "_id" else field]
+        values.append(value.isoformat() if isinstance(value, datetime) else value)
+    return base64.urlsafe_b64encode(orjson.dumps(values)).decode().rstrip("=")
+
+
+def decode_cursor(sort: str, cursor: str) -> list:
+    try:
+        values = orjson.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(values, list) or len(values) != len(SORTS[sort]):
+            raise ValueError("cursor does not match the sort")
+        return [
+            datetime.fromisoformat(value) if field == "created_at" else value
+            for (field, _), value in zip(SORTS[sort], values)
+        ]
+    except (ValueError, TypeError, binascii.Error, orjson.JSONDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _after(sort: str, values: list) -> dict:
+    """Keyset filter: reviews ordered strictly after the cursor's sort values"""
+    keys = SORTS[sort]
+    clauses = []
+    for i, (field, direction) in enumerate(keys):
+        clause = {previous: value for (previous, _), value in zip(keys[:i], values[:i])}
+        clause[field] = {"$lt" if direction < 0 else "$gt": values[i]}
+        clauses.append(clause)
+    return {"$or": clauses}
+
+
+async def _target_query(target_id: str, target_type) -> dict:
+    query = {"target_id": target_id, "target_type": ReviewTarget(target_type).value}
+    clinic_id = await get_target_clinic_id(target_id, target_type)
+    if clinic_id:
+        query.update(await clinic_filter([clinic_id]))
+    return query
+
+
+class ReviewFeedService:
+    """Review pages of a target without skip: a capped latest-reviews document plus keyset paging.
+
+    One document per target holds its newest reviews, kept sorted and trimmed to
+    REVIEW_FEED_SIZE with $push/$sort/$slice, so the first page of a clinic, staff or
+    service page is a single point read. Every other page, and the other orderings,
+    continue from an opaque cursor with a range query on the ordering's index, which
+    costs the same on page 1000 as on page 2.
+    """
+
+    def __init__(self, size: int = REVIEW_FEED_SIZE):
+        self.size = size
+        self.collection = get_review_feed_collection()
+        self.read_collection = get_review_feed_collection(read_only=True)
+        self.review_collection = get_review_collection()
+        self.read_review_collection = get_review_collection(read_only=True)
+
+    async def get_page(
+        self,
+        target_id: UUID,
+        target_type: ReviewTarget,
+        sort: str = "newest",
+        limit: int = REVIEW_FEED_SIZE,
+        cursor: Optional[str] = None
+    ) -> ReviewFeedOut:
+        if sort not in SORTS:
+            raise HTTPException(status_code=400, detail=f"Unknown sort, expected one of {', '.join(SORTS)}")
+        if not 1 <= limit <= REVIEW_FEED_MAX_PAGE:
+            raise HTTPException(status_code=400, detail=f"limit must be between 1 and {REVIEW_FEED_MAX_PAGE}")
+
+        if sort == "newest" and cursor is None and limit <= self.size:
+            feed = await self.read_collection.find_one({"_id": _feed_id(str(target_id), target_type)})
+            latest = feed["latest"] if feed else await self.rebuild(str(target_id), target_type)
+            page = latest[:limit]
+            # A feed shorter than its cap holds every review of the target
+            has_more = len(latest) > limit or len(latest) >= self.size
+        else:
+            query = await _target_query(str(target_id), target_type)
+            if cursor is not None:
+                query = {"$and": [query, _after(sort, decode_cursor(sort, cursor))]}
+            documents = await self.read_review_collection.find(query, get_projection(ReviewOut)).sort(
+                SORTS[sort]
+            ).limit(limit + 1).to_list(length=limit + 1)
+            page = [_to_entry(document) for document in documents[:limit]]
+            has_more = len(documents) > limit
+
+        return ReviewFeedOut(
+            reviews=[ReviewOut(**entry) for entry in page],
+            next_cursor=encode_cursor(sort, page[-1]) if has_more and page else None
+        )
+
+    async def add(self, review: dict):
+        """Insert a new review at its place in the target's feed"""
+        await self.collection.update_one(
+            {"_id": _feed_id(str(review["target_id"]), review["target_type"])},
+            {
+                "$push": {"latest": {"$each": [_to_entry(review)], "$sort": {"created_at": -1, "id": -1}, "$slice": self.size}},
+                "$set": {"updated_at": datetime.utcnow()}
+            },
+            upsert=True
+        )
+
+    async def update(self, review: dict):
+        """Refresh a changed review if it is in the feed; edits never move it"""
+        await self.collection.update_one(
+            {"_id": _feed_id(str(review["target_id"]), review["target_type"]), "latest.id": str(review["_id"])},
+            {"$set": {"latest.$": _to_entry(review), "updated_at": datetime.utcnow()}}
+        )
+
+    async def remove(self, review: dict):
+        feed_id = _feed_id(str(review["target_id"]), review["target_type"])
+        previous = await self.collection.find_one_and_update(
+            {"_id": feed_id},
+            {"$pull": {"latest": {"id": str(review["_id"])}}, "$set": {"updated_at": datetime.utcnow()}},
+            projection={"latest.id": 1},
+            return_document=ReturnDocument.BEFORE
+        )
+        # A full feed may have sliced off an older review that now fits again
+        if previous and len(previous.get("latest", [])) >= self.size:
+            await self.rebuild(str(review["target_id"]), review["target_type"])
+
+    async def rebuild(self, target_id: str, target_type) -> List[dict]:
+        """Recompute a target's feed from the reviews collection"""
+        cursor = self.review_collection.find(
+            await _target_query(target_id, target_type), get_projection(ReviewOut)
+        ).sort(SORTS["newest"]).limit(self.size)
+        latest = [_to_entry(review) for review in await cursor.to_list(length=self.size)]
+
+        await self.collection.update_one(
+            {"_id": _feed_id(target_id, target_type)},
+            {"$set": {"latest": latest, "updated_at": datetime.utcnow()}},
+            upsert=True
+        )
+        return latest
+
+
+def get_review_feed_service() -> ReviewFeedService:
+    return ReviewFeedService()
+
+
+@job_handler("reviews.backfill_helpful_count")
+async def backfill_helpful_count_job(payload: dict):
+    # Reviews written before votes existed need the field to take part in the "helpful" keyset
+    result = await get_review_collection().update_many(
+        {"helpful_count": {"$exists": False}}, {"$set": {"helpful_count": 0, "updated_at": datetime.utcnow()}}
+    )
+    print(f"✅ Backfilled helpful_count on {result.modified_count} reviews")
+
+
+def init_review_feeds(app):
+    @app.on_event("startup")
+    async def prepare_review_feeds():
+        try:
+            await get_review_helpful_vote_collection().create_index("review_id")
+            await get_job_service().enqueue("reviews.backfill_helpful_count", idempotency_key="reviews.backfill_helpful_count:v1")
+        except Exception as e:
+            print(f"❌ Failed to prepare review feeds: {e}")
@@ -0,0 +1,263 @@
+import math
+from datetime import datetime, time, timedelta, timezone
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+from fastapi import HTTPException
+from database.collections import (
+    get_appointment_collection, get_availability_collection, get_staff_collection, get_service_collection
+)
+from models.Appointment import AppStatus
+from schemas.Schedule import ScheduleOptimizeIn, ScheduleOptimizeOut, ScheduledAssignmentOut
+from config import SCHEDULER_SLOT_MINUTES, SCHEDULER_MAX_REQUESTS, SCHEDULER_LOCAL_SEARCH_ROUNDS
+
+# numpy is imported on first use, not at startup: only the optimize endpoint needs it.
+if TYPE_CHECKING:
+    import numpy as np
+
+
+# Assigned requests considered for relocation per unassigned request
+RELOCATION_CANDIDATES = 50
+
+
+def _naive_utc(value: datetime) -> datetime:
+    # Mongo stores naive UTC datetimes
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def free_starts(free: "np.ndarray", length: int) -> "np.ndarray":
+    """feasible[s, t] is True when row s is free for `length` slots starting at slot t"""
+    import numpy as np
+    n_rows, n_slots = free.shape
+    feasible = np.zeros((n_rows, n_slots), dtype=bool)
+    if length > n_slots:
+        return feasible
+    cumulative = np.zeros((n_rows, n_slots + 1), dtype=np.int32)
+    np.cumsum(free, axis=1, out=cumulative[:, 1:])
+    feasible[:, :n_slots - length + 1] = (cumulative[:, length:] - cumulative[:, :n_slots - length + 1]) == length
+    return feasible
+
+
+class SchedulePacker:
+    """Greedy interval packing on a staff x slot grid, followed by a relocation local search.
+
+    Requests are placed most constrained first. Among feasible placements the one touching
+    the most busy or unavailable neighbours wins, so free time stays in large blocks that
+    later requests can still use; ties go to the least loaded staff member, then the earliest
+    slot. Unassigned requests are then retried by moving one already placed request elsewhere.
+    """
+
+    def __init__(self, free: "np.ndarray", lengths: "np.ndarray", staff_masks: "np.ndarray", start_masks: "np.ndarray"):
+        import numpy as np
+        self.free = free.copy()
+        self.lengths = lengths
+        self.staff_masks = staff_masks
+        self.start_masks = start_masks
+        n_requests = len(lengths)
+        self.staff = np.full(n_requests, -1, dtype=np.int64)
+        self.start = np.full(n_requests, -1, dtype=np.int64)
+        self.load = np.zeros(free.shape[0], dtype=np.int64)
+
+    def feasible(self, request: int, rows: Optional[slice] = None) -> "np.ndarray":
+        free = self.free if rows is None else self.free[rows]
+        staff_mask = self.staff_masks[request] if rows is None else self.staff_masks[request][rows]
+        return free_starts(free, self.lengths[request]) & staff_mask[:, None] & self.start_masks[request][None, :]
+
+    def best_placement(self, request: int) -> Optional[Tuple[int, int]]:
+        import numpy as np
+        feasible = self.feasible(request)
+        staff_idx, start_idx = np.nonzero(feasible)
+        if not len(staff_idx):
+            return None
+
+        length = self.lengths[request]
+        busy = np.concatenate([~self.free, np.ones((self.free.shape[0], 1), dtype=bool)], axis=1)
+        touches_left = np.where(start_idx == 0, True, busy[staff_idx, np.maximum(start_idx - 1, 0)])
+        touches_right = busy[staff_idx, np.minimum(start_idx + length, busy.shape[1] - 1)]
+        touches = touches_left.astype(np.int64) + touches_right
+
+        best = np.lexsort((start_idx, self.load[staff_idx], -touches))[0]
+        return int(staff_idx[best]), int(start_idx[best])
+
+    def place(self, request: int, staff: int, start: int):
+        self.free[staff, start:start + self.lengths[request]] = False
+        self.staff[request] = staff
+        self.start[request] = start
+        self.load[staff] += self.lengths[request]
+
+    def release(self, request: int):
+        staff, start = self.staff[request], self.start[request]
+        self.free[staff, start:start + self.lengths[request]] = True
+        self.load[staff] -= self.lengths[request]
+        self.staff[request] = -1
+        self.start[request] = -1
+
+    def greedy(self):
+        import numpy as np
+        # Fewest initial options first, longest first among equals
+        options = np.array([self.feasible(request).sum() for request in range(len(self.lengths))])
+        for request in np.lexsort((-self.lengths, options)):
+            placement = self.best_placement(request)
+            if placement:
+                self.place(request, *placement)
+
+    def local_search(self, rounds: int = SCHEDULER_LOCAL_SEARCH_ROUNDS):
+        import numpy as np
+        for _ in range(rounds):
+            improved = False
+            for request in np.nonzero(self.staff < 0)[0]:
+                if self._relocate_for(request):
+                    improved = True
+            if not improved:
+                return
+
+    def _relocate_for(self, request: int) -> bool:
+        """Try to fit an unassigned request by moving one placed request out of its way"""
+        import numpy as np
+        allowed = np.nonzero(self.start_masks[request])[0]
+        if not len(allowed):
+            return False
+        lo, hi = allowed[0], allowed[-1] + self.lengths[request]
+
+        placed = np.nonzero(self.staff >= 0)[0]
+        blockers = placed[
+            self.staff_masks[request][self.staff[placed]]
+            & (self.start[placed] < hi)
+            & (self.start[placed] + self.lengths[placed] > lo)
+        ][:RELOCATION_CANDIDATES]
+
+        for blocker in blockers:
+            staff, start = int(self.staff[blocker]), int(self.start[blocker])
+            self.release(blocker)
+            # Only the blocker's row changed, so only it can newly fit the request
+            row_starts = np.nonzero(self.feasible(request, slice(staff, staff + 1))[0])[0]
+            if len(row_starts):
+                self.place(request, staff, int(row_starts[0]))
+                placement = self.best_placement(blocker)
+                if placement:
+                    self.place(blocker, *placement)
+                    return True
+                self.release(request)
+            self.place(blocker, staff, start)
+        return False
+
+
+class SchedulerService:
+    def __init__(self):
+        self.appointment_collection = get_appointment_collection(read_only=True)
+        self.availability_collection = get_availability_collection(read_only=True)
+        self.staff_collection = get_staff_collection(read_only=True)
+        self.service_collection = get_service_collection(read_only=True)
+
+    async def optimize(self, clinic_id: str, data: ScheduleOptimizeIn) -> ScheduleOptimizeOut:
+        """Assign a clinic-day's pending requests to staff and start times, maximizing utilization"""
+        import numpy as np
+        if len(data.requests) > SCHEDULER_MAX_REQUESTS:
+            raise HTTPException(status_code=400, detail=f"At most {SCHEDULER_MAX_REQUESTS} requests can be scheduled at once")
+
+        slot = timedelta(minutes=SCHEDULER_SLOT_MINUTES)
+        day_start = datetime.combine(data.date, time.min)
+        day_end = day_start + timedelta(days=1)
+        n_slots = int(timedelta(days=1) / slot)
+
+        staff_docs = await self.staff_collection.find({"clinic_id": clinic_id}, {"service_ids": 1}).to_list(length=None)
+        staff_ids = [str(staff["_id"]) for staff in staff_docs]
+        staff_index = {staff_id: i for i, staff_id in enumerate(staff_ids)}
+
+        service_ids = list({str(request.service_id) for request in data.requests})
+        services = {
+            str(service["_id"]): service
+            for service in await self.service_collection.find(
+                {"_id": {"$in": service_ids}, "clinic_id": clinic_id}, {"duration_minutes": 1}
+            ).to_list(length=None)
+        }
+        unknown = sorted(set(service_ids) - set(services))
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Services not found in this clinic: {', '.join(unknown)}")
+
+        free = np.zeros((len(staff_ids), n_slots), dtype=bool)
+        async for window in self.availability_collection.find({
+            "clinic_id": clinic_id, "start_time": {"$lt": day_end}, "end_time": {"$gt": day_start}
+        }, {"staff_id": 1, "start_time": 1, "end_time": 1}):
+            row = staff_index.get(str(window["staff_id"]))
+            if row is not None:
+                # Only whole slots inside the availability window are usable
+                first = max(0, math.ceil((window["start_time"] - day_start) / slot))
+                last = min(n_slots, math.floor((window["end_time"] - day_start) / slot))
+                free[row, first:last] = True
+
+        async for booking in self.appointment_collection.find({
+            "clinic_id": clinic_id,
+            "status": {"$ne": AppStatus.canceled.value},
+            "start_time": {"$lt": day_end},
+            "end_time": {"$gt": day_start}
+        }, {"staff_id": 1, "start_time": 1, "end_time": 1}):
+            row = staff_index.get(str(booking["staff_id"]))
+            if row is not None:
+                first = max(0, math.floor((booking["start_time"] - day_start) / slot))
+                last = min(n_slots, math.ceil((booking["end_time"] - day_start) / slot))
+                free[row, first:last] = False
+        available_slots = int(free.sum())
+
+        qualified: Dict[str, "np.ndarray"] = {
+            service_id: np.array([service_id in [str(sid) for sid in staff.get("service_ids", [])] for staff in staff_docs], dtype=bool)
+            for service_id in service_ids
+        }
+
+        n_requests = len(data.requests)
+        lengths = np.zeros(n_requests, dtype=np.int64)
+        staff_masks = np.zeros((n_requests, len(staff_ids)), dtype=bool)
+        start_masks = np.zeros((n_requests, n_slots), dtype=bool)
+        slot_starts = np.arange(n_slots)
+
+        for i, request in enumerate(data.requests):
+            service_id = str(request.service_id)
+            lengths[i] = math.ceil(services[service_id]["duration_minutes"] / SCHEDULER_SLOT_MINUTES)
+            staff_masks[i] = qualified[service_id]
+            if request.staff_id is not None:
+                requested = np.zeros(len(staff_ids), dtype=bool)
+                if str(request.staff_id) in staff_index:
+                    requested[staff_index[str(request.staff_id)]] = True
+                staff_masks[i] &= requested
+
+            if not request.windows:
+                start_masks[i] = slot_starts + lengths[i] <= n_slots
+            for window in request.windows:
+                window_first = (_naive_utc(window.start_time) - day_start) / slot
+                window_last = (_naive_utc(window.end_time) - day_start) / slot
+                start_masks[i] |= (slot_starts >= window_first) & (slot_starts + lengths[i] <= window_last)
+
+        packer = SchedulePacker(free, lengths, staff_masks, start_masks)
+        packer.greedy()
+        packer.local_search()
+
+        assignments = []
+        unassigned = []
+        for i, request in enumerate(data.requests):
+            if packer.staff[i] < 0:
+                unassigned.append(request.request_id)
+                continue
+            start_time = day_start + slot * int(packer.start[i])
+            assignments.append(ScheduledAssignmentOut(
+                request_id=request.request_id,
+                service_id=request.service_id,
+                customer_id=request.customer_id,
+                staff_id=staff_ids[packer.staff[i]],
+                start_time=start_time,
+                end_time=start_time + timedelta(minutes=services[str(request.service_id)]["duration_minutes"])
+            ))
+
+        scheduled_slots = int(lengths[packer.staff >= 0].sum())
+        return ScheduleOptimizeOut(
+            date=data.date,
+            assignments=assignments,
+            unassigned=unassigned,
+            available_minutes=available_slots * SCHEDULER_SLOT_MINUTES,
+            scheduled_minutes=scheduled_slots * SCHEDULER_SLOT_MINUTES,
+            idle_minutes=max(0, available_slots - scheduled_slots) * SCHEDULER_SLOT_MINUTES,
+            utilization=round(scheduled_slots / available_slots, 4) if available_slots else None
+        )
+
+
+def get_scheduler_service() -> SchedulerService:
+    return SchedulerService()
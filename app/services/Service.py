@@ -1,14 +1,19 @@
 from uuid import UUID
+from datetime import datetime
 from typing import List, Optional
 from fastapi import HTTPException
 from database.collections import get_service_collection, get_clinic_collection, get_user_collection
 from models.Service import Service
 from schemas.Service import ServiceCreate, ServiceUpdate, ServiceOut
+from services.Job import job_handler, get_job_service
+from utils.fast_response import get_projection
+from utils.httpcache import VALIDATOR_PROJECTION, Validators, build_validators, build_list_validators
 
 
 class ServiceService:
     def __init__(self):
         self.collection = get_service_collection()
+        self.read_collection = get_service_collection(read_only=True)
         self.clinic_collection = get_clinic_collection()
         self.user_collection = get_user_collection()
 
@@ -53,6 +58,8 @@ class ServiceService:
         
         service_dict = service.model_dump()
         service_dict["_id"] = str(service.id)
+        service_dict["version"] = 1
+        service_dict["updated_at"] = datetime.utcnow()
         
         result = await self.collection.insert_one(service_dict)
         if result.inserted_id:
@@ -78,6 +85,22 @@ class ServiceService:
             price=service["price"]
         )
 
+    async def get_service_validators(self, service_id: UUID) -> Optional[Validators]:
+        """Get the ETag/Last-Modified of a service without loading the full document"""
+        service = await self.collection.find_one({"_id": str(service_id)}, VALIDATOR_PROJECTION)
+        if not service:
+            return None
+        return build_validators([service])
+
+    async def get_services_by_clinic_validators(self, clinic_id: UUID, skip: int = 0, limit: int = 100) -> Optional[Validators]:
+        """Get the ETag/Last-Modified of a page of clinic services from a projection-only query"""
+        clinic = await self.clinic_collection.find_one({"_id": str(clinic_id)}, {"_id": 1})
+        if not clinic:
+            return None
+        
+        cursor = self.collection.find({"clinic_id": str(clinic_id)}, VALIDATOR_PROJECTION).skip(skip).limit(limit)
+        return build_list_validators(await cursor.to_list(length=limit))
+
     async def get_services_by_clinic(self, clinic_id: UUID, skip: int = 0, limit: int = 100) -> List[ServiceOut]:
         """Get all services for a specific clinic"""
         # Validate that clinic exists
@@ -115,6 +138,11 @@ class ServiceService:
         
         return result
 
+    async def get_all_services_documents(self, skip: int = 0, limit: int = 100) -> List[dict]:
+        """Get raw service documents with pagination, projected to the ServiceOut fields"""
+        cursor = self.collection.find({}, get_projection(ServiceOut)).skip(skip).limit(limit)
+        return await cursor.to_list(length=limit)
+
     async def search_services(self, search_term: str, clinic_id: Optional[UUID] = None, skip: int = 0, limit: int = 100) -> List[ServiceOut]:
         """Search services by name"""
         query = {
@@ -124,7 +152,7 @@ class ServiceService:
         if clinic_id:
             query["clinic_id"] = str(clinic_id)
         
-        cursor = self.collection.find(query).skip(skip).limit(limit)
+        cursor = self.read_collection.find(query).skip(skip).limit(limit)
         services = await cursor.to_list(length=None)
         
         result = []
@@ -147,7 +175,7 @@ class ServiceService:
         if clinic_id:
             query["clinic_id"] = str(clinic_id)
         
-        cursor = self.collection.find(query).skip(skip).limit(limit)
+        cursor = self.read_collection.find(query).skip(skip).limit(limit)
         services = await cursor.to_list(length=None)
         
         result = []
@@ -205,9 +233,10 @@ class ServiceService:
             update_dict["price"] = update_data.price
         
         if update_dict:
+            update_dict["updated_at"] = datetime.utcnow()
             result = await self.collection.update_one(
                 {"_id": str(service_id)},
-                {"$set": update_dict}
+                {"$set": update_dict, "$inc": {"version": 1}}
             )
             
             if result.modified_count:
@@ -241,11 +270,10 @@ class ServiceService:
         if str(clinic["owner_id"]) != str(user_id) and user.get("role") != "admin":
             raise HTTPException(status_code=403, detail="Not authorized to delete this service")
         
-        # Check if service is being used in any appointments or staff assignments
-        from database.collections import get_appointment_collection, get_staff_collection
+        # Check if service is being used in any appointments
+        from database.collections import get_appointment_collection
         
         appointment_collection = get_appointment_collection()
-        staff_collection = get_staff_collection()
         
         # Check for existing appointments
         appointment_count = await appointment_collection.count_documents({
@@ -256,14 +284,14 @@ class ServiceService:
         if appointment_count > 0:
             raise HTTPException(status_code=400, detail="Cannot delete service with active appointments")
         
-        # Remove service from staff service lists
-        await staff_collection.update_many(
-            {"service_ids": str(service_id)},
-            {"$pull": {"service_ids": str(service_id)}}
-        )
-        
         result = await self.collection.delete_one({"_id": str(service_id)})
         if result.deleted_count:
+            # Remove service from staff service lists off the request path
+            await get_job_service().enqueue(
+                "staff.remove_service",
+                {"service_id": str(service_id)},
+                idempotency_key=f"staff.remove_service:{service_id}"
+            )
             return True
         
         raise HTTPException(status_code=500, detail="Failed to delete service")
@@ -277,8 +305,8 @@ class ServiceService:
         # Import here to avoid circular imports
         from database.collections import get_appointment_collection, get_staff_collection
         
-        appointment_collection = get_appointment_collection()
-        staff_collection = get_staff_collection()
+        appointment_collection = get_appointment_collection(read_only=True)
+        staff_collection = get_staff_collection(read_only=True)
         
         # Count appointments for this service
         total_appointments = await appointment_collection.count_documents({"service_id": str(service_id)})
@@ -301,6 +329,16 @@ class ServiceService:
         }
 
 
+@job_handler("staff.remove_service")
+async def remove_service_from_staff(payload: dict):
+    from database.collections import get_staff_collection
+    
+    await get_staff_collection().update_many(
+        {"service_ids": payload["service_id"]},
+        {"$pull": {"service_ids": payload["service_id"]}, "$set": {"updated_at": datetime.utcnow()}}
+    )
+
+
 # Create a global instance
 # service_service = ServiceService()
 
@@ -0,0 +1,160 @@
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+from pymongo import UpdateOne
+from database.collections import (
+    get_appointment_collection, get_job_collection, get_availability_collection, get_review_collection,
+    get_staff_collection, get_service_collection,
+    get_customer_clinics_collection, get_user_review_clinics_collection
+)
+from database.sharding import ensure_indexes, shard_collections
+from models.Job import JobStatus
+from models.Review import ReviewTarget
+from services.Job import job_handler, get_job_service
+from config import SHARDING_ENABLED
+
+
+BACKFILL_BATCH_SIZE = 1000
+BACKFILL_JOB_KEY = "sharding.backfill_clinic_ids:v1"
+
+# Flips once the backfill job is done; it never goes back
+_backfilled = False
+
+
+async def clinic_ids_backfilled() -> bool:
+    """Whether backfill_clinic_ids has finished, so every document and lookup entry carries clinic_id"""
+    global _backfilled
+    if not _backfilled:
+        job = await get_job_collection().find_one({"idempotency_key": BACKFILL_JOB_KEY, "status": JobStatus.done.value}, {"_id": 1})
+        _backfilled = job is not None
+    return _backfilled
+
+
+async def clinic_filter(clinic_ids: List[str]) -> dict:
+    """clinic_id condition for a query; until the backfill is done it also keeps documents written without one"""
+    condition = {"clinic_id": clinic_ids[0] if len(clinic_ids) == 1 else {"$in": clinic_ids}}
+    if await clinic_ids_backfilled():
+        return condition
+    return {"$or": [condition, {"clinic_id": {"$exists": False}}]}
+
+
+async def add_customer_clinic(customer_id: str, clinic_id: str):
+    await get_customer_clinics_collection().update_one(
+        {"_id": customer_id}, {"$addToSet": {"clinic_ids": clinic_id}}, upsert=True
+    )
+
+
+async def get_customer_clinic_ids(customer_id: str) -> Optional[List[str]]:
+    """Clinics a customer has appointments in, or None when the lookup has no entry yet"""
+    # Before the backfill the lookup only knows clinics booked since, so it cannot narrow a query
+    if not await clinic_ids_backfilled():
+        return None
+    entry = await get_customer_clinics_collection(read_only=True).find_one({"_id": customer_id})
+    return entry["clinic_ids"] if entry else None
+
+
+async def add_user_review_clinic(user_id: str, clinic_id: str):
+    await get_user_review_clinics_collection().update_one(
+        {"_id": user_id}, {"$addToSet": {"clinic_ids": clinic_id}}, upsert=True
+    )
+
+
+async def get_user_review_clinic_ids(user_id: str) -> Optional[List[str]]:
+    """Clinics a user has reviewed in, or None when the lookup has no entry yet"""
+    if not await clinic_ids_backfilled():
+        return None
+    entry = await get_user_review_clinics_collection(read_only=True).find_one({"_id": user_id})
+    return entry["clinic_ids"] if entry else None
+
+
+async def get_staff_clinic_id(staff_id: str) -> Optional[str]:
+    staff = await get_staff_collection(read_only=True).find_one({"_id": staff_id}, {"clinic_id": 1})
+    return str(staff["clinic_id"]) if staff else None
+
+
+async def get_target_clinic_id(target_id: str, target_type: ReviewTarget) -> Optional[str]:
+    """Clinic owning a review target: the clinic itself, or the clinic of the staff member or service"""
+    if target_type == ReviewTarget.clinic:
+        return target_id
+    collection = get_staff_collection(read_only=True) if target_type == ReviewTarget.staff else get_service_collection(read_only=True)
+    target = await collection.find_one({"_id": target_id}, {"clinic_id": 1})
+    return str(target["clinic_id"]) if target else None
+
+
+async def get_target_clinic_ids(target_type: ReviewTarget, target_ids: Iterable[str]) -> Dict[str, str]:
+    """get_target_clinic_id for many targets of one type, in at most one query"""
+    target_ids = list(target_ids)
+    if target_type == ReviewTarget.clinic:
+        return {target_id: target_id for target_id in target_ids}
+    collection = get_staff_collection(read_only=True) if target_type == ReviewTarget.staff else get_service_collection(read_only=True)
+    return {
+        str(target["_id"]): str(target["clinic_id"])
+        async for target in collection.find({"_id": {"$in": target_ids}}, {"clinic_id": 1})
+    }
+
+
+async def _flush(collection, operations: list):
+    if operations:
+        await collection.bulk_write(operations, ordered=False)
+        operations.clear()
+
+
+async def backfill_clinic_ids() -> dict:
+    """Stamp clinic_id on documents written before it was denormalized and build the lookups"""
+    counts = {"reviews": 0, "availability": 0, "customer_clinics": 0, "user_review_clinics": 0}
+
+    reviews = get_review_collection()
+    operations = []
+    async for review in reviews.find({"clinic_id": {"$exists": False}}, {"target_id": 1, "target_type": 1}):
+        clinic_id = await get_target_clinic_id(review["target_id"], review["target_type"])
+        if clinic_id:
+            operations.append(UpdateOne({"_id": review["_id"]}, {"$set": {"clinic_id": clinic_id, "updated_at": datetime.utcnow()}}))
+            counts["reviews"] += 1
+        if len(operations) >= BACKFILL_BATCH_SIZE:
+            await _flush(reviews, operations)
+    await _flush(reviews, operations)
+
+    availability = get_availability_collection()
+    async for staff in get_staff_collection().find({}, {"clinic_id": 1}):
+        result = await availability.update_many(
+            {"staff_id": str(staff["_id"]), "clinic_id": {"$exists": False}},
+            {"$set": {"clinic_id": str(staff["clinic_id"]), "updated_at": datetime.utcnow()}}
+        )
+        counts["availability"] += result.modified_count
+
+    for source, owner_field, lookup, name in (
+        (get_appointment_collection(), "customer_id", get_customer_clinics_collection(), "customer_clinics"),
+        (reviews, "user_id", get_user_review_clinics_collection(), "user_review_clinics"),
+    ):
+        pipeline = [
+            {"$match": {"clinic_id": {"$exists": True}}},
+            {"$group": {"_id": f"${owner_field}", "clinic_ids": {"$addToSet": "$clinic_id"}}}
+        ]
+        async for row in source.aggregate(pipeline, allowDiskUse=True):
+            operations.append(UpdateOne(
+                {"_id": row["_id"]}, {"$addToSet": {"clinic_ids": {"$each": row["clinic_ids"]}}}, upsert=True
+            ))
+            counts[name] += 1
+            if len(operations) >= BACKFILL_BATCH_SIZE:
+                await _flush(lookup, operations)
+        await _flush(lookup, operations)
+
+    return counts
+
+
+@job_handler("sharding.backfill_clinic_ids")
+async def backfill_clinic_ids_job(payload: dict):
+    counts = await backfill_clinic_ids()
+    print(f"✅ Backfilled clinic_id: {counts}")
+
+
+def init_sharding(app):
+    @app.on_event("startup")
+    async def prepare_sharding():
+        try:
+            await ensure_indexes()
+            if SHARDING_ENABLED:
+                await shard_collections()
+            # Queued once per deployment however many workers start
+            await get_job_service().enqueue("sharding.backfill_clinic_ids", idempotency_key=BACKFILL_JOB_KEY)
+        except Exception as e:
+            print(f"❌ Failed to prepare clinic_id sharding: {e}")
@@ -1,4 +1,5 @@
 from bson import ObjectId
+from datetime import datetime
 from uuid import UUID
 from typing import List, Optional
 from fastapi import HTTPException
@@ -42,6 +43,7 @@ class StaffService:
         staff_dict["user_id"] = str(staff_dict["user_id"])
         staff_dict["clinic_id"] = str(staff_dict["clinic_id"])
         staff_dict["service_ids"] = [str(sid) for sid in staff_dict["service_ids"]]
+        staff_dict["updated_at"] = datetime.utcnow()
         
         result = await self.collection.insert_one(staff_dict)
         
@@ -109,6 +111,7 @@ class StaffService:
             # No updates provided
             return await self.get_staff_by_id(staff_id)
         
+        update_data["updated_at"] = datetime.utcnow()
         result = await self.collection.update_one(
             {"_id": ObjectId(str(staff_id))},
             {"$set": update_data}
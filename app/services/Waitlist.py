@@ -0,0 +1,241 @@
+from uuid import UUID
+from datetime import datetime, timedelta
+from typing import List, Optional
+from fastapi import HTTPException
+from pymongo import ReturnDocument
+from database.collections import get_waitlist_collection, get_service_collection
+from models.Waitlist import WaitlistEntry, WaitlistStatus
+from schemas.Waitlist import WaitlistCreate, WaitlistOut
+from schemas.Appointment import AppointmentCreate
+from services.Job import job_handler, get_job_service
+from config import WAITLIST_OFFER_SECONDS, WAITLIST_MATCH_CANDIDATES
+
+
+# Entries are transient: drop them a day after their window closed
+WAITLIST_RETENTION_SECONDS = 24 * 60 * 60
+
+
+def _to_out(entry: dict) -> WaitlistOut:
+    entry["id"] = entry["_id"]
+    return WaitlistOut(**entry)
+
+
+def _slot_of(appointment: dict) -> dict:
+    return {
+        "clinic_id": str(appointment["clinic_id"]),
+        "service_id": str(appointment["service_id"]),
+        "staff_id": str(appointment["staff_id"]),
+        "start_time": appointment["start_time"],
+        "end_time": appointment["end_time"],
+    }
+
+
+def candidate_query(slot: dict) -> dict:
+    return {
+        "clinic_id": slot["clinic_id"],
+        "service_id": slot["service_id"],
+        "status": WaitlistStatus.waiting.value,
+        "window_start": {"$lte": slot["start_time"]},
+        "window_end": {"$gte": slot["end_time"]},
+        "staff_id": {"$in": [slot["staff_id"], None]}
+    }
+
+
+class WaitlistService:
+    def __init__(self):
+        self.collection = get_waitlist_collection()
+        self.service_collection = get_service_collection()
+
+    async def ensure_indexes(self):
+        # Equality on the slot, then the window range: a freed slot only walks entries whose
+        # window opens before it, and window_end is filtered from the index without a fetch
+        await self.collection.create_index([
+            ("clinic_id", 1), ("service_id", 1), ("status", 1), ("window_start", 1), ("window_end", 1)
+        ])
+        await self.collection.create_index([("customer_id", 1), ("created_at", -1)])
+        await self.collection.create_index("window_end", expireAfterSeconds=WAITLIST_RETENTION_SECONDS)
+
+    async def join(self, data: WaitlistCreate) -> WaitlistOut:
+        """Register a customer's interest in a service at a clinic within a time window"""
+        if data.window_end <= data.window_start:
+            raise HTTPException(status_code=400, detail="window_end must be after window_start")
+        if data.window_end <= datetime.utcnow():
+            raise HTTPException(status_code=400, detail="Waitlist window is already over")
+
+        service = await self.service_collection.find_one({"_id": str(data.service_id), "clinic_id": str(data.clinic_id)})
+        if not service:
+            raise HTTPException(status_code=404, detail="Service not found in this clinic")
+
+        entry = WaitlistEntry(**data.model_dump(), created_at=datetime.utcnow())
+        entry_dict = entry.model_dump(exclude={"id"})
+        entry_dict["_id"] = str(entry.id)
+        for field in ("customer_id", "clinic_id", "service_id", "staff_id"):
+            if entry_dict[field] is not None:
+                entry_dict[field] = str(entry_dict[field])
+        entry_dict["status"] = WaitlistStatus.waiting.value
+
+        await self.collection.insert_one(entry_dict)
+        return _to_out(entry_dict)
+
+    async def get_entry(self, entry_id: UUID) -> WaitlistOut:
+        entry = await self.collection.find_one({"_id": str(entry_id)})
+        if not entry:
+            raise HTTPException(status_code=404, detail="Waitlist entry not found")
+        return _to_out(entry)
+
+    async def get_entries_by_customer(self, customer_id: UUID) -> List[WaitlistOut]:
+        cursor = self.collection.find({"customer_id": str(customer_id)}).sort("created_at", -1)
+        return [_to_out(entry) for entry in await cursor.to_list(length=None)]
+
+    async def withdraw(self, entry_id: UUID) -> WaitlistOut:
+        """Leave the waitlist; a pending offer moves on to the next waitlister"""
+        entry = await self.collection.find_one_and_update(
+            {"_id": str(entry_id), "status": {"$in": [WaitlistStatus.waiting.value, WaitlistStatus.offered.value]}},
+            {"$set": {"status": WaitlistStatus.withdrawn.value}},
+            return_document=ReturnDocument.BEFORE
+        )
+        if not entry:
+            raise HTTPException(status_code=404, detail="No active waitlist entry found")
+
+        if entry["status"] == WaitlistStatus.offered.value:
+            await enqueue_slot_match(entry["offer"], f"waitlist.rematch:{entry['_id']}")
+        entry["status"] = WaitlistStatus.withdrawn.value
+        return _to_out(entry)
+
+    async def accept(self, entry_id: UUID) -> WaitlistOut:
+        """Book the slot offered to a waitlister"""
+        entry = await self.collection.find_one({"_id": str(entry_id), "status": WaitlistStatus.offered.value})
+        if not entry:
+            raise HTTPException(status_code=404, detail="No pending offer for this waitlist entry")
+        if entry["offer"]["expires_at"] <= datetime.utcnow():
+            raise HTTPException(status_code=409, detail="The offer has expired")
+
+        booked = await self._book(entry)
+        if booked is None:
+            raise HTTPException(status_code=409, detail="The offered slot is no longer available")
+        return _to_out(booked)
+
+    async def find_candidates(self, slot: dict) -> List[dict]:
+        """Oldest waiting entries whose window contains the slot, from one indexed range query"""
+        cursor = self.collection.find(candidate_query(slot)).sort("created_at", 1).limit(WAITLIST_MATCH_CANDIDATES)
+        return await cursor.to_list(length=WAITLIST_MATCH_CANDIDATES)
+
+    async def match_slot(self, slot: dict) -> Optional[dict]:
+        """Offer a freed slot to the first eligible waitlister, or book it for those who opted in"""
+        if slot["start_time"] <= datetime.utcnow():
+            return None
+
+        for candidate in await self.find_candidates(slot):
+            entry = await self._claim(candidate["_id"], slot)
+            if entry is None:
+                # Taken by a concurrent matcher or withdrawn meanwhile
+                continue
+
+            if not entry["auto_book"]:
+                # Keyed on the offer too: an entry that went back to waiting can be offered again
+                offer = entry["offer"]
+                await get_job_service().enqueue(
+                    "waitlist.offer_expired",
+                    payload={"entry_id": entry["_id"]},
+                    idempotency_key=(
+                        f"waitlist.offer_expired:{entry['_id']}:"
+                        f"{offer['start_time'].isoformat()}:{offer['expires_at'].isoformat()}"
+                    ),
+                    delay_seconds=WAITLIST_OFFER_SECONDS
+                )
+                return entry
+
+            booked = await self._book(entry)
+            if booked is not None:
+                return booked
+            # Someone else booked the slot first: nothing left to hand out
+            return None
+
+        return None
+
+    async def expire_offer(self, entry_id: str):
+        """Expire an unanswered offer and pass the slot on"""
+        entry = await self.collection.find_one_and_update(
+            {"_id": entry_id, "status": WaitlistStatus.offered.value, "offer.expires_at": {"$lte": datetime.utcnow()}},
+            {"$set": {"status": WaitlistStatus.expired.value}},
+            return_document=ReturnDocument.AFTER
+        )
+        if entry:
+            await self.match_slot(entry["offer"])
+
+    async def _claim(self, entry_id: str, slot: dict) -> Optional[dict]:
+        """Atomically move a waiting entry to offered, so one slot goes to one waitlister"""
+        return await self.collection.find_one_and_update(
+            {"_id": entry_id, "status": WaitlistStatus.waiting.value},
+            {"$set": {
+                "status": WaitlistStatus.offered.value,
+                "offer": {**slot, "expires_at": datetime.utcnow() + timedelta(seconds=WAITLIST_OFFER_SECONDS)}
+            }},
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def _book(self, entry: dict) -> Optional[dict]:
+        """Book the offered slot; the entry goes back to waiting if the slot was taken"""
+        from services.Appointment import get_appointment_service
+
+        offer = entry["offer"]
+        try:
+            appointment = await get_appointment_service().create_appointment(AppointmentCreate(
+                customer_id=entry["customer_id"],
+                clinic_id=offer["clinic_id"],
+                service_id=offer["service_id"],
+                staff_id=offer["staff_id"],
+                start_time=offer["start_time"],
+                end_time=offer["end_time"]
+            ))
+        except HTTPException:
+            await self.collection.update_one(
+                {"_id": entry["_id"], "status": WaitlistStatus.offered.value},
+                {"$set": {"status": WaitlistStatus.waiting.value}, "$unset": {"offer": ""}}
+            )
+            return None
+
+        return await self.collection.find_one_and_update(
+            {"_id": entry["_id"]},
+            {"$set": {"status": WaitlistStatus.booked.value, "appointment_id": str(appointment.id)}},
+            return_document=ReturnDocument.AFTER
+        )
+
+
+def get_waitlist_service() -> WaitlistService:
+    return WaitlistService()
+
+
+async def enqueue_slot_match(slot: dict, idempotency_key: str):
+    """Match a freed slot against the waitlist in the background, off the request path"""
+    if slot["start_time"] <= datetime.utcnow():
+        return
+    await get_job_service().enqueue("waitlist.match", payload=_slot_of(slot), idempotency_key=idempotency_key)
+
+
+async def on_appointment_canceled(appointment: dict):
+    """Offer a canceled appointment's slot; pass the appointment as booked, with the cancellation's updated_at"""
+    # Canceled, rebooked and canceled again frees a slot again: the key names this cancellation
+    await enqueue_slot_match(
+        appointment,
+        f"waitlist.match:{appointment['_id']}:{appointment['start_time'].isoformat()}:{appointment['updated_at'].isoformat()}"
+    )
+
+
+@job_handler("waitlist.match")
+async def match_slot_job(payload: dict):
+    await get_waitlist_service().match_slot(payload)
+
+
+@job_handler("waitlist.offer_expired")
+async def expire_offer_job(payload: dict):
+    await get_waitlist_service().expire_offer(payload["entry_id"])
+
+
+def init_waitlist(app):
+    @app.on_event("startup")
+    async def prepare_waitlist():
+        try:
+            await get_waitlist_service().ensure_indexes()
+        except Exception as e:
+            print(f"❌ Failed to create waitlist indexes: {e}")
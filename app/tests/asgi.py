@@ -0,0 +1,47 @@
+import asyncio
+from types import SimpleNamespace
+from typing import Optional
+from urllib.parse import urlsplit
+
+import orjson
+
+
+async def call(app, method: str, url: str, json=None, headers: Optional[dict] = None) -> SimpleNamespace:
+    """Send one HTTP request straight into an ASGI app and collect its response"""
+    parts = urlsplit(url)
+    body = b"" if json is None else orjson.dumps(json)
+    raw_headers = [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in (headers or {}).items()]
+    if json is not None:
+        raw_headers.append((b"content-type", b"application/json"))
+    raw_headers.append((b"content-length", str(len(body)).encode()))
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "scheme": "http",
+        "method": method, "path": parts.path, "raw_path": parts.path.encode(), "root_path": "",
+        "query_string": parts.query.encode(), "headers": raw_headers,
+        "client": ("10.0.0.1", 1234), "server": ("testserver", 80),
+    }
+    requests = [{"type": "http.request", "body": body, "more_body": False}]
+    response = SimpleNamespace(status=None, headers={}, body=b"")
+
+    async def receive():
+        if requests:
+            return requests.pop(0)
+        # Nothing more to read; only a disconnect could still arrive
+        return await _never()
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response.status = message["status"]
+            for name, value in message.get("headers", []):
+                response.headers.setdefault(name.decode("latin-1").lower(), []).append(value.decode("latin-1"))
+        elif message["type"] == "http.response.body":
+            response.body += message.get("body", b"")
+
+    await app(scope, receive, send)
+    response.json = lambda: orjson.loads(response.body)
+    response.header = lambda name: response.headers.get(name.lower(), [None])[-1]
+    return response
+
+
+async def _never():
+    await asyncio.Event().wait()
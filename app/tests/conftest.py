@@ -0,0 +1,44 @@
+import asyncio
+import os
+import sys
+from functools import partial
+
+import pytest
+
+# Modules import each other from app/, the way uvicorn runs them
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tests.asgi import call  # noqa: E402
+from tests.fakes import FakeDatabase  # noqa: E402
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    """Point every collection getter at a fresh in-memory database"""
+    import database.database as database
+    import services.Sharding as sharding
+
+    fake = FakeDatabase()
+    monkeypatch.setattr(database, "db", fake)
+    monkeypatch.setattr(database, "read_db", fake)
+    # Remembered per process; a fresh database has not been backfilled
+    monkeypatch.setattr(sharding, "_backfilled", False)
+    return fake
+
+
+@pytest.fixture
+def run():
+    """Run a coroutine to completion on a fresh event loop"""
+    return asyncio.run
+
+
+@pytest.fixture
+def api(fake_db, monkeypatch):
+    """Call the whole app, middleware included, as a signed-in user: await api("GET", "/path")"""
+    from main import app
+    from routers.Appointment import get_current_user
+
+    monkeypatch.setitem(app.dependency_overrides, get_current_user, lambda: "test-user")
+    # Rebuilt on the next request, so no middleware state carries over between tests
+    monkeypatch.setattr(app, "middleware_stack", None)
+    return partial(call, app)
@@ -0,0 +1,661 @@
+"""An in-memory stand-in for the slice of the Motor API the services use.
+
+Good enough to drive services and workers in-process: equality and the common
+comparison operators in filters, $set/$inc/$unset/$setOnInsert/$push updates,
+unique indexes, sorting and simple $match/$group aggregations. Every operation
+can be slowed down with `latency`, and `capacity` bounds how many run at once,
+to emulate a struggling server.
+"""
+import asyncio
+import copy
+import math
+import re
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+from bson import ObjectId
+
+from pymongo import ReturnDocument
+from pymongo.errors import CollectionInvalid, DuplicateKeyError, OperationFailure
+
+
+MISSING = object()
+
+
+def _get(document: dict, path: str):
+    value = document
+    for part in path.split("."):
+        if isinstance(value, list) and part.isdigit():
+            index = int(part)
+            value = value[index] if index < len(value) else MISSING
+        elif isinstance(value, list):
+            # "items.field" reaches into every embedded document of an array
+            value = [item[part] for item in value if isinstance(item, dict) and part in item] or MISSING
+        elif isinstance(value, dict):
+            value = value.get(part, MISSING)
+        else:
+            return MISSING
+        if value is MISSING:
+            return MISSING
+    return value
+
+
+def _set(document: dict, path: str, value):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        document = document.setdefault(part, {})
+    document[parts[-1]] = value
+
+
+def _unset(document: dict, path: str):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        document = document.get(part, {})
+    document.pop(parts[-1], None)
+
+
+def _compare(value, operator: str, operand) -> bool:
+    if operator == "$exists":
+        return (value is not MISSING) == bool(operand)
+    if operator == "$in":
+        return any(_equals(value, candidate) for candidate in operand)
+    if operator == "$nin":
+        return not any(_equals(value, candidate) for candidate in operand)
+    if operator == "$ne":
+        return not _equals(value, operand)
+    if operator == "$eq":
+        return _equals(value, operand)
+    if operator == "$type":
+        return isinstance(value, {"string": str, "objectId": ObjectId}.get(operand, ()))
+    if operator == "$regex":
+        return isinstance(value, str) and re.search(operand, value) is not None
+    if operator == "$options":
+        return True
+    if value is MISSING or value is None or operand is None:
+        return False
+    if isinstance(value, list):
+        return any(_compare(item, operator, operand) for item in value)
+    try:
+        return {
+            "$lt": value < operand, "$lte": value <= operand,
+            "$gt": value > operand, "$gte": value >= operand,
+        }[operator]
+    except TypeError:
+        return False
+
+
+def _equals(value, expected) -> bool:
+    if isinstance(value, list) and not isinstance(expected, list):
+        return any(_equals(item, expected) for item in value)
+    if value is MISSING:
+        return expected is None
+    return value == expected
+
+
+def matches(document: dict, query: dict) -> bool:
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(matches(document, clause) for clause in condition):
+                return False
+        elif key == "$and":
+            if not all(matches(document, clause) for clause in condition):
+                return False
+        elif key == "$nor":
+            if any(matches(document, clause) for clause in condition):
+                return False
+        else:
+            value = _get(document, key)
+            if isinstance(condition, dict) and condition and all(name.startswith("$") for name in condition):
+                if "$elemMatch" in condition:
+                    if not isinstance(value, list) or not any(matches(item, condition["$elemMatch"]) for item in value):
+                        return False
+                    continue
+                if not all(_compare(value, operator, operand) for operator, operand in condition.items()):
+                    return False
+            elif not _equals(value, condition):
+                return False
+    return True
+
+
+def _pulled(item, condition) -> bool:
+    if not isinstance(condition, dict):
+        return item == condition
+    if isinstance(item, dict) and any(name in condition for name in ("$or", "$and", "$nor")):
+        return matches(item, condition)
+    if all(name.startswith("$") for name in condition):
+        return all(_compare(item, operator, operand) for operator, operand in condition.items())
+    return isinstance(item, dict) and matches(item, condition)
+
+
+def _sort_key(sort):
+    def key(document):
+        values = []
+        for field, direction in sort:
+            value = _get(document, field)
+            values.append(_Ordered(None if value is MISSING else value, direction))
+        return values
+    return key
+
+
+class _Ordered:
+    def __init__(self, value, direction: int):
+        self.value = value
+        self.direction = direction
+
+    def __lt__(self, other):
+        if self.value == other.value:
+            return False
+        if self.value is None:
+            less = True
+        elif other.value is None:
+            less = False
+        elif isinstance(self.value, ObjectId) != isinstance(other.value, ObjectId):
+            # BSON order: strings before ObjectIds
+            less = isinstance(other.value, ObjectId)
+        else:
+            less = self.value < other.value
+        return less if self.direction > 0 else not less
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+
+def _normalize_sort(sort) -> List:
+    if sort is None:
+        return []
+    if isinstance(sort, str):
+        return [(sort, 1)]
+    return list(sort)
+
+
+def _project(document: dict, projection: Optional[dict]) -> dict:
+    if not projection:
+        return copy.deepcopy(document)
+    included = {field for field, flag in projection.items() if flag}
+    if included:
+        result = {"_id": document["_id"]} if projection.get("_id", 1) else {}
+        for field in included:
+            head, _, rest = field.partition(".")
+            if rest and isinstance(document.get(head), list):
+                # "items.field" keeps that field of every embedded document
+                result[head] = [_project(item, {rest: 1, "_id": 0}) for item in document[head] if isinstance(item, dict)]
+                continue
+            value = _get(document, field)
+            if value is not MISSING:
+                _set(result, field, copy.deepcopy(value))
+        return result
+    result = copy.deepcopy(document)
+    for field in projection:
+        _unset(result, field)
+    return result
+
+
+class FakeCursor:
+    def __init__(self, collection: "FakeCollection", query: dict, projection: Optional[dict]):
+        self.collection = collection
+        self.query = query
+        self.projection = projection
+        self._sort = []
+        self._skip = 0
+        self._limit = 0
+        self._results = None
+
+    def sort(self, key, direction=None):
+        self._sort = [(key, direction or 1)] if isinstance(key, str) else list(key)
+        return self
+
+    def skip(self, count: int):
+        self._skip = count
+        return self
+
+    def limit(self, count: int):
+        self._limit = count
+        return self
+
+    def batch_size(self, size: int):
+        return self
+
+    def max_time_ms(self, milliseconds):
+        return self
+
+    def _evaluate(self) -> List[dict]:
+        documents = [document for document in self.collection.documents.values() if matches(document, self.query)]
+        if self._sort:
+            documents.sort(key=_sort_key(self._sort))
+        documents = documents[self._skip:]
+        if self._limit:
+            documents = documents[:self._limit]
+        return [_project(document, self.projection) for document in documents]
+
+    async def to_list(self, length: Optional[int] = None) -> List[dict]:
+        await self.collection.wait()
+        documents = self._evaluate()
+        return documents if length is None else documents[:length]
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._results is None:
+            await self.collection.wait()
+            self._results = iter(self._evaluate())
+        try:
+            return next(self._results)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class FakeCommandCursor:
+    def __init__(self, collection: "FakeCollection", documents: List[dict]):
+        self.collection = collection
+        self.documents = documents
+        self._results = None
+
+    async def to_list(self, length: Optional[int] = None) -> List[dict]:
+        await self.collection.wait()
+        return self.documents if length is None else self.documents[:length]
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._results is None:
+            await self.collection.wait()
+            self._results = iter(self.documents)
+        try:
+            return next(self._results)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+def _expression(document: dict, expression):
+    if isinstance(expression, str) and expression.startswith("$"):
+        value = _get(document, expression[1:])
+        return None if value is MISSING else value
+    if isinstance(expression, dict) and len(expression) == 1:
+        (operator, operand), = expression.items()
+        if operator == "$literal":
+            return operand
+        if operator == "$ifNull":
+            value = _expression(document, operand[0])
+            return _expression(document, operand[1]) if value is None else value
+        if operator in ("$add", "$multiply", "$subtract", "$divide"):
+            values = [_expression(document, item) for item in operand]
+            result = values[0]
+            for value in values[1:]:
+                result = {
+                    "$add": lambda a, b: a + b, "$multiply": lambda a, b: a * b,
+                    "$subtract": _subtract, "$divide": lambda a, b: a / b,
+                }[operator](result, value)
+            return result
+        if operator == "$cond":
+            condition, then, otherwise = operand if isinstance(operand, list) else (operand["if"], operand["then"], operand["else"])
+            return _expression(document, then if _expression(document, condition) else otherwise)
+        if operator in ("$eq", "$ne", "$gt", "$gte", "$lt", "$lte"):
+            left, right = (_expression(document, item) for item in operand)
+            return _compare(left, operator, right)
+        if operator == "$max":
+            return max(_expression(document, item) for item in operand)
+        if operator == "$exp":
+            return math.exp(_expression(document, operand))
+        if operator == "$and":
+            return all(_expression(document, item) for item in operand)
+        if operator == "$or":
+            return any(_expression(document, item) for item in operand)
+    if isinstance(expression, dict):
+        return {key: _expression(document, value) for key, value in expression.items()}
+    return expression
+
+
+def _subtract(a, b):
+    # The difference of two dates is in milliseconds, as in Mongo
+    if isinstance(a, datetime) and isinstance(b, datetime):
+        return (a - b).total_seconds() * 1000
+    return a - b
+
+
+class FakeCollection:
+    def __init__(self, database: "FakeDatabase", name: str):
+        self.database = database
+        self.name = name
+        self.documents: Dict[Any, dict] = {}
+        self.indexes: List[dict] = []
+        self.calls: List[str] = []
+
+    async def wait(self):
+        self.database.operations += 1
+        if self.database.failure is not None:
+            raise self.database.failure
+        if self.database.capacity:
+            # A server that only works on `capacity` operations at a time queues the rest
+            loop = asyncio.get_running_loop()
+            if self.database.slots is None or self.database.slots[0] is not loop:
+                self.database.slots = (loop, asyncio.Semaphore(self.database.capacity))
+            async with self.database.slots[1]:
+                await asyncio.sleep(self.database.latency)
+        elif self.database.latency:
+            await asyncio.sleep(self.database.latency)
+
+    def with_options(self, **kwargs):
+        return self
+
+    async def create_index(self, keys, unique: bool = False, partialFilterExpression=None, **kwargs):
+        await self.wait()
+        keys = _normalize_sort(keys)
+        name = "_".join(f"{field}_{direction}" for field, direction in keys)
+        if not any(index["name"] == name for index in self.indexes):
+            self.indexes.append({"name": name, "keys": keys, "unique": unique, "partial": partialFilterExpression, **kwargs})
+        return name
+
+    def _check_unique(self, document: dict, ignore_id=MISSING):
+        for index in self.indexes:
+            if not index["unique"]:
+                continue
+            if index["partial"] and not matches(document, index["partial"]):
+                continue
+            key = [_get(document, field) for field, _ in index["keys"]]
+            for other_id, other in self.documents.items():
+                if other_id == ignore_id:
+                    continue
+                if index["partial"] and not matches(other, index["partial"]):
+                    continue
+                if [_get(other, field) for field, _ in index["keys"]] == key:
+                    raise DuplicateKeyError(f"E11000 duplicate key error on {index['name']}")
+
+    def _insert(self, document: dict):
+        if "_id" not in document:
+            from bson import ObjectId
+            document["_id"] = ObjectId()
+        if document["_id"] in self.documents:
+            raise DuplicateKeyError("E11000 duplicate key error on _id")
+        self._check_unique(document)
+        self.documents[document["_id"]] = copy.deepcopy(document)
+
+    async def insert_one(self, document: dict, **kwargs):
+        await self.wait()
+        self._insert(document)
+        return SimpleNamespace(inserted_id=document["_id"], acknowledged=True)
+
+    async def insert_many(self, documents: List[dict], ordered: bool = True, **kwargs):
+        from pymongo.errors import BulkWriteError
+        await self.wait()
+        errors = []
+        for i, document in enumerate(documents):
+            try:
+                self._insert(document)
+            except DuplicateKeyError as e:
+                errors.append({"index": i, "code": 11000, "errmsg": str(e)})
+                if ordered:
+                    break
+        if errors:
+            raise BulkWriteError({"writeErrors": errors})
+        return SimpleNamespace(inserted_ids=[document["_id"] for document in documents])
+
+    async def find_one(self, query: Optional[dict] = None, projection: Optional[dict] = None, sort=None, **kwargs):
+        cursor = self.find(query or {}, projection)
+        if sort:
+            cursor.sort(_normalize_sort(sort))
+        documents = await cursor.limit(1).to_list(length=1)
+        return documents[0] if documents else None
+
+    def find(self, query: Optional[dict] = None, projection: Optional[dict] = None, **kwargs):
+        return FakeCursor(self, query or {}, projection)
+
+    async def count_documents(self, query: dict, **kwargs) -> int:
+        await self.wait()
+        return sum(1 for document in self.documents.values() if matches(document, query))
+
+    async def distinct(self, field: str, query: Optional[dict] = None, **kwargs) -> list:
+        await self.wait()
+        values = []
+        for document in self.documents.values():
+            if matches(document, query or {}):
+                value = _get(document, field)
+                for item in value if isinstance(value, list) else [value]:
+                    if item is not MISSING and item not in values:
+                        values.append(item)
+        return values
+
+    def _apply_update(self, document: dict, update, inserting: bool):
+        if isinstance(update, list):
+            for stage in update:
+                for field, expression in stage["$set"].items():
+                    _set(document, field, _expression(document, expression))
+            return
+        for operator, fields in update.items():
+            for field, value in fields.items():
+                if operator == "$set":
+                    _set(document, field, copy.deepcopy(value))
+                elif operator == "$setOnInsert":
+                    if inserting:
+                        _set(document, field, copy.deepcopy(value))
+                elif operator == "$unset":
+                    _unset(document, field)
+                elif operator == "$inc":
+                    current = _get(document, field)
+                    _set(document, field, (0 if current is MISSING else current) + value)
+                elif operator == "$max":
+                    current = _get(document, field)
+                    _set(document, field, value if current is MISSING or value > current else current)
+                elif operator == "$min":
+                    current = _get(document, field)
+                    _set(document, field, value if current is MISSING or value < current else current)
+                elif operator == "$push":
+                    current = _get(document, field)
+                    items = [] if current is MISSING else list(current)
+                    if isinstance(value, dict) and "$each" in value:
+                        items.extend(copy.deepcopy(value["$each"]))
+                        if "$sort" in value:
+                            items.sort(key=_sort_key(list(value["$sort"].items())))
+                        if "$slice" in value:
+                            items = items[:value["$slice"]]
+                    else:
+                        items.append(copy.deepcopy(value))
+                    _set(document, field, items)
+                elif operator == "$addToSet":
+                    current = _get(document, field)
+                    items = [] if current is MISSING else list(current)
+                    for item in value["$each"] if isinstance(value, dict) and "$each" in value else [value]:
+                        if item not in items:
+                            items.append(copy.deepcopy(item))
+                    _set(document, field, items)
+                elif operator == "$pull":
+                    current = _get(document, field)
+                    if current is not MISSING:
+                        _set(document, field, [item for item in current if not _pulled(item, value)])
+                else:
+                    raise NotImplementedError(f"FakeCollection does not support {operator}")
+
+    def _upsert_document(self, query: dict) -> dict:
+        document = {}
+        for key, value in query.items():
+            if not key.startswith("$") and not (isinstance(value, dict) and any(name.startswith("$") for name in value)):
+                _set(document, key, copy.deepcopy(value))
+        return document
+
+    def _update(self, query: dict, update, upsert: bool, many: bool):
+        matched = [document for document in self.documents.values() if matches(document, query)]
+        if not many:
+            matched = matched[:1]
+        for document in matched:
+            updated = copy.deepcopy(document)
+            self._apply_update(updated, update, inserting=False)
+            self._check_unique(updated, ignore_id=document["_id"])
+            self.documents[document["_id"]] = updated
+        upserted_id = None
+        if not matched and upsert:
+            document = self._upsert_document(query)
+            self._apply_update(document, update, inserting=True)
+            self._insert(document)
+            upserted_id = document["_id"]
+        return SimpleNamespace(
+            matched_count=len(matched), modified_count=len(matched), upserted_id=upserted_id, acknowledged=True
+        )
+
+    async def update_one(self, query: dict, update, upsert: bool = False, **kwargs):
+        await self.wait()
+        return self._update(query, update, upsert, many=False)
+
+    async def update_many(self, query: dict, update, upsert: bool = False, **kwargs):
+        await self.wait()
+        return self._update(query, update, upsert, many=True)
+
+    async def replace_one(self, query: dict, replacement: dict, upsert: bool = False, **kwargs):
+        await self.wait()
+        for document in self.documents.values():
+            if matches(document, query):
+                replacement = {**copy.deepcopy(replacement), "_id": document["_id"]}
+                self.documents[document["_id"]] = replacement
+                return SimpleNamespace(matched_count=1, modified_count=1, upserted_id=None)
+        if upsert:
+            document = {**self._upsert_document(query), **copy.deepcopy(replacement)}
+            self._insert(document)
+            return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=document["_id"])
+        return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=None)
+
+    async def find_one_and_update(
+        self, query: dict, update, projection=None, sort=None, upsert: bool = False,
+        return_document=ReturnDocument.BEFORE, **kwargs
+    ):
+        await self.wait()
+        documents = [document for document in self.documents.values() if matches(document, query)]
+        if sort:
+            documents.sort(key=_sort_key(_normalize_sort(sort)))
+        if not documents:
+            if not upsert:
+                return None
+            result = self._update(query, update, upsert=True, many=False)
+            return _project(self.documents[result.upserted_id], projection) if return_document == ReturnDocument.AFTER else None
+        before = copy.deepcopy(documents[0])
+        self._update({"_id": before["_id"]}, update, upsert=False, many=False)
+        after = self.documents[before["_id"]]
+        return _project(after if return_document == ReturnDocument.AFTER else before, projection)
+
+    async def find_one_and_delete(self, query: dict, sort=None, **kwargs):
+        await self.wait()
+        documents = [document for document in self.documents.values() if matches(document, query)]
+        if sort:
+            documents.sort(key=_sort_key(_normalize_sort(sort)))
+        if not documents:
+            return None
+        return self.documents.pop(documents[0]["_id"])
+
+    async def delete_one(self, query: dict, **kwargs):
+        await self.wait()
+        for document_id, document in list(self.documents.items()):
+            if matches(document, query):
+                del self.documents[document_id]
+                return SimpleNamespace(deleted_count=1)
+        return SimpleNamespace(deleted_count=0)
+
+    async def delete_many(self, query: dict, **kwargs):
+        await self.wait()
+        doomed = [document_id for document_id, document in self.documents.items() if matches(document, query)]
+        for document_id in doomed:
+            del self.documents[document_id]
+        return SimpleNamespace(deleted_count=len(doomed))
+
+    async def bulk_write(self, operations: list, ordered: bool = True, **kwargs):
+        await self.wait()
+        matched = upserted = inserted = 0
+        for operation in operations:
+            document = operation._doc if hasattr(operation, "_doc") else None
+            if type(operation).__name__ == "InsertOne":
+                self._insert(copy.deepcopy(document))
+                inserted += 1
+                continue
+            many = type(operation).__name__ == "UpdateMany"
+            result = self._update(operation._filter, operation._doc, operation._upsert or False, many=many)
+            matched += result.matched_count
+            upserted += result.upserted_id is not None
+        return SimpleNamespace(
+            matched_count=matched, modified_count=matched, upserted_count=upserted, inserted_count=inserted
+        )
+
+    def aggregate(self, pipeline: List[dict], **kwargs):
+        documents = [copy.deepcopy(document) for document in self.documents.values()]
+        for stage in pipeline:
+            (operator, spec), = stage.items()
+            if operator == "$match":
+                documents = [document for document in documents if matches(document, spec)]
+            elif operator == "$sort":
+                documents.sort(key=_sort_key(list(spec.items())))
+            elif operator == "$limit":
+                documents = documents[:spec]
+            elif operator == "$group":
+                groups: Dict[Any, dict] = {}
+                averages: Dict[Any, list] = {}
+                for document in documents:
+                    key = _expression(document, spec["_id"])
+                    hashable = repr(key)
+                    group = groups.setdefault(hashable, {"_id": key})
+                    for field, accumulator in spec.items():
+                        if field == "_id":
+                            continue
+                        (name, expression), = accumulator.items()
+                        value = _expression(document, expression)
+                        if name == "$sum":
+                            group[field] = group.get(field, 0) + (value or 0)
+                        elif name == "$first":
+                            group.setdefault(field, value)
+                        elif name == "$max":
+                            group[field] = value if field not in group else max(group[field], value)
+                        elif name == "$min":
+                            group[field] = value if field not in group else min(group[field], value)
+                        elif name == "$addToSet":
+                            group.setdefault(field, [])
+                            if value not in group[field]:
+                                group[field].append(value)
+                        elif name == "$push":
+                            group.setdefault(field, []).append(value)
+                        elif name == "$avg":
+                            # Non-numeric values are ignored, as in Mongo
+                            total = averages.setdefault((hashable, field), [0, 0])
+                            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                                total[0] += value
+                                total[1] += 1
+                        else:
+                            raise NotImplementedError(f"FakeCollection does not support {name}")
+                for (hashable, field), (total, count) in averages.items():
+                    groups[hashable][field] = total / count if count else None
+                documents = list(groups.values())
+            else:
+                raise NotImplementedError(f"FakeCollection does not support {operator}")
+        return FakeCommandCursor(self, documents)
+
+
+class FakeDatabase:
+    def __init__(self, latency: float = 0, capacity: Optional[int] = None):
+        self.collections: Dict[str, FakeCollection] = {}
+        self.latency = latency
+        self.capacity = capacity
+        self.slots = None  # (event loop, semaphore)
+        self.failure: Optional[Exception] = None
+        self.operations = 0
+
+    def __getitem__(self, name: str) -> FakeCollection:
+        if name not in self.collections:
+            self.collections[name] = FakeCollection(self, name)
+        return self.collections[name]
+
+    def with_options(self, **kwargs):
+        return self
+
+    async def create_collection(self, name: str, **kwargs):
+        if name in self.collections:
+            raise CollectionInvalid(f"collection {name} already exists")
+        return self[name]
+
+    async def list_collection_names(self, filter: Optional[dict] = None, **kwargs) -> List[str]:
+        names = list(self.collections)
+        if filter and "name" in filter:
+            names = [name for name in names if matches({"name": name}, {"name": filter["name"]})]
+        return names
+
+    def watch(self, *args, **kwargs):
+        # Like a standalone mongod: no replica set, no change streams
+        raise OperationFailure("The $changeStream stage is only supported on replica sets", code=40573)
+
+    async def command(self, command, *args, **kwargs):
+        await self[""].wait()
+        return {"ok": 1}
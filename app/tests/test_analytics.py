@@ -0,0 +1,125 @@
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+import services.Analytics as analytics
+import utils.auth as auth
+from models.Appointment import AppStatus
+from models.ChangeEvent import ChangeEvent, OperationType
+from services.Analytics import AnalyticsService
+from services.Archive import get_archive_service
+from services.Job import get_job_service
+from utils.auth import create_access_token
+
+CLINIC_ID, SERVICE_ID, STAFF_ID = str(uuid4()), str(uuid4()), str(uuid4())
+LONG_AGO = (datetime.utcnow() - timedelta(days=400)).replace(hour=10, minute=0, second=0, microsecond=0)
+
+
+def appointment(start_time: datetime) -> dict:
+    return {
+        "_id": str(uuid4()), "clinic_id": CLINIC_ID, "staff_id": STAFF_ID, "service_id": SERVICE_ID,
+        "customer_id": str(uuid4()), "status": AppStatus.completed.value,
+        "start_time": start_time, "end_time": start_time + timedelta(minutes=30)
+    }
+
+
+def rollups(fake_db) -> dict:
+    return {cell_id: cell["revenue"] for cell_id, cell in fake_db["daily_rollups"].documents.items()}
+
+
+def test_archiving_keeps_rollups_and_rebuild_reads_the_archive(fake_db, run):
+    fake_db["services"].documents[SERVICE_ID] = {"_id": SERVICE_ID, "clinic_id": CLINIC_ID, "price": 40}
+    old = appointment(LONG_AGO)
+    fake_db["appointments"].documents[old["_id"]] = old
+
+    async def scenario():
+        service = AnalyticsService()
+        await service.on_appointment_change(ChangeEvent(
+            collection="appointments", operation=OperationType.insert, document_id=old["_id"], document=dict(old)
+        ))
+        before = rollups(fake_db)
+        await get_archive_service().archive_appointments()
+        await service.on_appointment_change(ChangeEvent(
+            collection="appointments", operation=OperationType.delete, document_id=old["_id"]
+        ))
+        after_archive = rollups(fake_db)
+        await service.rebuild(LONG_AGO.date(), LONG_AGO.date())
+        return before, after_archive, rollups(fake_db)
+
+    before, after_archive, rebuilt = run(scenario())
+
+    assert old["_id"] not in fake_db["appointments"].documents
+    assert list(before.values()) == [40]
+    assert after_archive == before
+    assert rebuilt == before
+
+
+def test_rebuild_zeroes_cells_nothing_contributes_to(fake_db, run):
+    day = LONG_AGO.date().isoformat()
+    stale_id = f"{day}|{CLINIC_ID}|{STAFF_ID}|{SERVICE_ID}"
+    fake_db["daily_rollups"].documents[stale_id] = {
+        "_id": stale_id, "day": day, "clinic_id": CLINIC_ID, "staff_id": STAFF_ID, "service_id": SERVICE_ID,
+        "appointments": 3, "revenue": 120
+    }
+
+    counts = run(AnalyticsService().rebuild(LONG_AGO.date(), LONG_AGO.date()))
+
+    assert counts["cells"] == 0
+    assert fake_db["daily_rollups"].documents[stale_id]["revenue"] == 0
+    assert fake_db["daily_rollups"].documents[stale_id]["appointments"] == 0
+
+
+def test_rebuild_keeps_an_event_applied_while_it_ran(fake_db, run, monkeypatch):
+    fake_db["services"].documents[SERVICE_ID] = {"_id": SERVICE_ID, "clinic_id": CLINIC_ID, "price": 40}
+    booked = {**appointment(LONG_AGO), "status": AppStatus.booked.value}
+    fake_db["appointments"].documents[booked["_id"]] = booked
+    service = AnalyticsService()
+
+    async def complete():
+        booked["status"] = AppStatus.completed.value
+        await service.on_appointment_change(ChangeEvent(
+            collection="appointments", operation=OperationType.update, document_id=booked["_id"], document=dict(booked)
+        ))
+
+    class AvailabilityAfterACompletion:
+        """The rebuild has read the appointment as booked; it is completed before the rebuild writes"""
+
+        def find(self, *args, **kwargs):
+            async def documents():
+                await complete()
+                async for document in fake_db["availability"].find(*args, **kwargs):
+                    yield document
+            return documents()
+
+    monkeypatch.setattr(analytics, "get_availability_collection", AvailabilityAfterACompletion)
+
+    async def scenario():
+        await service.on_appointment_change(ChangeEvent(
+            collection="appointments", operation=OperationType.insert, document_id=booked["_id"], document=dict(booked)
+        ))
+        await service.rebuild(LONG_AGO.date(), LONG_AGO.date())
+
+    run(scenario())
+
+    (cell,) = fake_db["daily_rollups"].documents.values()
+    contribution = fake_db["rollup_contributions"].documents[f"appointments:{booked['_id']}"]
+    assert (cell["completed"], cell["booked"], cell["revenue"]) == (1, 0, 40)
+    assert contribution["metrics"] == {"appointments": 1, "booked_minutes": 30, "expected_revenue": 40, "completed": 1, "revenue": 40}
+
+
+def test_rebuild_route_is_admin_only_and_queues_one_job_per_range(api, run, fake_db, monkeypatch):
+    monkeypatch.setattr(auth, "SECRET_KEY", "test-secret")
+    monkeypatch.setattr(auth, "ALGORITHM", "HS256")
+    admin = {"Authorization": f"Bearer {create_access_token({'user_id': 'admin-1', 'role': 'admin'})}"}
+
+    async def scenario():
+        await get_job_service().ensure_indexes()
+        first = await api("POST", "/analytics/rebuild?start_date=2026-01-01&end_date=2026-01-31", headers=admin)
+        again = await api("POST", "/analytics/rebuild?start_date=2026-01-01&end_date=2026-01-31", headers=admin)
+        other = await api("POST", "/analytics/rebuild?start_date=2026-02-01&end_date=2026-02-28", headers=admin)
+        return first, again, other
+
+    first, again, other = run(scenario())
+
+    assert first.status == again.status == other.status == 202
+    assert again.json()["job_id"] == first.json()["job_id"] != other.json()["job_id"]
+    assert len(fake_db["jobs"].documents) == 2
@@ -0,0 +1,112 @@
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+import pytest
+
+CLINIC_ID, SERVICE_ID, STAFF_ID, CUSTOMER_ID = (str(uuid4()) for _ in range(4))
+DAY = (datetime.utcnow() + timedelta(days=7)).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+@pytest.fixture
+def clinic(fake_db):
+    fake_db["users"].documents[CUSTOMER_ID] = {"_id": CUSTOMER_ID, "email": "customer@example.com"}
+    fake_db["clinics"].documents[CLINIC_ID] = {"_id": CLINIC_ID, "name": "Clinic"}
+    fake_db["services"].documents[SERVICE_ID] = {"_id": SERVICE_ID, "clinic_id": CLINIC_ID, "name": "Checkup", "duration_minutes": 30}
+    fake_db["staff"].documents[STAFF_ID] = {"_id": STAFF_ID, "clinic_id": CLINIC_ID, "service_ids": [SERVICE_ID]}
+    return fake_db
+
+
+def booking(hour: int) -> dict:
+    start_time = DAY + timedelta(hours=hour)
+    return {
+        "customer_id": CUSTOMER_ID, "clinic_id": CLINIC_ID, "service_id": SERVICE_ID, "staff_id": STAFF_ID,
+        "start_time": start_time.isoformat(), "end_time": (start_time + timedelta(minutes=30)).isoformat()
+    }
+
+
+def test_book_read_complete_and_delete_over_http(clinic, api, run):
+    async def scenario():
+        created = await api("POST", "/appointments/", json=booking(10))
+        appointment_id = created.json()["id"]
+        conflict = await api("POST", "/appointments/", json=booking(10))
+        fetched = await api("GET", f"/appointments/{appointment_id}")
+        completed = await api("PUT", f"/appointments/{appointment_id}/complete")
+        after_complete = await api("GET", f"/appointments/{appointment_id}")
+        deleted = await api("DELETE", f"/appointments/{appointment_id}")
+        missing = await api("GET", f"/appointments/{appointment_id}")
+        return created, conflict, fetched, completed, after_complete, deleted, missing
+
+    created, conflict, fetched, completed, after_complete, deleted, missing = run(scenario())
+
+    assert created.status == 201
+    assert conflict.status == 400
+    assert fetched.status == 200 and fetched.json()["id"] == created.json()["id"]
+    assert completed.status == 200
+    assert after_complete.json()["status"] == "completed"
+    assert deleted.status == 200
+    assert missing.status == 404
+    assert not clinic["staff_slots"].documents
+
+
+def test_reschedule_over_http_moves_the_slot_claims(clinic, api, run):
+    async def scenario():
+        created = await api("POST", "/appointments/", json=booking(10))
+        moved = await api("PUT", f"/appointments/{created.json()['id']}", json={
+            "start_time": booking(12)["start_time"], "end_time": booking(12)["end_time"]
+        })
+        rebooked = await api("POST", "/appointments/", json=booking(10))
+        return moved, rebooked
+
+    moved, rebooked = run(scenario())
+
+    assert moved.status == 200
+    assert moved.json()["start_time"].startswith(booking(12)["start_time"][:16])
+    assert rebooked.status == 201
+
+
+def test_upcoming_index_follows_every_route(clinic, api, run):
+    clinic["availability"].documents["window"] = {
+        "_id": "window", "clinic_id": CLINIC_ID, "staff_id": STAFF_ID,
+        "start_time": DAY + timedelta(hours=8), "end_time": DAY + timedelta(hours=18)
+    }
+
+    async def upcoming():
+        return [entry["id"] for entry in (await api("GET", f"/appointments/customer/{CUSTOMER_ID}/upcoming")).json()]
+
+    async def scenario():
+        named = (await api("POST", "/appointments/", json=booking(9))).json()["id"]
+        auto = (await api("POST", "/appointments/auto", json={
+            "customer_id": CUSTOMER_ID, "clinic_id": CLINIC_ID, "service_id": SERVICE_ID, "start_time": booking(11)["start_time"]
+        })).json()["id"]
+        later = (await api("POST", "/appointments/", json=booking(14))).json()["id"]
+        booked = await upcoming()
+        await api("PUT", f"/appointments/{named}/cancel")
+        await api("PUT", f"/appointments/{auto}/complete")
+        await api("PUT", f"/appointments/{later}", json={"start_time": booking(8)["start_time"], "end_time": booking(8)["end_time"]})
+        after_changes = await upcoming()
+        await api("DELETE", f"/appointments/{later}")
+        return (named, auto, later), booked, after_changes, await upcoming()
+
+    (named, auto, later), booked, after_changes, after_delete = run(scenario())
+
+    assert booked == [named, auto, later]
+    assert after_changes == [later]
+    assert after_delete == []
+
+
+def test_cancel_over_http_frees_the_slot_and_queues_a_waitlist_match(clinic, api, run):
+    async def scenario():
+        appointment_id = (await api("POST", "/appointments/", json=booking(10))).json()["id"]
+        canceled = await api("PUT", f"/appointments/{appointment_id}/cancel")
+        again = await api("PUT", f"/appointments/{appointment_id}/cancel")
+        rebooked = await api("POST", "/appointments/", json=booking(10))
+        return canceled, again, rebooked
+
+    canceled, again, rebooked = run(scenario())
+
+    assert canceled.status == again.status == 200
+    assert rebooked.status == 201
+    matches = [job for job in clinic["jobs"].documents.values() if job["type"] == "waitlist.match"]
+    assert len(matches) == 1
+    assert matches[0]["payload"]["staff_id"] == STAFF_ID
+    assert matches[0]["payload"]["start_time"] == DAY + timedelta(hours=10)
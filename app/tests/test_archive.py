@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta
+from uuid import UUID, uuid4
+
+from models.Appointment import AppStatus
+from services.Appointment import AppointmentService
+from services.Archive import AppointmentArchiveService
+
+CLINIC_ID, CUSTOMER_ID = str(uuid4()), str(uuid4())
+LONG_AGO = (datetime.utcnow() - timedelta(days=400)).replace(hour=10, minute=0, second=0, microsecond=0)
+ARCHIVE = f"appointments_archive_{LONG_AGO.year:04d}_{LONG_AGO.month:02d}"
+
+
+def appointment(start_time: datetime, status: AppStatus) -> dict:
+    return {
+        "_id": str(uuid4()), "customer_id": CUSTOMER_ID, "clinic_id": CLINIC_ID, "service_id": str(uuid4()),
+        "staff_id": str(uuid4()), "status": status.value,
+        "start_time": start_time, "end_time": start_time + timedelta(minutes=30), "updated_at": start_time
+    }
+
+
+def test_old_finished_appointments_move_to_their_month_and_stay_findable(fake_db, run):
+    completed = appointment(LONG_AGO, AppStatus.completed)
+    # Still booked, or too recent: both stay in the hot collection
+    booked = appointment(LONG_AGO, AppStatus.booked)
+    recent = appointment(datetime.utcnow() - timedelta(days=3), AppStatus.completed)
+    for document in (completed, booked, recent):
+        fake_db["appointments"].documents[document["_id"]] = dict(document)
+
+    async def scenario():
+        result = await AppointmentArchiveService().archive_appointments()
+        found = await AppointmentService().get_appointments_by_customer(
+            UUID(CUSTOMER_ID), start_date=LONG_AGO - timedelta(days=1), end_date=datetime.utcnow()
+        )
+        return result, found
+
+    result, found = run(scenario())
+
+    assert result["archived"] == 1 and result["months"] == [ARCHIVE[len("appointments_archive_"):]]
+    assert set(fake_db["appointments"].documents) == {booked["_id"], recent["_id"]}
+    assert fake_db[ARCHIVE].documents == {completed["_id"]: completed}
+    assert sorted(str(a.id) for a in found) == sorted(d["_id"] for d in (completed, booked, recent))
+
+
+def test_an_appointment_changed_after_its_copy_stays_live_only(fake_db, run, monkeypatch):
+    canceled = appointment(LONG_AGO, AppStatus.canceled)
+    fake_db["appointments"].documents[canceled["_id"]] = dict(canceled)
+    service = AppointmentArchiveService()
+    copy_to_archive = service._copy_to_archive
+
+    async def copy_then_rebook(month, appointments):
+        await copy_to_archive(month, appointments)
+        # Rebooked between the copy and the delete
+        fake_db["appointments"].documents[canceled["_id"]]["status"] = AppStatus.booked.value
+
+    monkeypatch.setattr(service, "_copy_to_archive", copy_then_rebook)
+
+    async def scenario():
+        result = await service.archive_appointments()
+        found = await AppointmentService().get_appointments_by_customer(
+            UUID(CUSTOMER_ID), start_date=LONG_AGO - timedelta(days=1), end_date=datetime.utcnow()
+        )
+        return result, found
+
+    result, found = run(scenario())
+
+    assert result["archived"] == 0
+    assert fake_db["appointments"].documents[canceled["_id"]]["status"] == AppStatus.booked.value
+    assert fake_db[ARCHIVE].documents == {}
+    assert [(str(a.id), a.status) for a in found] == [(canceled["_id"], AppStatus.booked)]
@@ -0,0 +1,33 @@
+import pytest
+
+import utils.auth as auth
+from utils.auth import create_access_token
+
+
+@pytest.fixture(autouse=True)
+def signing_key(monkeypatch):
+    monkeypatch.setattr(auth, "SECRET_KEY", "test-secret")
+    monkeypatch.setattr(auth, "ALGORITHM", "HS256")
+
+
+def bearer(**claims) -> dict:
+    return {"Authorization": f"Bearer {create_access_token(claims)}"}
+
+
+@pytest.mark.parametrize("method, path", [
+    ("GET", "/exports/appointments"), ("POST", "/imports"), ("POST", "/analytics/rebuild?start_date=2026-01-01&end_date=2026-01-31")
+])
+def test_admin_routes_refuse_other_roles(api, run, method, path):
+    anonymous = run(api(method, path))
+    forged = run(api(method, path, headers={"Authorization": "Bearer not-a-token"}))
+    staff = run(api(method, path, headers=bearer(user_id="u1", role="staff")))
+
+    assert anonymous.status == 403
+    assert forged.status == 401
+    assert staff.status == 403 and staff.json()["detail"] == "Admin access required"
+
+
+def test_admin_user_is_the_token_subject(run):
+    credentials = auth.HTTPAuthorizationCredentials(scheme="Bearer", credentials=create_access_token({"user_id": "u1", "role": "admin"}))
+
+    assert run(auth.get_admin_user(credentials)) == "u1"
@@ -0,0 +1,95 @@
+import asyncio
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+import pytest
+from fastapi import HTTPException
+
+from schemas.Appointment import AppointmentAutoCreate, AppointmentCreate, AppointmentUpdate
+from services.Appointment import AppointmentService
+from services.Assignment import AssignmentService
+from services.Booking import claim_slots, slot_starts
+
+CLINIC_ID, SERVICE_ID, STAFF_ID, CUSTOMER_ID = (str(uuid4()) for _ in range(4))
+DAY = (datetime.utcnow() + timedelta(days=7)).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+@pytest.fixture
+def clinic(fake_db):
+    fake_db["users"].documents[CUSTOMER_ID] = {"_id": CUSTOMER_ID, "email": "customer@example.com"}
+    fake_db["clinics"].documents[CLINIC_ID] = {"_id": CLINIC_ID, "name": "Clinic"}
+    fake_db["services"].documents[SERVICE_ID] = {"_id": SERVICE_ID, "clinic_id": CLINIC_ID, "name": "Checkup", "duration_minutes": 30}
+    fake_db["staff"].documents[STAFF_ID] = {"_id": STAFF_ID, "clinic_id": CLINIC_ID, "service_ids": [SERVICE_ID]}
+    fake_db["availability"].documents["window"] = {
+        "_id": "window", "clinic_id": CLINIC_ID, "staff_id": STAFF_ID,
+        "start_time": DAY + timedelta(hours=9), "end_time": DAY + timedelta(hours=17)
+    }
+    return fake_db
+
+
+def named(hour: float, minutes: int = 30) -> AppointmentCreate:
+    start_time = DAY + timedelta(hours=hour)
+    return AppointmentCreate(
+        customer_id=CUSTOMER_ID, clinic_id=CLINIC_ID, service_id=SERVICE_ID, staff_id=STAFF_ID,
+        start_time=start_time, end_time=start_time + timedelta(minutes=minutes)
+    )
+
+
+def test_slots_cover_partial_grid_cells():
+    starts = slot_starts(DAY + timedelta(minutes=7), DAY + timedelta(minutes=16))
+    assert starts == [DAY + timedelta(minutes=5), DAY + timedelta(minutes=10), DAY + timedelta(minutes=15)]
+
+
+def test_named_and_auto_bookings_race_for_one_slot(clinic, run):
+    clinic.latency = 0.001
+
+    async def scenario():
+        return await asyncio.gather(
+            AppointmentService().create_appointment(named(10)),
+            AssignmentService().auto_assign(AppointmentAutoCreate(
+                customer_id=CUSTOMER_ID, clinic_id=CLINIC_ID, service_id=SERVICE_ID, start_time=DAY + timedelta(hours=10, minutes=15)
+            )),
+            return_exceptions=True
+        )
+
+    outcomes = run(scenario())
+
+    assert sum(not isinstance(outcome, Exception) for outcome in outcomes) == 1
+    assert all(isinstance(outcome, HTTPException) for outcome in outcomes if isinstance(outcome, Exception))
+    assert len(clinic["appointments"].documents) == 1
+
+
+def test_reschedule_needs_the_new_slots_and_cancel_frees_them(clinic, run):
+    service = AppointmentService()
+
+    async def scenario():
+        first = await service.create_appointment(named(10))
+        second = await service.create_appointment(named(11))
+        with pytest.raises(HTTPException):
+            # Bypass the pre-check so only the slot claim stands in the way
+            service._check_scheduling_conflicts = lambda *args, **kwargs: asyncio.sleep(0)
+            await service.update_appointment(second.id, AppointmentUpdate(status=None, start_time=named(10).start_time, end_time=None))
+        await service.update_appointment(first.id, AppointmentUpdate(status="canceled", start_time=None, end_time=None))
+        return await service.update_appointment(second.id, AppointmentUpdate(status=None, start_time=named(10).start_time, end_time=named(10).end_time))
+
+    moved = run(scenario())
+
+    assert moved.start_time == named(10).start_time
+    held = {claim["slot"] for claim in clinic["staff_slots"].documents.values()}
+    assert held == set(slot_starts(named(10).start_time, named(10).end_time))
+
+
+def test_orphan_claims_are_taken_over(clinic, run):
+    crashed = str(uuid4())
+    start_time, end_time = named(10).start_time, named(10).end_time
+
+    async def scenario():
+        await claim_slots(crashed, CLINIC_ID, STAFF_ID, start_time, end_time)
+        fresh = await claim_slots(str(uuid4()), CLINIC_ID, STAFF_ID, start_time, end_time)
+        for claim in clinic["staff_slots"].documents.values():
+            claim["claimed_at"] -= timedelta(hours=1)
+        stale = await claim_slots(str(uuid4()), CLINIC_ID, STAFF_ID, start_time, end_time)
+        return fresh, stale
+
+    # Within the grace period the claim may still be a booking about to insert its appointment
+    assert run(scenario()) == (False, True)
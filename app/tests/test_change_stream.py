@@ -0,0 +1,128 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from pymongo.errors import AutoReconnect, OperationFailure
+
+import services.ChangeStream as change_stream
+from models.ChangeEvent import OperationType
+from services.Analytics import rebuild_recent_rollups
+from services.ChangeStream import CHANGE_STREAM_HISTORY_LOST, ChangeStreamListener
+
+
+def test_polling_emits_every_write_once(fake_db, run, monkeypatch):
+    monkeypatch.setattr(change_stream, "POLL_SETTLE_SECONDS", 0)
+    monkeypatch.setattr(change_stream, "CHANGE_STREAM_POLL_INTERVAL_SECONDS", 0.01)
+    seen = []
+
+    async def record(event):
+        seen.append(event.document_id)
+
+    monkeypatch.setitem(change_stream._subscribers, "appointments", [record])
+    monkeypatch.setattr(change_stream, "_resyncers", [])
+
+    async def scenario():
+        appointments = fake_db["appointments"]
+        stamp = datetime.utcnow() + timedelta(milliseconds=5)
+        # Writes sharing one timestamp, as a bulk write or update_many leaves them
+        await appointments.insert_one({"_id": "a", "updated_at": stamp})
+        await appointments.insert_one({"_id": "b", "updated_at": stamp})
+
+        task = asyncio.create_task(ChangeStreamListener().run())
+        await asyncio.sleep(0.05)
+        await appointments.insert_one({"_id": "c", "updated_at": stamp})
+        await appointments.update_one({"_id": "a"}, {"$set": {"updated_at": stamp + timedelta(milliseconds=1)}})
+        await asyncio.sleep(0.05)
+        task.cancel()
+
+    run(scenario())
+    assert seen == ["a", "b", "c", "a"]
+
+
+def test_polling_resyncs_for_the_deletes_it_cannot_see(fake_db, run, monkeypatch):
+    monkeypatch.setattr(change_stream, "CHANGE_STREAM_POLL_INTERVAL_SECONDS", 0.01)
+    monkeypatch.setattr(change_stream, "CHANGE_STREAM_POLL_RESYNC_SECONDS", 0.05)
+    monkeypatch.setattr(change_stream, "_resyncers", [rebuild_recent_rollups])
+
+    async def scenario():
+        task = asyncio.create_task(ChangeStreamListener().run())
+        await asyncio.sleep(0.12)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    run(scenario())
+
+    rebuilds = [job for job in fake_db["jobs"].documents.values() if job["type"] == "analytics.rebuild_rollups"]
+    # Once on falling back to polling, then once per resync period
+    assert len(rebuilds) >= 2
+    assert rebuilds[0]["payload"]["start_date"] < rebuilds[0]["payload"]["end_date"]
+
+
+class FakeChangeStream:
+    """What Motor's watch() hands back: the given changes, then an error or an open, idle stream"""
+
+    def __init__(self, changes, error=None):
+        self.changes = changes
+        self.error = error
+        self.resume_token = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def __aiter__(self):
+        for change in self.changes:
+            self.resume_token = change["_id"]
+            yield change
+        if self.error is not None:
+            raise self.error
+        await asyncio.Event().wait()
+
+
+def change(token: str, operation: str, document_id: str) -> dict:
+    document = {"_id": document_id} if operation != "delete" else None
+    return {
+        "_id": {"_data": token}, "operationType": operation, "ns": {"db": "test", "coll": "appointments"},
+        "documentKey": {"_id": document_id}, "fullDocument": document
+    }
+
+
+def test_watch_resumes_after_the_last_token_and_resyncs_when_history_is_lost(fake_db, run, monkeypatch):
+    monkeypatch.setattr(change_stream, "TOKEN_FLUSH_INTERVAL_SECONDS", 0)
+    monkeypatch.setattr(change_stream, "CHANGE_STREAM_POLL_INTERVAL_SECONDS", 0)
+    streams = [
+        FakeChangeStream([change("t1", "insert", "a"), change("t2", "drop", "a")], error=AutoReconnect("primary stepped down")),
+        FakeChangeStream([change("t3", "delete", "a")], error=OperationFailure("history lost", code=CHANGE_STREAM_HISTORY_LOST)),
+        FakeChangeStream([change("t4", "update", "b")]),
+    ]
+    resumed_after, seen, resyncs = [], [], []
+
+    def watch(pipeline, full_document=None, resume_after=None):
+        resumed_after.append(resume_after)
+        return streams.pop(0)
+
+    async def record(event):
+        seen.append((event.operation, event.document_id))
+
+    async def count_resync():
+        resyncs.append(datetime.utcnow())
+
+    monkeypatch.setattr(fake_db, "watch", watch, raising=False)
+    monkeypatch.setitem(change_stream._subscribers, "appointments", [record])
+    monkeypatch.setattr(change_stream, "_resyncers", [count_resync])
+
+    async def scenario():
+        listener = ChangeStreamListener(name="test")
+        task = asyncio.create_task(listener.run())
+        await asyncio.sleep(0.05)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    run(scenario())
+
+    assert seen == [(OperationType.insert, "a"), (OperationType.delete, "a"), (OperationType.update, "b")]
+    # After the network error the stream resumes right after the drop; after losing history it starts over
+    assert resumed_after == [None, {"_data": "t2"}, None]
+    assert len(resyncs) == 1
+    assert fake_db["change_stream_tokens"].documents["test"]["resume_token"] == {"_data": "t4"}
@@ -0,0 +1,75 @@
+import asyncio
+import time
+
+from utils.concurrency import AdaptiveConcurrencyLimiter, ConcurrencyLimitMiddleware, PRIORITY_NORMAL
+
+
+def limiter(**kwargs) -> AdaptiveConcurrencyLimiter:
+    options = dict(
+        initial_limit=4, min_limit=1, max_limit=8, target_latency_ms=100,
+        queue_deadlines_ms={0: 400, 1: 100, 2: 50}
+    )
+    options.update(kwargs)
+    return AdaptiveConcurrencyLimiter(**options)
+
+
+async def call(app, method: str, path: str):
+    started = time.monotonic()
+    status = None
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app({"type": "http", "method": method, "path": path, "headers": []}, None, send)
+    return status, time.monotonic() - started
+
+
+def test_tail_latency_stays_bounded_when_the_db_slows_down(fake_db, run):
+    # Mongo works on 4 operations at a time, 20 ms each: 220 concurrent requests queue for over a second
+    fake_db.latency, fake_db.capacity = 0.02, 4
+
+    async def app(scope, receive, send):
+        await fake_db["appointments"].find_one({})
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def burst(handler):
+        requests = [call(handler, "GET", "/services/") for _ in range(200)]
+        requests += [call(handler, "POST", "/appointments/") for _ in range(20)]
+        return await asyncio.gather(*requests)
+
+    unlimited = run(burst(app))
+    limited = run(burst(ConcurrencyLimitMiddleware(app, limiter())))
+
+    assert max(latency for _, latency in unlimited) > 1.0
+    # Admitted or shed, nobody waits much past their priority's queue deadline plus one query
+    assert max(latency for _, latency in limited) < 0.6
+    statuses = [status for status, _ in limited]
+    assert 503 in statuses[:200]
+    # Bookings outrank listings, so they get through while listings are shed
+    assert statuses[200:].count(200) == 20
+
+
+def test_cancelled_waiters_do_not_hold_up_new_requests(run):
+    async def scenario():
+        limits = limiter(initial_limit=1, queue_deadlines_ms={0: 1000, 1: 1000, 2: 1000})
+        assert await limits.acquire()
+        queued = [asyncio.create_task(limits.acquire(priority)) for priority in (2, 1, 2)]
+        await asyncio.sleep(0)
+        queued[0].cancel()
+        queued[2].cancel()
+        await asyncio.gather(queued[0], queued[2], return_exceptions=True)
+        assert limits.snapshot()["queued"] == 1
+
+        limits.release(0.001)
+        assert await queued[1]
+        queued[1].cancel()
+        limits.release(0.001)
+
+        # Only abandoned entries are left: a new request is admitted straight away
+        assert limits.snapshot()["queued"] == 0
+        return await asyncio.wait_for(limits.acquire(PRIORITY_NORMAL), timeout=0.01)
+
+    assert run(scenario())
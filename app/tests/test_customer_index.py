@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+from services.CustomerIndex import CustomerAppointmentIndexService
+
+CUSTOMER_ID = str(uuid4())
+
+
+def appointment(start_time: datetime) -> dict:
+    return {
+        "_id": str(uuid4()), "customer_id": CUSTOMER_ID, "clinic_id": str(uuid4()), "service_id": str(uuid4()),
+        "staff_id": str(uuid4()), "start_time": start_time, "end_time": start_time + timedelta(minutes=30),
+        "status": "booked"
+    }
+
+
+def book(fake_db, start_time: datetime) -> dict:
+    booked = appointment(start_time)
+    fake_db["appointments"].documents[booked["_id"]] = booked
+    return booked
+
+
+def index_entry(booked: dict) -> dict:
+    return {"id": booked["_id"], **{field: value for field, value in booked.items() if field != "_id"}}
+
+
+def set_index(fake_db, appointments: list):
+    fake_db["customer_appointment_index"].documents[CUSTOMER_ID] = {
+        "_id": CUSTOMER_ID, "upcoming": [index_entry(booked) for booked in appointments]
+    }
+
+
+def stored(fake_db) -> list:
+    return [entry["id"] for entry in fake_db["customer_appointment_index"].documents[CUSTOMER_ID]["upcoming"]]
+
+
+def test_add_prunes_past_entries_before_pushing(fake_db, run):
+    index = CustomerAppointmentIndexService(size=3)
+    now = datetime.utcnow()
+    past = book(fake_db, now - timedelta(hours=1))
+    future = book(fake_db, now + timedelta(days=2))
+    set_index(fake_db, [past, future])
+
+    fresh = book(fake_db, now + timedelta(days=1))
+    run(index.add(fresh))
+
+    assert stored(fake_db) == [fresh["_id"], future["_id"]]
+
+
+def test_add_to_a_full_list_with_past_entries_rebuilds(fake_db, run):
+    index = CustomerAppointmentIndexService(size=3)
+    now = datetime.utcnow()
+    past = [book(fake_db, now - timedelta(hours=i + 1)) for i in range(2)]
+    later = [book(fake_db, now + timedelta(days=i + 1)) for i in range(3)]
+    # The full list sliced later[1:] off while the past entries still held their slots
+    set_index(fake_db, past[::-1] + later[:1])
+
+    fresh = book(fake_db, now + timedelta(hours=2))
+    run(index.add(fresh))
+
+    assert stored(fake_db) == [fresh["_id"], later[0]["_id"], later[1]["_id"]]
+
+
+def test_full_list_past_entries_rebuild_on_read(fake_db, run):
+    index = CustomerAppointmentIndexService(size=2)
+    now = datetime.utcnow()
+    past = book(fake_db, now - timedelta(hours=1))
+    future = [book(fake_db, now + timedelta(days=i + 1)) for i in range(3)]
+    set_index(fake_db, [past, future[0]])
+
+    upcoming = run(index.get_upcoming(CUSTOMER_ID))
+
+    assert [str(entry.id) for entry in upcoming] == [future[0]["_id"], future[1]["_id"]]
+
+
+def test_partial_list_is_served_without_rebuilding(fake_db, run):
+    index = CustomerAppointmentIndexService(size=5)
+    now = datetime.utcnow()
+    future = book(fake_db, now + timedelta(days=1))
+    run(index.add(future))
+    unindexed = book(fake_db, now + timedelta(days=2))
+
+    upcoming = run(index.get_upcoming(CUSTOMER_ID))
+
+    assert [str(entry.id) for entry in upcoming] == [future["_id"]]
+    assert unindexed["_id"] not in stored(fake_db)
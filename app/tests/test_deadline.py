@@ -0,0 +1,22 @@
+import pytest
+
+from config import DEADLINE_DEFAULT_MS, DEADLINE_HEADER, DEADLINE_MAX_MS
+from utils.deadline import get_request_timeout_ms
+
+
+def scope(value: str) -> dict:
+    return {"path": "/services/", "headers": [(DEADLINE_HEADER.lower().encode("latin-1"), value.encode())]}
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("250", 250.0),
+    ("-5", 1.0),
+    ("0", 1.0),
+    (str(DEADLINE_MAX_MS * 10), DEADLINE_MAX_MS),
+    ("nan", DEADLINE_DEFAULT_MS),
+    ("inf", DEADLINE_DEFAULT_MS),
+    ("-inf", DEADLINE_DEFAULT_MS),
+    ("soon", DEADLINE_DEFAULT_MS),
+])
+def test_client_timeout_is_clamped(value, expected):
+    assert get_request_timeout_ms(scope(value)) == expected
@@ -0,0 +1,44 @@
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+from bson import ObjectId
+
+from models.Appointment import AppStatus
+from services.Export import ExportService
+
+CLINIC_ID = str(uuid4())
+NOW = datetime.utcnow().replace(microsecond=0)
+
+
+def appointment(document_id, start_time: datetime) -> dict:
+    return {
+        "_id": document_id, "customer_id": str(uuid4()), "clinic_id": CLINIC_ID, "service_id": str(uuid4()),
+        "staff_id": str(uuid4()), "status": AppStatus.completed.value,
+        "start_time": start_time, "end_time": start_time + timedelta(minutes=30)
+    }
+
+
+def exported(run, filters: dict, after=None) -> list:
+    async def collect():
+        return [row["id"] async for rows, _ in ExportService().iter_row_groups("appointments", filters, after) for row in rows]
+    return run(collect())
+
+
+def test_export_merges_monthly_archives_in_id_order(fake_db, run):
+    old = NOW - timedelta(days=500)
+    month = f"{old.year:04d}_{old.month:02d}"
+    archived = [appointment("a-archived", old), appointment(ObjectId(), old)]
+    live = [appointment("b-live", NOW), appointment(ObjectId(), NOW)]
+    for document in archived:
+        fake_db[f"appointments_archive_{month}"].documents[document["_id"]] = document
+    for document in live:
+        fake_db["appointments"].documents[document["_id"]] = document
+    # Copied to the archive but not yet deleted from the hot collection
+    fake_db["appointments"].documents["a-archived"] = dict(archived[0])
+
+    everything = exported(run, {})
+    expected = ["a-archived", "b-live", str(archived[1]["_id"]), str(live[1]["_id"])]
+
+    assert everything == expected
+    assert exported(run, {}, after="b-live") == expected[2:]
+    assert exported(run, {"start_date": NOW.date().isoformat()}) == ["b-live", str(live[1]["_id"])]
@@ -0,0 +1,31 @@
+from datetime import datetime
+from uuid import uuid4
+
+import orjson
+
+from models.Review import ReviewTarget
+from schemas.Review import ReviewOut
+from utils.fast_response import fast_list_response
+
+
+def test_fast_path_fills_defaults_like_the_model_path():
+    # Written before helpful votes existed: no helpful_count, and no comment either
+    legacy = {
+        "_id": str(uuid4()), "user_id": str(uuid4()), "target_id": str(uuid4()),
+        "target_type": ReviewTarget.staff.value, "rating": 4, "created_at": datetime(2025, 1, 1, 9, 30)
+    }
+    current = {**legacy, "_id": str(uuid4()), "comment": "Quick and kind", "helpful_count": 3}
+
+    fast = orjson.loads(fast_list_response(ReviewOut, [legacy, current]).body)
+    # What the review routes build for the same documents without the fast path
+    model = [
+        orjson.loads(ReviewOut(
+            id=document["_id"], user_id=document["user_id"], target_id=document["target_id"],
+            target_type=document["target_type"], rating=document["rating"], comment=document.get("comment"),
+            created_at=document["created_at"], helpful_count=document.get("helpful_count", 0)
+        ).model_dump_json())
+        for document in (legacy, current)
+    ]
+
+    assert fast == model
+    assert fast[0]["helpful_count"] == 0 and fast[0]["comment"] is None
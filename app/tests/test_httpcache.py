@@ -0,0 +1,31 @@
+from datetime import datetime
+
+from starlette.requests import Request
+
+from utils.httpcache import build_list_validators, build_validators, is_not_modified
+
+
+def request(**headers) -> Request:
+    raw = [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": raw})
+
+
+DOCUMENTS = [
+    {"_id": "a", "version": 1, "updated_at": datetime(2025, 3, 1, 12, 0, 0)},
+    {"_id": "b", "version": 4, "updated_at": datetime(2025, 3, 2, 8, 30, 0)},
+]
+
+
+def test_if_modified_since_with_a_minus_zero_zone():
+    validators = build_validators(DOCUMENTS[:1])
+    assert is_not_modified(request(if_modified_since="Sat, 01 Mar 2025 12:00:00 -0000"), validators)
+    assert not is_not_modified(request(if_modified_since="Sat, 01 Mar 2025 11:59:59 -0000"), validators)
+
+
+def test_pages_are_revalidated_by_etag_only():
+    etag, last_modified = build_list_validators(DOCUMENTS)
+    assert last_modified is None
+    # The newest document is untouched, but "a" was deleted from the page
+    assert not is_not_modified(request(if_none_match=etag), build_list_validators(DOCUMENTS[1:]))
+    assert not is_not_modified(request(if_modified_since="Sun, 02 Mar 2025 09:00:00 GMT"), (etag, last_modified))
+    assert is_not_modified(request(if_none_match=etag), build_list_validators(DOCUMENTS))
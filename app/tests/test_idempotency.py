@@ -0,0 +1,128 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import orjson
+import pytest
+
+from tests.asgi import call
+from utils.idempotency import IdempotencyMiddleware
+
+
+class Handler:
+    """A write endpoint counting its runs; it can be made to fail or to wait until released"""
+
+    def __init__(self, fail: bool = False):
+        self.runs = 0
+        self.fail = fail
+        self.release = None
+
+    async def __call__(self, scope, receive, send):
+        self.runs += 1
+        run = self.runs
+        body = (await receive())["body"]
+        if self.release is not None and run == 1:
+            await self.release.wait()
+        if self.fail:
+            raise RuntimeError("handler failed")
+        response = orjson.dumps({"run": run, "echo": orjson.loads(body)})
+        await send({"type": "http.response.start", "status": 201, "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": response})
+
+
+def post(app, json, key="key-1"):
+    return call(app, "POST", "/appointments/", json=json, headers={"Idempotency-Key": key, "Authorization": "Bearer caller"})
+
+
+def test_a_retry_replays_the_stored_response(fake_db, run):
+    handler = Handler()
+    app = IdempotencyMiddleware(handler)
+
+    async def scenario():
+        return await post(app, {"slot": 1}), await post(app, {"slot": 1})
+
+    first, retry = run(scenario())
+
+    assert handler.runs == 1
+    assert (first.status, retry.status) == (201, 201)
+    assert retry.json() == first.json() == {"run": 1, "echo": {"slot": 1}}
+    assert first.header("idempotent-replayed") is None
+    assert retry.header("idempotent-replayed") == "true"
+
+
+def test_reusing_a_key_for_another_request_is_refused(fake_db, run):
+    handler = Handler()
+    app = IdempotencyMiddleware(handler)
+
+    async def scenario():
+        return await post(app, {"slot": 1}), await post(app, {"slot": 2})
+
+    first, other = run(scenario())
+
+    assert handler.runs == 1
+    assert first.status == 201
+    assert other.status == 422
+
+
+def test_concurrent_duplicates_run_the_handler_once(fake_db, run):
+    handler = Handler()
+    handler.release = asyncio.Event()
+    app = IdempotencyMiddleware(handler)
+
+    async def scenario():
+        first = asyncio.create_task(post(app, {"slot": 1}))
+        duplicate = asyncio.create_task(post(app, {"slot": 1}))
+        # Both are in flight: the duplicate found the key claimed and is polling for the outcome
+        await asyncio.sleep(0.1)
+        handler.release.set()
+        return await first, await duplicate
+
+    first, duplicate = run(scenario())
+
+    assert handler.runs == 1
+    assert duplicate.json() == first.json()
+    assert duplicate.header("idempotent-replayed") == "true"
+
+
+def test_a_failed_request_releases_its_key(fake_db, run):
+    handler = Handler(fail=True)
+    app = IdempotencyMiddleware(handler)
+
+    with pytest.raises(RuntimeError):
+        run(post(app, {"slot": 1}))
+    assert fake_db["idempotency_keys"].documents == {}
+
+    handler.fail = False
+    retry = run(post(app, {"slot": 1}))
+
+    assert handler.runs == 2
+    assert retry.status == 201
+    assert retry.header("idempotent-replayed") is None
+
+
+def test_a_duplicate_takes_over_a_lock_that_ran_out(fake_db, run):
+    handler = Handler()
+    handler.release = asyncio.Event()
+    app = IdempotencyMiddleware(handler)
+    records = fake_db["idempotency_keys"].documents
+
+    async def scenario():
+        # The first holder hangs mid-request, as if its worker had died
+        stuck = asyncio.create_task(post(app, {"slot": 1}))
+        await asyncio.sleep(0.05)
+        (record,) = records.values()
+        stuck_owner = record["owner"]
+        record["locked_until"] = datetime.utcnow() - timedelta(seconds=1)
+
+        retry = await post(app, {"slot": 1})
+        stuck.cancel()
+        await asyncio.gather(stuck, return_exceptions=True)
+        return stuck_owner, retry
+
+    stuck_owner, retry = run(scenario())
+
+    (record,) = records.values()
+    assert handler.runs == 2
+    assert retry.status == 201 and retry.json()["run"] == 2
+    # The record belongs to the request that took over; the stuck one could not release it
+    assert record["owner"] != stuck_owner
+    assert record["status"] == "completed"
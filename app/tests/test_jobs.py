@@ -0,0 +1,160 @@
+import asyncio
+
+from models.Job import JobStatus
+from services.Job import JobWorker, get_job_service, job_handler
+
+
+calls = []
+
+
+@job_handler("tests.record")
+async def record_job(payload: dict):
+    calls.append(payload["value"])
+
+
+@job_handler("tests.flaky")
+async def flaky_job(payload: dict):
+    calls.append("flaky")
+    if calls.count("flaky") < payload["succeed_on"]:
+        raise RuntimeError("not yet")
+
+
+@job_handler("tests.slow")
+async def slow_job(payload: dict):
+    await asyncio.sleep(payload["seconds"])
+    calls.append("slow")
+
+
+def setup_function():
+    calls.clear()
+
+
+def test_worker_runs_queued_jobs_in_process(fake_db, run):
+    async def scenario():
+        service = get_job_service()
+        await service.ensure_indexes()
+        for value in range(5):
+            await service.enqueue("tests.record", {"value": value})
+        ran = await JobWorker(concurrency=2).run_until_idle()
+        statuses = {job["status"] async for job in fake_db["jobs"].find({})}
+        return ran, statuses
+
+    ran, statuses = run(scenario())
+    assert ran == 5
+    assert sorted(calls) == [0, 1, 2, 3, 4]
+    assert statuses == {JobStatus.done.value}
+
+
+def test_idempotency_key_queues_a_job_once(fake_db, run):
+    async def scenario():
+        service = get_job_service()
+        await service.ensure_indexes()
+        first = await service.enqueue("tests.record", {"value": 1}, idempotency_key="once")
+        second = await service.enqueue("tests.record", {"value": 2}, idempotency_key="once")
+        await JobWorker().run_until_idle()
+        return first, second
+
+    first, second = run(scenario())
+    assert first["_id"] == second["_id"]
+    assert calls == [1]
+
+
+def test_failed_job_is_retried_with_backoff(fake_db, run):
+    async def scenario():
+        service = get_job_service()
+        job = await service.enqueue("tests.flaky", {"succeed_on": 2})
+        worker = JobWorker()
+        await worker.run_until_idle()
+        after_failure = await fake_db["jobs"].find_one({"_id": job["_id"]})
+        # Backoff pushed run_at into the future: make it due again
+        await fake_db["jobs"].update_one({"_id": job["_id"]}, {"$set": {"run_at": after_failure["created_at"]}})
+        await worker.run_until_idle()
+        return after_failure, await fake_db["jobs"].find_one({"_id": job["_id"]})
+
+    after_failure, final = run(scenario())
+    assert after_failure["status"] == JobStatus.queued.value
+    assert after_failure["run_at"] > after_failure["created_at"]
+    assert after_failure["last_error"] == "not yet"
+    assert final["status"] == JobStatus.done.value
+    assert final["attempts"] == 2
+
+
+def test_job_gives_up_after_max_attempts(fake_db, run):
+    async def scenario():
+        service = get_job_service()
+        job = await service.enqueue("tests.flaky", {"succeed_on": 10}, max_attempts=1)
+        await JobWorker().run_until_idle()
+        return await fake_db["jobs"].find_one({"_id": job["_id"]})
+
+    assert run(scenario())["status"] == JobStatus.failed.value
+
+
+def test_stale_worker_cannot_overwrite_the_new_owner(fake_db, run):
+    async def scenario():
+        service = get_job_service()
+        await service.enqueue("tests.record", {"value": 1})
+        stale = await service.claim()
+        # Its lease runs out and another worker claims the job
+        await fake_db["jobs"].update_one({"_id": stale["_id"]}, {"$set": {"locked_until": stale["started_at"]}})
+        current = await service.claim()
+        stale_completed = await service.complete(stale)
+        stale_failed = await service.fail(stale, "late")
+        current_completed = await service.complete(current)
+        return stale_completed, stale_failed, current_completed, await fake_db["jobs"].find_one({"_id": stale["_id"]})
+
+    stale_completed, stale_failed, current_completed, job = run(scenario())
+    assert (stale_completed, stale_failed, current_completed) == (False, False, True)
+    assert job["status"] == JobStatus.done.value
+    assert "last_error" not in job or job["last_error"] is None
+
+
+def test_heartbeat_keeps_a_long_job_leased(fake_db, run):
+    async def scenario():
+        service = get_job_service()
+        job = await service.enqueue("tests.slow", {"seconds": 0.2})
+        worker = JobWorker(heartbeat_interval=0.05)
+        claimed = await service.claim()
+        task = asyncio.create_task(worker._execute(service, claimed, acquired=False))
+        await asyncio.sleep(0.15)
+        leased = await fake_db["jobs"].find_one({"_id": job["_id"]})
+        await task
+        return claimed, leased
+
+    claimed, leased = run(scenario())
+    assert leased["locked_until"] > claimed["locked_until"]
+    assert calls == ["slow"]
+
+
+def test_worker_survives_queue_errors(fake_db, run):
+    async def scenario():
+        service = get_job_service()
+        await service.enqueue("tests.record", {"value": 1})
+        fake_db.failure = ConnectionError("mongo is down")
+        worker = JobWorker(concurrency=1, poll_interval=0.01)
+        task = asyncio.create_task(worker.run())
+        await asyncio.sleep(0.05)
+        fake_db.failure = None
+        for _ in range(100):
+            if calls:
+                break
+            await asyncio.sleep(0.01)
+        await worker.stop()
+        await task
+        return task
+
+    task = run(scenario())
+    assert calls == [1]
+    assert task.exception() is None
+
+
+def test_metrics_report_depth_and_lag(fake_db, run):
+    async def scenario():
+        service = get_job_service()
+        await service.enqueue("tests.record", {"value": 1})
+        await service.enqueue("tests.record", {"value": 2}, delay_seconds=60)
+        return await service.get_metrics()
+
+    metrics = run(scenario())
+    assert metrics["depth"][JobStatus.queued.value] == 2
+    assert metrics["ready"] == 1
+    assert metrics["oldest_ready_type"] == "tests.record"
@@ -0,0 +1,50 @@
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+import pytest
+
+from models.Review import ReviewTarget
+from services.Ranking import RankingService, _ranking_id, review_weight
+
+
+def review(target_id: str, rating: int) -> dict:
+    return {
+        "_id": str(uuid4()), "user_id": str(uuid4()), "target_id": target_id, "target_type": ReviewTarget.clinic.value,
+        "clinic_id": target_id, "rating": rating, "created_at": datetime.utcnow() - timedelta(days=3)
+    }
+
+
+def test_rebuild_keeps_review_writes_made_while_it_runs(fake_db, run):
+    busy, quiet = str(uuid4()), str(uuid4())
+    quiet_review = review(quiet, 2)
+    for document in (review(busy, 4), quiet_review):
+        fake_db["reviews"].documents[document["_id"]] = document
+    for target_id in (busy, quiet):
+        # Drifted sums, as rebuild exists to correct
+        ranking_id = _ranking_id(target_id, ReviewTarget.clinic)
+        fake_db["ranking_scores"].documents[ranking_id] = {
+            "_id": ranking_id, "target_id": target_id, "target_type": ReviewTarget.clinic.value, "clinic_id": target_id,
+            "weighted_sum": 0.0, "weight": 0.0, "reviews": 0, "rating_sum": 0, "score": 0.0,
+            "updated_at": datetime.utcnow() - timedelta(days=1), "scored_at": datetime.utcnow() - timedelta(days=1)
+        }
+
+    service = RankingService()
+    replace = service._replace
+    late = review(busy, 5)
+
+    async def replace_after_a_late_review(rows, decay, started):
+        # Written after the aggregate read the reviews, before its sums are stored
+        fake_db["reviews"].documents[late["_id"]] = late
+        await service.on_review_created(late)
+        return await replace(rows, decay, started)
+
+    service._replace = replace_after_a_late_review
+    run(service.rebuild())
+
+    rankings = fake_db["ranking_scores"].documents
+    assert rankings[_ranking_id(busy, ReviewTarget.clinic)]["reviews"] == 1
+    assert rankings[_ranking_id(busy, ReviewTarget.clinic)]["rating_sum"] == 5
+    assert rankings[_ranking_id(quiet, ReviewTarget.clinic)]["reviews"] == 1
+    assert rankings[_ranking_id(quiet, ReviewTarget.clinic)]["weighted_sum"] == pytest.approx(
+        2 * review_weight(quiet_review["created_at"])
+    )
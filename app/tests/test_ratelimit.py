@@ -0,0 +1,81 @@
+import asyncio
+from datetime import timedelta
+
+import pytest
+
+import utils.auth as auth
+from utils.ratelimit import InMemoryRateLimitBackend, RateLimitMiddleware
+
+
+@pytest.fixture(autouse=True)
+def signing_key(monkeypatch):
+    monkeypatch.setattr(auth, "SECRET_KEY", "test-secret")
+    monkeypatch.setattr(auth, "ALGORITHM", "HS256")
+
+
+async def ok_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+def request(middleware, path="/services/", authorization=None, ip="10.0.0.1"):
+    headers = [(b"authorization", authorization.encode())] if authorization else []
+    scope = {"type": "http", "path": path, "headers": headers, "client": (ip, 1234)}
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(middleware(scope, None, send))
+    return sent[0]
+
+
+def limiter(**kwargs):
+    return RateLimitMiddleware(ok_app, backend=InMemoryRateLimitBackend(), rate=0.001, capacity=2, route_costs={}, **kwargs)
+
+
+def test_made_up_tokens_share_the_ip_bucket():
+    middleware = limiter()
+    statuses = [request(middleware, authorization=f"Bearer forged-{i}")["status"] for i in range(4)]
+    assert statuses == [200, 200, 429, 429]
+
+
+def test_valid_token_is_throttled_per_user_across_tokens():
+    middleware = limiter()
+    tokens = [auth.create_access_token({"user_id": "u1", "n": i}, timedelta(minutes=5)) for i in range(3)]
+    statuses = [request(middleware, authorization=f"Bearer {token}", ip=f"10.0.0.{i}")["status"] for i, token in enumerate(tokens)]
+    assert statuses == [200, 200, 429]
+    # Another user keeps its own bucket
+    other = auth.create_access_token({"user_id": "u2"}, timedelta(minutes=5))
+    assert request(middleware, authorization=f"Bearer {other}")["status"] == 200
+
+
+def test_rejected_request_carries_retry_after():
+    middleware = limiter()
+    for _ in range(2):
+        request(middleware)
+    start = request(middleware)
+    assert start["status"] == 429
+    assert int(dict(start["headers"])[b"retry-after"]) >= 1
+
+
+def test_eviction_keeps_recently_used_buckets():
+    backend = InMemoryRateLimitBackend(max_keys=10)
+
+    async def scenario():
+        await backend.consume("busy", 2, 0.001, 2)
+        for i in range(30):
+            await backend.consume(f"spray-{i}", 1, 0.001, 2)
+            # The busy client keeps coming back, so it stays recently used
+            allowed, _ = await backend.consume("busy", 1, 0.001, 2)
+            assert not allowed
+
+    asyncio.run(scenario())
+    assert len(backend.buckets) <= 10
+    assert "busy" in backend.buckets
+
+
+def test_health_probes_are_never_throttled():
+    middleware = limiter()
+    statuses = [request(middleware, path="/health/ready")["status"] for _ in range(5)]
+    assert statuses == [200] * 5
@@ -0,0 +1,38 @@
+import time
+
+import database.database as database
+from tests.asgi import call
+from tests.fakes import FakeDatabase
+from utils.readpref import ReadYourWritesMiddleware
+
+
+def test_reads_after_a_write_go_to_the_primary(fake_db, run, monkeypatch):
+    secondary = FakeDatabase()
+    monkeypatch.setattr(database, "read_db", secondary)
+    used = []
+
+    async def app(scope, receive, send):
+        used.append("primary" if database.get_read_database() is fake_db else "secondary")
+        status = 400 if scope["path"] == "/invalid" else 200
+        await send({"type": "http.response.start", "status": status, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    middleware = ReadYourWritesMiddleware(app, window_seconds=30)
+
+    async def scenario():
+        await call(middleware, "GET", "/reviews")
+        refused = await call(middleware, "POST", "/invalid", json={})
+        write = await call(middleware, "POST", "/reviews", json={})
+        cookie = write.header("set-cookie").split(";", 1)[0]
+        await call(middleware, "GET", "/reviews", headers={"Cookie": f"theme=dark; {cookie}"})
+        await call(middleware, "GET", "/reviews", headers={"X-Read-Primary-Until": write.header("x-read-primary-until")})
+        await call(middleware, "GET", "/reviews", headers={"X-Read-Primary-Until": str(int(time.time()) - 1)})
+        return refused, write, cookie
+
+    refused, write, cookie = run(scenario())
+
+    assert refused.header("set-cookie") is None
+    until = int(write.header("x-read-primary-until"))
+    assert time.time() < until <= time.time() + 30
+    assert cookie == f"read_primary_until={until}"
+    assert used == ["secondary", "secondary", "secondary", "primary", "primary", "secondary"]
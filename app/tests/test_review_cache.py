@@ -0,0 +1,106 @@
+import os
+from datetime import datetime
+from uuid import uuid4
+
+import pytest
+
+from models.Review import ReviewTarget
+from tests.fakes import FakeDatabase
+from utils.httpcache import build_list_validators
+
+# A replica set with at least one secondary, e.g. mongodb://localhost:27017/?replicaSet=rs0
+REPLICA_SET_URI = os.getenv("TEST_REPLICA_SET_URI")
+
+
+def review(clinic_id: str, version: int) -> dict:
+    return {
+        "_id": str(uuid4()), "user_id": str(uuid4()), "target_id": clinic_id, "target_type": ReviewTarget.clinic.value,
+        "clinic_id": clinic_id, "rating": 4, "comment": "Fine", "created_at": datetime(2025, 3, 1),
+        "helpful_count": 0, "version": version, "updated_at": datetime(2025, 3, 1)
+    }
+
+
+async def page_and_validators(target_id: str):
+    from services.Review import get_review_service
+
+    service = get_review_service()
+    validators = await service.get_reviews_by_target_validators(target_id, ReviewTarget.clinic)
+    documents = await service.get_reviews_by_target_documents(target_id, ReviewTarget.clinic)
+    return documents, validators
+
+
+def test_etag_describes_the_page_read_from_a_lagging_secondary(fake_db, monkeypatch, run):
+    import database.database as database
+
+    secondary = FakeDatabase()
+    monkeypatch.setattr(database, "read_db", secondary)
+    clinic_id = str(uuid4())
+    written = review(clinic_id, version=1)
+    secondary["reviews"].documents[written["_id"]] = dict(written)
+    # The primary already has the edit the secondary has not replicated yet
+    fake_db["reviews"].documents[written["_id"]] = dict(written, version=2, comment="Great")
+
+    documents, validators = run(page_and_validators(clinic_id))
+
+    assert [document["comment"] for document in documents] == ["Fine"]
+    assert validators == build_list_validators([written])
+
+
+@pytest.mark.skipif(not REPLICA_SET_URI, reason="TEST_REPLICA_SET_URI is not set")
+def test_etag_matches_the_page_on_a_replica_set(monkeypatch, run):
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from pymongo.read_preferences import SecondaryPreferred
+    from pymongo.write_concern import WriteConcern
+    import database.database as database
+
+    async def scenario():
+        client = AsyncIOMotorClient(REPLICA_SET_URI)
+        name = f"test_review_cache_{uuid4().hex[:8]}"
+        try:
+            members = len((await client.admin.command("replSetGetStatus"))["members"])
+            primary = client[name]
+            monkeypatch.setattr(database, "db", primary)
+            monkeypatch.setattr(database, "read_db", primary.with_options(read_preference=SecondaryPreferred()))
+            # Acknowledged by every member, so whichever secondary serves the reads has the write
+            reviews = primary.get_collection("reviews", write_concern=WriteConcern(w=members))
+            clinic_id = str(uuid4())
+            written = review(clinic_id, version=1)
+            await reviews.insert_one(written)
+
+            mismatches = 0
+            for version in range(2, 12):
+                await reviews.update_one({"_id": written["_id"]}, {"$set": {"version": version}})
+                documents, validators = await page_and_validators(clinic_id)
+                served = [dict(document, version=version) for document in documents]
+                mismatches += validators != build_list_validators(served)
+            return mismatches
+        finally:
+            await client.drop_database(name)
+            client.close()
+
+    assert run(scenario()) == 0
+
+
+def test_helpful_vote_changes_the_etag_and_needs_a_real_user(fake_db, run):
+    from fastapi import HTTPException
+    from services.Review import get_review_service
+
+    clinic_id, voter_id = str(uuid4()), str(uuid4())
+    written = review(clinic_id, version=1)
+    fake_db["reviews"].documents[written["_id"]] = dict(written)
+    fake_db["users"].documents[voter_id] = {"_id": voter_id, "email": "voter@example.com"}
+
+    async def scenario():
+        _, before = await page_and_validators(clinic_id)
+        with pytest.raises(HTTPException) as unknown:
+            await get_review_service().set_helpful_vote(written["_id"], uuid4(), True)
+        await get_review_service().set_helpful_vote(written["_id"], voter_id, True)
+        _, after = await page_and_validators(clinic_id)
+        return unknown.value.status_code, before, after
+
+    status_code, before, after = run(scenario())
+
+    assert status_code == 404
+    assert after != before
+    assert fake_db["reviews"].documents[written["_id"]]["version"] == 2
+    assert fake_db["reviews"].documents[written["_id"]]["helpful_count"] == 1
@@ -0,0 +1,66 @@
+from datetime import datetime
+from uuid import UUID, uuid4
+
+import orjson
+
+from models.Job import JobStatus
+from models.Review import ReviewTarget
+from schemas.Review import ReviewStatsTarget
+from services.Review import ReviewService
+from services.Sharding import BACKFILL_JOB_KEY
+
+CLINIC_ID, OTHER_CLINIC_ID = str(uuid4()), str(uuid4())
+
+
+def test_batch_statistics_match_one_target_at_a_time(fake_db, run, api):
+    known_staff, unknown_staff, quiet_service = str(uuid4()), str(uuid4()), str(uuid4())
+    fake_db["staff"].documents[known_staff] = {"_id": known_staff, "clinic_id": CLINIC_ID}
+    fake_db["services"].documents[quiet_service] = {"_id": quiet_service, "clinic_id": CLINIC_ID}
+    ratings = {
+        (ReviewTarget.staff, known_staff, CLINIC_ID): [5, 4, 4],
+        # Its staff document is gone, so only some of the batch's staff clinics resolve
+        (ReviewTarget.staff, unknown_staff, OTHER_CLINIC_ID): [2, 3],
+        (ReviewTarget.clinic, CLINIC_ID, CLINIC_ID): [1, 5],
+    }
+    for (target_type, target_id, clinic_id), values in ratings.items():
+        for rating in values:
+            review_id = str(uuid4())
+            fake_db["reviews"].documents[review_id] = {
+                "_id": review_id, "user_id": str(uuid4()), "target_id": target_id, "target_type": target_type.value,
+                "clinic_id": clinic_id, "rating": rating, "created_at": datetime.utcnow()
+            }
+    targets = [
+        ReviewStatsTarget(target_id=UUID(target_id), target_type=target_type)
+        for target_type, target_id in [
+            (ReviewTarget.staff, known_staff), (ReviewTarget.staff, unknown_staff),
+            (ReviewTarget.clinic, CLINIC_ID), (ReviewTarget.service, quiet_service),
+        ]
+    ]
+
+    async def both_ways():
+        service = ReviewService()
+        batch = await service.get_review_statistics_batch(targets)
+        one_by_one = {
+            f"{target.target_type.value}:{target.target_id}": await service.get_review_statistics(target.target_id, target.target_type)
+            for target in targets
+        }
+        return batch, one_by_one
+
+    for backfilled in (False, True):
+        if backfilled:
+            fake_db["jobs"].documents["backfill"] = {"_id": "backfill", "idempotency_key": BACKFILL_JOB_KEY, "status": JobStatus.done.value}
+        batch, one_by_one = run(both_ways())
+
+        assert batch == one_by_one
+        assert batch[f"staff:{known_staff}"]["average_rating"] == 4.33
+        assert batch[f"staff:{unknown_staff}"]["total_reviews"] == 2
+        assert batch[f"service:{quiet_service}"] == {
+            "target_id": quiet_service, "target_type": ReviewTarget.service, "total_reviews": 0,
+            "average_rating": 0, "rating_distribution": {1: 0, 2: 0, 3: 0, 4: 0, 5: 0}
+        }
+
+    response = run(api("POST", "/reviews/stats/batch", json={
+        "targets": [{"target_id": str(target.target_id), "target_type": target.target_type.value} for target in targets]
+    }))
+    assert response.status == 200
+    assert response.json() == orjson.loads(orjson.dumps(batch, option=orjson.OPT_NON_STR_KEYS))
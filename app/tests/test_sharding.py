@@ -0,0 +1,117 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from uuid import UUID, uuid4
+
+from database.sharding import (
+    ShardRoutingListener, ShardRoutingMiddleware, classify_query, current_request, BACKGROUND
+)
+import database.sharding as sharding
+from models.Appointment import AppStatus
+from models.Job import JobStatus
+from models.Review import ReviewTarget
+from services.Appointment import AppointmentService
+from services.Review import ReviewService
+from services.Sharding import BACKFILL_JOB_KEY, backfill_clinic_ids, clinic_filter
+
+
+def command(name: str, collection: str, **fields) -> SimpleNamespace:
+    return SimpleNamespace(command_name=name, command={name: collection, **fields})
+
+
+def test_classify_real_filters():
+    assert classify_query("appointments", {"clinic_id": "c1", "staff_id": "s1"}) == "targeted"
+    assert classify_query("appointments", {"clinic_id": {"$in": ["c1", "c2"]}, "customer_id": "u1"}) == "multi"
+    assert classify_query("appointments", {"$and": [{"clinic_id": "c1"}, {"start_time": {"$gte": 0}}]}) == "targeted"
+    assert classify_query("appointments", {"$or": [{"clinic_id": "c1"}, {"clinic_id": "c2"}]}) == "multi"
+    assert classify_query("appointments", {"_id": "a1"}) == "broadcast"
+    assert classify_query("reviews", {"clinic_id": {"$gte": "c"}}) == "broadcast"
+    assert classify_query("staff", {"clinic_id": "c1"}) == "unsharded"
+
+
+def test_listener_attributes_queries_to_the_matched_route(run, monkeypatch):
+    listener = ShardRoutingListener()
+    monkeypatch.setattr(sharding, "routing_listener", listener)
+
+    async def app(scope, receive, send):
+        # What the router does once it matched, then what the handler sends to Mongo
+        scope["route"] = SimpleNamespace(path="/appointments/{appointment_id}")
+        listener.started(command("find", "appointments", filter={"_id": "a1"}))
+        listener.started(command("update", "appointments", updates=[{"q": {"_id": "a1", "clinic_id": "c1"}}]))
+        listener.started(command("distinct", "staff", key="_id", query={"clinic_id": "c1"}))
+        listener.started(command("insert", "appointments", documents=[{}]))
+
+    middleware = ShardRoutingMiddleware(app)
+    for _ in range(2):
+        run(middleware({"type": "http", "method": "GET", "path": "/appointments/a1"}, None, None))
+    listener.started(command("aggregate", "reviews", pipeline=[{"$match": {"clinic_id": "c1"}}, {"$limit": 1}]))
+
+    report = listener.report()
+    endpoint = report["GET /appointments/{appointment_id}"]
+    assert endpoint["requests"] == 2
+    assert endpoint["queries"] == {
+        "appointments": {"broadcast": 2, "targeted": 2},
+        "staff": {"unsharded": 2},
+    }
+    assert endpoint["broadcasts"] == 2 and endpoint["within_budget"]
+    assert report[BACKGROUND]["queries"] == {"reviews": {"targeted": 1}}
+    assert current_request.get() is None
+
+
+def test_endpoint_over_budget_is_reported(run, monkeypatch):
+    listener = ShardRoutingListener()
+    monkeypatch.setattr(sharding, "routing_listener", listener)
+
+    async def app(scope, receive, send):
+        scope["route"] = SimpleNamespace(path="/appointments/customer/{customer_id}")
+        listener.started(command("find", "appointments", filter={"customer_id": "u1"}))
+
+    run(ShardRoutingMiddleware(app)({"type": "http", "method": "GET", "path": "/appointments/customer/u1"}, None, None))
+
+    assert sharding.get_routing_report()["over_budget"] == ["GET /appointments/customer/{customer_id}"]
+
+
+def test_legacy_documents_without_clinic_id_are_found_until_the_backfill_is_done(fake_db, run):
+    clinic_id, other_clinic_id, staff_id, customer_id = str(uuid4()), str(uuid4()), str(uuid4()), str(uuid4())
+    now = datetime.utcnow()
+    fake_db["staff"].documents[staff_id] = {"_id": staff_id, "clinic_id": clinic_id}
+    review = {"user_id": customer_id, "target_id": staff_id, "target_type": ReviewTarget.staff.value, "rating": 5, "created_at": now}
+    legacy_review, new_review = {"_id": str(uuid4()), **review}, {"_id": str(uuid4()), **review, "clinic_id": clinic_id}
+    fake_db["reviews"].documents.update({legacy_review["_id"]: legacy_review, new_review["_id"]: new_review})
+    appointment = {
+        "customer_id": customer_id, "service_id": str(uuid4()), "staff_id": staff_id, "status": AppStatus.booked.value,
+        "start_time": now + timedelta(days=1), "end_time": now + timedelta(days=1, minutes=30)
+    }
+    # Booked before the lookup existed, in a clinic it does not list yet
+    old_appointment = {"_id": str(uuid4()), **appointment, "clinic_id": other_clinic_id}
+    new_appointment = {"_id": str(uuid4()), **appointment, "clinic_id": clinic_id}
+    fake_db["appointments"].documents.update({old_appointment["_id"]: old_appointment, new_appointment["_id"]: new_appointment})
+    fake_db["customer_clinics"].documents[customer_id] = {"_id": customer_id, "clinic_ids": [clinic_id]}
+
+    async def found():
+        reviews = await ReviewService().get_reviews_by_target(UUID(staff_id), ReviewTarget.staff)
+        stats = await ReviewService().get_review_statistics_batch([
+            SimpleNamespace(target_id=UUID(staff_id), target_type=ReviewTarget.staff)
+        ])
+        appointments = await AppointmentService().get_appointments_by_customer(UUID(customer_id))
+        return (
+            sorted(str(r.id) for r in reviews), stats[f"staff:{staff_id}"]["total_reviews"],
+            sorted(str(a.id) for a in appointments)
+        )
+
+    async def scenario():
+        before = await found()
+        await backfill_clinic_ids()
+        fake_db["jobs"].documents["backfill"] = {
+            "_id": "backfill", "idempotency_key": BACKFILL_JOB_KEY, "status": JobStatus.done.value
+        }
+        return before, await found(), await clinic_filter([clinic_id])
+
+    before, after, condition = run(scenario())
+
+    both_reviews = sorted([legacy_review["_id"], new_review["_id"]])
+    both_appointments = sorted([old_appointment["_id"], new_appointment["_id"]])
+    assert before == (both_reviews, 2, both_appointments)
+    # The backfill stamped the legacy review and listed the old clinic, so the narrowed queries still find them
+    assert after == before
+    assert fake_db["reviews"].documents[legacy_review["_id"]]["clinic_id"] == clinic_id
+    assert condition == {"clinic_id": clinic_id}
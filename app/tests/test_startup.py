@@ -0,0 +1,99 @@
+import os
+import subprocess
+import sys
+
+import orjson
+import pytest
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Cold start budget for `import main`; override on slow CI machines
+IMPORT_BUDGET_SECONDS = float(os.getenv("IMPORT_BUDGET_SECONDS", "2.0"))
+# Loaded on first use, never by importing the app
+DEFERRED_MODULES = ["passlib", "jose", "pyarrow", "numpy"]
+
+
+def test_import_main_within_budget():
+    script = (
+        "import sys, time\n"
+        "started = time.perf_counter()\n"
+        "import main\n"
+        "elapsed = time.perf_counter() - started\n"
+        f"print(elapsed, [name for name in {DEFERRED_MODULES!r} if name in sys.modules])\n"
+    )
+    # A fresh interpreter, so nothing the test session imported counts as preloaded
+    result = subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", script], cwd=APP_DIR, capture_output=True, text=True, check=True
+    )
+    elapsed, loaded = result.stdout.strip().splitlines()[-1].split(" ", 1)
+    assert loaded == "[]"
+    assert float(elapsed) < IMPORT_BUDGET_SECONDS
+
+
+@pytest.fixture
+def app_main(monkeypatch, tmp_path):
+    import main
+
+    monkeypatch.setattr(main, "OPENAPI_SCHEMA_PATH", str(tmp_path / "openapi.json"))
+    monkeypatch.setattr(main.app, "openapi_schema", None)
+    return main
+
+
+def test_openapi_served_from_build_time_file(app_main):
+    schema = app_main.build_openapi_schema()
+    schema["info"]["description"] = "from the build"
+    with open(app_main.OPENAPI_SCHEMA_PATH, "wb") as schema_file:
+        schema_file.write(orjson.dumps(schema))
+
+    assert app_main.custom_openapi()["info"]["description"] == "from the build"
+
+
+def test_stale_openapi_file_is_rebuilt(app_main, monkeypatch):
+    schema = app_main.build_openapi_schema()
+    schema["info"]["description"] = "from the build"
+    with open(app_main.OPENAPI_SCHEMA_PATH, "wb") as schema_file:
+        schema_file.write(orjson.dumps(schema))
+    # A release bumps the version without regenerating the file
+    monkeypatch.setattr(app_main.app, "version", "2.0.0")
+
+    served = app_main.custom_openapi()
+    assert served["info"]["description"] != "from the build"
+    assert served["info"]["version"] == "2.0.0"
+
+
+def test_route_changes_change_the_fingerprint(app_main):
+    before = app_main.routes_fingerprint()
+
+    @app_main.app.get("/fingerprint-probe")
+    async def fingerprint_probe():
+        return {}
+
+    try:
+        assert app_main.routes_fingerprint() != before
+    finally:
+        app_main.app.router.routes.pop()
+
+
+def test_parameter_and_model_changes_change_the_fingerprint(app_main):
+    from pydantic import BaseModel
+
+    class Probe(BaseModel):
+        name: str
+
+    class ProbeWithNote(BaseModel):
+        name: str
+        note: str = ""
+
+    def probe_route(query_type, model):
+        async def fingerprint_probe(limit: query_type = 10) -> model:
+            return model(name="probe")
+        app_main.app.get("/fingerprint-probe/{probe_id}")(fingerprint_probe)
+        try:
+            return app_main.routes_fingerprint()
+        finally:
+            app_main.app.router.routes.pop()
+
+    fingerprint = probe_route(int, Probe)
+
+    assert probe_route(int, Probe) == fingerprint
+    assert probe_route(float, Probe) != fingerprint
+    assert probe_route(int, ProbeWithNote) != fingerprint
@@ -0,0 +1,68 @@
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+from models.Appointment import AppStatus
+from models.Waitlist import WaitlistStatus
+from schemas.Appointment import AppointmentUpdate
+from services.Appointment import AppointmentService
+from services.Job import get_job_service
+from services.Waitlist import WaitlistService
+
+CLINIC_ID, SERVICE_ID, STAFF_ID = str(uuid4()), str(uuid4()), str(uuid4())
+
+
+def slot(start_time: datetime) -> dict:
+    return {
+        "clinic_id": CLINIC_ID, "service_id": SERVICE_ID, "staff_id": STAFF_ID,
+        "start_time": start_time, "end_time": start_time + timedelta(minutes=30)
+    }
+
+
+def test_every_offer_gets_its_own_expiry_job(fake_db, run):
+    now = datetime.utcnow()
+    entry_id = str(uuid4())
+    fake_db["waitlist"].documents[entry_id] = {
+        "_id": entry_id, "customer_id": str(uuid4()), "clinic_id": CLINIC_ID, "service_id": SERVICE_ID,
+        "staff_id": None, "window_start": now, "window_end": now + timedelta(days=2), "auto_book": False,
+        "status": WaitlistStatus.waiting.value, "created_at": now
+    }
+
+    async def scenario():
+        await get_job_service().ensure_indexes()
+        service = WaitlistService()
+        first = await service.match_slot(slot(now + timedelta(hours=1)))
+        # The offered slot was booked by someone else: the entry went back to waiting
+        fake_db["waitlist"].documents[entry_id]["status"] = WaitlistStatus.waiting.value
+        second = await service.match_slot(slot(now + timedelta(hours=5)))
+        return first, second
+
+    first, second = run(scenario())
+
+    assert first["_id"] == second["_id"] == entry_id
+    expiries = [job for job in fake_db["jobs"].documents.values() if job["type"] == "waitlist.offer_expired"]
+    assert len(expiries) == 2
+    assert len({job["idempotency_key"] for job in expiries}) == 2
+
+
+def test_a_slot_canceled_twice_is_matched_twice(fake_db, run):
+    start_time = (datetime.utcnow() + timedelta(days=3)).replace(microsecond=0)
+    appointment_id, customer_id = str(uuid4()), str(uuid4())
+    fake_db["appointments"].documents[appointment_id] = {
+        "_id": appointment_id, "customer_id": customer_id, "clinic_id": CLINIC_ID, "service_id": SERVICE_ID,
+        "staff_id": STAFF_ID, "start_time": start_time, "end_time": start_time + timedelta(minutes=30),
+        "status": AppStatus.booked.value,
+        "updated_at": datetime.utcnow()
+    }
+
+    async def scenario():
+        await get_job_service().ensure_indexes()
+        service = AppointmentService()
+        await service.update_appointment(appointment_id, AppointmentUpdate(status=AppStatus.canceled))
+        # Rebooked by moving it back to booked, then canceled again
+        await service.update_appointment(appointment_id, AppointmentUpdate(status=AppStatus.booked))
+        await service.update_appointment(appointment_id, AppointmentUpdate(status=AppStatus.canceled))
+
+    run(scenario())
+
+    matches = [job for job in fake_db["jobs"].documents.values() if job["type"] == "waitlist.match"]
+    assert len(matches) == 2
@@ -1,7 +1,8 @@
-from passlib.context import CryptContext
-from jose import JWTError, jwt
+from functools import lru_cache
 import os
 from datetime import datetime, timedelta
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from config import MONGO_URI , ALGORITHM , SECRET_REFRESH_KEY , SECRET_KEY
 
 # load_dotenv()
@@ -10,24 +11,47 @@ from config import MONGO_URI , ALGORITHM , SECRET_REFRESH_KEY , SECRET_KEY
 # ALGORITHM = os.getenv("HS256")
 # SECRET_REFRESH_KEY = os.getenv("SECRET_REFRESH_KEY")
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# passlib/bcrypt and jose are imported on first use, not at startup:
+# most requests never hash a password and cold starts should not pay for it.
+
+@lru_cache(maxsize=None)
+def get_pwd_context():
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
 
 def verify_password(plain: str, hashed: str) -> bool:
-    return pwd_context.verify(plain, hashed)
+    return get_pwd_context().verify(plain, hashed)
 
 def create_access_token(data: dict, expires_delta: timedelta = None):
+    from jose import jwt
     to_encode = data.copy()
     expire = datetime.now() + (expires_delta or timedelta(minutes=15))
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 def decode_access_token(token: str):
+    from jose import jwt
     return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
 
 def create_refresh_token(subject: str) -> str:
+    from jose import jwt
     expires = datetime.now() + timedelta(days=7)
     to_encode = {"sub":subject , "exp": int(expires.timestamp())}
-    return jwt.encode(to_encode,SECRET_REFRESH_KEY , algorithm=ALGORITHM)
\ No newline at end of file
+    return jwt.encode(to_encode,SECRET_REFRESH_KEY , algorithm=ALGORITHM)
+
+security = HTTPBearer()
+
+async def get_admin_user(token: HTTPAuthorizationCredentials = Depends(security)) -> str:
+    """Dependency for admin-only routes: the caller's user_id, 401 without a valid token, 403 unless an admin"""
+    try:
+        payload = decode_access_token(token.credentials)
+    except Exception:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    if payload.get("user_id") is None:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    if payload.get("role") != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return payload["user_id"]
@@ -0,0 +1,227 @@
+import zlib
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from config import (
+    COMPRESSION_MIN_SIZE, COMPRESSION_GZIP_LEVEL, COMPRESSION_BROTLI_QUALITY,
+    COMPRESSION_ZSTD_LEVEL, COMPRESSION_CACHE_MAX_BYTES
+)
+
+try:
+    import brotli
+except ImportError:  # optional: br is simply not offered
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # optional: zstd is simply not offered
+    zstandard = None
+
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+
+class GzipEncoder:
+    def __init__(self):
+        self.compressor = zlib.compressobj(COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        # Sync flush so each streamed chunk can be decoded as soon as it arrives
+        return self.compressor.compress(data) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self.compressor.flush(zlib.Z_FINISH)
+
+
+class BrotliEncoder:
+    def __init__(self):
+        self.compressor = brotli.Compressor(quality=COMPRESSION_BROTLI_QUALITY)
+
+    def compress(self, data: bytes) -> bytes:
+        return self.compressor.process(data) + self.compressor.flush()
+
+    def finish(self) -> bytes:
+        return self.compressor.finish()
+
+
+class ZstdEncoder:
+    def __init__(self):
+        self.compressor = zstandard.ZstdCompressor(level=COMPRESSION_ZSTD_LEVEL).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self.compressor.compress(data) + self.compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self.compressor.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH)
+
+
+# Server preference, best ratio per CPU first
+ENCODERS: Dict[str, Callable] = {}
+if zstandard is not None:
+    ENCODERS["zstd"] = ZstdEncoder
+if brotli is not None:
+    ENCODERS["br"] = BrotliEncoder
+ENCODERS["gzip"] = GzipEncoder
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick the preferred encoding the client accepts with a non-zero q-value"""
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+
+    for encoding in ENCODERS:
+        if accepted.get(encoding, accepted.get("*", 0)) > 0:
+            return encoding
+    return None
+
+
+class CompressedBodyCache:
+    """LRU of compressed bodies keyed by ETag, so a cacheable response is compressed once"""
+
+    def __init__(self, max_bytes: int = COMPRESSION_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.entries: "OrderedDict[Tuple[str, str, str], bytes]" = OrderedDict()
+
+    def get(self, key: Tuple[str, str, str]) -> Optional[bytes]:
+        body = self.entries.get(key)
+        if body is not None:
+            self.entries.move_to_end(key)
+        return body
+
+    def put(self, key: Tuple[str, str, str], body: bytes):
+        if len(body) > self.max_bytes:
+            return
+        previous = self.entries.pop(key, None)
+        if previous is not None:
+            self.size -= len(previous)
+        self.entries[key] = body
+        self.size += len(body)
+        while self.size > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.size -= len(evicted)
+
+
+compressed_body_cache = CompressedBodyCache()
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing responses with zstd, br or gzip.
+
+    Single-message bodies under COMPRESSION_MIN_SIZE are sent as is. Streamed
+    bodies (NDJSON exports) are compressed chunk by chunk with a flush after
+    each one. Bodies carrying an ETag are served from the precompressed cache.
+    """
+
+    def __init__(self, app, min_size: int = COMPRESSION_MIN_SIZE, cache: Optional[CompressedBodyCache] = None):
+        self.app = app
+        self.min_size = min_size
+        self.cache = cache or compressed_body_cache
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = None
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                encoding = negotiate_encoding(value.decode("latin-1"))
+                break
+
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        headers: List[Tuple[bytes, bytes]] = []
+        encoder = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start_message, headers, encoder, passthrough
+
+            if message["type"] == "http.response.start":
+                start_message = message
+                headers = list(message.get("headers", []))
+                passthrough = not self._is_compressible(message["status"], headers)
+                if passthrough:
+                    await send(message)
+                return
+
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if encoder is None:
+                if not more_body:
+                    # Whole body in one message: compress it (or skip it if tiny) in one go
+                    if len(body) < self.min_size:
+                        await send(start_message)
+                        await send(message)
+                        return
+                    compressed = self._compress_whole(scope, encoding, headers, body)
+                    await send(self._start_with_encoding(start_message, headers, encoding, len(compressed)))
+                    await send({"type": "http.response.body", "body": compressed})
+                    return
+
+                encoder = ENCODERS[encoding]()
+                await send(self._start_with_encoding(start_message, headers, encoding, None))
+
+            chunk = encoder.compress(body) if body else b""
+            if not more_body:
+                chunk += encoder.finish()
+            await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
+
+    def _compress_whole(self, scope, encoding: str, headers: List[Tuple[bytes, bytes]], body: bytes) -> bytes:
+        etag = _get_header(headers, b"etag")
+        key = None
+        if etag:
+            key = (etag.decode("latin-1"), f"{scope['path']}?{scope.get('query_string', b'').decode('latin-1')}", encoding)
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        encoder = ENCODERS[encoding]()
+        compressed = encoder.compress(body) + encoder.finish()
+        if key:
+            self.cache.put(key, compressed)
+        return compressed
+
+    def _is_compressible(self, status: int, headers: List[Tuple[bytes, bytes]]) -> bool:
+        if status < 200 or status in (204, 304):
+            return False
+        if _get_header(headers, b"content-encoding"):
+            return False
+        content_type = (_get_header(headers, b"content-type") or b"").decode("latin-1")
+        return content_type.startswith(COMPRESSIBLE_TYPES)
+
+    def _start_with_encoding(self, start_message, headers, encoding: str, length: Optional[int]) -> dict:
+        new_headers = [(name, value) for name, value in headers if name not in (b"content-length", b"vary")]
+        vary = _get_header(headers, b"vary")
+        new_headers.append((b"vary", vary + b", Accept-Encoding" if vary else b"Accept-Encoding"))
+        new_headers.append((b"content-encoding", encoding.encode()))
+        if length is not None:
+            new_headers.append((b"content-length", str(length).encode()))
+        return {**start_message, "headers": new_headers}
+
+
+def _get_header(headers: List[Tuple[bytes, bytes]], name: bytes) -> Optional[bytes]:
+    for header_name, value in headers:
+        if header_name.lower() == name:
+            return value
+    return None
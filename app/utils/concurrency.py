@@ -0,0 +1,200 @@
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Dict, List, Optional, Tuple
+
+import orjson
+
+from config import (
+    CONCURRENCY_INITIAL_LIMIT, CONCURRENCY_MIN_LIMIT, CONCURRENCY_MAX_LIMIT,
+    CONCURRENCY_TARGET_LATENCY_MS, CONCURRENCY_BACKOFF_RATIO, CONCURRENCY_QUEUE_DEADLINES_MS
+)
+
+
+PRIORITY_CRITICAL = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+# (method or None for any, path prefix, path fragment or None, priority); first match wins
+ROUTE_PRIORITIES: List[Tuple[Optional[str], str, Optional[str], int]] = [
+    ("POST", "/appointments", None, PRIORITY_CRITICAL),
+    ("PUT", "/appointments", "/cancel", PRIORITY_CRITICAL),
+    (None, "/", "/stats", PRIORITY_LOW),
+    (None, "/appointments/calendar", None, PRIORITY_LOW),
+]
+
+# Routes that never touch Mongo are not worth queueing
+EXEMPT_PATHS = {"/", "/docs", "/redoc", "/openapi.json", "/metrics/concurrency", "/health/live", "/health/ready"}
+# Exports and imports last minutes: they would skew the latency signal
+EXEMPT_PREFIXES = ("/exports", "/imports")
+
+
+class AdaptiveConcurrencyLimiter:
+    """AIMD concurrency limit with a priority queue in front of it.
+
+    The limit grows by one per window of successful requests under the target
+    latency and shrinks multiplicatively when a request is slow or fails, so
+    when Mongo slows down fewer requests are let through instead of all of
+    them queueing on the Motor pool.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = CONCURRENCY_INITIAL_LIMIT,
+        min_limit: int = CONCURRENCY_MIN_LIMIT,
+        max_limit: int = CONCURRENCY_MAX_LIMIT,
+        target_latency_ms: float = CONCURRENCY_TARGET_LATENCY_MS,
+        backoff_ratio: float = CONCURRENCY_BACKOFF_RATIO,
+        queue_deadlines_ms: Optional[Dict[int, float]] = None
+    ):
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.target_latency = target_latency_ms / 1000
+        self.backoff_ratio = backoff_ratio
+        self.queue_deadlines = {
+            priority: deadline / 1000
+            for priority, deadline in (queue_deadlines_ms or CONCURRENCY_QUEUE_DEADLINES_MS).items()
+        }
+        self.in_flight = 0
+        # Heap of (priority, sequence, future); given-up futures stay in it until pruned
+        self._waiters: list = []
+        self._queued = 0
+        self._sequence = itertools.count()
+        self._last_decrease = 0.0
+        self.admitted: Dict[int, int] = {priority: 0 for priority in self.queue_deadlines}
+        self.shed: Dict[int, int] = {priority: 0 for priority in self.queue_deadlines}
+
+    async def acquire(self, priority: int = PRIORITY_NORMAL) -> bool:
+        """Wait for a slot; returns False when the request should be shed"""
+        if self.in_flight < int(self.limit) and not self._queued:
+            self._admit(priority)
+            return True
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), future))
+        self._queued += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout=self.queue_deadlines[priority])
+        except asyncio.TimeoutError:
+            if future.done():
+                # Granted at the same moment the deadline fired: keep the slot
+                self.admitted[priority] += 1
+                return True
+            self._give_up(future)
+            self.shed[priority] += 1
+            return False
+        except asyncio.CancelledError:
+            # The client went away while queued: give back a slot granted in the meantime
+            if future.done():
+                self.in_flight -= 1
+                self._wake()
+            else:
+                self._give_up(future)
+            raise
+
+        self.admitted[priority] += 1
+        return True
+
+    def release(self, latency: float, ok: bool = True):
+        """Free a slot and adapt the limit from the observed latency"""
+        self.in_flight -= 1
+        now = time.monotonic()
+
+        if not ok or latency > self.target_latency:
+            # Decrease at most once per target latency so one slow burst does not collapse the limit
+            if now - self._last_decrease > self.target_latency:
+                self.limit = max(self.min_limit, self.limit * self.backoff_ratio)
+                self._last_decrease = now
+        else:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+        self._wake()
+
+    def snapshot(self) -> dict:
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "queued": self._queued,
+            "admitted": dict(self.admitted),
+            "shed": dict(self.shed),
+        }
+
+    def _admit(self, priority: int):
+        self.in_flight += 1
+        self.admitted[priority] += 1
+
+    def _give_up(self, future: asyncio.Future):
+        future.cancel()
+        self._queued -= 1
+        # Drop abandoned entries once they outnumber the live ones, wherever they sit in the heap
+        if len(self._waiters) > 2 * self._queued + 16:
+            self._waiters = [waiter for waiter in self._waiters if not waiter[2].done()]
+            heapq.heapify(self._waiters)
+
+    def _wake(self):
+        while self._waiters and self.in_flight < int(self.limit):
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done():
+                continue
+            self._queued -= 1
+            self.in_flight += 1
+            future.set_result(True)
+
+
+concurrency_limiter = AdaptiveConcurrencyLimiter()
+
+SERVICE_UNAVAILABLE_BODY = orjson.dumps({"detail": "Server is overloaded, please retry"})
+
+
+def get_route_priority(method: str, path: str) -> int:
+    for rule_method, prefix, fragment, priority in ROUTE_PRIORITIES:
+        if rule_method and rule_method != method:
+            continue
+        if not path.startswith(prefix):
+            continue
+        if fragment and fragment not in path:
+            continue
+        return priority
+    return PRIORITY_NORMAL
+
+
+class ConcurrencyLimitMiddleware:
+    """ASGI middleware admitting requests through the adaptive limiter, shedding with a fast 503"""
+
+    def __init__(self, app, limiter: Optional[AdaptiveConcurrencyLimiter] = None):
+        self.app = app
+        self.limiter = limiter or concurrency_limiter
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in EXEMPT_PATHS or scope["path"].startswith(EXEMPT_PREFIXES):
+            await self.app(scope, receive, send)
+            return
+
+        if not await self.limiter.acquire(get_route_priority(scope["method"], scope["path"])):
+            await send({
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(SERVICE_UNAVAILABLE_BODY)).encode()),
+                    (b"retry-after", b"1"),
+                ],
+            })
+            await send({"type": "http.response.body", "body": SERVICE_UNAVAILABLE_BODY})
+            return
+
+        started = time.monotonic()
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            self.limiter.release(time.monotonic() - started, ok=status_code < 500)
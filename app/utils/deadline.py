@@ -0,0 +1,104 @@
+import asyncio
+import math
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+import pymongo
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from pymongo.errors import PyMongoError
+
+from config import DEADLINE_HEADER, DEADLINE_DEFAULT_MS, DEADLINE_MAX_MS, DEADLINE_ROUTE_DEFAULTS_MS, DEADLINE_EXEMPT_PREFIXES
+
+
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+def get_remaining_ms() -> Optional[int]:
+    """Milliseconds left before the current request's deadline, None outside a request"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return max(1, int((deadline - time.monotonic()) * 1000))
+
+
+def get_request_timeout_ms(scope) -> float:
+    """Timeout asked for by the client header, else the route default; clamped to [1, DEADLINE_MAX_MS]"""
+    header = DEADLINE_HEADER.encode("latin-1")
+    for name, value in scope["headers"]:
+        if name == header:
+            try:
+                timeout = float(value)
+            except ValueError:
+                break
+            # nan and inf would give no deadline at all, and pymongo.timeout() refuses negatives
+            if not math.isfinite(timeout):
+                break
+            return min(max(timeout, 1.0), DEADLINE_MAX_MS)
+
+    path = scope["path"]
+    for prefix, timeout in DEADLINE_ROUTE_DEFAULTS_MS.items():
+        if path.startswith(prefix):
+            return timeout
+    return DEADLINE_DEFAULT_MS
+
+
+class DeadlineMiddleware:
+    """ASGI middleware giving each request a deadline and cancelling it when the client leaves.
+
+    The handler runs under pymongo.timeout(), a contextvar PyMongo reads on
+    every operation: each find, aggregate or write is sent with the remaining
+    budget as maxTimeMS, so the server stops working on a request nobody is
+    waiting for any more.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(DEADLINE_EXEMPT_PREFIXES):
+            await self.app(scope, receive, send)
+            return
+
+        timeout = get_request_timeout_ms(scope) / 1000
+        token = _deadline.set(time.monotonic() + timeout)
+        messages: asyncio.Queue = asyncio.Queue()
+        disconnected = False
+
+        async def run_handler():
+            with pymongo.timeout(timeout):
+                await self.app(scope, messages.get, send)
+
+        handler = asyncio.create_task(run_handler())
+
+        async def watch_disconnect():
+            # Sole reader of the real receive channel; the handler reads from the queue
+            nonlocal disconnected
+            while True:
+                message = await receive()
+                await messages.put(message)
+                if message["type"] == "http.disconnect":
+                    disconnected = True
+                    handler.cancel()
+                    return
+
+        watcher = asyncio.create_task(watch_disconnect())
+        try:
+            await handler
+        except asyncio.CancelledError:
+            if not disconnected:
+                raise
+        finally:
+            watcher.cancel()
+            if not handler.done():
+                handler.cancel()
+            _deadline.reset(token)
+
+
+def init_deadline_handlers(app):
+    @app.exception_handler(PyMongoError)
+    async def mongo_error_handler(request: Request, exc: PyMongoError):
+        if exc.timeout:
+            return JSONResponse(status_code=504, content={"detail": "Request deadline exceeded"})
+        raise exc
@@ -0,0 +1,75 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Iterable, Optional, Tuple
+
+from fastapi import Request, Response
+
+from config import CACHE_CONTROL_POLICIES
+
+
+# Only the fields needed to answer a conditional GET
+VALIDATOR_PROJECTION = {"_id": 1, "version": 1, "updated_at": 1}
+
+Validators = Tuple[str, Optional[datetime]]
+
+
+def build_validators(documents: Iterable[dict]) -> Validators:
+    """ETag and Last-Modified for one or more documents from their id and version"""
+    digest = hashlib.blake2b(digest_size=12)
+    last_modified = None
+    for document in documents:
+        digest.update(f"{document['_id']}:{document.get('version', 0)};".encode())
+        updated_at = document.get("updated_at")
+        if updated_at and (last_modified is None or updated_at > last_modified):
+            last_modified = updated_at
+    return f'W/"{digest.hexdigest()}"', last_modified
+
+
+def build_list_validators(documents: Iterable[dict]) -> Validators:
+    """ETag of a page of documents, without Last-Modified.
+
+    Deleting a document, or one shifting into the page from the next, changes
+    the page without moving its newest updated_at, so If-Modified-Since would
+    answer 304 for a stale page; pages are only revalidated by ETag.
+    """
+    etag, _ = build_validators(documents)
+    return etag, None
+
+
+def is_not_modified(request: Request, validators: Validators) -> bool:
+    """Whether the client's copy is still current, per If-None-Match then If-Modified-Since"""
+    etag, last_modified = validators
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        candidates = [tag.strip() for tag in if_none_match.split(",")]
+        # Weak comparison, as required for If-None-Match
+        return "*" in candidates or any(tag.removeprefix("W/") == etag.removeprefix("W/") for tag in candidates)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        # A -0000 zone parses to a naive datetime, meaning UTC
+        return _as_utc(last_modified).replace(microsecond=0) <= _as_utc(since)
+    return False
+
+
+def apply_cache_headers(response: Response, policy: str, validators: Validators) -> Response:
+    etag, last_modified = validators
+    response.headers["ETag"] = etag
+    if last_modified:
+        response.headers["Last-Modified"] = format_datetime(_as_utc(last_modified), usegmt=True)
+    response.headers["Cache-Control"] = CACHE_CONTROL_POLICIES.get(policy, "no-cache")
+    return response
+
+
+def not_modified_response(policy: str, validators: Validators) -> Response:
+    return apply_cache_headers(Response(status_code=304), policy, validators)
+
+
+def _as_utc(moment: datetime) -> datetime:
+    # Mongo hands back naive datetimes in UTC
+    return moment.replace(tzinfo=timezone.utc) if moment.tzinfo is None else moment
@@ -0,0 +1,207 @@
+import asyncio
+import hashlib
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+import orjson
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from database.collections import get_idempotency_key_collection
+from config import (
+    IDEMPOTENCY_HEADER, IDEMPOTENCY_TTL_SECONDS, IDEMPOTENCY_LOCK_SECONDS,
+    IDEMPOTENCY_WAIT_SECONDS, IDEMPOTENCY_MAX_RESPONSE_BYTES
+)
+
+
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+REPLAYED_HEADER = b"idempotent-replayed"
+MAX_KEY_LENGTH = 255
+# Multipart uploads are too large to buffer for a fingerprint, and imports are idempotent already
+EXEMPT_PREFIXES = ("/imports",)
+# Transient outcomes a retry should get another go at; 5xx are never stored either
+RETRYABLE_STATUSES = {408, 425, 429}
+POLL_SECONDS = 0.05
+MAX_POLL_SECONDS = 0.5
+
+
+def _json_response(status: int, detail: str):
+    body = orjson.dumps({"detail": detail})
+    return [
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        },
+        {"type": "http.response.body", "body": body},
+    ]
+
+
+class IdempotencyMiddleware:
+    """ASGI middleware making writes safe to retry with an Idempotency-Key header.
+
+    The first request with a key claims it in Mongo and runs; its response is
+    stored next to a fingerprint of the request until the TTL index drops it.
+    A retry with the same key gets the stored response back without the handler
+    running again, a duplicate arriving while the first is still running waits
+    for it, and reusing a key for a different request is refused. Keys are
+    scoped to the caller's credentials and the route.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.header = IDEMPOTENCY_HEADER.lower().encode("latin-1")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in WRITE_METHODS or scope["path"].startswith(EXEMPT_PREFIXES):
+            await self.app(scope, receive, send)
+            return
+
+        key = authorization = None
+        for name, value in scope["headers"]:
+            if name == self.header:
+                key = value.decode("latin-1")
+            elif name == b"authorization":
+                authorization = value
+        if key is None:
+            await self.app(scope, receive, send)
+            return
+        if not key or len(key) > MAX_KEY_LENGTH:
+            await self._send_all(send, _json_response(400, f"{IDEMPOTENCY_HEADER} must be 1 to {MAX_KEY_LENGTH} characters"))
+            return
+
+        # The body is read up front for the fingerprint, then handed to the app unchanged
+        messages = []
+        body = hashlib.sha256()
+        while True:
+            message = await receive()
+            messages.append(message)
+            if message["type"] != "http.request":
+                break
+            body.update(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+
+        caller = hashlib.sha256(authorization or b"").hexdigest()[:32]
+        record_id = f"{caller}:{scope['method']}:{scope['path']}:{key}"
+        fingerprint = hashlib.sha256(
+            b"\0".join([scope["method"].encode(), scope["path"].encode(), scope.get("query_string", b""), body.digest()])
+        ).hexdigest()
+
+        collection = get_idempotency_key_collection()
+        owner = uuid4().hex
+        if not await self._claim(collection, record_id, fingerprint, owner):
+            record = await self._wait_for(collection, record_id, fingerprint, owner)
+            if record is None:
+                await self._send_all(send, _json_response(409, f"A request with this {IDEMPOTENCY_HEADER} is still in progress"))
+                return
+            if record["fingerprint"] != fingerprint:
+                await self._send_all(send, _json_response(422, f"{IDEMPOTENCY_HEADER} was already used for a different request"))
+                return
+            if record["status"] == "completed":
+                await self._replay(send, record["response"])
+                return
+            # The previous holder's lock ran out without a response: this request took over
+
+        pending = list(messages)
+
+        async def replay_receive():
+            if pending:
+                return pending.pop(0)
+            return await receive()
+
+        response = {"status": None, "headers": [], "body": []}
+        size = 0
+
+        async def capture_send(message):
+            nonlocal size
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["headers"] = [[name, value] for name, value in message.get("headers", [])]
+            elif message["type"] == "http.response.body" and size <= IDEMPOTENCY_MAX_RESPONSE_BYTES:
+                chunk = message.get("body", b"")
+                size += len(chunk)
+                response["body"].append(chunk)
+            await send(message)
+
+        stored = False
+        try:
+            await self.app(scope, replay_receive, capture_send)
+            status = response["status"]
+            if status is not None and status < 500 and status not in RETRYABLE_STATUSES and size <= IDEMPOTENCY_MAX_RESPONSE_BYTES:
+                await collection.update_one({"_id": record_id, "owner": owner}, {"$set": {
+                    "status": "completed",
+                    "response": {"status": status, "headers": response["headers"], "body": b"".join(response["body"])},
+                    "completed_at": datetime.utcnow()
+                }})
+                stored = True
+        finally:
+            if not stored:
+                # Nothing worth replaying: release the key so a retry runs the request again
+                await collection.delete_one({"_id": record_id, "owner": owner, "status": "in_progress"})
+
+    async def _claim(self, collection, record_id: str, fingerprint: str, owner: str) -> bool:
+        now = datetime.utcnow()
+        try:
+            await collection.insert_one({
+                "_id": record_id,
+                "fingerprint": fingerprint,
+                "owner": owner,
+                "status": "in_progress",
+                "locked_until": now + timedelta(seconds=IDEMPOTENCY_LOCK_SECONDS),
+                "expires_at": now + timedelta(seconds=IDEMPOTENCY_TTL_SECONDS)
+            })
+            return True
+        except DuplicateKeyError:
+            return False
+
+    async def _wait_for(self, collection, record_id: str, fingerprint: str, owner: str):
+        """The stored record once it is final, the taken-over record, or None on timeout"""
+        loop = asyncio.get_running_loop()
+        give_up_at = loop.time() + IDEMPOTENCY_WAIT_SECONDS
+        delay = POLL_SECONDS
+        while True:
+            record = await collection.find_one({"_id": record_id})
+            if record is None:
+                # The first request failed and released the key
+                if await self._claim(collection, record_id, fingerprint, owner):
+                    return {"fingerprint": fingerprint, "status": "in_progress"}
+                continue
+            if record["fingerprint"] != fingerprint or record["status"] == "completed":
+                return record
+
+            now = datetime.utcnow()
+            if record["locked_until"] <= now:
+                # Its holder died mid-request: take the lock over, once
+                taken = await collection.find_one_and_update(
+                    {"_id": record_id, "status": "in_progress", "locked_until": record["locked_until"]},
+                    {"$set": {"owner": owner, "locked_until": now + timedelta(seconds=IDEMPOTENCY_LOCK_SECONDS)}},
+                    return_document=ReturnDocument.AFTER
+                )
+                if taken:
+                    return taken
+                continue
+
+            if loop.time() >= give_up_at:
+                return None
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, MAX_POLL_SECONDS)
+
+    async def _replay(self, send, stored: dict):
+        headers = [(bytes(name), bytes(value)) for name, value in stored["headers"]]
+        headers.append((REPLAYED_HEADER, b"true"))
+        await send({"type": "http.response.start", "status": stored["status"], "headers": headers})
+        await send({"type": "http.response.body", "body": bytes(stored["body"])})
+
+    async def _send_all(self, send, messages):
+        for message in messages:
+            await send(message)
+
+
+def init_idempotency(app):
+    @app.on_event("startup")
+    async def prepare_idempotency_keys():
+        try:
+            await get_idempotency_key_collection().create_index("expires_at", expireAfterSeconds=0)
+        except Exception as e:
+            print(f"❌ Failed to create idempotency key indexes: {e}")
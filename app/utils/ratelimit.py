@@ -0,0 +1,198 @@
+import math
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import orjson
+
+from utils.auth import decode_access_token
+from config import (
+    RATE_LIMIT_BACKEND, REDIS_URL, RATE_LIMIT_RATE, RATE_LIMIT_BURST, RATE_LIMIT_ROUTE_COSTS,
+    RATE_LIMIT_MAX_KEYS, RATE_LIMIT_TOKEN_CACHE_SIZE
+)
+
+LOGIN_ROUTE = "/api/auth/login"
+# Probes from the orchestrator and load balancer must never be throttled
+EXEMPT_PATHS = {"/health/live", "/health/ready"}
+# Tokens without an exp claim are verified again after this long
+UNEXPIRING_TOKEN_CACHE_SECONDS = 60
+
+
+class InMemoryRateLimitBackend:
+    """Token buckets kept in an LRU dict; limits are per process"""
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self.buckets: "OrderedDict[str, List[float]]" = OrderedDict()
+
+    async def consume(self, key: str, cost: float, rate: float, capacity: float) -> Tuple[bool, float]:
+        """Take `cost` tokens from the bucket; returns (allowed, seconds until it would be allowed)"""
+        now = time.monotonic()
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            if len(self.buckets) >= self.max_keys:
+                self._evict()
+            bucket = self.buckets[key] = [capacity, now]
+        else:
+            self.buckets.move_to_end(key)
+
+        tokens = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+        bucket[1] = now
+        if tokens >= cost:
+            bucket[0] = tokens - cost
+            return True, 0.0
+
+        bucket[0] = tokens
+        return False, (cost - tokens) / rate
+
+    def _evict(self):
+        """Drop the least recently used tenth; a bucket idle long enough to have refilled loses nothing"""
+        for _ in range(max(1, self.max_keys // 10)):
+            if not self.buckets:
+                break
+            self.buckets.popitem(last=False)
+
+
+# Refill and consume atomically on the server so every API process shares one bucket
+TOKEN_BUCKET_SCRIPT = """
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local cost = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local capacity = tonumber(ARGV[3])
+local now = tonumber(ARGV[4])
+local tokens = tonumber(bucket[1]) or capacity
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local allowed = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return {allowed, tostring(tokens)}
+"""
+
+
+class RedisRateLimitBackend:
+    """Token buckets shared across processes in Redis (or any server speaking its protocol)"""
+
+    def __init__(self, client=None, prefix: str = "ratelimit:"):
+        if client is None:
+            import redis.asyncio as redis
+            client = redis.from_url(REDIS_URL)
+        self.client = client
+        self.prefix = prefix
+        self.script = client.register_script(TOKEN_BUCKET_SCRIPT)
+
+    async def consume(self, key: str, cost: float, rate: float, capacity: float) -> Tuple[bool, float]:
+        allowed, tokens = await self.script(keys=[self.prefix + key], args=[cost, rate, capacity, time.time()])
+        if allowed:
+            return True, 0.0
+        return False, (cost - float(tokens)) / rate
+
+
+def get_rate_limit_backend():
+    if RATE_LIMIT_BACKEND == "redis":
+        return RedisRateLimitBackend()
+    return InMemoryRateLimitBackend()
+
+
+TOO_MANY_REQUESTS_BODY = orjson.dumps({"detail": "Too many requests"})
+
+
+class RateLimitMiddleware:
+    """ASGI middleware throttling each client per route group with token buckets.
+
+    Clients are identified by the user_id of a valid bearer token and by IP
+    otherwise, so made-up tokens do not buy a fresh bucket. Verified tokens are
+    cached until they expire to keep the JWT decode off the hot path. Login is
+    always keyed by IP.
+    """
+
+    def __init__(
+        self,
+        app,
+        backend=None,
+        rate: float = RATE_LIMIT_RATE,
+        capacity: float = RATE_LIMIT_BURST,
+        route_costs: Optional[Dict[str, float]] = None
+    ):
+        self.app = app
+        self.backend = backend or get_rate_limit_backend()
+        # Authorization header -> (user_id, expiry) of tokens that verified
+        self.tokens: "OrderedDict[bytes, Tuple[str, float]]" = OrderedDict()
+        self.rate = rate
+        self.capacity = capacity
+        costs = RATE_LIMIT_ROUTE_COSTS if route_costs is None else route_costs
+        # Longest prefix first so the most specific rule wins
+        self.route_costs = sorted(costs.items(), key=lambda item: len(item[0]), reverse=True)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"]
+        route, cost = "default", 1.0
+        for prefix, prefix_cost in self.route_costs:
+            if path.startswith(prefix):
+                route, cost = prefix, prefix_cost
+                break
+
+        allowed, retry_after = await self.backend.consume(
+            f"{self._identify(scope, route)}|{route}", cost, self.rate, self.capacity
+        )
+        if allowed:
+            await self.app(scope, receive, send)
+            return
+
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(TOO_MANY_REQUESTS_BODY)).encode()),
+                (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": TOO_MANY_REQUESTS_BODY})
+
+    def _identify(self, scope, route: str) -> str:
+        if route != LOGIN_ROUTE:
+            for name, value in scope["headers"]:
+                if name == b"authorization":
+                    user_id = self._verified_user_id(value)
+                    if user_id is not None:
+                        return "user:" + user_id
+                    break
+        client = scope.get("client")
+        return "ip:" + (client[0] if client else "unknown")
+
+    def _verified_user_id(self, authorization: bytes) -> Optional[str]:
+        now = time.time()
+        cached = self.tokens.get(authorization)
+        if cached is not None:
+            user_id, expires = cached
+            if expires > now:
+                self.tokens.move_to_end(authorization)
+                return user_id
+            del self.tokens[authorization]
+            return None
+
+        scheme, _, token = authorization.decode("latin-1").partition(" ")
+        if scheme.lower() != "bearer" or not token:
+            return None
+        try:
+            payload = decode_access_token(token)
+        except Exception:
+            return None
+        if payload.get("user_id") is None:
+            return None
+
+        user_id = str(payload["user_id"])
+        # Failures are not cached: they are throttled by IP and must not push out real users
+        self.tokens[authorization] = (user_id, float(payload.get("exp") or now + UNEXPIRING_TOKEN_CACHE_SECONDS))
+        if len(self.tokens) > RATE_LIMIT_TOKEN_CACHE_SIZE:
+            self.tokens.popitem(last=False)
+        return user_id
@@ -0,0 +1,61 @@
+import time
+from http.cookies import SimpleCookie
+
+from database.database import read_primary
+from config import READ_YOUR_WRITES_SECONDS
+
+
+READ_PRIMARY_COOKIE = "read_primary_until"
+READ_PRIMARY_HEADER = b"x-read-primary-until"
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+
+class ReadYourWritesMiddleware:
+    """ASGI middleware pinning a client's reads to the primary for a while after it writes.
+
+    A successful write answers with a cookie (and a header for clients without
+    a cookie jar) holding the time until which that client's reads must not go
+    to a possibly lagging secondary. Being client-side, the pin holds whichever
+    worker process serves the next request.
+    """
+
+    def __init__(self, app, window_seconds: int = READ_YOUR_WRITES_SECONDS):
+        self.app = app
+        self.window_seconds = window_seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        token = read_primary.set(self._pinned_until(scope) > time.time())
+        is_write = scope["method"] in WRITE_METHODS
+
+        async def send_with_pin(message):
+            if is_write and message["type"] == "http.response.start" and message["status"] < 400:
+                until = str(int(time.time()) + self.window_seconds)
+                headers = list(message.get("headers", []))
+                headers.append((b"set-cookie", (
+                    f"{READ_PRIMARY_COOKIE}={until}; Max-Age={self.window_seconds}; Path=/; HttpOnly; SameSite=Lax"
+                ).encode()))
+                headers.append((READ_PRIMARY_HEADER, until.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_pin)
+        finally:
+            read_primary.reset(token)
+
+    def _pinned_until(self, scope) -> float:
+        for name, value in scope["headers"]:
+            try:
+                if name == READ_PRIMARY_HEADER:
+                    return float(value)
+                if name == b"cookie":
+                    cookie = SimpleCookie(value.decode("latin-1"))
+                    if READ_PRIMARY_COOKIE in cookie:
+                        return float(cookie[READ_PRIMARY_COOKIE].value)
+            except ValueError:
+                return 0.0
+        return 0.0